@@ -0,0 +1,53 @@
+"""
+Benchmark de cotización por lote frente al cálculo visitante por visitante.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_cotizacion
+"""
+import random
+import time
+
+from entradas.tarifas import TablaTarifas, EDAD_MAXIMA, np
+
+TAMANIOS = (10_000, 1_000_000)
+
+
+def _grupo(cantidad, semilla=42):
+    azar = random.Random(semilla)
+    edades = [azar.randint(0, EDAD_MAXIMA) for _ in range(cantidad)]
+    tipos_pase = [azar.choice(("Regular", "VIP")) for _ in range(cantidad)]
+    return edades, tipos_pase
+
+
+def _medir(funcion, repeticiones=3):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    tabla = TablaTarifas({"Regular": 5000, "VIP": 10000})
+    print(f"numpy: {'sí' if np is not None else 'no (camino en Python puro)'}")
+
+    for cantidad in TAMANIOS:
+        edades, tipos_pase = _grupo(cantidad)
+        visitantes = [{"edad": e, "tipo_pase": t} for e, t in zip(edades, tipos_pase)]
+        if np is not None:
+            # Las columnas ya llegan como arrays (p. ej. leídas de una planilla)
+            edades, tipos_pase = np.asarray(edades), np.asarray(tipos_pase)
+
+        t_escalar, total_escalar = _medir(lambda: sum(tabla.precio(v["edad"], v["tipo_pase"]) for v in visitantes))
+        t_lote, cotizacion = _medir(lambda: tabla.cotizar_lote(edades, tipos_pase))
+
+        assert cotizacion.total == total_escalar
+        print(
+            f"{cantidad:>9,} visitantes | escalar {t_escalar * 1000:9.2f} ms | "
+            f"lote {t_lote * 1000:8.2f} ms | x{t_escalar / t_lote:6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
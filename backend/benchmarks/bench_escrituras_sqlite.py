@@ -0,0 +1,135 @@
+"""
+Prueba de carga de escrituras concurrentes sobre SQLite: varios hilos compran entradas a la vez
+(reserva de cupo, Compra, Entradas y bandeja de salida, como un checkout) mientras otros listan
+compras. Compara la configuración original de SQLite (journal DELETE, timeout de 5 s, BEGIN
+diferido) con la de settings (WAL, busy_timeout, synchronous=NORMAL, mmap y BEGIN IMMEDIATE).
+
+Cada variante corre en un proceso aparte sobre un archivo nuevo.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_escrituras_sqlite
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ESCRITORES = 16
+COMPRAS_POR_ESCRITOR = 25
+LECTORES = 4
+
+VARIANTES = [
+    ("original (DELETE, timeout 5 s)", "0"),
+    ("ajustada (WAL + PRAGMAs)", "1"),
+]
+
+
+def _correr_variante():
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+    from datetime import datetime, timedelta
+    from decimal import Decimal
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import OperationalError, connection
+
+    from entradas.models import Pase, Compra, CupoDiario
+    from entradas.servicio_compra import ServicioCompraEntradas
+    from entradas.servicios_externos import PasarelaPagosSimulada
+
+    if os.environ['SQLITE_AJUSTES'] == '0':
+        # Lo que traía el proyecto: sin OPTIONS (timeout por defecto de 5 s, transacciones diferidas)
+        settings.DATABASES['default']['OPTIONS'] = {}
+    call_command('migrate', verbosity=0)
+
+    Pase.objects.create(nombre="Regular", precio=Decimal("5000"))
+    Pase.objects.create(nombre="VIP", precio=Decimal("10000"))
+    usuario = User.objects.create_user(username="carga", email="carga@example.com")
+    fecha = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    CupoDiario.objects.create(fecha_visita=fecha.date(), pase=None, capacidad=1_000_000)
+    visitantes = [{"edad": 30, "tipo_pase": "Regular"}, {"edad": 8, "tipo_pase": "VIP"}]
+    connection.close()
+
+    resultados = {"compras": 0, "bloqueos": 0, "otros_errores": 0, "lecturas": 0}
+    lock = threading.Lock()
+    terminado = threading.Event()
+
+    def sumar(clave):
+        with lock:
+            resultados[clave] += 1
+
+    def escribir():
+        servicio = ServicioCompraEntradas(PasarelaPagosSimulada(), None)
+        try:
+            for _ in range(COMPRAS_POR_ESCRITOR):
+                try:
+                    servicio.comprar_entradas(usuario, 2, fecha.isoformat(), "Tarjeta", visitantes)
+                    sumar("compras")
+                except OperationalError as e:
+                    sumar("bloqueos" if "locked" in str(e) else "otros_errores")
+        finally:
+            connection.close()
+
+    def leer():
+        try:
+            while not terminado.is_set():
+                try:
+                    list(Compra.objects.order_by('-id').values('id', 'monto_total')[:50])
+                    sumar("lecturas")
+                except OperationalError:
+                    sumar("bloqueos")
+        finally:
+            connection.close()
+
+    lectores = [threading.Thread(target=leer) for _ in range(LECTORES)]
+    escritores = [threading.Thread(target=escribir) for _ in range(ESCRITORES)]
+    inicio = time.perf_counter()
+    for hilo in lectores + escritores:
+        hilo.start()
+    for hilo in escritores:
+        hilo.join()
+    resultados["segundos"] = time.perf_counter() - inicio
+    terminado.set()
+    for hilo in lectores:
+        hilo.join()
+
+    print(json.dumps(resultados))
+
+
+def main():
+    print(f"{ESCRITORES} hilos x {COMPRAS_POR_ESCRITOR} compras, {LECTORES} hilos leyendo")
+    for nombre, ajustes in VARIANTES:
+        with tempfile.TemporaryDirectory() as directorio:
+            entorno = {
+                **os.environ,
+                'DB_MOTOR': 'sqlite',
+                'DB_NOMBRE': os.path.join(directorio, 'carga.sqlite3'),
+                'SQLITE_AJUSTES': ajustes,
+                'BENCH_VARIANTE': '1',
+            }
+            salida = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_escrituras_sqlite'],
+                env=entorno, capture_output=True, text=True, check=True,
+            )
+        r = json.loads(salida.stdout.strip().splitlines()[-1])
+        print(
+            f"{nombre:<32} | {r['compras']:5d} compras | {r['compras'] / r['segundos']:7.1f} compras/s | "
+            f"{r['bloqueos']:4d} 'database is locked' | {r['lecturas']:6d} lecturas"
+        )
+
+
+if __name__ == "__main__":
+    if os.environ.get('BENCH_VARIANTE'):
+        _correr_variante()
+    else:
+        main()
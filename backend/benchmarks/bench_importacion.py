@@ -0,0 +1,80 @@
+"""
+Importación masiva de reservas de agencias: arma un CSV de 50.000 filas (20 agencias, 12 fechas,
+edades y pases al azar, con un 1 % de filas inválidas) y lo importa con el comando
+importar_reservas, midiendo el tiempo total y las filas por segundo.
+
+Corre en un proceso aparte sobre un archivo SQLite nuevo.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_importacion
+"""
+import csv
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+FILAS = 50_000
+AGENCIAS = 20
+FECHAS = 12
+
+
+def _correr():
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+    from datetime import date, timedelta
+    from decimal import Decimal
+
+    from django.contrib.auth.models import Group, User
+    from django.core.management import call_command
+
+    from entradas.importacion import GRUPO_AGENCIAS
+    from entradas.models import Pase, Entrada
+
+    call_command('migrate', verbosity=0)
+    Pase.objects.create(nombre="Regular", precio=Decimal("5000"))
+    Pase.objects.create(nombre="VIP", precio=Decimal("10000"))
+    grupo = Group.objects.create(name=GRUPO_AGENCIAS)
+    for numero in range(AGENCIAS):
+        grupo.user_set.add(User.objects.create_user(username=f"agencia-{numero}", email=f"agencia{numero}@example.com"))
+
+    miercoles = date.today() + timedelta(days=7)
+    while miercoles.weekday() != 2:
+        miercoles += timedelta(days=1)
+    fechas = [miercoles + timedelta(weeks=semana) for semana in range(FECHAS)]
+
+    azar = random.Random(1)
+    archivo = os.path.join(os.path.dirname(os.environ['DB_NOMBRE']), 'reservas.csv')
+    with open(archivo, 'w', newline='') as salida:
+        escritor = csv.writer(salida)
+        escritor.writerow(['agencia', 'fecha_visita', 'edad', 'tipo_pase'])
+        for _ in range(FILAS):
+            escritor.writerow([
+                f"agencia-{azar.randrange(AGENCIAS)}",
+                azar.choice(fechas).isoformat(),
+                azar.randrange(0, 90) if azar.random() > 0.01 else "?",
+                azar.choice(["Regular", "VIP"]),
+            ])
+
+    inicio = time.perf_counter()
+    call_command('importar_reservas', archivo, stderr=open(os.devnull, 'w'))
+    segundos = time.perf_counter() - inicio
+    print(f"{FILAS} filas en {segundos:.1f} s ({FILAS / segundos:,.0f} filas/s); {Entrada.objects.count()} entradas creadas")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directorio:
+        entorno = {**os.environ, 'DB_MOTOR': 'sqlite', 'DB_NOMBRE': os.path.join(directorio, 'importacion.sqlite3'), 'BENCH_IMPORTACION': '1'}
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_importacion'], env=entorno, check=True)
+
+
+if __name__ == "__main__":
+    if os.environ.get('BENCH_IMPORTACION'):
+        _correr()
+    else:
+        main()
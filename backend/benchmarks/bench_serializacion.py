@@ -0,0 +1,88 @@
+"""
+Benchmark del listado de compras: ModelSerializer + JSONRenderer de DRF frente al serializer
+liviano (.values()) con JSONRenderer y con ORJSONRenderer, sobre 1.000 compras de 3 entradas.
+Mide de punta a punta (consultas, serialización y render) y reporta bytes por segundo.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_serializacion
+"""
+import os
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from entradas.api.renderers import ORJSONRenderer  # noqa: E402
+from entradas.api.serializers import CompraSerializer, CompraListaSerializer  # noqa: E402
+from entradas.models import Pase, Compra, Entrada  # noqa: E402
+
+CANTIDAD_COMPRAS = 1_000
+ENTRADAS_POR_COMPRA = 3
+
+
+def _poblar():
+    usuario = User.objects.create_user(username="bench", email="bench@example.com")
+    pases = [Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+             Pase.objects.create(nombre="VIP", precio=Decimal("10000"))]
+    compras = Compra.objects.bulk_create([
+        Compra(usuario=usuario, fecha_visita=date(2030, 1, 1) + timedelta(days=i % 90), monto_total=Decimal("15000"),
+               forma_pago=Compra.FormasPago.TARJETA, estado_pago=Compra.EstadosPago.PAGADO)
+        for i in range(CANTIDAD_COMPRAS)
+    ])
+    Entrada.objects.bulk_create([
+        Entrada(compra=compra, pase=pases[j % 2], edad_visitante=20 + j, precio_calculado=Decimal("5000"))
+        for compra in compras for j in range(ENTRADAS_POR_COMPRA)
+    ])
+
+
+def _completo(renderer):
+    compras = Compra.objects.select_related('usuario').prefetch_related('entradas__pase')
+    return renderer.render(CompraSerializer(compras, many=True).data)
+
+
+def _liviano(renderer):
+    filas = Compra.objects.values(*CompraListaSerializer.columnas)
+    return renderer.render(CompraListaSerializer(filas).data)
+
+
+def _medir(funcion, repeticiones=5):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    nombre_base = connection.creation.create_test_db(verbosity=0)
+    try:
+        _poblar()
+        variantes = [
+            ("ModelSerializer + JSONRenderer", lambda: _completo(JSONRenderer())),
+            ("liviano + JSONRenderer", lambda: _liviano(JSONRenderer())),
+            ("liviano + ORJSONRenderer", lambda: _liviano(ORJSONRenderer())),
+        ]
+        print(f"{CANTIDAD_COMPRAS:,} compras x {ENTRADAS_POR_COMPRA} entradas")
+        base = None
+        for nombre, funcion in variantes:
+            segundos, contenido = _medir(funcion)
+            base = base or segundos
+            print(
+                f"{nombre:<32} | {segundos * 1000:8.1f} ms | {len(contenido) / segundos / 1e6:7.1f} MB/s | "
+                f"x{base / segundos:5.1f}"
+            )
+    finally:
+        connection.creation.destroy_test_db(nombre_base, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def caches_limpias():
+    """Cada benchmark arranca con la tabla de tarifas, el calendario y el catálogo sin cachear."""
+    from entradas.tarifas import invalidar_tabla
+    from entradas.calendario import invalidar_calendario
+    from entradas.api.catalogo import invalidar_catalogo
+    invalidar_tabla()
+    invalidar_calendario()
+    invalidar_catalogo()
+    yield
+    invalidar_tabla()
+    invalidar_calendario()
+    invalidar_catalogo()
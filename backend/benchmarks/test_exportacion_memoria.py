@@ -0,0 +1,109 @@
+"""
+Memoria de la exportación en streaming: exporta 1.000.000 de entradas sintéticas y verifica que el
+pico de memoria del proceso (RSS) crezca menos que un presupuesto fijo, muy por debajo de lo que
+ocuparían las filas cargadas todas juntas.
+
+La carga y la exportación corren cada una en un proceso aparte sobre un archivo SQLite nuevo, para
+que la medición no arrastre la memoria de la carga ni de otros tests.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+FILAS = 1_000_000
+ENTRADAS_POR_COMPRA = 4
+# Crecimiento máximo del pico de RSS durante la exportación completa
+PRESUPUESTO_MB = 40
+
+
+def _cargar_filas(archivo):
+    """Inserta compras y entradas directo con sqlite3: por el ORM, la carga tardaría más que la exportación."""
+    import sqlite3
+
+    base = sqlite3.connect(archivo)
+    with base:
+        base.execute("INSERT INTO auth_user (id, password, is_superuser, username, first_name, last_name, email, "
+                     "is_staff, is_active, date_joined) VALUES (1, '', 0, 'carga', '', '', '', 0, 1, '2024-01-01 00:00:00')")
+        base.execute("INSERT INTO entradas_pase (id, nombre, precio) VALUES (1, 'Regular', '5000')")
+        compras = FILAS // ENTRADAS_POR_COMPRA
+        base.executemany(
+            "INSERT INTO entradas_compra (id, usuario_id, fecha_compra, fecha_visita, monto_total, forma_pago, estado_pago) "
+            "VALUES (?, 1, ?, '2024-01-10', '20000.00', 'TAR', 'PAG')",
+            ((id_compra, f"2024-01-{1 + id_compra % 7:02d} 12:00:00") for id_compra in range(1, compras + 1)),
+        )
+        base.executemany(
+            "INSERT INTO entradas_entrada (compra_id, pase_id, edad_visitante, precio_calculado) VALUES (?, 1, ?, '5000.00')",
+            ((1 + fila // ENTRADAS_POR_COMPRA, fila % 90) for fila in range(FILAS)),
+        )
+    base.close()
+
+
+def _rss_pico_mb():
+    import resource
+
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _preparar_django():
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+
+def _cargar():
+    _preparar_django()
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    _cargar_filas(os.environ['DB_NOMBRE'])
+
+
+def _exportar():
+    _preparar_django()
+    from django.core.management import call_command
+
+    # Un primer bloque carga módulos y cachés; lo que crezca después es de la exportación
+    call_command('exportar', 'entradas', formato=os.environ['EXPORTAR_FORMATO'], hasta='2024-01-01', salida=os.devnull)
+    antes = _rss_pico_mb()
+    call_command('exportar', 'entradas', formato=os.environ['EXPORTAR_FORMATO'], salida=os.environ['EXPORTAR_SALIDA'])
+    print(json.dumps({'antes_mb': antes, 'despues_mb': _rss_pico_mb()}))
+
+
+def _correr(paso, **entorno):
+    proceso = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.test_exportacion_memoria'],
+        env={**os.environ, 'DB_MOTOR': 'sqlite', 'BENCH_EXPORTAR': paso, **entorno},
+        capture_output=True, text=True, check=True,
+    )
+    return proceso.stdout
+
+
+@pytest.fixture(scope='module')
+def base_cargada(tmp_path_factory):
+    """La carga va en su propio proceso: el pico de memoria que mide la exportación es solo suyo."""
+    archivo = str(tmp_path_factory.mktemp('exportacion') / 'exportacion.sqlite3')
+    _correr('cargar', DB_NOMBRE=archivo)
+    return archivo
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason="ru_maxrss se informa en KB solo en Linux")
+@pytest.mark.parametrize('formato', ['csv', 'ndjson'])
+def test_exportar_un_millon_de_filas_en_memoria_constante(formato, base_cargada, tmp_path):
+    salida = tmp_path / f"entradas.{formato}"
+    # Sin mmap de SQLite: las páginas del archivo mapeadas también cuentan en el RSS y taparían el heap
+    resultado = _correr('exportar', DB_NOMBRE=base_cargada, SQLITE_MMAP='0', EXPORTAR_FORMATO=formato, EXPORTAR_SALIDA=str(salida))
+    memoria = json.loads(resultado.strip().splitlines()[-1])
+
+    with open(salida, 'rb') as archivo:
+        lineas = sum(1 for _ in archivo)
+    assert lineas == FILAS + (formato == 'csv')
+    assert memoria['despues_mb'] - memoria['antes_mb'] < PRESUPUESTO_MB, memoria
+
+
+if __name__ == "__main__":
+    {'cargar': _cargar, 'exportar': _exportar}[os.environ['BENCH_EXPORTAR']]()
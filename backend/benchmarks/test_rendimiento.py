@@ -0,0 +1,311 @@
+"""
+Benchmarks de los caminos calientes de la compra: precios, validaciones, serialización de
+compras anidadas, boletos, validación en los molinetes (con y sin red) y checkout de punta a punta. Ver benchmarks/pytest.ini para líneas base y umbral.
+"""
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from entradas.api.renderers import ORJSONRenderer
+from entradas.boletos import RenderizadorBoletos
+from entradas.api.serializers import CompraSerializer, CompraListaSerializer
+from entradas.calendario import CalendarioParque
+from entradas.credenciales import EPOCA, firmar
+from entradas.ingresos import USADA, VALIDA, IndiceIngresos
+from entradas import instantanea as modulo_instantanea
+from entradas.models import Pase, Compra, Entrada
+from entradas.servicio_compra import ServicioCompraEntradas
+from entradas.servicios_externos import PasarelaPagosSimulada
+from entradas.tarifas import TablaTarifas
+from entradas.trazas import tramo
+
+
+# Las operaciones de menos de un microsegundo se miden en tandas: así el tiempo de cada ronda
+# queda muy por encima de la resolución del reloj y las comparaciones con la línea base son estables
+TANDA = 1000
+
+
+def en_tanda(funcion, *args):
+    def tanda():
+        for _ in range(TANDA):
+            resultado = funcion(*args)
+        return resultado
+    return tanda
+
+
+# --- FIXTURES ---
+
+def _proximo_miercoles():
+    fecha = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+@pytest.fixture
+def servicio():
+    """Servicio con tarifas y calendario fijos: mide solo la lógica, sin base ni mocks."""
+    return ServicioCompraEntradas(
+        pasarela_pagos=PasarelaPagosSimulada(),
+        servicio_correo=None,
+        tarifas=TablaTarifas({"Regular": 5000, "VIP": 10000}),
+        calendario=CalendarioParque(),
+    )
+
+
+@pytest.fixture
+def visitantes():
+    return [{"edad": 30 + i, "tipo_pase": "VIP" if i % 2 else "Regular"} for i in range(10)]
+
+
+@pytest.fixture
+def compras(db):
+    usuario = User.objects.create_user(username="bench", email="bench@example.com")
+    pases = [Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+             Pase.objects.create(nombre="VIP", precio=Decimal("10000"))]
+    compras = Compra.objects.bulk_create([
+        Compra(usuario=usuario, fecha_visita=_proximo_miercoles().date(), monto_total=Decimal("15000"),
+               forma_pago=Compra.FormasPago.TARJETA, estado_pago=Compra.EstadosPago.PAGADO)
+        for _ in range(50)
+    ])
+    Entrada.objects.bulk_create([
+        Entrada(compra=compra, pase=pases[j % 2], edad_visitante=20 + j, precio_calculado=Decimal("5000"))
+        for compra in compras for j in range(3)
+    ])
+    return compras
+
+
+# --- PRECIOS ---
+
+def test_calcular_precio_entrada(benchmark, servicio):
+    assert benchmark(en_tanda(servicio._calcular_precio_entrada, 30, "VIP")) == Decimal("10000")
+
+
+def test_calcular_monto_total(benchmark, servicio, visitantes):
+    assert benchmark(en_tanda(servicio._calcular_monto_total, visitantes)) == Decimal("75000")
+
+
+# --- VALIDACIONES ---
+
+def test_validar_usuario(benchmark, servicio):
+    usuario = SimpleNamespace(email="juan@example.com", esta_registrado=True)
+    assert benchmark(en_tanda(servicio._validar_usuario, usuario))
+
+
+def test_validar_formato_cantidad(benchmark, servicio):
+    assert benchmark(en_tanda(servicio._validar_formato_cantidad, 10))
+
+
+def test_validar_cantidad(benchmark, servicio, visitantes):
+    assert benchmark(en_tanda(servicio._validar_cantidad, 10, visitantes))
+
+
+def test_validar_formato_edades(benchmark, servicio, visitantes):
+    assert benchmark(en_tanda(servicio._validar_formato_edades, visitantes))
+
+
+def test_validar_formato_pases(benchmark, servicio, visitantes):
+    assert benchmark(en_tanda(servicio._validar_formato_pases, visitantes))
+
+
+def test_validar_formato_fecha(benchmark, servicio):
+    assert benchmark(en_tanda(servicio._validar_formato_fecha, _proximo_miercoles().isoformat()))
+
+
+def test_validar_fecha_hora_visita(benchmark, servicio):
+    assert benchmark(en_tanda(servicio._validar_fecha_hora_visita, _proximo_miercoles()))
+
+
+# --- TRAMOS DE TIEMPO ---
+# Con las trazas deshabilitadas un tramo debe costar mucho menos que la etapa más barata que
+# mide (calcular el monto de 10 visitantes); un checkout abre seis
+
+def test_tramo_deshabilitado(benchmark):
+    def abrir_tramo():
+        with tramo("compra.precios"):
+            pass
+
+    with override_settings(TRAZAS={'HABILITADAS': False, 'OTEL': False}):
+        benchmark(en_tanda(abrir_tramo))
+
+
+def test_calcular_monto_total_en_tramo_deshabilitado(benchmark, servicio, visitantes):
+    def calcular():
+        with tramo("compra.precios"):
+            return servicio._calcular_monto_total(visitantes)
+
+    with override_settings(TRAZAS={'HABILITADAS': False, 'OTEL': False}):
+        assert benchmark(en_tanda(calcular)) == Decimal("75000")
+
+
+# --- SERIALIZACIÓN DE COMPRAS ANIDADAS (50 compras x 3 entradas) ---
+
+@pytest.mark.django_db
+def test_serializar_compras_model_serializer(benchmark, compras):
+    def serializar():
+        queryset = Compra.objects.select_related('usuario').prefetch_related('entradas__pase')
+        return JSONRenderer().render(CompraSerializer(queryset, many=True).data)
+
+    assert benchmark(serializar)
+
+
+@pytest.mark.django_db
+def test_serializar_compras_liviano_orjson(benchmark, compras):
+    def serializar():
+        filas = Compra.objects.values(*CompraListaSerializer.columnas)
+        return ORJSONRenderer().render(CompraListaSerializer(filas).data)
+
+    assert benchmark(serializar)
+
+
+# --- BOLETOS (credencial firmada + QR + PDF) ---
+
+def _boletos(compra_id, cantidad=10):
+    fecha = _proximo_miercoles().date()
+    return [
+        {"entrada_id": compra_id * 10 + numero, "compra_id": compra_id, "fecha_visita": fecha, "pase": "Regular",
+         "edad": 30, "precio": Decimal("5000.00"), "token": firmar(compra_id * 10 + numero, fecha, 1)}
+        for numero in range(cantidad)
+    ]
+
+
+def test_renderizar_boletos_de_una_compra(benchmark):
+    renderizador = RenderizadorBoletos()
+    boletos = _boletos(1)
+
+    assert benchmark(renderizador.renderizar, boletos).startswith(b"%PDF")
+
+
+def test_renderizar_lote_de_10k_boletos(benchmark):
+    """Lo que hace el worker con 1000 compras de 10 entradas: firmar cada credencial y armar cada PDF."""
+    renderizador = RenderizadorBoletos()
+
+    def renderizar_lote():
+        return [renderizador.renderizar(_boletos(compra_id)) for compra_id in range(1, 1001)]
+
+    assert len(benchmark.pedantic(renderizar_lote, rounds=3, warmup_rounds=1)) == 1000
+
+
+# --- MOLINETES (índice de ingresos del día, 100k entradas) ---
+
+ENTRADAS_DEL_DIA = 100_000
+
+
+@pytest.fixture
+def entradas_del_dia(db):
+    """ENTRADAS_DEL_DIA entradas pagadas de una fecha, en una sola compra; retorna la fecha y los tokens de 1 de cada 10."""
+    fecha = _proximo_miercoles().date()
+    pase = Pase.objects.create(nombre="Regular", precio=Decimal("5000"))
+    compra = Compra.objects.create(
+        usuario=User.objects.create_user(username="bench", email="bench@example.com"), fecha_visita=fecha,
+        monto_total=Decimal("5000") * ENTRADAS_DEL_DIA, forma_pago=Compra.FormasPago.TARJETA,
+        estado_pago=Compra.EstadosPago.PAGADO,
+    )
+    Entrada.objects.bulk_create(
+        (Entrada(compra=compra, pase=pase, edad_visitante=30, precio_calculado=Decimal("5000")) for _ in range(ENTRADAS_DEL_DIA)),
+        batch_size=5000,
+    )
+    ids = Entrada.objects.order_by('id').values_list('id', flat=True)[::10]
+    return fecha, [firmar(entrada_id, fecha, pase.id) for entrada_id in ids]
+
+
+def test_validar_10k_ingresos(benchmark, entradas_del_dia):
+    """10k validaciones contra un índice recién cargado: firma, búsqueda binaria y el UPDATE que acepta cada una."""
+    fecha, credenciales = entradas_del_dia
+    ahora = timezone.now()
+
+    def indice_nuevo():
+        Entrada.objects.update(fecha_ingreso=None)
+        return (IndiceIngresos.cargar(fecha),), {}
+
+    def validar_todas(indice):
+        return [indice.validar(token, ahora).resultado for token in credenciales]
+
+    resultados = benchmark.pedantic(validar_todas, setup=indice_nuevo, rounds=5)
+    assert resultados == [VALIDA] * len(credenciales)
+
+
+def test_rechazar_10k_ingresos_repetidos(benchmark):
+    """10k credenciales ya usadas: se rechazan con el bitset del índice, sin base."""
+    fecha = _proximo_miercoles().date()
+    ids = range(1, ENTRADAS_DEL_DIA + 1)
+    credenciales = [firmar(entrada_id, fecha, 1) for entrada_id in range(1, ENTRADAS_DEL_DIA + 1, 10)]
+    ahora = datetime.now()
+    indice = IndiceIngresos(fecha, ids, [1] * ENTRADAS_DEL_DIA, [30] * ENTRADAS_DEL_DIA, dict.fromkeys(ids, ahora), {1: "Regular"})
+
+    resultados = benchmark(lambda: [indice.validar(token, ahora).resultado for token in credenciales])
+    assert resultados == [USADA] * len(credenciales)
+
+
+def _archivo_instantanea(ruta, fecha, cantidad):
+    """Instantánea de `cantidad` entradas sin pasar por la base (ids 1..cantidad, un pase)."""
+    pases = b'{"1": "Regular"}'
+    with open(ruta, 'wb') as archivo:
+        archivo.write(modulo_instantanea._CABECERA.pack(
+            modulo_instantanea.MAGIA, modulo_instantanea.VERSION, modulo_instantanea._REGISTRO.size,
+            (fecha - EPOCA).days, cantidad, len(pases),
+        ))
+        archivo.write(b"".join(modulo_instantanea._REGISTRO.pack(entrada_id, 1, 30, 0) for entrada_id in range(1, cantidad + 1)))
+        archivo.write(pases)
+    return str(ruta)
+
+
+@pytest.mark.parametrize("cantidad", [1_000, 500_000])
+def test_abrir_instantanea(benchmark, tmp_path, cantidad):
+    """Abrir la instantánea no depende de la cantidad de entradas: los dos tamaños deben medir lo mismo."""
+    ruta = _archivo_instantanea(tmp_path / "ingresos.bin", _proximo_miercoles().date(), cantidad)
+
+    def abrir():
+        instantanea = modulo_instantanea.Instantanea(ruta)
+        instantanea.cerrar()
+        return instantanea
+
+    assert len(benchmark(abrir)) == cantidad
+
+
+def test_validar_10k_ingresos_sin_red(benchmark, tmp_path):
+    """10k validaciones en un molinete sin red contra una instantánea de 500k entradas, con bitácora en disco."""
+    fecha = _proximo_miercoles().date()
+    ruta = _archivo_instantanea(tmp_path / "ingresos.bin", fecha, 500_000)
+    credenciales = [firmar(entrada_id, fecha, 1) for entrada_id in range(1, 500_001, 50)]
+    ahora = datetime.now()
+    rondas = iter(range(100))
+
+    def validador_nuevo():
+        return (modulo_instantanea.ValidadorOffline(ruta, str(tmp_path / f"bitacora-{next(rondas)}.csv")),), {}
+
+    def validar_todas(validador):
+        resultados = [validador.validar(token, ahora).resultado for token in credenciales]
+        validador.cerrar()
+        return resultados
+
+    resultados = benchmark.pedantic(validar_todas, setup=validador_nuevo, rounds=10)
+    assert resultados == [VALIDA] * len(credenciales)
+
+
+# --- CHECKOUT DE PUNTA A PUNTA ---
+
+@pytest.mark.django_db
+def test_checkout_por_api(benchmark):
+    Pase.objects.create(nombre="Regular", precio=Decimal("5000"))
+    Pase.objects.create(nombre="VIP", precio=Decimal("10000"))
+    cliente = APIClient()
+    cliente.force_authenticate(user=User.objects.create_user(username="juan", email="juan@example.com"))
+    carrito = {
+        "fecha_visita": _proximo_miercoles().isoformat(),
+        "tipo_pago": "Tarjeta",
+        "visitantes": [{"edad": 30, "tipo_pase": "Regular"}, {"edad": 8, "tipo_pase": "VIP"}, {"edad": 2, "tipo_pase": "Regular"}],
+    }
+
+    # Rondas fijas: cada checkout descuenta cupo del día
+    respuesta = benchmark.pedantic(
+        lambda: cliente.post("/api/compras/checkout/", carrito, format="json"), rounds=100, warmup_rounds=5,
+    )
+    assert respuesta.status_code == 201
@@ -10,8 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
+import django
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'entradas.middleware.MetricasMiddleware',  # Primero, para medir el request completo
+    'entradas.middleware.EnrutadorLecturasMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -60,10 +67,22 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Con orjson instalado la API renderiza y parsea JSON con él (mucho más rápido en listados grandes)
+JSON_RAPIDO = importlib.util.find_spec('orjson') is not None
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Para desarrollo
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'entradas.api.renderers.ORJSONRenderer' if JSON_RAPIDO else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'entradas.api.renderers.ORJSONParser' if JSON_RAPIDO else 'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 ROOT_URLCONF = 'config.urls'
@@ -90,11 +109,204 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Se elige con DB_MOTOR ('sqlite' por defecto o 'postgresql') y el resto de variables DB_*
+
+DB_MOTOR = os.environ.get('DB_MOTOR', 'sqlite')
+
+if DB_MOTOR == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NOMBRE', 'entradas'),
+            'USER': os.environ.get('DB_USUARIO', ''),
+            'PASSWORD': os.environ.get('DB_CLAVE', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PUERTO', ''),
+            # Conexiones persistentes: cada worker reusa la suya hasta CONN_MAX_AGE segundos y la
+            # verifica antes de cada request, así un corte de la base no deja conexiones rotas
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    DB_POOL = os.environ.get('DB_POOL', '')
+    if DB_POOL == 'pgbouncer':
+        # PgBouncer en modo transaction reparte las conexiones entre transacciones: los cursores
+        # del lado del servidor (.iterator()) no sobreviven al cambio de conexión
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    elif DB_POOL == 'interno':
+        # Pool de psycopg dentro de cada proceso (Django 5.1+); reemplaza a las conexiones persistentes
+        if django.VERSION < (5, 1):
+            raise ImproperlyConfigured("DB_POOL=interno requiere Django 5.1 o superior; usar DB_POOL=pgbouncer o ninguno.")
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MINIMO', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAXIMO', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NOMBRE', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Segundos que una escritura espera el lock antes de fallar con "database is locked"
+                'timeout': int(os.environ.get('SQLITE_ESPERA', 20)),
+            },
+            # Los tests usan un archivo y no la base en memoria compartida, que ante escrituras
+            # concurrentes falla al instante con "table is locked" en lugar de esperar el timeout
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
     }
+    if django.VERSION >= (5, 1):
+        # BEGIN IMMEDIATE toma el lock de escritura al empezar la transacción: una transacción que
+        # lee y después escribe espera su turno en vez de fallar al querer pasar a escritura
+        DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+
+# Réplica de solo lectura opcional (DB_REPLICA_NOMBRE con SQLite, DB_REPLICA_HOST con PostgreSQL).
+# Los listados y reportes leen de ella; ver entradas.enrutador
+
+if DB_MOTOR == 'postgresql' and os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PUERTO', DATABASES['default']['PORT']),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif DB_MOTOR != 'postgresql' and os.environ.get('DB_REPLICA_NOMBRE'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DB_REPLICA_NOMBRE'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['entradas.enrutador.EnrutadorLecturas']
+
+REPLICA_LECTURAS = {
+    # Después de escribir, un cliente lee del primario durante estos segundos (read-your-writes)
+    'SEGUNDOS_EN_PRIMARIO': int(os.environ.get('DB_REPLICA_RETRASO', 10)),
+}
+
+# PRAGMAs que entradas.base_datos aplica a cada conexión SQLite nueva (SQLITE_AJUSTES=0 los desactiva).
+# WAL deja leer mientras se escribe; synchronous=NORMAL es seguro con WAL y evita un fsync por commit
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': int(os.environ.get('SQLITE_ESPERA', 20)) * 1000,
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.environ.get('SQLITE_MMAP', 256 * 1024 * 1024)),
+} if os.environ.get('SQLITE_AJUSTES', '1') != '0' else {}
+
+
+# Email
+# https://docs.djangoproject.com/en/4.2/topics/email/
+
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'no-reply@ecoharmonypark.com'
+
+
+# Pasarela de pagos (sin URL se usa la pasarela simulada de desarrollo)
+
+PASARELA_PAGOS = {
+    'URL': os.environ.get('PASARELA_PAGOS_URL', ''),
+    'TOKEN': os.environ.get('PASARELA_PAGOS_TOKEN', ''),
+    'PLAZO': float(os.environ.get('PASARELA_PAGOS_PLAZO', 5)),  # Segundos por operación, reintentos incluidos
+    'REINTENTOS': 2,
+    'TAMANIO_POOL': 20,
+    'TAMANIO_POOL_ASYNC': 200,  # Conexiones simultáneas del checkout async (ASGI)
+    'UMBRAL_FALLOS': 5,
+    'TIEMPO_APERTURA': 30.0,
+}
+
+
+# Credenciales de las entradas (token firmado con HMAC que lleva el QR de cada entrada).
+# CLAVES: id -> secreto; se firma con la VIGENTE y se verifican todas, así una rotación no invalida
+# las entradas ya emitidas. Formato del entorno: "1:secreto,2:otro". Sin claves solo se puede arrancar
+# con DEBUG, y se deriva de SECRET_KEY: la del repositorio es pública y con ella cualquiera emitiría entradas.
+
+_claves_credenciales = {
+    int(clave_id): secreto
+    for clave_id, _, secreto in (par.partition(':') for par in os.environ.get('CREDENCIALES_CLAVES', '').split(',') if par)
+}
+if not _claves_credenciales:
+    if not DEBUG:
+        raise ImproperlyConfigured("Falta CREDENCIALES_CLAVES: las credenciales de las entradas necesitan claves propias.")
+    _claves_credenciales = {1: SECRET_KEY}
+if not all(_claves_credenciales.values()):
+    raise ImproperlyConfigured("CREDENCIALES_CLAVES tiene claves sin secreto (formato \"id:secreto,id:secreto\").")
+# El id de la clave viaja en un byte del token (entradas/credenciales.py)
+_ids_fuera_de_rango = sorted(clave_id for clave_id in _claves_credenciales if not 0 <= clave_id <= 255)
+if _ids_fuera_de_rango:
+    raise ImproperlyConfigured(
+        f"CREDENCIALES_CLAVES tiene ids fuera de rango ({', '.join(map(str, _ids_fuera_de_rango))}): van de 0 a 255."
+    )
+
+CREDENCIALES = {
+    'CLAVES': _claves_credenciales,
+    # Sin CREDENCIALES_VIGENTE se firma con la de id más alto (la última agregada en una rotación)
+    'VIGENTE': int(os.environ.get('CREDENCIALES_VIGENTE', max(_claves_credenciales))),
+}
+if CREDENCIALES['VIGENTE'] not in CREDENCIALES['CLAVES']:
+    raise ImproperlyConfigured(
+        f"CREDENCIALES_VIGENTE ({CREDENCIALES['VIGENTE']}) no es ninguna de las claves de CREDENCIALES_CLAVES."
+    )
+
+
+# Capacidad diaria del parque (entradas por fecha de visita) cuando la fecha no tiene un CupoDiario cargado
+
+CAPACIDAD_DIARIA_PARQUE = 5000
+
+
+# Catálogo de pases y tabla de tarifas en caché: por defecto en memoria de cada proceso; con varios
+# workers conviene indicar un alias de CACHES compartido (p. ej. Redis) para que la invalidación
+# llegue a todos (la tabla de tarifas guarda ahí solo su versión)
+
+CATALOGO_PASES = {
+    'CACHE': os.environ.get('CATALOGO_PASES_CACHE', ''),
+}
+
+
+# Perfilado de requests con cProfile: se perfilan los que traen el header con el token
+# y una muestra aleatoria (MUESTREO = fracción de requests, 0 = ninguno)
+
+PERFILADO = {
+    'HEADER': 'X-Perfilar',
+    'TOKEN': os.environ.get('PERFILADO_TOKEN', ''),
+    'MUESTREO': float(os.environ.get('PERFILADO_MUESTREO', 0)),
+    'DIRECTORIO': os.environ.get('PERFILADO_DIRECTORIO', str(BASE_DIR / 'perfiles')),
+}
+
+
+# Tramos de tiempo dentro del servicio de compra (validación, precios, cupo, pago, registro),
+# emitidos como logs estructurados en 'entradas.trazas' y, con OTEL, también como spans de
+# OpenTelemetry (el exportador se configura con el SDK, p. ej. OTEL_TRACES_EXPORTER=console)
+
+TRAZAS = {
+    'HABILITADAS': os.environ.get('TRAZAS_HABILITADAS', '') == '1',
+    'OTEL': os.environ.get('TRAZAS_OTEL', '') == '1',
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'entradas.trazas.FormatoJSON'},
+    },
+    'handlers': {
+        'trazas': {'class': 'logging.StreamHandler', 'formatter': 'json'},
+    },
+    'loggers': {
+        'entradas.trazas': {'handlers': ['trazas'], 'level': 'INFO'},
+    },
+}
+
+
+# Claves Idempotency-Key de compras y pagos: cuánto tiempo se guardan (segundos) y cuántas
+# respuestas recientes se sirven desde memoria sin consultar la base
+
+IDEMPOTENCIA = {
+    'TTL': int(os.environ.get('IDEMPOTENCIA_TTL', 24 * 60 * 60)),
+    'MAXIMO_EN_MEMORIA': 1000,
 }
 
 
@@ -17,7 +17,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from entradas.metricas import vista_metricas
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('entradas.api.urls')),
+    path('metricas/', vista_metricas, name='metricas'),
 ]
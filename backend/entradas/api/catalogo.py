@@ -0,0 +1,97 @@
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import parse_etags, patch_cache_control, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from entradas.models import Pase
+from .serializers import PaseListaSerializer
+
+CLAVE_CACHE = 'entradas:catalogo_pases'
+
+
+def calcular_etag(datos) -> str:
+    """ETag fuerte: hash del JSON canónico de los datos."""
+    contenido = json.dumps(datos, sort_keys=True, cls=DjangoJSONEncoder).encode()
+    return quote_etag(hashlib.sha256(contenido).hexdigest()[:32])
+
+
+class CatalogoPases:
+    """
+    Catálogo de pases ya serializado, con el ETag del listado y de cada pase.
+    Se arma una sola vez y se reutiliza hasta que cambie algún Pase.
+    """
+
+    def __init__(self, datos: list):
+        self.lista = datos
+        self.etag = calcular_etag(datos)
+        self._por_id = {str(pase['id']): (pase, calcular_etag(pase)) for pase in datos}
+
+    def pase(self, pk):
+        """(datos, etag) del pase, o None si no existe."""
+        return self._por_id.get(str(pk))
+
+
+def _construir() -> CatalogoPases:
+    return CatalogoPases(PaseListaSerializer(Pase.objects.order_by('id').values(*PaseListaSerializer.columnas)).data)
+
+
+def _cache_compartida():
+    """Backend de caché compartido entre procesos (settings.CATALOGO_PASES['CACHE']), si hay uno."""
+    alias = settings.CATALOGO_PASES.get('CACHE')
+    return caches[alias] if alias else None
+
+
+# Caché del proceso
+_lock = threading.Lock()
+_catalogo = None
+
+
+def obtener_catalogo() -> CatalogoPases:
+    """Retorna el catálogo vigente, construyéndolo desde la base (una sola consulta) si hace falta."""
+    compartida = _cache_compartida()
+    if compartida is not None:
+        catalogo = compartida.get(CLAVE_CACHE)
+        if catalogo is None:
+            catalogo = _construir()
+            compartida.set(CLAVE_CACHE, catalogo, timeout=None)
+        return catalogo
+
+    global _catalogo
+    catalogo = _catalogo
+    if catalogo is not None:
+        return catalogo
+    with _lock:
+        if _catalogo is None:
+            _catalogo = _construir()
+        return _catalogo
+
+
+def invalidar_catalogo():
+    """Descarta el catálogo en caché (del proceso y compartido); la próxima consulta lo reconstruye."""
+    global _catalogo
+    with _lock:
+        _catalogo = None
+    compartida = _cache_compartida()
+    if compartida is not None:
+        compartida.delete(CLAVE_CACHE)
+
+
+def respuesta_condicional(request, datos, etag: str, max_age: int) -> Response:
+    """
+    Responde 304 sin cuerpo si el cliente ya tiene esta versión (If-None-Match),
+    o los datos completos; en ambos casos con ETag y Cache-Control.
+    """
+    etags_cliente = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in etags_cliente or '*' in etags_cliente:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(datos)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from entradas.models import ClaveIdempotencia
+
+HEADER = 'Idempotency-Key'
+LARGO_MAXIMO_CLAVE = 100
+
+
+class CacheLRU:
+    """Caché en memoria acotada (LRU) con vencimiento, delante de la tabla de claves."""
+
+    def __init__(self, maximo: int, ttl: float, reloj=time.monotonic):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._reloj = reloj
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            item = self._items.get(clave)
+            if item is None:
+                return None
+            valor, vence = item
+            if self._reloj() >= vence:
+                del self._items[clave]
+                return None
+            self._items.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._items[clave] = (valor, self._reloj() + self.ttl)
+            self._items.move_to_end(clave)
+            while len(self._items) > self.maximo:
+                self._items.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._items.clear()
+
+
+def _ttl() -> timedelta:
+    return timedelta(seconds=settings.IDEMPOTENCIA['TTL'])
+
+
+cache_respuestas = CacheLRU(maximo=settings.IDEMPOTENCIA['MAXIMO_EN_MEMORIA'], ttl=settings.IDEMPOTENCIA['TTL'])
+
+
+def huella_de(datos) -> str:
+    return hashlib.sha256(json.dumps(datos, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+def como_json(datos):
+    """Los datos de la respuesta tal como se guardan (Decimal, fechas, etc. pasados a JSON)."""
+    return json.loads(json.dumps(datos, cls=DjangoJSONEncoder))
+
+
+def _repetir(estado_http, respuesta):
+    return Response(respuesta, status=estado_http, headers={'Idempotent-Replayed': 'true'})
+
+
+def alcance_de(request):
+    """
+    Usuario, método y ruta a los que aplica la clave. None si el request es anónimo: no hay nada
+    propio del cliente que separe sus claves de las de otros anónimos.
+    """
+    if not request.user.is_authenticated:
+        return None
+    return f"{request.user.pk}:{request.method} {request.path}"
+
+
+def referencia_de(registro: ClaveIdempotencia) -> str:
+    """
+    Referencia de cobro derivada de la clave: la misma en cada reintento y distinta entre usuarios,
+    acciones y usos de la clave después de vencida. Llega a la pasarela como su clave de
+    idempotencia, así un reintento no cobra dos veces.
+    """
+    return hashlib.sha256(f"{registro.alcance}\n{registro.clave}\n{registro.fecha_creacion.isoformat()}".encode()).hexdigest()
+
+
+def tomar_clave(alcance: str, clave: str, huella: str):
+    """
+    Registra la clave como request en curso. Retorna (registro, None) si hay que atender el request,
+    o (None, (estado_http, datos, repetida)) con la respuesta que corresponde sin atenderlo.
+    """
+    ahora = timezone.now()
+    try:
+        # Savepoint propio: el choque de la clave única no debe romper la transacción del request
+        with transaction.atomic():
+            return ClaveIdempotencia.objects.create(alcance=alcance, clave=clave, huella=huella, expira=ahora + _ttl()), None
+    except IntegrityError:
+        pass
+
+    registro = ClaveIdempotencia.objects.filter(alcance=alcance, clave=clave).first()
+    if registro is None or registro.expira <= ahora:
+        # Clave vencida (o borrada mientras tanto): se libera y se atiende como un request nuevo
+        ClaveIdempotencia.objects.filter(alcance=alcance, clave=clave, expira__lte=ahora).delete()
+        return tomar_clave(alcance, clave, huella)
+    if registro.huella != huella:
+        return None, (status.HTTP_422_UNPROCESSABLE_ENTITY, {"error": f"El {HEADER} ya se usó con otros datos."}, False)
+    if registro.estado_http is not None and registro.estado_http >= 500:
+        # El intento anterior falló, quizás después de cobrar: se vuelve a atender con la misma
+        # referencia de cobro. El UPDATE condicional deja pasar a un solo reintento a la vez.
+        retomada = ClaveIdempotencia.objects.filter(id=registro.id, estado_http=registro.estado_http).update(
+            estado_http=None, respuesta=None, expira=ahora + _ttl(),
+        )
+        if retomada:
+            return registro, None
+    elif registro.estado_http is not None:
+        cache_respuestas.guardar((alcance, clave), (huella, registro.estado_http, registro.respuesta))
+        return None, (registro.estado_http, registro.respuesta, True)
+    return None, (status.HTTP_409_CONFLICT, {"error": f"Ya hay un request en curso con el mismo {HEADER}."}, False)
+
+
+def guardar_respuesta(registro, alcance: str, clave: str, huella: str, estado_http: int, datos):
+    """
+    Guarda la respuesta del request. Las 5xx no se repiten: la clave queda marcada como fallida
+    (no se borra) hasta que un reintento con los mismos datos la retome.
+    """
+    ClaveIdempotencia.objects.filter(id=registro.id).update(estado_http=estado_http, respuesta=datos)
+    if estado_http < 500:
+        cache_respuestas.guardar((alcance, clave), (huella, estado_http, datos))
+
+
+class Intento:
+    """
+    Un request con Idempotency-Key, con los pasos que comparten la acción síncrona (idempotente)
+    y la vista async (views_async.checkout_async): `abrir` decide si hay que atenderlo y `cerrar`
+    guarda la respuesta. Los pasos que tocan la base tienen su variante `*_async`.
+    """
+
+    def __init__(self, alcance: str, clave: str, datos):
+        self.alcance = alcance
+        self.clave = clave
+        self.huella = huella_de(datos)
+        self.registro = None
+
+    @property
+    def referencia(self) -> str:
+        """Referencia de cobro del intento (ver referencia_de); existe una vez abierto."""
+        return referencia_de(self.registro)
+
+    def _sin_base(self):
+        """La respuesta que se decide sin ir a la base (request anónimo, clave inválida o ya guardada en memoria), o None."""
+        if self.alcance is None:
+            return status.HTTP_403_FORBIDDEN, {"error": f"El header {HEADER} requiere un usuario autenticado."}, False
+        if len(self.clave) > LARGO_MAXIMO_CLAVE:
+            return status.HTTP_400_BAD_REQUEST, {"error": f"El header {HEADER} no puede superar {LARGO_MAXIMO_CLAVE} caracteres."}, False
+        guardada = cache_respuestas.obtener((self.alcance, self.clave))
+        if guardada is not None and guardada[0] == self.huella:
+            return (*guardada[1:], True)
+        return None
+
+    def _tomar(self):
+        self.registro, respuesta = tomar_clave(self.alcance, self.clave, self.huella)
+        return respuesta
+
+    def abrir(self):
+        """
+        None si hay que atender el request, o (estado_http, datos, repetida) con la respuesta
+        que corresponde sin atenderlo.
+        """
+        respuesta = self._sin_base()
+        return respuesta if respuesta is not None else self._tomar()
+
+    async def abrir_async(self):
+        respuesta = self._sin_base()
+        return respuesta if respuesta is not None else await sync_to_async(self._tomar)()
+
+    def cerrar(self, estado_http: int, datos):
+        """Guarda la respuesta del request (datos ya pasados a JSON, o None si falló)."""
+        guardar_respuesta(self.registro, self.alcance, self.clave, self.huella, estado_http, datos)
+
+    async def cerrar_async(self, estado_http: int, datos):
+        await sync_to_async(self.cerrar)(estado_http, datos)
+
+
+def idempotente(vista):
+    """
+    Hace idempotente una acción de un ViewSet cuando el request trae el header Idempotency-Key:
+    el primer request se procesa y su respuesta se guarda; los reintentos con la misma clave
+    y el mismo cuerpo reciben esa respuesta sin volver a ejecutar la acción.
+    Tras una respuesta 5xx el reintento vuelve a ejecutarla, con la misma referencia de cobro
+    (request.referencia_pago) para que la pasarela no cobre dos veces.
+    """
+    @wraps(vista)
+    def envoltura(self, request, *args, **kwargs):
+        clave = request.headers.get(HEADER)
+        if not clave:
+            return vista(self, request, *args, **kwargs)
+
+        intento = Intento(alcance_de(request), clave, request.data)
+        respuesta = intento.abrir()
+        if respuesta is not None:
+            estado_http, datos, repetida = respuesta
+            return _repetir(estado_http, datos) if repetida else Response(datos, status=estado_http)
+
+        request.referencia_pago = intento.referencia
+        try:
+            response = vista(self, request, *args, **kwargs)
+        except Exception:
+            intento.cerrar(status.HTTP_500_INTERNAL_SERVER_ERROR, None)
+            raise
+
+        intento.cerrar(response.status_code, como_json(response.data))
+        return response
+
+    return envoltura
+
+
+def limpiar_vencidas() -> int:
+    """Borra las claves vencidas de la tabla. Retorna cuántas se borraron."""
+    borradas, _ = ClaveIdempotencia.objects.filter(expira__lte=timezone.now()).delete()
+    return borradas
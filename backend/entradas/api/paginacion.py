@@ -0,0 +1,23 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CompraCursorPagination(CursorPagination):
+    """
+    Paginación por cursor ordenada por (fecha_compra, id). El cursor de DRF guarda solo la
+    fecha_compra de la última fila: cada página filtra por índice desde esa fecha y saltea con un
+    OFFSET únicamente las filas que comparten la misma fecha_compra (el id desempata el orden).
+    Con fecha_compra al microsegundo los empates son pocos; más de offset_cutoff (1000) filas con la
+    misma fecha_compra no se pueden recorrer.
+    """
+    ordering = ('-fecha_compra', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class EntradaCursorPagination(CursorPagination):
+    """Paginación por cursor sobre el id de la entrada."""
+    ordering = ('-id',)
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,36 @@
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+# Lo que orjson no sabe serializar (Decimal, textos traducibles, etc.) se resuelve como en el JSONRenderer de DRF
+_por_defecto = encoders.JSONEncoder().default
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Renderer JSON sobre orjson: misma salida que el JSONRenderer de DRF, varias veces más rápido."""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    opciones = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        opciones = self.opciones
+        if 'indent' in (accepted_media_type or '') or (renderer_context or {}).get('indent'):
+            opciones |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_por_defecto, option=opciones)
+
+
+class ORJSONParser(BaseParser):
+    """Parser JSON sobre orjson."""
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -1,14 +1,43 @@
 # entradas/api/serializers.py
+import functools
+
 from rest_framework import serializers
+from entradas.metricas import medir_serializacion
 from entradas.models import Pase, Compra, Entrada
 from django.contrib.auth.models import User
+from django.utils import timezone
+from decimal import Decimal
+
+
+def _serializacion_medida(datos):
+    """Para el .data de los serializers: el tiempo va a la métrica de serialización del request (entradas.metricas)."""
+    @functools.wraps(datos)
+    def medida(self):
+        with medir_serializacion():
+            return datos(self)
+    return medida
+
+
+class SerializacionMedidaMixin:
+    """Serializers de DRF cuyo .data se mide aparte del render de la respuesta."""
 
-class PaseSerializer(serializers.ModelSerializer):
+    @property
+    @_serializacion_medida
+    def data(self):
+        return super().data
+
+
+class ListaMedida(SerializacionMedidaMixin, serializers.ListSerializer):
+    """list_serializer_class de los serializers medidos, para cuando se usan con many=True."""
+
+
+class PaseSerializer(SerializacionMedidaMixin, serializers.ModelSerializer):
     class Meta:
         model = Pase
+        list_serializer_class = ListaMedida
         fields = '__all__'
 
-class EntradaSerializer(serializers.ModelSerializer):
+class EntradaSerializer(SerializacionMedidaMixin, serializers.ModelSerializer):
     # Cambiar a PrimaryKeyRelatedField para que sea escribible
     pase = serializers.PrimaryKeyRelatedField(
         queryset=Pase.objects.all()
@@ -20,13 +49,146 @@ class EntradaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Entrada
         fields = '__all__'
+        list_serializer_class = ListaMedida
+        # Lo marca la validación en el molinete (entradas/ingresos.py), no la API
+        read_only_fields = ('fecha_ingreso',)
         # O si quieres incluir el pase_detalle:
         # fields = ['id', 'compra', 'pase', 'pase_detalle', 'edad_visitante', 'precio_calculado']
 
-class CompraSerializer(serializers.ModelSerializer):
+class CompraSerializer(SerializacionMedidaMixin, serializers.ModelSerializer):
     usuario = serializers.StringRelatedField(read_only=True)
     entradas = EntradaSerializer(many=True, read_only=True)
 
     class Meta:
         model = Compra
-        fields = '__all__'
\ No newline at end of file
+        list_serializer_class = ListaMedida
+        # La referencia del cobro es interna: no se expone en la API
+        exclude = ('referencia_pago',)
+
+class CheckoutSerializer(serializers.Serializer):
+    """Carrito completo para el checkout; las reglas de negocio las valida ServicioCompraEntradas."""
+    cantidad = serializers.IntegerField(required=False)
+    fecha_visita = serializers.CharField()
+    tipo_pago = serializers.CharField()
+    visitantes = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+
+class CotizacionGrupoSerializer(serializers.Serializer):
+    """Grupo a cotizar en columnas: edades[i] y tipos_pase[i] describen al mismo visitante."""
+    edades = serializers.ListField(child=serializers.IntegerField(min_value=0), allow_empty=False)
+    tipos_pase = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+
+
+# --- Serializers de solo lectura para listados ---
+# Arman los dicts directamente desde filas .values(), sin instancias de modelo ni un Field por campo.
+# Producen la misma salida que los ModelSerializer de arriba.
+
+CERO = Decimal('0.00')
+
+
+def _decimal(valor):
+    return None if valor is None else f"{valor:f}"
+
+
+def _fecha_hora(valor):
+    texto = timezone.localtime(valor).isoformat()
+    return texto[:-6] + 'Z' if texto.endswith('+00:00') else texto
+
+
+class PaseListaSerializer:
+    columnas = ('id', 'nombre', 'precio')
+
+    def __init__(self, filas):
+        self.filas = filas
+
+    @property
+    @_serializacion_medida
+    def data(self):
+        return [{'id': fila['id'], 'nombre': fila['nombre'], 'precio': _decimal(fila['precio'])} for fila in self.filas]
+
+
+class EntradaListaSerializer:
+    columnas = ('id', 'compra_id', 'pase_id', 'pase__nombre', 'pase__precio', 'edad_visitante', 'precio_calculado', 'fecha_ingreso')
+
+    def __init__(self, filas):
+        self.filas = filas
+
+    @staticmethod
+    def fila_a_dict(fila):
+        return {
+            'id': fila['id'],
+            'pase': fila['pase_id'],
+            'pase_detalle': {'id': fila['pase_id'], 'nombre': fila['pase__nombre'], 'precio': _decimal(fila['pase__precio'])},
+            'edad_visitante': fila['edad_visitante'],
+            'precio_calculado': _decimal(fila['precio_calculado']),
+            'fecha_ingreso': _fecha_hora(fila['fecha_ingreso']) if fila['fecha_ingreso'] is not None else None,
+            'compra': fila['compra_id'],
+        }
+
+    @property
+    @_serializacion_medida
+    def data(self):
+        return [self.fila_a_dict(fila) for fila in self.filas]
+
+
+class CompraListaSerializer:
+    """Las entradas de todas las compras de la página se traen en una sola consulta extra."""
+    columnas = ('id', 'usuario__username', 'fecha_compra', 'fecha_visita', 'monto_total', 'forma_pago', 'estado_pago')
+
+    def __init__(self, filas):
+        self.filas = filas
+
+    @property
+    @_serializacion_medida
+    def data(self):
+        entradas = {fila['id']: [] for fila in self.filas}
+        if entradas:
+            filas_entradas = (Entrada.objects.filter(compra_id__in=entradas).order_by('id')
+                              .values(*EntradaListaSerializer.columnas))
+            for fila in filas_entradas:
+                entradas[fila['compra_id']].append(EntradaListaSerializer.fila_a_dict(fila))
+
+        return [
+            {
+                'id': fila['id'],
+                'usuario': fila['usuario__username'],
+                'entradas': entradas[fila['id']],
+                'fecha_compra': _fecha_hora(fila['fecha_compra']),
+                'fecha_visita': fila['fecha_visita'].isoformat(),
+                'monto_total': _decimal(fila['monto_total']),
+                'forma_pago': fila['forma_pago'],
+                'estado_pago': fila['estado_pago'],
+            }
+            for fila in self.filas
+        ]
+
+
+class VentasDiariasSerializer:
+    """Filas .values() de VentasDiarias, detalladas o agrupadas por fecha (sin pase ni forma/estado de pago)."""
+    columnas = ('fecha_visita', 'pase_id', 'pase__nombre', 'forma_pago', 'estado_pago')
+
+    def __init__(self, filas):
+        self.filas = filas
+
+    @staticmethod
+    def fila_a_dict(fila):
+        datos = {
+            'entradas': fila['entradas'] or 0,
+            # Las sumas de algunas bases vuelven sin los decimales de la columna
+            'recaudacion': _decimal(Decimal(fila['recaudacion'] or 0).quantize(CERO)),
+            'infantes': fila['infantes'] or 0,
+            'ninos': fila['ninos'] or 0,
+            'adultos': fila['adultos'] or 0,
+            'mayores': fila['mayores'] or 0,
+        }
+        if 'fecha_visita' in fila:
+            datos = {'fecha_visita': fila['fecha_visita'].isoformat(), **datos}
+        if 'pase_id' in fila:
+            datos.update(pase=fila['pase_id'], pase_nombre=fila['pase__nombre'],
+                         forma_pago=fila['forma_pago'], estado_pago=fila['estado_pago'])
+        return datos
+
+    @property
+    @_serializacion_medida
+    def data(self):
+        return [self.fila_a_dict(fila) for fila in self.filas]
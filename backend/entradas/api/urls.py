@@ -1,12 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from entradas.api.views import PaseViewSet, CompraViewSet, EntradaViewSet
+from entradas.api.views import PaseViewSet, CompraViewSet, EntradaViewSet, CalendarioViewSet, VentasDiariasViewSet, ExportacionViewSet, IngresoViewSet
+from entradas.api.views_async import checkout_async
 
 router = DefaultRouter()
 router.register(r'pases', PaseViewSet)
 router.register(r'compras', CompraViewSet)
 router.register(r'entradas', EntradaViewSet)
+router.register(r'calendario', CalendarioViewSet, basename='calendario')
+router.register(r'ventas-diarias', VentasDiariasViewSet, basename='ventas-diarias')
+router.register(r'exportar', ExportacionViewSet, basename='exportar')
+router.register(r'ingresos', IngresoViewSet, basename='ingresos')
 
 urlpatterns = [
+    # Checkout async (ASGI): va antes del router para no confundirse con el detalle de una compra
+    path('compras/checkout-async/', checkout_async, name='compra-checkout-async'),
     path('', include(router.urls)),
 ]
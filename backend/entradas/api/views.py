@@ -1,15 +1,194 @@
-from rest_framework import viewsets
-from entradas.models import Pase, Compra, Entrada
-from .serializers import PaseSerializer, CompraSerializer, EntradaSerializer
+import codecs
+import csv
+import logging
+import tempfile
+from datetime import date
+
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ValidationError
+from entradas.models import Pase, Compra, Entrada, VentasDiarias
+from entradas.servicio_compra import ServicioCompraEntradas
+from entradas.calendario import obtener_calendario, HORIZONTE_DIAS
+from entradas.servicios_externos import ServicioCorreoDjango
+from entradas.pasarela_pagos import obtener_pasarela_pagos
+from entradas import excepciones
+from entradas.enrutador import leer_de_replica
+from entradas.ventas import CAMPOS_TOTALES
+from entradas import exportacion, ingresos
+from entradas.conciliacion import ConciliadorIngresos
+from entradas.instantanea import escribir_instantanea
+from entradas.importacion import ImportadorReservas
+from entradas.excepciones import LimiteEntradasExcedidoError, ParqueCerradoError, PagoRechazadoError, CupoAgotadoError
+from .catalogo import obtener_catalogo, respuesta_condicional
+from .idempotencia import idempotente
+from .paginacion import CompraCursorPagination, EntradaCursorPagination
+from .serializers import (
+    PaseSerializer, CompraSerializer, EntradaSerializer, CheckoutSerializer, CotizacionGrupoSerializer,
+    CompraListaSerializer, EntradaListaSerializer, VentasDiariasSerializer,
+)
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Sum
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
+
+logger = logging.getLogger(__name__)
+
+
+def crear_servicio_compra():
+    """Arma el servicio de compra con los adaptadores externos del proyecto."""
+    return ServicioCompraEntradas(
+        pasarela_pagos=obtener_pasarela_pagos(),
+        servicio_correo=ServicioCorreoDjango(),
+    )
+
+
+# Grupo de los usuarios con que se autentican los molinetes
+GRUPO_MOLINETES = "molinetes"
+
+# Errores de negocio del checkout y el código HTTP con que se responden (gana el primero que coincide)
+ESTADOS_POR_ERROR = (
+    (PermissionError, status.HTTP_403_FORBIDDEN),
+    (PagoRechazadoError, status.HTTP_402_PAYMENT_REQUIRED),
+    (CupoAgotadoError, status.HTTP_409_CONFLICT),
+    (excepciones.TimeoutError, status.HTTP_504_GATEWAY_TIMEOUT),
+    (excepciones.ConnectionError, status.HTTP_503_SERVICE_UNAVAILABLE),
+    ((ValueError, LimiteEntradasExcedidoError, ParqueCerradoError), status.HTTP_400_BAD_REQUEST),
+)
+ERRORES_COMPRA = tuple(
+    tipo for tipos, _ in ESTADOS_POR_ERROR for tipo in (tipos if isinstance(tipos, tuple) else (tipos,))
+)
+
+
+def estado_http_de_error(error) -> int:
+    """Código HTTP para un error de ERRORES_COMPRA."""
+    for tipos, estado in ESTADOS_POR_ERROR:
+        if isinstance(error, tipos):
+            return estado
+    return status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+def fecha_de_parametro(parametros, nombre: str):
+    """Fecha YYYY-MM-DD del parámetro `nombre`, o None si no vino. Si no es una fecha válida responde 400."""
+    valor = parametros.get(nombre)
+    if not valor:
+        return None
+    try:
+        fecha = parse_date(valor)
+    except ValueError:  # Bien formada pero inexistente, p. ej. 2024-02-30
+        fecha = None
+    if fecha is None:
+        raise ValidationError({"error": f"El parámetro '{nombre}' debe ser una fecha YYYY-MM-DD."})
+    return fecha
+
+
+def filtrar_por_parametros(queryset, parametros, filtros):
+    """Aplica los filtros de igualdad presentes en los parámetros de la URL."""
+    condiciones = {campo: parametros[nombre] for nombre, campo in filtros.items() if parametros.get(nombre)}
+    if not condiciones:
+        return queryset
+    try:
+        return queryset.filter(**condiciones)
+    except (ValueError, DjangoValidationError) as e:
+        raise ValidationError({"error": str(e)})
+
+
+class EsPersonalDeIngreso(BasePermission):
+    """Usuarios autenticados del staff o del grupo de los molinetes (GRUPO_MOLINETES)."""
+    message = "Solo el personal del parque y los molinetes pueden operar los ingresos."
+
+    def has_permission(self, request, view):
+        usuario = request.user
+        if not (usuario and usuario.is_authenticated):
+            return False
+        return usuario.is_staff or usuario.groups.filter(name=GRUPO_MOLINETES).exists()
+
+
+class LecturaEnReplicaMixin:
+    """
+    Las acciones de solo lectura del ViewSet (acciones_en_replica) leen de la réplica, si hay una,
+    para no competir con las escrituras de las compras en el primario.
+    """
+    acciones_en_replica = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.action_map.get(request.method.lower()) not in self.acciones_en_replica:
+            return super().dispatch(request, *args, **kwargs)
+        with leer_de_replica():
+            return super().dispatch(request, *args, **kwargs)
+
 
 class PaseViewSet(viewsets.ModelViewSet):
     queryset = Pase.objects.all()
     serializer_class = PaseSerializer
 
-class CompraViewSet(viewsets.ModelViewSet):
-    queryset = Compra.objects.all()
+    # El catálogo cambia muy poco: listado y detalle salen del catálogo en caché, con ETag
+    # para que navegador y CDN revaliden con 304 en lugar de volver a descargarlo
+    CACHE_MAX_AGE = 300
+
+    def list(self, request, *args, **kwargs):
+        catalogo = obtener_catalogo()
+        return respuesta_condicional(request, catalogo.lista, catalogo.etag, self.CACHE_MAX_AGE)
+
+    def retrieve(self, request, *args, **kwargs):
+        pase = obtener_catalogo().pase(kwargs[self.lookup_field])
+        if pase is None:
+            raise NotFound()
+        datos, etag = pase
+        return respuesta_condicional(request, datos, etag, self.CACHE_MAX_AGE)
+
+    @action(detail=False, methods=['post'])
+    def cotizar(self, request):
+        """Cotización por lote para ventas a grupos: precios por visitante y total, sin registrar compra."""
+        serializer = CotizacionGrupoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+
+        try:
+            cotizacion = crear_servicio_compra().cotizar_grupo(datos['edades'], datos['tipos_pase'])
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "cantidad": len(cotizacion),
+            "total": str(cotizacion.total),
+            "precios": [str(precio) for precio in cotizacion.precios],
+        })
+
+class CompraViewSet(LecturaEnReplicaMixin, viewsets.ModelViewSet):
+    # El serializer anida usuario, entradas y el pase de cada entrada: se traen en consultas fijas
+    queryset = Compra.objects.select_related('usuario').prefetch_related('entradas__pase')
     serializer_class = CompraSerializer
+    pagination_class = CompraCursorPagination
+
+    # Filtros del listado: parámetro de la URL -> campo del modelo
+    filtros = {
+        'fecha_visita': 'fecha_visita',
+        'estado_pago': 'estado_pago',
+        'forma_pago': 'forma_pago',
+        'usuario': 'usuario_id',
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = filtrar_por_parametros(queryset, self.request.query_params, self.filtros)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # Listado con el serializer liviano: filas .values() en lugar de instancias y ModelSerializer
+        queryset = self.get_queryset().prefetch_related(None).values(*CompraListaSerializer.columnas)
+        pagina = self.paginate_queryset(queryset)
+        return self.get_paginated_response(CompraListaSerializer(pagina).data)
+
+    @idempotente
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         # Si no se proporciona usuario en los datos, usar usuario por defecto
@@ -20,18 +199,298 @@ class CompraViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
 
-class EntradaViewSet(viewsets.ModelViewSet):
-    queryset = Entrada.objects.all()
+    @action(detail=False, methods=['post'])
+    @idempotente
+    def checkout(self, request):
+        """Compra completa en un solo request: Compra y Entradas se registran en una única transacción."""
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+
+        # Usuario por defecto (ID 2 para desarrollo) si no hay sesión
+        usuario = request.user if request.user.is_authenticated else User.objects.get(id=2)
+
+        try:
+            compra = crear_servicio_compra().comprar_entradas(
+                usuario=usuario,
+                cantidad=datos.get('cantidad', len(datos['visitantes'])),
+                fecha_visita=datos['fecha_visita'],
+                tipo_pago=datos['tipo_pago'],
+                visitantes=datos['visitantes'],
+                referencia=getattr(request, 'referencia_pago', None),
+            )
+        except ERRORES_COMPRA as e:
+            return Response({"error": str(e)}, status=estado_http_de_error(e))
+
+        return Response(CompraSerializer(compra).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='procesar-pago')
+    @idempotente
+    def procesar_pago(self, request, pk=None):
+        """Cobra con tarjeta una compra pendiente (p. ej. reservada para pagar en efectivo)."""
+        compra = self.get_object()
+        try:
+            compra = crear_servicio_compra().pagar_compra(compra, referencia=getattr(request, 'referencia_pago', None))
+        except PagoRechazadoError as e:
+            return Response({"error": str(e)}, status=status.HTTP_402_PAYMENT_REQUIRED)
+        except excepciones.TimeoutError as e:
+            return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except excepciones.ConnectionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        return Response(CompraSerializer(compra).data)
+
+    @action(detail=False, methods=['post'], url_path='importar-agencias', permission_classes=[IsAdminUser])
+    def importar_agencias(self, request):
+        """
+        Carga masiva de reservas de agencias, solo para el staff: CSV (multipart, campo 'archivo') con
+        las columnas agencia, fecha_visita, edad y tipo_pase. La agencia tiene que ser un usuario del
+        grupo de agencias (importacion.GRUPO_AGENCIAS). Importa las filas válidas y devuelve los
+        errores por línea (207 si algún lote no se pudo registrar).
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({"error": "Falta el archivo CSV (campo 'archivo')."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # El archivo se lee de a una línea (de disco si es grande), sin cargarlo entero en memoria
+        importador = ImportadorReservas(crear_servicio_compra())
+        try:
+            resultado = importador.importar(codecs.iterdecode(archivo, 'utf-8-sig'))
+        except (ValueError, csv.Error) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Con lotes que la base rechazó la importación quedó parcial: los demás lotes sí se registraron
+        estado = status.HTTP_207_MULTI_STATUS if resultado.lotes_fallidos else status.HTTP_200_OK
+        return Response(resultado.como_dict(), status=estado)
+
+class EntradaViewSet(LecturaEnReplicaMixin, viewsets.ModelViewSet):
+    queryset = Entrada.objects.select_related('pase')
     serializer_class = EntradaSerializer
-    
+    pagination_class = EntradaCursorPagination
+
+    filtros = {
+        'compra': 'compra_id',
+        'pase': 'pase_id',
+        'fecha_visita': 'compra__fecha_visita',
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = filtrar_por_parametros(queryset, self.request.query_params, self.filtros)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset().values(*EntradaListaSerializer.columnas)
+        pagina = self.paginate_queryset(queryset)
+        return self.get_paginated_response(EntradaListaSerializer(pagina).data)
+
     def create(self, request, *args, **kwargs):
         try:
-            # Log para debug
-            print("Datos recibidos:", request.data)
+            logger.debug("Datos recibidos: %s", request.data)
             return super().create(request, *args, **kwargs)
         except Exception as e:
-            print("Error al crear entrada:", str(e))
+            logger.exception("Error al crear entrada")
             return Response(
-                {"error": str(e)}, 
+                {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+
+class CalendarioViewSet(viewsets.ViewSet):
+    """Disponibilidad del parque por día, servida desde el calendario en memoria."""
+
+    # Los navegadores pueden reutilizar la respuesta un rato: el calendario cambia muy poco
+    CACHE_MAX_AGE = 300
+
+    def list(self, request):
+        desde = fecha_de_parametro(request.query_params, 'desde') or date.today()
+        try:
+            dias = min(int(request.query_params.get('dias', 120)), HORIZONTE_DIAS)
+        except ValueError:
+            return Response({"error": "El parámetro 'dias' debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+
+        datos = [
+            {
+                "fecha": fecha,
+                "abierto": horario is not None,
+                "hora_apertura": horario[0] if horario else None,
+                "hora_cierre": horario[1] if horario else None,
+            }
+            for fecha, horario in obtener_calendario().dias(desde, dias)
+        ]
+        response = Response(datos)
+        patch_cache_control(response, public=True, max_age=self.CACHE_MAX_AGE)
+        return response
+
+    @action(detail=False, methods=['get'])
+    def proximos(self, request):
+        """Las próximas N fechas abiertas (por defecto 10)."""
+        desde = fecha_de_parametro(request.query_params, 'desde') or date.today()
+        try:
+            cantidad = min(int(request.query_params.get('cantidad', 10)), HORIZONTE_DIAS)
+        except ValueError:
+            return Response({"error": "El parámetro 'cantidad' debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = Response(obtener_calendario().proximos_dias_abiertos(desde, cantidad))
+        patch_cache_control(response, public=True, max_age=self.CACHE_MAX_AGE)
+        return response
+
+
+class VentasDiariasViewSet(viewsets.ViewSet):
+    """
+    Ventas por día desde el acumulado VentasDiarias: el costo depende de los días del rango y no
+    de las entradas vendidas. Lee de la réplica, si hay una. Solo para el staff.
+    """
+    permission_classes = [IsAdminUser]
+
+    filtros = {
+        'pase': 'pase_id',
+        'forma_pago': 'forma_pago',
+        'estado_pago': 'estado_pago',
+    }
+
+    def list(self, request):
+        parametros = request.query_params
+        rango = {}
+        for nombre, filtro in (('desde', 'fecha_visita__gte'), ('hasta', 'fecha_visita__lte')):
+            fecha = fecha_de_parametro(parametros, nombre)
+            if fecha is not None:
+                rango[filtro] = fecha
+
+        agrupar = parametros.get('agrupar', '')
+        if agrupar not in ('', 'fecha'):
+            return Response({"error": "El parámetro 'agrupar' solo admite 'fecha'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        sumas = {campo: Sum(campo) for campo in CAMPOS_TOTALES}
+        with leer_de_replica():
+            queryset = filtrar_por_parametros(VentasDiarias.objects.filter(**rango), parametros, self.filtros)
+            if agrupar == 'fecha':
+                filas = queryset.values('fecha_visita').annotate(**sumas).order_by('fecha_visita')
+            else:
+                filas = queryset.values(*VentasDiariasSerializer.columnas, *CAMPOS_TOTALES)
+            datos = {
+                "filas": VentasDiariasSerializer(filas).data,
+                "totales": VentasDiariasSerializer.fila_a_dict(queryset.aggregate(**sumas)),
+            }
+        return Response(datos)
+
+
+class ExportacionViewSet(viewsets.ViewSet):
+    """
+    Exportación completa de compras o entradas en CSV (?formato=csv) o NDJSON (?formato=ndjson),
+    filtrable por fecha de compra (desde / hasta). La respuesta se va generando mientras se lee
+    la base por bloques, así que la memoria no depende de la cantidad de filas. Lee de la réplica,
+    si hay una. Solo para el staff: incluye las compras de todos los usuarios.
+    """
+    permission_classes = [IsAdminUser]
+
+    @action(detail=False, methods=['get'])
+    def compras(self, request):
+        return self._exportar(request, 'compras')
+
+    @action(detail=False, methods=['get'])
+    def entradas(self, request):
+        return self._exportar(request, 'entradas')
+
+    def _exportar(self, request, tipo):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in exportacion.FORMATOS:
+            return Response({"error": "El parámetro 'formato' debe ser 'csv' o 'ndjson'."}, status=status.HTTP_400_BAD_REQUEST)
+        rango = {}
+        for nombre in ('desde', 'hasta'):
+            if request.query_params.get(nombre):
+                try:
+                    rango[nombre] = parse_date(request.query_params[nombre])
+                except ValueError:  # Bien formada pero inexistente, p. ej. 2024-13-01
+                    rango[nombre] = None
+                if rango[nombre] is None:
+                    return Response({"error": f"El parámetro '{nombre}' debe ser una fecha YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # La respuesta se itera después de salir de la vista: la base se fija acá
+        with leer_de_replica():
+            queryset = exportacion.consulta(tipo, **rango)
+            queryset = queryset.using(queryset.db)
+
+        response = StreamingHttpResponse(exportacion.generar(queryset, tipo, formato), content_type=exportacion.FORMATOS[formato])
+        sufijo = "".join(f"-{fecha.isoformat()}" for fecha in rango.values())
+        response['Content-Disposition'] = f'attachment; filename="{tipo}{sufijo}.{formato}"'
+        return response
+
+
+class IngresoViewSet(viewsets.ViewSet):
+    """
+    Validación de entradas en los molinetes contra el índice del día en memoria (entradas/ingresos.py):
+    la firma del QR se verifica sin la base y el uso se escribe por lotes. Para los molinetes sin red,
+    la instantánea del día y la conciliación de sus bitácoras (entradas/instantanea.py y conciliacion.py).
+    Solo para el personal del parque y los molinetes (EsPersonalDeIngreso).
+    """
+    permission_classes = [EsPersonalDeIngreso]
+
+    # Código HTTP de cada resultado de la validación
+    ESTADOS_POR_RESULTADO = {
+        ingresos.VALIDA: status.HTTP_200_OK,
+        ingresos.USADA: status.HTTP_409_CONFLICT,
+        ingresos.OTRA_FECHA: status.HTTP_409_CONFLICT,
+        ingresos.NO_PAGADA: status.HTTP_402_PAYMENT_REQUIRED,
+        ingresos.DESCONOCIDA: status.HTTP_404_NOT_FOUND,
+        ingresos.INVALIDA: status.HTTP_400_BAD_REQUEST,
+    }
+
+    @action(detail=False, methods=['post'])
+    def validar(self, request):
+        token = request.data.get('token')
+        if not token:
+            return Response({"error": "Falta el campo 'token'."}, status=status.HTTP_400_BAD_REQUEST)
+        indice = ingresos.obtener_indice()
+        validacion = indice.validar(token)
+        return Response(validacion.como_dict(), status=self.ESTADOS_POR_RESULTADO[validacion.resultado])
+
+    @action(detail=False, methods=['post'])
+    def precargar(self, request):
+        """Carga (o recarga) el índice del día antes de abrir los molinetes."""
+        ingresos.descartar_indice()
+        return Response(ingresos.obtener_indice().estado())
+
+    @action(detail=False, methods=['get'])
+    def estado(self, request):
+        indice = ingresos.indice_cargado()
+        if indice is None:
+            return Response({"error": "No hay un índice de ingresos cargado."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(indice.estado())
+
+    @action(detail=False, methods=['get'])
+    def instantanea(self, request):
+        """Instantánea binaria de las entradas pagadas de ?fecha= (hoy, por defecto) para los molinetes sin red."""
+        fecha = timezone.localdate()
+        if request.query_params.get('fecha'):
+            try:
+                fecha = parse_date(request.query_params['fecha'])
+            except ValueError:
+                fecha = None
+            if fecha is None:
+                return Response({"error": "El parámetro 'fecha' debe ser una fecha YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # A disco y no a memoria: la cantidad va en la cabecera y se completa al terminar
+        archivo = tempfile.TemporaryFile()
+        escribir_instantanea(fecha, archivo)
+        archivo.seek(0)
+        return FileResponse(
+            archivo, as_attachment=True, filename=f"ingresos-{fecha.isoformat()}.bin", content_type='application/octet-stream',
+        )
+
+    @action(detail=False, methods=['post'])
+    def conciliar(self, request):
+        """Bitácora de un molinete que validó sin red (multipart, campo 'archivo'): registra sus ingresos."""
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({"error": "Falta la bitácora (campo 'archivo')."}, status=status.HTTP_400_BAD_REQUEST)
+
+        conciliador = ConciliadorIngresos()
+        try:
+            conciliador.agregar(codecs.iterdecode(archivo, 'utf-8'))
+        except (ValueError, csv.Error) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(conciliador.conciliar().como_dict())
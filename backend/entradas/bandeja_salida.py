@@ -0,0 +1,89 @@
+# bandeja_salida.py
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .boletos import datos_boletos, obtener_renderizador
+from .models import CorreoSaliente
+
+MAX_INTENTOS = 8
+ESPERA_BASE = timedelta(seconds=30)
+ESPERA_MAXIMA = timedelta(hours=1)
+# Tiempo que un worker se reserva un correo: si muere mientras envía, otro lo retoma al vencer
+RESERVA = timedelta(minutes=5)
+
+
+def datos_compra(compra) -> dict:
+    """Datos serializables de la compra que necesita el correo de confirmación."""
+    return {
+        'id': compra.id,
+        'fecha_visita': compra.fecha_visita.isoformat(),
+        'monto_total': str(compra.monto_total),
+        'forma_pago': compra.forma_pago,
+        'estado_pago': compra.estado_pago,
+    }
+
+
+def encolar_confirmacion(compra, destinatario: str) -> CorreoSaliente:
+    """Encola el correo de confirmación; debe llamarse dentro de la transacción que crea la compra."""
+    return CorreoSaliente.objects.create(compra=compra, destinatario=destinatario, datos=datos_compra(compra))
+
+
+def espera_para(intentos: int) -> timedelta:
+    """Backoff exponencial: 30s, 1m, 2m, 4m... hasta ESPERA_MAXIMA."""
+    return min(ESPERA_BASE * (2 ** (intentos - 1)), ESPERA_MAXIMA)
+
+
+def _reservar_lote(tamanio: int) -> list:
+    """Toma un lote de correos vencidos y los reserva corriendo su próximo intento."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        lote = list(
+            CorreoSaliente.objects
+            .select_for_update(skip_locked=True)
+            .filter(estado=CorreoSaliente.Estados.PENDIENTE, proximo_intento__lte=ahora)
+            .order_by('proximo_intento')[:tamanio]
+        )
+        CorreoSaliente.objects.filter(id__in=[c.id for c in lote]).update(proximo_intento=ahora + RESERVA)
+    return lote
+
+
+def procesar_pendientes(servicio_correo, tamanio_lote: int = 50, renderizador=None) -> dict:
+    """
+    Envía un lote de correos pendientes, con el PDF de los boletos de cada compra adjunto (los
+    datos de todo el lote salen de una consulta). Los fallos se reintentan con backoff exponencial
+    y pasan a FALLIDO al superar MAX_INTENTOS. Retorna la cantidad de enviados y fallidos.
+    """
+    resultado = {'enviados': 0, 'fallidos': 0}
+    lote = _reservar_lote(tamanio_lote)
+    if not lote:
+        return resultado
+    renderizador = renderizador or obtener_renderizador()
+    boletos_por_compra = datos_boletos({correo.compra_id for correo in lote})
+
+    for correo in lote:
+        try:
+            adjuntos = {}
+            boletos = boletos_por_compra.get(correo.compra_id)
+            if boletos:
+                adjuntos['boletos'] = renderizador.renderizar(boletos)
+            enviado = servicio_correo.enviar_confirmacion(mail=correo.destinatario, compra_details=correo.datos, **adjuntos)
+            error = "" if enviado else "El servicio de correo no confirmó el envío."
+        except Exception as e:
+            enviado, error = False, str(e)
+
+        if enviado:
+            correo.estado = CorreoSaliente.Estados.ENVIADO
+            correo.fecha_envio = timezone.now()
+            resultado['enviados'] += 1
+        else:
+            correo.intentos += 1
+            correo.ultimo_error = error
+            if correo.intentos >= MAX_INTENTOS:
+                correo.estado = CorreoSaliente.Estados.FALLIDO
+            correo.proximo_intento = timezone.now() + espera_para(correo.intentos)
+            resultado['fallidos'] += 1
+        correo.save(update_fields=['estado', 'fecha_envio', 'intentos', 'ultimo_error', 'proximo_intento'])
+    return resultado
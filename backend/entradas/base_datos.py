@@ -0,0 +1,15 @@
+# base_datos.py
+
+from django.conf import settings
+
+
+def ajustar_sqlite(connection):
+    """
+    Aplica settings.SQLITE_PRAGMAS a una conexión SQLite recién abierta. Los PRAGMA valen por
+    conexión (journal_mode=WAL además queda guardado en el archivo), por eso se aplican en cada una.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    # Sobre la conexión de sqlite3 directamente: no son consultas del request (métricas, debug)
+    for nombre, valor in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f"PRAGMA {nombre} = {valor}")
@@ -0,0 +1,159 @@
+# boletos.py
+
+import re
+import threading
+import zlib
+
+from .credenciales import firmar
+from .models import Entrada
+
+try:
+    import segno
+except ImportError:  # segno es opcional: sin él, el boleto lleva el código de la credencial, sin QR
+    segno = None
+
+# Cada boleto es una página de ANCHO x ALTO puntos
+ANCHO, ALTO = 400, 200
+
+# QR: módulos de MODULO puntos con la esquina inferior izquierda en (QR_X, QR_Y)
+MODULO = 4
+QR_X, QR_Y = 272, 38
+# Máscara fija: elegir la de menor penalización cuadruplica el costo de cada QR y con cualquiera
+# el código es válido (los tokens son cortos y parejos, no hay patrones que la máscara deba romper)
+MASCARA_QR = 2
+
+# Parte fija del boleto (marco, encabezado y rótulos): un Form XObject que todas las páginas reusan
+_PLANTILLA = f"""0.5 w 0.6 G 8 8 {ANCHO - 16} {ALTO - 16} re S
+0.18 0.49 0.20 rg 8 {ALTO - 44} {ANCHO - 16} 36 re f
+BT 1 g /F2 16 Tf 20 {ALTO - 32} Td (EcoHarmony Park) Tj /F1 9 Tf 250 2 Td (Entrada de visita) Tj ET
+BT 0.45 g /F1 7 Tf 20 136 Td (FECHA DE VISITA) Tj 0 -35 Td (PASE) Tj 0 -35 Td (VISITANTE) Tj ET
+""".encode('cp1252')
+
+_PAGINA = (
+    b"q /Plantilla Do Q\n"
+    b"BT 0 g /F2 13 Tf 20 122 Td (%s) Tj 0 -35 Td (%s) Tj 0 -35 Td (%s) Tj 0.3 g /F1 8 Tf 0 -34 Td (%s) Tj ET\n"
+    b"BT 0.3 g /F1 5 Tf %d %d Td (%s) Tj ET\n"
+)
+
+_MODULOS = re.compile(rb'\x01+')
+
+
+def datos_boletos(compra_ids) -> dict:
+    """Datos de los boletos de varias compras en una sola consulta: compra_id -> lista de dicts."""
+    por_compra = {}
+    filas = (
+        Entrada.objects.filter(compra_id__in=compra_ids).order_by('compra_id', 'id')
+        .values_list('id', 'compra_id', 'compra__fecha_visita', 'pase_id', 'pase__nombre', 'edad_visitante', 'precio_calculado')
+    )
+    for entrada_id, compra_id, fecha_visita, pase_id, pase, edad, precio in filas:
+        por_compra.setdefault(compra_id, []).append({
+            'entrada_id': entrada_id,
+            'compra_id': compra_id,
+            'fecha_visita': fecha_visita,
+            'pase': pase,
+            'edad': edad,
+            'precio': precio,
+            'token': firmar(entrada_id, fecha_visita, pase_id),
+        })
+    return por_compra
+
+
+class RenderizadorBoletos:
+    """
+    Arma el PDF de los boletos de una compra, una página por entrada, con el QR de la credencial
+    firmada. Las fuentes, la plantilla y los recursos compartidos se arman una vez por renderizador;
+    cada PDF solo agrega sus páginas. Pensado para el worker de la bandeja de salida, no para el request.
+    """
+
+    def __init__(self):
+        fuente = b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+        # Objetos 3 a 6, iguales en todos los PDF (1 y 2 son el catálogo y el árbol de páginas)
+        self._comunes = [
+            fuente % b"Helvetica",
+            fuente % b"Helvetica-Bold",
+            _stream(_PLANTILLA, b"/Type /XObject /Subtype /Form /BBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >>" % (ANCHO, ALTO)),
+            b"<< /Font << /F1 3 0 R /F2 4 0 R >> /XObject << /Plantilla 5 0 R >> >>",
+        ]
+
+    def renderizar(self, boletos: list) -> bytes:
+        """PDF con una página por boleto (dicts de datos_boletos)."""
+        objetos = [None, None, *self._comunes]
+        paginas = []
+        total = len(boletos)
+        for numero, boleto in enumerate(boletos, 1):
+            paginas.append(b"%d 0 R" % (len(objetos) + 1))
+            objetos.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources 6 0 R /Contents %d 0 R >>" % (ANCHO, ALTO, len(objetos) + 2))
+            objetos.append(_stream(self._pagina(boleto, numero, total)))
+        objetos[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+        objetos[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(paginas), total)
+        return _pdf(objetos)
+
+    def renderizar_compras(self, compra_ids) -> dict:
+        """Boletos de varias compras en una pasada (una consulta): compra_id -> PDF."""
+        return {compra_id: self.renderizar(boletos) for compra_id, boletos in datos_boletos(compra_ids).items()}
+
+    def _pagina(self, boleto: dict, numero: int, total: int) -> bytes:
+        token = boleto['token']
+        contenido = _PAGINA % (
+            _texto(boleto['fecha_visita'].strftime('%d/%m/%Y')),
+            _texto(boleto['pase']),
+            _texto(f"{boleto['edad']} años · ${boleto['precio']}"),
+            _texto(f"Entrada N.º {boleto['entrada_id']} · Compra N.º {boleto['compra_id']} · {numero} de {total}"),
+            QR_X - 2, QR_Y - 22,
+            token.encode(),
+        )
+        return contenido + _qr(token)
+
+
+def _qr(token: str) -> bytes:
+    """Módulos oscuros del QR como rectángulos, una tira por racha horizontal (en unidades de módulo)."""
+    if segno is None:
+        return b""
+    matriz = segno.make_qr(token, error='m', mask=MASCARA_QR, boost_error=False).matrix
+    lado = len(matriz)
+    partes = [b"q 0 g %d 0 0 %d %d %d cm" % (MODULO, MODULO, QR_X, QR_Y)]
+    for fila, modulos in enumerate(matriz):
+        y = lado - 1 - fila
+        partes.extend(
+            b"%d %d %d 1 re" % (racha.start(), y, racha.end() - racha.start())
+            for racha in _MODULOS.finditer(modulos)
+        )
+    partes.append(b"f Q\n")
+    return b"\n".join(partes)
+
+
+def _texto(valor: str) -> bytes:
+    """Texto para un string literal de PDF con las fuentes en WinAnsiEncoding."""
+    return valor.encode('cp1252', errors='replace').replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _stream(contenido: bytes, diccionario: bytes = b"") -> bytes:
+    comprimido = zlib.compress(contenido)
+    return b"<< %s /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (diccionario, len(comprimido), comprimido)
+
+
+def _pdf(objetos: list) -> bytes:
+    salida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    posiciones = []
+    for numero, objeto in enumerate(objetos, 1):
+        posiciones.append(len(salida))
+        salida += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+    xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    salida += b"".join(b"%010d 00000 n \n" % posicion for posicion in posiciones)
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    return bytes(salida)
+
+
+_lock = threading.Lock()
+_renderizador = None
+
+
+def obtener_renderizador() -> RenderizadorBoletos:
+    """Renderizador del proceso, con fuentes y plantilla ya armadas."""
+    global _renderizador
+    if _renderizador is None:
+        with _lock:
+            if _renderizador is None:
+                _renderizador = RenderizadorBoletos()
+    return _renderizador
@@ -0,0 +1,112 @@
+# calendario.py
+
+import threading
+from bisect import bisect_left
+from datetime import date, time, timedelta
+
+# Reglas habituales del parque
+DIAS_CERRADOS_SEMANA = {0}  # Lunes
+FERIADOS_CERRADOS = {(12, 25), (1, 1)}  # Navidad y Año Nuevo (mes, día)
+HORA_APERTURA = time(9, 0)
+HORA_CIERRE = time(19, 0)
+
+HORIZONTE_DIAS = 400
+
+
+def horario_habitual(fecha: date):
+    """Horario según las reglas habituales: (apertura, cierre) o None si el parque no abre."""
+    if fecha.weekday() in DIAS_CERRADOS_SEMANA or (fecha.month, fecha.day) in FERIADOS_CERRADOS:
+        return None
+    return HORA_APERTURA, HORA_CIERRE
+
+
+class CalendarioParque:
+    """
+    Calendario materializado para un horizonte de días a partir de `desde`: cada día abierto queda
+    marcado en un bitmap y los horarios especiales en un diccionario, así que las consultas son O(1).
+    Las fechas fuera del horizonte se resuelven con las reglas habituales.
+    """
+
+    def __init__(self, dias_especiales=(), desde: date = None, horizonte: int = HORIZONTE_DIAS):
+        self.desde = desde or date.today()
+        self.horizonte = horizonte
+        self._especiales = {}
+        for dia in dias_especiales:
+            if dia.abierto:
+                self._especiales[dia.fecha] = (dia.hora_apertura or HORA_APERTURA, dia.hora_cierre or HORA_CIERRE)
+            else:
+                self._especiales[dia.fecha] = None
+
+        self._abiertos = bytearray(horizonte)
+        self._fechas_abiertas = []
+        for indice in range(horizonte):
+            fecha = self.desde + timedelta(days=indice)
+            if self._resolver(fecha) is not None:
+                self._abiertos[indice] = 1
+                self._fechas_abiertas.append(fecha)
+
+    def _resolver(self, fecha: date):
+        if fecha in self._especiales:
+            return self._especiales[fecha]
+        return horario_habitual(fecha)
+
+    def es_dia_abierto(self, fecha: date) -> bool:
+        indice = (fecha - self.desde).days
+        if 0 <= indice < self.horizonte:
+            return bool(self._abiertos[indice])
+        return self._resolver(fecha) is not None
+
+    def horario(self, fecha: date):
+        """Retorna (apertura, cierre) del día, o None si el parque está cerrado."""
+        if not self.es_dia_abierto(fecha):
+            return None
+        return self._resolver(fecha)
+
+    def proximos_dias_abiertos(self, desde: date, cantidad: int) -> list:
+        """Las próximas `cantidad` fechas abiertas a partir de `desde` (inclusive)."""
+        inicio = bisect_left(self._fechas_abiertas, desde)
+        fechas = self._fechas_abiertas[inicio:inicio + cantidad]
+        # Fuera del horizonte materializado se sigue con las reglas
+        fecha = max(desde, self.desde + timedelta(days=self.horizonte))
+        while len(fechas) < cantidad:
+            if self._resolver(fecha) is not None:
+                fechas.append(fecha)
+            fecha += timedelta(days=1)
+        return fechas
+
+    def dias(self, desde: date, cantidad_dias: int) -> list:
+        """Estado de cada día del rango: (fecha, horario o None)."""
+        return [
+            (fecha, self.horario(fecha))
+            for fecha in (desde + timedelta(days=i) for i in range(cantidad_dias))
+        ]
+
+
+# Caché en proceso del calendario vigente. Se invalida con las señales de DiaCalendario
+# y se reconstruye solo cuando cambia el día, para que el horizonte avance.
+_lock = threading.Lock()
+_calendario = None
+
+
+def obtener_calendario() -> CalendarioParque:
+    """Retorna el calendario vigente, construyéndolo desde DiaCalendario (una sola consulta)."""
+    global _calendario
+    calendario = _calendario
+    hoy = date.today()
+    if calendario is not None and calendario.desde == hoy:
+        return calendario
+
+    from .models import DiaCalendario
+
+    with _lock:
+        if _calendario is None or _calendario.desde != hoy:
+            dias = DiaCalendario.objects.filter(fecha__gte=hoy, fecha__lt=hoy + timedelta(days=HORIZONTE_DIAS))
+            _calendario = CalendarioParque(dias, desde=hoy)
+        return _calendario
+
+
+def invalidar_calendario():
+    """Descarta el calendario en caché; la próxima consulta lo reconstruye."""
+    global _calendario
+    with _lock:
+        _calendario = None
@@ -0,0 +1,143 @@
+# conciliacion.py
+
+import csv
+from datetime import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import ingresos
+from .models import Compra, Entrada
+
+# Entradas que se consultan por vez al conciliar (debajo del límite de parámetros de SQLite)
+TAMANIO_CONSULTA = 500
+
+
+class ResultadoConciliacion:
+    """
+    Ingresos leídos de las bitácoras y qué pasó con cada uno: registrados en la base, ya registrados
+    antes (otro molinete u otra importación de la misma bitácora), entradas inexistentes y repetidos
+    entre molinetes. Errores por línea de las filas mal formadas, y conflictos por entrada: las que
+    en la base son de otra fecha de visita o no están pagadas, que no se registran.
+    """
+
+    def __init__(self):
+        self.lineas = 0
+        self.registrados = 0
+        self.ya_registrados = 0
+        self.desconocidas = 0
+        self.repetidos = 0
+        self.errores = []
+        self.conflictos = []
+
+    def como_dict(self) -> dict:
+        return {
+            "lineas": self.lineas,
+            "registrados": self.registrados,
+            "ya_registrados": self.ya_registrados,
+            "desconocidas": self.desconocidas,
+            "repetidos": self.repetidos,
+            "errores": [{"linea": linea, "error": error} for linea, error in self.errores],
+            "conflictos": [{"entrada": entrada_id, "error": error} for entrada_id, error in self.conflictos],
+        }
+
+
+class ConciliadorIngresos:
+    """
+    Lleva a la base las bitácoras de los molinetes que validaron sin red (instantanea.ValidadorOffline).
+    Se pueden agregar varias bitácoras antes de conciliar: de cada entrada vale el primer ingreso,
+    y los demás se cuentan como repetidos. Solo se marcan las entradas que siguen sin ingreso, así
+    que importar dos veces la misma bitácora no cambia nada. La fecha de visita de la bitácora se
+    compara con la de la compra en la base, que además tiene que seguir pagada (la instantánea del
+    molinete pudo quedar vieja).
+    """
+
+    def __init__(self):
+        self._ingresos = {}
+        self._fechas = {}
+        self.resultado = ResultadoConciliacion()
+
+    def agregar(self, lineas):
+        """Lee una bitácora (archivo de texto o iterable de líneas CSV: entrada_id, fecha_visita, momento, molinete)."""
+        for numero, fila in enumerate(csv.reader(lineas), 1):
+            if not fila:
+                continue
+            self.resultado.lineas += 1
+            try:
+                entrada_id, fecha_visita, ingreso = _fila(fila)
+            except ValueError as e:
+                self.resultado.errores.append((numero, str(e)))
+                continue
+            previo = self._ingresos.get(entrada_id)
+            if previo is not None:
+                self.resultado.repetidos += 1
+                if previo <= ingreso:
+                    continue
+            self._ingresos[entrada_id] = ingreso
+            self._fechas[entrada_id] = fecha_visita
+
+    def conciliar(self) -> ResultadoConciliacion:
+        """Registra los ingresos agregados y avisa al índice del día del proceso, si está cargado."""
+        ids = sorted(self._ingresos)
+        nuevos, validos = [], {}
+        for inicio in range(0, len(ids), TAMANIO_CONSULTA):
+            bloque = ids[inicio:inicio + TAMANIO_CONSULTA]
+            en_base = {
+                entrada_id: (fecha_ingreso, fecha_visita, estado_pago)
+                for entrada_id, fecha_ingreso, fecha_visita, estado_pago in Entrada.objects.filter(id__in=bloque).values_list(
+                    'id', 'fecha_ingreso', 'compra__fecha_visita', 'compra__estado_pago',
+                )
+            }
+            for entrada_id in bloque:
+                if entrada_id not in en_base:
+                    self.resultado.desconocidas += 1
+                    continue
+                fecha_ingreso, fecha_visita, estado_pago = en_base[entrada_id]
+                if fecha_visita != self._fechas[entrada_id]:
+                    self.resultado.conflictos.append((entrada_id, (
+                        f"La bitácora la registra para el {self._fechas[entrada_id].isoformat()} "
+                        f"y la compra es para el {fecha_visita.isoformat()}."
+                    )))
+                elif estado_pago != Compra.EstadosPago.PAGADO:
+                    self.resultado.conflictos.append((entrada_id, "La compra de la entrada no está pagada."))
+                else:
+                    validos[entrada_id] = self._ingresos[entrada_id]
+                    if fecha_ingreso is not None:
+                        self.resultado.ya_registrados += 1
+                    else:
+                        nuevos.append((entrada_id, self._ingresos[entrada_id]))
+
+        escritos = ingresos.escribir_ingresos(nuevos)
+        # Las que se marcaron entre la consulta y el UPDATE (otro proceso) quedan como ya registradas
+        self.resultado.registrados += escritos
+        self.resultado.ya_registrados += len(nuevos) - escritos
+
+        indice = ingresos.indice_cargado()
+        if indice is not None:
+            indice.marcar_usadas({
+                entrada_id: ingreso for entrada_id, ingreso in validos.items() if self._fechas[entrada_id] == indice.fecha
+            })
+        self._ingresos, self._fechas = {}, {}
+        return self.resultado
+
+
+def _fila(fila):
+    if len(fila) < 3:
+        raise ValueError("La línea debe tener entrada_id, fecha_visita y momento.")
+    try:
+        entrada_id = int(fila[0])
+    except ValueError:
+        raise ValueError(f"Entrada inválida: '{fila[0]}'.")
+    try:
+        fecha_visita = parse_date(fila[1])
+    except ValueError:
+        fecha_visita = None
+    if fecha_visita is None:
+        raise ValueError(f"Fecha de visita inválida: '{fila[1]}'.")
+    try:
+        ingreso = datetime.fromisoformat(fila[2])
+    except ValueError:
+        raise ValueError(f"Momento de ingreso inválido: '{fila[2]}'.")
+    if timezone.is_naive(ingreso):
+        ingreso = timezone.make_aware(ingreso)
+    return entrada_id, fecha_visita, ingreso
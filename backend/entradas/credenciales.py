@@ -0,0 +1,98 @@
+# credenciales.py
+
+import base64
+import hashlib
+import hmac
+import struct
+from datetime import date, timedelta
+
+from django.conf import settings
+
+from .excepciones import CredencialInvalidaError
+
+# Token: id de clave, id de entrada, fecha de visita (días desde EPOCA) e id de pase, seguidos de
+# los primeros bytes del HMAC-SHA256 de esos datos. En base32 sin relleno: solo mayúsculas y dígitos,
+# que el QR codifica en modo alfanumérico (más denso que en modo byte).
+_FORMATO = struct.Struct('>BIHH')
+LARGO_FIRMA = 10  # 80 bits: falsificar una entrada offline no es viable
+LARGO_TOKEN = len(base64.b32encode(bytes(_FORMATO.size + LARGO_FIRMA)).rstrip(b'='))
+EPOCA = date(2020, 1, 1)
+
+_RELLENO = '=' * (-LARGO_TOKEN % 8)
+
+
+class Credencial:
+    """Datos de una entrada leídos de un token con firma válida."""
+    __slots__ = ('entrada_id', 'fecha_visita', 'pase_id', 'clave_id')
+
+    def __init__(self, entrada_id: int, fecha_visita: date, pase_id: int, clave_id: int):
+        self.entrada_id = entrada_id
+        self.fecha_visita = fecha_visita
+        self.pase_id = pase_id
+        self.clave_id = clave_id
+
+    def __repr__(self):
+        return f"Credencial(entrada_id={self.entrada_id}, fecha_visita={self.fecha_visita}, pase_id={self.pase_id})"
+
+
+# HMAC ya inicializados con cada clave (se copian por token en lugar de rehacer el key schedule).
+# Se reconstruyen si settings.CREDENCIALES cambia (p. ej. override_settings en los tests).
+_claves = (None, {})
+
+
+def _hmacs() -> dict:
+    global _claves
+    configuracion = settings.CREDENCIALES
+    origen, hmacs = _claves
+    if origen is not configuracion:
+        hmacs = {
+            clave_id: hmac.new(_derivar(secreto), digestmod=hashlib.sha256)
+            for clave_id, secreto in configuracion['CLAVES'].items()
+        }
+        _claves = (configuracion, hmacs)
+    return hmacs
+
+
+def _derivar(secreto: str) -> bytes:
+    # Clave propia de las credenciales: el secreto (p. ej. SECRET_KEY) no se usa directo
+    return hmac.new(secreto.encode(), b'entradas.credenciales', hashlib.sha256).digest()
+
+
+def _firma(hmac_clave, datos: bytes) -> bytes:
+    calculo = hmac_clave.copy()
+    calculo.update(datos)
+    return calculo.digest()[:LARGO_FIRMA]
+
+
+def firmar(entrada_id: int, fecha_visita: date, pase_id: int) -> str:
+    """Token de la entrada para el QR. Es determinístico: se puede volver a generar sin guardarlo."""
+    clave_id = settings.CREDENCIALES['VIGENTE']
+    datos = _FORMATO.pack(clave_id, entrada_id, (fecha_visita - EPOCA).days, pase_id)
+    return base64.b32encode(datos + _firma(_hmacs()[clave_id], datos)).decode().rstrip('=')
+
+
+def credencial_de(entrada) -> str:
+    """Token de una instancia de Entrada (usa entrada.compra.fecha_visita)."""
+    return firmar(entrada.id, entrada.compra.fecha_visita, entrada.pase_id)
+
+
+def verificar(token: str) -> Credencial:
+    """
+    Valida la firma del token y retorna sus datos, sin consultar la base (sirve offline en los
+    molinetes). Lanza CredencialInvalidaError si el token no es auténtico.
+    """
+    if not isinstance(token, str) or len(token) != LARGO_TOKEN:
+        raise CredencialInvalidaError("Credencial mal formada.")
+    try:
+        crudo = base64.b32decode(token + _RELLENO)
+    except ValueError:
+        raise CredencialInvalidaError("Credencial mal formada.")
+
+    datos, firma = crudo[:_FORMATO.size], crudo[_FORMATO.size:]
+    clave_id, entrada_id, dias, pase_id = _FORMATO.unpack(datos)
+    hmac_clave = _hmacs().get(clave_id)
+    if hmac_clave is None:
+        raise CredencialInvalidaError("Credencial firmada con una clave desconocida.")
+    if not hmac.compare_digest(firma, _firma(hmac_clave, datos)):
+        raise CredencialInvalidaError("La firma de la credencial no es válida.")
+    return Credencial(entrada_id, EPOCA + timedelta(days=dias), pase_id, clave_id)
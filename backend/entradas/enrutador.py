@@ -0,0 +1,95 @@
+# enrutador.py
+
+import contextvars
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Alias de la réplica de solo lectura en settings.DATABASES (solo existe si se configuró una)
+REPLICA = 'replica'
+
+# Cookie que marca a un cliente que escribió hace poco: sus lecturas van al primario hasta que
+# la réplica lo alcance (settings.REPLICA_LECTURAS['SEGUNDOS_EN_PRIMARIO'])
+COOKIE_PRIMARIO = 'leer_primario'
+
+# Lecturas del bloque actual que pueden ir a la réplica (listados, reportes)
+_lecturas_en_replica = contextvars.ContextVar('lecturas_en_replica', default=False)
+
+# Estado del request en curso, lo crea EnrutadorLecturasMiddleware
+_estado_request = contextvars.ContextVar('estado_lecturas', default=None)
+
+
+class EstadoLecturas:
+    """
+    Qué pasó con la base durante un request. Es mutable a propósito: las vistas async hacen las
+    consultas en otros hilos con una copia del contexto, y así igual ven y marcan el mismo estado.
+    """
+    __slots__ = ('primario', 'escribio')
+
+    def __init__(self, primario=False):
+        # primario: las lecturas del request no van a la réplica (escribió antes o tiene la cookie)
+        self.primario = primario
+        self.escribio = False
+
+
+def hay_replica() -> bool:
+    return REPLICA in connections.settings
+
+
+@contextmanager
+def leer_de_replica():
+    """
+    Manda a la réplica las lecturas del bloque, salvo que el request ya haya escrito:
+
+        with leer_de_replica():
+            filas = list(Compra.objects.values(...))
+
+    Sin réplica configurada las lecturas siguen yendo al primario.
+    """
+    token = _lecturas_en_replica.set(True)
+    try:
+        yield
+    finally:
+        _lecturas_en_replica.reset(token)
+
+
+@contextmanager
+def request_enrutado(primario: bool):
+    """Estado de lecturas de un request; lo usa el middleware alrededor de cada request."""
+    estado = EstadoLecturas(primario)
+    token = _estado_request.set(estado)
+    try:
+        yield estado
+    finally:
+        _estado_request.reset(token)
+
+
+class EnrutadorLecturas:
+    """
+    Router de bases: las escrituras van siempre al primario y las lecturas marcadas con
+    leer_de_replica() van a la réplica. Después de una escritura el resto del request lee
+    del primario (read-your-writes), y el middleware lo extiende a los requests siguientes
+    del mismo cliente.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _lecturas_en_replica.get() or not hay_replica():
+            return None
+        estado = _estado_request.get()
+        if estado is not None and estado.primario:
+            return None
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        estado = _estado_request.get()
+        if estado is not None:
+            estado.primario = estado.escribio = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica tiene los mismos datos que el primario
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación
+        return db != REPLICA
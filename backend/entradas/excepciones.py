@@ -1,3 +1,6 @@
+import builtins
+
+
 
 class LimiteEntradasExcedidoError(Exception):
     """Lanzada cuando la cantidad de entradas supera el límite de 10."""
@@ -20,14 +23,22 @@ class FechaInvalidaError(Exception):
 class FormaDePagoRequeridaError(Exception):
     pass
 
-class EdadInvalidaError(Exception):
+class EdadInvalidaError(ValueError):
+    pass
+
+class CredencialInvalidaError(ValueError):
+    """Para tokens de entrada mal formados, con firma inválida o firmados con una clave desconocida."""
+    pass
+
+class CupoAgotadoError(Exception):
+    """Para cuando no quedan entradas disponibles para la fecha de visita."""
     pass
 
 class PagoRechazadoError(Exception):
     """Para cuando la pasarela de pagos rechaza una transacción."""
     pass
 
-class PermissionError(Exception):
+class PermissionError(builtins.PermissionError):
     """Para cuando el usuario no tiene permisos"""
     pass
 
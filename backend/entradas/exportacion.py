@@ -0,0 +1,120 @@
+# exportacion.py
+
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import Compra, Entrada
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él, el NDJSON se arma con json
+    orjson = None
+
+# Filas que se leen de la base por vez: la memoria queda acotada a un bloque, no al total
+TAMANIO_BLOQUE = 2000
+
+# Columnas de cada exportación: nombre en el archivo -> campo para .values_list()
+COLUMNAS = {
+    'compras': {
+        'id': 'id',
+        'usuario': 'usuario__username',
+        'fecha_compra': 'fecha_compra',
+        'fecha_visita': 'fecha_visita',
+        'monto_total': 'monto_total',
+        'forma_pago': 'forma_pago',
+        'estado_pago': 'estado_pago',
+    },
+    'entradas': {
+        'id': 'id',
+        'compra': 'compra_id',
+        'fecha_compra': 'compra__fecha_compra',
+        'fecha_visita': 'compra__fecha_visita',
+        'forma_pago': 'compra__forma_pago',
+        'estado_pago': 'compra__estado_pago',
+        'pase': 'pase__nombre',
+        'edad_visitante': 'edad_visitante',
+        'precio_calculado': 'precio_calculado',
+    },
+}
+
+MODELOS = {'compras': Compra, 'entradas': Entrada}
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def consulta(tipo: str, desde: date = None, hasta: date = None):
+    """
+    Filas (tuplas) de la exportación, ordenadas por id y filtradas por fecha de compra
+    (desde y hasta inclusive). Sin instancias de modelo ni prefetch: solo las columnas exportadas.
+    """
+    modelo = MODELOS[tipo]
+    prefijo = '' if modelo is Compra else 'compra__'
+    queryset = modelo.objects.all()
+    if desde is not None:
+        queryset = queryset.filter(**{f'{prefijo}fecha_compra__gte': _inicio_del_dia(desde)})
+    if hasta is not None:
+        queryset = queryset.filter(**{f'{prefijo}fecha_compra__lt': _inicio_del_dia(hasta + timedelta(days=1))})
+    return queryset.order_by('id').values_list(*COLUMNAS[tipo].values())
+
+
+def _inicio_del_dia(fecha: date) -> datetime:
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def _texto(valor):
+    if isinstance(valor, Decimal):
+        return f"{valor:f}"
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def generar(queryset, tipo: str, formato: str, tamanio_bloque: int = TAMANIO_BLOQUE):
+    """
+    Genera la exportación en bloques de bytes (UTF-8), leyendo la base con .iterator(): nunca hay más de
+    un bloque de filas en memoria, sea cual sea el total. Sirve para StreamingHttpResponse o para
+    escribir a un archivo.
+    """
+    columnas = list(COLUMNAS[tipo])
+    filas = queryset.iterator(chunk_size=tamanio_bloque)
+    if formato == 'csv':
+        return _generar_csv(filas, columnas, tamanio_bloque)
+    return _generar_ndjson(filas, columnas, tamanio_bloque)
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _generar_csv(filas, columnas, tamanio_bloque):
+    escritor = csv.writer(_Eco())
+    bloque = [escritor.writerow(columnas)]
+    for fila in filas:
+        bloque.append(escritor.writerow([_texto(valor) for valor in fila]))
+        if len(bloque) >= tamanio_bloque:
+            yield ''.join(bloque).encode()
+            bloque = []
+    if bloque:
+        yield ''.join(bloque).encode()
+
+
+def _generar_ndjson(filas, columnas, tamanio_bloque):
+    bloque = []
+    for fila in filas:
+        registro = {columna: _texto(valor) for columna, valor in zip(columnas, fila)}
+        bloque.append(orjson.dumps(registro) if orjson is not None else json.dumps(registro, ensure_ascii=False).encode())
+        if len(bloque) >= tamanio_bloque:
+            yield b'\n'.join(bloque) + b'\n'
+            bloque = []
+    if bloque:
+        yield b'\n'.join(bloque) + b'\n'
@@ -0,0 +1,242 @@
+# importacion.py
+
+import csv
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, Value, When
+
+from .excepciones import CupoAgotadoError, ParqueCerradoError
+from .models import Compra, Entrada
+from .ventas import sumar, totales_por_pase
+
+# Columnas obligatorias del archivo de reservas de agencias (puede traer otras, se ignoran)
+COLUMNAS = ('agencia', 'fecha_visita', 'edad', 'tipo_pase')
+
+# Grupo de los usuarios que son agencias: solo a su nombre se pueden importar reservas
+GRUPO_AGENCIAS = "agencias"
+
+# Las agencias pagan contra factura: sus compras quedan pendientes de pago
+FORMA_PAGO = Compra.FormasPago.EFECTIVO
+ESTADO_PAGO = Compra.EstadosPago.PENDIENTE
+
+# Filas que se validan y se insertan juntas, cada lote en su propia transacción
+TAMANIO_LOTE = 1000
+
+
+class ResultadoImportacion:
+    """
+    Filas leídas e importadas, compras creadas y errores por fila (número de línea y mensaje).
+    Los lotes que la base no pudo registrar se cuentan en `lotes_fallidos`, con un error por fila.
+    """
+
+    def __init__(self):
+        self.filas = 0
+        self.importadas = 0
+        self.compras = []
+        self.errores = []
+        self.lotes_fallidos = 0
+
+    def como_dict(self) -> dict:
+        return {
+            "filas": self.filas,
+            "importadas": self.importadas,
+            "compras": self.compras,
+            "lotes_fallidos": self.lotes_fallidos,
+            "errores": [{"linea": linea, "error": error} for linea, error in self.errores],
+        }
+
+
+class ImportadorReservas:
+    """
+    Importa reservas de agencias desde un CSV (agencia, fecha_visita, edad, tipo_pase) por lotes.
+
+    Cada fila se valida con las mismas reglas de formato que el checkout; las filas inválidas se
+    informan con su número de línea y no frenan al resto. Las válidas se cotizan en lote con la
+    tabla de tarifas, reservan cupo y se insertan con bulk_create, un lote por transacción. Todas
+    las entradas de una agencia para un mismo día van a una única Compra, pendiente de pago.
+    La agencia es el username de un usuario activo del grupo GRUPO_AGENCIAS. Si la base rechaza un lote (p. ej. un IntegrityError),
+    sus filas se informan como errores y se sigue con el próximo: los lotes ya registrados quedan.
+    """
+
+    def __init__(self, servicio, tamanio_lote: int = TAMANIO_LOTE):
+        self.servicio = servicio
+        self.tamanio_lote = tamanio_lote
+        self._agencias = {}
+        self._fechas = {}
+        self._compras = {}
+
+    def importar(self, lineas) -> ResultadoImportacion:
+        """Lee el CSV de `lineas` (archivo de texto o iterable de líneas) sin cargarlo entero en memoria."""
+        lector = csv.DictReader(lineas)
+        faltantes = [columna for columna in COLUMNAS if columna not in (lector.fieldnames or ())]
+        if faltantes:
+            raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}.")
+
+        resultado = ResultadoImportacion()
+        lote = []
+        for fila in lector:
+            # line_num es la línea donde termina la fila, contando el encabezado
+            lote.append((lector.line_num, {columna: (fila[columna] or '').strip() for columna in COLUMNAS}))
+            if len(lote) >= self.tamanio_lote:
+                self._importar_lote(lote, resultado)
+                lote = []
+        if lote:
+            self._importar_lote(lote, resultado)
+        resultado.errores.sort()
+        return resultado
+
+    def _importar_lote(self, lote, resultado):
+        resultado.filas += len(lote)
+        self._cargar_agencias({fila['agencia'] for _, fila in lote} - self._agencias.keys())
+
+        validas = []
+        for linea, fila in lote:
+            visitante = {'edad': _entero(fila['edad']), 'tipo_pase': fila['tipo_pase']}
+            try:
+                self.servicio._validar_formato_edades([visitante])
+                self.servicio._validar_formato_pases([visitante])
+                fecha = self._fecha(fila['fecha_visita'])
+                agencia = self._agencia(fila['agencia'])
+            except (ValueError, ParqueCerradoError) as e:
+                resultado.errores.append((linea, str(e)))
+                continue
+            validas.append((linea, agencia, fecha, visitante))
+        if not validas:
+            return
+
+        cotizacion = self.servicio.cotizar_grupo(
+            [visitante['edad'] for *_, visitante in validas],
+            [visitante['tipo_pase'] for *_, visitante in validas],
+        )
+        pases = self.servicio._obtener_pases([visitante for *_, visitante in validas])
+
+        por_fecha = {}
+        for (linea, agencia, fecha, visitante), precio in zip(validas, cotizacion.precios):
+            por_fecha.setdefault(fecha, []).append((linea, agencia, visitante, precio))
+
+        previos = dict(self._compras), len(resultado.compras), len(resultado.errores)
+        try:
+            self._registrar_lote(por_fecha, pases, resultado)
+        except DatabaseError as e:
+            self._deshacer_lote(previos, resultado)
+            resultado.lotes_fallidos += 1
+            resultado.errores.extend((linea, f"No se pudo registrar el lote: {e}") for linea, *_ in validas)
+        except Exception:
+            self._deshacer_lote(previos, resultado)
+            raise
+
+    def _deshacer_lote(self, previos, resultado):
+        """El lote se revirtió: sus compras nuevas ya no existen y sus filas sin cupo se informan con el lote."""
+        self._compras, compras, errores = previos
+        del resultado.compras[compras:]
+        del resultado.errores[errores:]
+
+    def _registrar_lote(self, por_fecha, pases, resultado):
+        """
+        Reserva cupo, crea las compras que falten, suma los montos e inserta las entradas del lote
+        en una transacción. Las consultas son por fecha o por lote, no por fila ni por agencia.
+        """
+        with transaction.atomic():
+            aceptadas = {}
+            for fecha, filas in por_fecha.items():
+                aceptadas[fecha] = self._reservar_cupo(fecha, filas, pases, resultado)
+            self._crear_compras({(agencia, fecha) for fecha, filas in aceptadas.items() for _, agencia, _, _ in filas}, resultado)
+
+            entradas = []
+            montos = {}
+            for fecha, filas in aceptadas.items():
+                for _, agencia, visitante, precio in filas:
+                    compra_id = self._compras[(agencia, fecha)]
+                    entradas.append(Entrada(compra_id=compra_id, pase=pases[visitante['tipo_pase']], edad_visitante=visitante['edad'], precio_calculado=precio))
+                    montos[compra_id] = montos.get(compra_id, Decimal('0')) + precio
+                # Todas las compras importadas comparten forma y estado de pago: una fila de VentasDiarias por pase y fecha
+                sumar((fecha, FORMA_PAGO, ESTADO_PAGO), totales_por_pase((pases[v['tipo_pase']].id, v['edad'], precio) for _, _, v, precio in filas))
+            if montos:
+                Compra.objects.filter(id__in=montos).update(monto_total=F('monto_total') + Case(
+                    *(When(id=compra_id, then=Value(monto)) for compra_id, monto in montos.items()),
+                    output_field=Compra._meta.get_field('monto_total'),
+                ))
+            Entrada.objects.bulk_create(entradas, batch_size=self.tamanio_lote)
+        resultado.importadas += len(entradas)
+
+    def _reservar_cupo(self, fecha: date, filas: list, pases: dict, resultado) -> list:
+        """
+        Reserva el cupo de la fecha para todas las filas del lote de una vez. Si no alcanza, prueba
+        agencia por agencia: las que no entran se informan como error y el resto se importa.
+        """
+        try:
+            self.servicio._reservar_cupo(fecha, [visitante for _, _, visitante, _ in filas], pases)
+            return filas
+        except CupoAgotadoError:
+            pass
+
+        por_agencia = {}
+        for fila in filas:
+            por_agencia.setdefault(fila[1], []).append(fila)
+        aceptadas = []
+        for filas_agencia in por_agencia.values():
+            try:
+                self.servicio._reservar_cupo(fecha, [visitante for _, _, visitante, _ in filas_agencia], pases)
+            except CupoAgotadoError as e:
+                resultado.errores.extend((linea, str(e)) for linea, *_ in filas_agencia)
+                continue
+            aceptadas.extend(filas_agencia)
+        return aceptadas
+
+    def _crear_compras(self, claves, resultado):
+        """Una Compra por agencia y fecha de visita para toda la importación; las que falten se crean en un bulk_create."""
+        nuevas = sorted(claves - self._compras.keys())
+        if not nuevas:
+            return
+        compras = Compra.objects.bulk_create([
+            Compra(usuario_id=usuario_id, fecha_visita=fecha, monto_total=Decimal('0'), forma_pago=FORMA_PAGO, estado_pago=ESTADO_PAGO)
+            for usuario_id, fecha in nuevas
+        ])
+        for clave, compra in zip(nuevas, compras):
+            self._compras[clave] = compra.id
+            resultado.compras.append(compra.id)
+
+    def _cargar_agencias(self, nombres):
+        if not nombres:
+            return
+        encontradas = dict(
+            User.objects.filter(username__in=nombres, is_active=True, groups__name=GRUPO_AGENCIAS).values_list('username', 'id')
+        )
+        for nombre in nombres:
+            self._agencias[nombre] = encontradas.get(nombre)
+
+    def _agencia(self, nombre: str) -> int:
+        if not nombre:
+            raise ValueError("Falta la agencia.")
+        usuario_id = self._agencias.get(nombre)
+        if usuario_id is None:
+            raise ValueError(f"La agencia '{nombre}' no existe o no está habilitada.")
+        return usuario_id
+
+    def _fecha(self, texto: str) -> date:
+        """Fecha de visita validada (formato, día abierto y no pasada). Se valida una vez por valor distinto."""
+        if texto not in self._fechas:
+            try:
+                fecha = self.servicio._validar_formato_fecha(texto).date()
+                if not self.servicio._calendario().es_dia_abierto(fecha):
+                    raise ParqueCerradoError("El parque está cerrado en esa fecha.")
+                if fecha < date.today():
+                    raise ValueError("La fecha de visita no puede ser en el pasado.")
+                self._fechas[texto] = fecha
+            except (ValueError, ParqueCerradoError) as e:
+                self._fechas[texto] = e
+        fecha = self._fechas[texto]
+        if isinstance(fecha, Exception):
+            raise fecha.with_traceback(None)
+        return fecha
+
+
+def _entero(texto: str):
+    """La edad como int; si no es un número entero queda el texto, que la validación de edades rechaza."""
+    try:
+        return int(texto)
+    except (TypeError, ValueError):
+        return texto
@@ -0,0 +1,271 @@
+# ingresos.py
+
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from .credenciales import verificar
+from .excepciones import CredencialInvalidaError
+from .models import Compra, Entrada, Pase
+
+# Resultado de validar una credencial en el molinete
+VALIDA = 'valida'
+USADA = 'usada'
+INVALIDA = 'invalida'
+OTRA_FECHA = 'otra_fecha'
+NO_PAGADA = 'no_pagada'
+DESCONOCIDA = 'desconocida'
+
+# Entradas por UPDATE al escribir ingresos en lote (debajo del límite de parámetros de SQLite)
+TAMANIO_UPDATE = 500
+
+
+class Validacion:
+    """Respuesta del molinete para una credencial."""
+    __slots__ = ('resultado', 'entrada_id', 'pase', 'edad', 'ingreso', 'mensaje')
+
+    def __init__(self, resultado: str, entrada_id: int = None, pase: str = None, edad: int = None, ingreso=None, mensaje: str = ""):
+        self.resultado = resultado
+        self.entrada_id = entrada_id
+        self.pase = pase
+        self.edad = edad
+        self.ingreso = ingreso
+        self.mensaje = mensaje
+
+    def como_dict(self) -> dict:
+        return {
+            "resultado": self.resultado,
+            "entrada": self.entrada_id,
+            "pase": self.pase,
+            "edad": self.edad,
+            "ingreso": self.ingreso.isoformat() if self.ingreso is not None else None,
+            "mensaje": self.mensaje,
+        }
+
+
+class IndiceIngresos:
+    """
+    Entradas pagadas de una fecha de visita en arreglos compactos: ids ordenados (array de uint32),
+    pase y edad alineados, y un bitset con las ya usadas. Validar es verificar la firma de la
+    credencial (sin base) y una búsqueda binaria; las que ya tienen el bit prendido se rechazan sin
+    ir a la base. Quien acepta es la base: un UPDATE de la entrada solo si sigue sin fecha_ingreso.
+    Cada proceso (worker) tiene su propio índice, así que si otro ya la aceptó el UPDATE no marca
+    nada, la respuesta es USADA y se cuenta en `conflictos`.
+
+    Las entradas que no estaban al cargar el índice (compras del día o pagadas en boletería después)
+    se buscan en la base una vez y quedan aparte, en _extras.
+    """
+
+    def __init__(self, fecha: date, ids, pases, edades, ingresos: dict, nombres_pases: dict):
+        self.fecha = fecha
+        self._ids = array('I', ids)
+        self._pases = array('H', pases)
+        self._edades = array('B', edades)
+        self._nombres_pases = nombres_pases
+        self._usadas = bytearray((len(self._ids) + 7) // 8)
+        # Momento de ingreso de las usadas (las que ya venían usadas de la base y las marcadas acá)
+        self._ingresos = dict(ingresos)
+        for entrada_id in ingresos:
+            posicion = self._posicion(entrada_id)
+            if posicion >= 0:
+                self._usadas[posicion >> 3] |= 1 << (posicion & 7)
+
+        self._extras = {}
+        self._desconocidas = set()
+        self._revocadas = set()
+        self.conflictos = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def cargar(cls, fecha: date) -> 'IndiceIngresos':
+        """Arma el índice de la fecha con una consulta, recorrida por bloques."""
+        ids, pases, edades, ingresos = [], [], [], {}
+        filas = (
+            Entrada.objects
+            .filter(compra__fecha_visita=fecha, compra__estado_pago=Compra.EstadosPago.PAGADO)
+            .order_by('id')
+            .values_list('id', 'pase_id', 'edad_visitante', 'fecha_ingreso')
+            .iterator(chunk_size=5000)
+        )
+        for entrada_id, pase_id, edad, fecha_ingreso in filas:
+            ids.append(entrada_id)
+            pases.append(pase_id)
+            edades.append(min(edad, 255))
+            if fecha_ingreso is not None:
+                ingresos[entrada_id] = fecha_ingreso
+        return cls(fecha, ids, pases, edades, ingresos, dict(Pase.objects.values_list('id', 'nombre')))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _posicion(self, entrada_id: int) -> int:
+        posicion = bisect_left(self._ids, entrada_id)
+        if posicion < len(self._ids) and self._ids[posicion] == entrada_id:
+            return posicion
+        return -1
+
+    def validar(self, token: str, ahora=None) -> Validacion:
+        """Valida una credencial y, si corresponde, la marca como usada."""
+        try:
+            credencial = verificar(token)
+        except CredencialInvalidaError as e:
+            return Validacion(INVALIDA, mensaje=str(e))
+
+        entrada_id = credencial.entrada_id
+        if credencial.fecha_visita != self.fecha:
+            return Validacion(OTRA_FECHA, entrada_id, mensaje=f"La entrada es para el {credencial.fecha_visita.strftime('%d/%m/%Y')}.")
+        if entrada_id in self._revocadas:
+            return Validacion(NO_PAGADA, entrada_id, mensaje="La compra de la entrada no está pagada.")
+
+        posicion = self._posicion(entrada_id)
+        if posicion < 0:
+            return self._validar_extra(entrada_id, ahora)
+
+        pase, edad = self._nombres_pases.get(self._pases[posicion]), self._edades[posicion]
+        byte, bit = posicion >> 3, 1 << (posicion & 7)
+        with self._lock:
+            if self._usadas[byte] & bit:
+                return Validacion(USADA, entrada_id, pase, edad, self._ingresos.get(entrada_id), "La entrada ya fue usada.")
+            # Se prende antes de ir a la base: los demás hilos del proceso ya la rechazan acá
+            self._usadas[byte] |= bit
+
+        def soltar():
+            with self._lock:
+                self._usadas[byte] &= ~bit
+        return self._aceptar(entrada_id, pase, edad, ahora, soltar)
+
+    def _validar_extra(self, entrada_id: int, ahora) -> Validacion:
+        """Entradas que no estaban al cargar el índice: se buscan en la base la primera vez."""
+        if entrada_id in self._desconocidas:
+            return Validacion(DESCONOCIDA, entrada_id, mensaje="La entrada no existe.")
+        extra = self._extras.get(entrada_id)
+        if extra is None:
+            fila = (
+                Entrada.objects.filter(id=entrada_id)
+                .values_list('pase__nombre', 'edad_visitante', 'compra__estado_pago', 'fecha_ingreso').first()
+            )
+            if fila is None:
+                self._desconocidas.add(entrada_id)
+                return Validacion(DESCONOCIDA, entrada_id, mensaje="La entrada no existe.")
+            pase, edad, estado_pago, fecha_ingreso = fila
+            if estado_pago != Compra.EstadosPago.PAGADO:
+                # No se guarda: puede pagarse en boletería y volver a pasar
+                return Validacion(NO_PAGADA, entrada_id, pase, edad, mensaje="La compra de la entrada no está pagada.")
+            extra = self._extras.setdefault(entrada_id, (pase, edad))
+            if fecha_ingreso is not None:
+                self._ingresos.setdefault(entrada_id, fecha_ingreso)
+
+        pase, edad = extra
+        with self._lock:
+            if entrada_id in self._ingresos:
+                return Validacion(USADA, entrada_id, pase, edad, self._ingresos[entrada_id], "La entrada ya fue usada.")
+            self._ingresos[entrada_id] = None
+
+        def soltar():
+            with self._lock:
+                self._ingresos.pop(entrada_id, None)
+        return self._aceptar(entrada_id, pase, edad, ahora, soltar)
+
+    def _aceptar(self, entrada_id: int, pase, edad, ahora, soltar) -> Validacion:
+        """
+        Marca el ingreso en la base si la entrada sigue sin usar. La entrada ya está reservada en el
+        proceso; si la base falla se suelta (`soltar`) para que pueda volver a pasar.
+        """
+        ingreso = ahora or timezone.now()
+        try:
+            marcada = Entrada.objects.filter(id=entrada_id, fecha_ingreso__isnull=True).update(fecha_ingreso=ingreso)
+        except Exception:
+            soltar()
+            raise
+        if marcada:
+            with self._lock:
+                self._ingresos[entrada_id] = ingreso
+            return Validacion(VALIDA, entrada_id, pase, edad, ingreso)
+
+        # Otro proceso la aceptó antes
+        previo = Entrada.objects.filter(id=entrada_id).values_list('fecha_ingreso', flat=True).first()
+        with self._lock:
+            self._ingresos[entrada_id] = previo
+            self.conflictos += 1
+        return Validacion(USADA, entrada_id, pase, edad, previo, "La entrada ya fue usada.")
+
+    def revocar_compra(self, compra_id: int, revocada: bool = True):
+        """Una compra del día que deja de estar pagada (o vuelve a estarlo) después de cargar el índice."""
+        entradas = set(Entrada.objects.filter(compra_id=compra_id).values_list('id', flat=True))
+        with self._lock:
+            if revocada:
+                self._revocadas |= entradas
+            else:
+                self._revocadas -= entradas
+                self._desconocidas -= entradas
+
+    def marcar_usadas(self, ingresos: dict):
+        """Entradas usadas fuera de este índice (p. ej. en un molinete sin red): entrada_id -> momento de ingreso."""
+        with self._lock:
+            for entrada_id, ingreso in ingresos.items():
+                posicion = self._posicion(entrada_id)
+                if posicion >= 0:
+                    self._usadas[posicion >> 3] |= 1 << (posicion & 7)
+                self._ingresos.setdefault(entrada_id, ingreso)
+
+    def estado(self) -> dict:
+        return {
+            "fecha": self.fecha.isoformat(),
+            "entradas": len(self._ids) + len(self._extras),
+            "usadas": len(self._ingresos),
+            "conflictos": self.conflictos,
+        }
+
+
+def escribir_ingresos(ingresos) -> int:
+    """
+    Marca en la base los ingresos (pares entrada_id, momento), p. ej. los de las bitácoras de los
+    molinetes sin red: un UPDATE por segundo de ingreso y por cada TAMANIO_UPDATE entradas, en una
+    transacción. Solo marca las que siguen sin ingreso, así que repetir una escritura no pisa el
+    primer ingreso. Retorna la cantidad de entradas marcadas.
+    """
+    por_segundo = {}
+    for entrada_id, ingreso in ingresos:
+        por_segundo.setdefault(ingreso.replace(microsecond=0), []).append(entrada_id)
+    escritas = 0
+    with transaction.atomic():
+        for ingreso, ids in por_segundo.items():
+            for inicio in range(0, len(ids), TAMANIO_UPDATE):
+                escritas += Entrada.objects.filter(
+                    id__in=ids[inicio:inicio + TAMANIO_UPDATE], fecha_ingreso__isnull=True,
+                ).update(fecha_ingreso=ingreso)
+    return escritas
+
+
+# Índice del día en el proceso. Al cambiar el día se descarta el anterior y se carga el nuevo.
+_lock = threading.Lock()
+_indice = None
+
+
+def obtener_indice(fecha: date = None) -> IndiceIngresos:
+    """Índice de la fecha (hoy, por defecto), cargándolo la primera vez."""
+    global _indice
+    fecha = fecha or timezone.localdate()
+    indice = _indice
+    if indice is not None and indice.fecha == fecha:
+        return indice
+    with _lock:
+        if _indice is None or _indice.fecha != fecha:
+            _indice = IndiceIngresos.cargar(fecha)
+        return _indice
+
+
+def indice_cargado():
+    """El índice del proceso, si hay uno cargado (sin cargarlo)."""
+    return _indice
+
+
+def descartar_indice():
+    """Descarta el índice del proceso; el próximo ingreso lo vuelve a cargar."""
+    global _indice
+    with _lock:
+        _indice = None
@@ -0,0 +1,192 @@
+# instantanea.py
+
+import csv
+import json
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from .credenciales import EPOCA, verificar
+from .excepciones import CredencialInvalidaError
+from .ingresos import DESCONOCIDA, INVALIDA, OTRA_FECHA, USADA, VALIDA, Validacion
+from .models import Compra, Entrada, Pase
+
+# Formato del archivo (little-endian):
+#   cabecera: "EHIN", versión, largo de registro, fecha (días desde EPOCA), cantidad de entradas, largo de la tabla de pases
+#   registros de largo fijo ordenados por id: entrada_id (uint32), pase_id (uint16), edad (uint8), ya usada (uint8)
+#   tabla de pases: JSON {pase_id: nombre}
+MAGIA = b"EHIN"
+VERSION = 1
+_CABECERA = struct.Struct('<4sBBHII')
+_REGISTRO = struct.Struct('<IHBB')
+
+# Registros que se leen de la base y se escriben por vez
+TAMANIO_BLOQUE = 5000
+
+
+def escribir_instantanea(fecha: date, archivo, tamanio_bloque: int = TAMANIO_BLOQUE) -> int:
+    """
+    Escribe en `archivo` (binario y con seek) las entradas pagadas de la fecha de visita, leyendo la
+    base por bloques. La cantidad va en la cabecera, que se completa al final. Retorna la cantidad.
+    """
+    inicio = archivo.tell()
+    archivo.write(b"\0" * _CABECERA.size)
+    filas = (
+        Entrada.objects
+        .filter(compra__fecha_visita=fecha, compra__estado_pago=Compra.EstadosPago.PAGADO)
+        .order_by('id')
+        .values_list('id', 'pase_id', 'edad_visitante', 'fecha_ingreso')
+        .iterator(chunk_size=tamanio_bloque)
+    )
+    cantidad = 0
+    bloque = bytearray()
+    for entrada_id, pase_id, edad, fecha_ingreso in filas:
+        bloque += _REGISTRO.pack(entrada_id, pase_id, min(edad, 255), fecha_ingreso is not None)
+        cantidad += 1
+        if cantidad % tamanio_bloque == 0:
+            archivo.write(bloque)
+            bloque = bytearray()
+    archivo.write(bloque)
+
+    pases = json.dumps(dict(Pase.objects.values_list('id', 'nombre')), ensure_ascii=False).encode()
+    archivo.write(pases)
+    fin = archivo.tell()
+    archivo.seek(inicio)
+    archivo.write(_CABECERA.pack(MAGIA, VERSION, _REGISTRO.size, (fecha - EPOCA).days, cantidad, len(pases)))
+    archivo.seek(fin)
+    return cantidad
+
+
+def exportar_instantanea(fecha: date, ruta: str) -> int:
+    """Escribe la instantánea en `ruta` reemplazándola de una vez: un molinete nunca abre un archivo a medio escribir."""
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'wb') as archivo:
+        cantidad = escribir_instantanea(fecha, archivo)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+    return cantidad
+
+
+class _Ids:
+    """Los ids de los registros como secuencia para bisect, leídos del mapa sin copiarlos."""
+    __slots__ = ('_mapa', '_cantidad')
+
+    def __init__(self, mapa, cantidad: int):
+        self._mapa = mapa
+        self._cantidad = cantidad
+
+    def __len__(self):
+        return self._cantidad
+
+    def __getitem__(self, posicion: int) -> int:
+        return struct.unpack_from('<I', self._mapa, _CABECERA.size + posicion * _REGISTRO.size)[0]
+
+
+class Instantanea:
+    """
+    Instantánea del día abierta con mmap. Abrirla solo lee la cabecera y la tabla de pases: el tiempo
+    no depende de la cantidad de entradas, y el sistema operativo trae del disco las páginas que la
+    búsqueda binaria va tocando.
+    """
+
+    def __init__(self, ruta: str):
+        with open(ruta, 'rb') as archivo:
+            self._mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mapa) < _CABECERA.size:
+                raise ValueError("La instantánea está dañada.")
+            magia, version, largo_registro, dias, self.cantidad, largo_pases = _CABECERA.unpack_from(self._mapa)
+            if magia != MAGIA or version != VERSION or largo_registro != _REGISTRO.size:
+                raise ValueError("El archivo no es una instantánea de ingresos compatible.")
+            fin_registros = _CABECERA.size + self.cantidad * _REGISTRO.size
+            if len(self._mapa) != fin_registros + largo_pases:
+                raise ValueError("La instantánea está dañada.")
+            self.fecha = EPOCA + timedelta(days=dias)
+            self.pases = {int(pase_id): nombre for pase_id, nombre in json.loads(self._mapa[fin_registros:]).items()}
+        except Exception:
+            self._mapa.close()
+            raise
+        self._ids = _Ids(self._mapa, self.cantidad)
+
+    def __len__(self):
+        return self.cantidad
+
+    def buscar(self, entrada_id: int):
+        """(pase_id, edad, ya usada) de la entrada, o None si no está en la instantánea."""
+        posicion = bisect_left(self._ids, entrada_id)
+        if posicion == self.cantidad:
+            return None
+        encontrada, pase_id, edad, usada = _REGISTRO.unpack_from(self._mapa, _CABECERA.size + posicion * _REGISTRO.size)
+        if encontrada != entrada_id:
+            return None
+        return pase_id, edad, bool(usada)
+
+    def cerrar(self):
+        self._mapa.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+
+class ValidadorOffline:
+    """
+    Validación en un molinete sin red, contra la instantánea del día. Cada ingreso aceptado se agrega
+    a la bitácora del molinete (CSV: entrada_id, fecha_visita, momento, molinete) antes de responder;
+    al reiniciar, el molinete vuelve a leer su bitácora para no aceptar dos veces la misma entrada.
+    Las bitácoras se concilian con la base al recuperar la red (entradas/conciliacion.py).
+
+    Solo conoce las entradas pagadas al exportar la instantánea y los ingresos de este molinete.
+    """
+
+    def __init__(self, ruta_instantanea: str, ruta_bitacora: str, molinete: str = ""):
+        self.instantanea = Instantanea(ruta_instantanea)
+        self.molinete = molinete
+        self._usadas = {}
+        self._lock = threading.Lock()
+        fecha = self.instantanea.fecha.isoformat()
+        if os.path.exists(ruta_bitacora):
+            with open(ruta_bitacora, newline='') as archivo:
+                for fila in csv.reader(archivo):
+                    if len(fila) >= 3 and fila[1] == fecha and fila[0].isdigit():
+                        self._usadas.setdefault(int(fila[0]), fila[2])
+        # Una línea por ingreso, escrita al aceptarlo
+        self._bitacora = open(ruta_bitacora, 'a', newline='', buffering=1)
+        self._escritor = csv.writer(self._bitacora)
+
+    def validar(self, token: str, ahora=None) -> Validacion:
+        try:
+            credencial = verificar(token)
+        except CredencialInvalidaError as e:
+            return Validacion(INVALIDA, mensaje=str(e))
+
+        entrada_id = credencial.entrada_id
+        if credencial.fecha_visita != self.instantanea.fecha:
+            return Validacion(OTRA_FECHA, entrada_id, mensaje=f"La entrada es para el {credencial.fecha_visita.strftime('%d/%m/%Y')}.")
+        registro = self.instantanea.buscar(entrada_id)
+        if registro is None:
+            return Validacion(DESCONOCIDA, entrada_id, mensaje="La entrada no está en la instantánea del día.")
+
+        pase_id, edad, usada = registro
+        pase = self.instantanea.pases.get(pase_id)
+        if usada:
+            return Validacion(USADA, entrada_id, pase, edad, mensaje="La entrada ya fue usada.")
+        with self._lock:
+            if entrada_id in self._usadas:
+                return Validacion(USADA, entrada_id, pase, edad, mensaje=f"La entrada ya fue usada ({self._usadas[entrada_id]}).")
+            ingreso = ahora or timezone.now()
+            self._escritor.writerow((entrada_id, self.instantanea.fecha.isoformat(), ingreso.isoformat(), self.molinete))
+            self._usadas[entrada_id] = ingreso.isoformat()
+        return Validacion(VALIDA, entrada_id, pase, edad, ingreso)
+
+    def cerrar(self):
+        self._bitacora.close()
+        self.instantanea.cerrar()
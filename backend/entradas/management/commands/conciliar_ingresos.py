@@ -0,0 +1,34 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from entradas.conciliacion import ConciliadorIngresos
+
+
+class Command(BaseCommand):
+    help = "Registra en la base los ingresos de las bitácoras de los molinetes que validaron sin red."
+
+    def add_arguments(self, parser):
+        parser.add_argument('bitacoras', nargs='+', help="Bitácoras CSV de los molinetes (entrada_id, fecha_visita, momento, molinete)")
+
+    def handle(self, *args, **options):
+        conciliador = ConciliadorIngresos()
+        errores = conciliador.resultado.errores
+        for ruta in options['bitacoras']:
+            previos = len(errores)
+            try:
+                with open(ruta, encoding='utf-8', newline='') as archivo:
+                    conciliador.agregar(archivo)
+            except (OSError, csv.Error) as e:
+                raise CommandError(str(e))
+            for linea, error in errores[previos:]:
+                self.stderr.write(f"{ruta}, línea {linea}: {error}")
+
+        resultado = conciliador.conciliar()
+        for entrada_id, error in resultado.conflictos:
+            self.stderr.write(f"Entrada {entrada_id}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Registrados {resultado.registrados} ingresos de {resultado.lineas} líneas; {resultado.ya_registrados} ya estaban "
+            f"registrados, {resultado.repetidos} repetidos entre molinetes, {resultado.desconocidas} entradas inexistentes, "
+            f"{len(resultado.conflictos)} en conflicto con la base y {len(resultado.errores)} líneas con errores."
+        ))
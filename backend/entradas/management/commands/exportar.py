@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from entradas import exportacion
+
+
+class Command(BaseCommand):
+    help = "Exporta compras o entradas en CSV o NDJSON leyendo la base por bloques (memoria constante)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(exportacion.COLUMNAS), help="Qué exportar")
+        parser.add_argument('--formato', choices=sorted(exportacion.FORMATOS), default='csv')
+        parser.add_argument('--desde', help="Primera fecha de compra (YYYY-MM-DD)")
+        parser.add_argument('--hasta', help="Última fecha de compra (YYYY-MM-DD)")
+        parser.add_argument('--salida', help="Archivo de salida; por defecto, la salida estándar")
+        parser.add_argument('--bloque', type=int, default=exportacion.TAMANIO_BLOQUE, help="Filas leídas de la base por vez")
+
+    def handle(self, *args, **options):
+        rango = {}
+        for nombre in ('desde', 'hasta'):
+            if options[nombre]:
+                try:
+                    rango[nombre] = parse_date(options[nombre])
+                except ValueError:
+                    rango[nombre] = None
+                if rango[nombre] is None:
+                    raise CommandError(f"Fecha inválida para --{nombre}: {options[nombre]}")
+
+        bloques = exportacion.generar(
+            exportacion.consulta(options['tipo'], **rango), options['tipo'], options['formato'], options['bloque'],
+        )
+        if options['salida']:
+            with open(options['salida'], 'wb') as archivo:
+                archivo.writelines(bloques)
+        else:
+            for bloque in bloques:
+                self.stdout.write(bloque.decode(), ending='')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from entradas.instantanea import exportar_instantanea
+
+
+class Command(BaseCommand):
+    help = "Exporta las entradas pagadas de una fecha de visita a la instantánea binaria que usan los molinetes sin red."
+
+    def add_arguments(self, parser):
+        parser.add_argument('salida', help="Archivo de la instantánea (se reemplaza de una vez)")
+        parser.add_argument('--fecha', help="Fecha de visita (YYYY-MM-DD); por defecto, hoy")
+
+    def handle(self, *args, **options):
+        fecha = timezone.localdate()
+        if options['fecha']:
+            try:
+                fecha = parse_date(options['fecha'])
+            except ValueError:
+                fecha = None
+            if fecha is None:
+                raise CommandError(f"Fecha inválida para --fecha: {options['fecha']}")
+
+        try:
+            cantidad = exportar_instantanea(fecha, options['salida'])
+        except OSError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Instantánea del {fecha.isoformat()} con {cantidad} entradas en {options['salida']}."))
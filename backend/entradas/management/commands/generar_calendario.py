@@ -0,0 +1,28 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from entradas.calendario import HORIZONTE_DIAS, horario_habitual, invalidar_calendario
+from entradas.models import DiaCalendario
+
+
+class Command(BaseCommand):
+    help = "Materializa en DiaCalendario los días del horizonte de venta según las reglas habituales del parque."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=HORIZONTE_DIAS, help="Cantidad de días a generar desde hoy")
+
+    def handle(self, *args, **options):
+        hoy = date.today()
+        dias = []
+        for indice in range(options['dias']):
+            fecha = hoy + timedelta(days=indice)
+            dias.append(DiaCalendario(fecha=fecha, abierto=horario_habitual(fecha) is not None))
+
+        # Los días ya cargados (p. ej. cierres especiales) no se pisan
+        existentes = DiaCalendario.objects.filter(fecha__gte=hoy).count()
+        DiaCalendario.objects.bulk_create(dias, ignore_conflicts=True, batch_size=500)
+        creados = DiaCalendario.objects.filter(fecha__gte=hoy).count() - existentes
+        invalidar_calendario()
+
+        self.stdout.write(self.style.SUCCESS(f"Calendario generado: {creados} días nuevos hasta {dias[-1].fecha if dias else hoy}."))
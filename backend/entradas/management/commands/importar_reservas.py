@@ -0,0 +1,33 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from entradas.importacion import TAMANIO_LOTE, ImportadorReservas
+from entradas.servicio_compra import ServicioCompraEntradas
+
+
+class Command(BaseCommand):
+    help = "Importa reservas de agencias desde un CSV (agencia, fecha_visita, edad, tipo_pase) por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="CSV con encabezado; las demás columnas se ignoran")
+        parser.add_argument('--lote', type=int, default=TAMANIO_LOTE, help="Filas validadas e insertadas por transacción")
+
+    def handle(self, *args, **options):
+        # La importación no cobra ni manda correos: las agencias pagan contra factura
+        servicio = ServicioCompraEntradas(pasarela_pagos=None, servicio_correo=None)
+        importador = ImportadorReservas(servicio, tamanio_lote=options['lote'])
+        try:
+            with open(options['archivo'], encoding='utf-8-sig', newline='') as archivo:
+                resultado = importador.importar(archivo)
+        except (OSError, ValueError, csv.Error) as e:
+            raise CommandError(str(e))
+
+        for linea, error in resultado.errores:
+            self.stderr.write(f"Línea {linea}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Importadas {resultado.importadas} de {resultado.filas} filas en {len(resultado.compras)} compras nuevas; "
+            f"{len(resultado.errores)} con errores."
+        ))
+        if resultado.lotes_fallidos:
+            self.stderr.write(self.style.WARNING(f"{resultado.lotes_fallidos} lotes no se pudieron registrar en la base."))
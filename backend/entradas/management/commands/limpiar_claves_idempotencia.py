@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from entradas.api.idempotencia import limpiar_vencidas
+
+
+class Command(BaseCommand):
+    help = "Borra las claves Idempotency-Key vencidas (pensado para correr periódicamente, p. ej. con cron)."
+
+    def handle(self, *args, **options):
+        borradas = limpiar_vencidas()
+        self.stdout.write(f"Claves vencidas borradas: {borradas}")
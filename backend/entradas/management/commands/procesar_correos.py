@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from entradas.bandeja_salida import procesar_pendientes
+from entradas.servicios_externos import ServicioCorreoDjango
+
+
+class Command(BaseCommand):
+    help = "Worker de la bandeja de salida: envía los correos pendientes en lotes, con los boletos en PDF y reintentos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50, help="Cantidad de correos por lote")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos de espera cuando no hay pendientes")
+        parser.add_argument('--una-vez', action='store_true', help="Procesa los pendientes actuales y termina")
+
+    def handle(self, *args, **options):
+        servicio_correo = ServicioCorreoDjango()
+        while True:
+            resultado = procesar_pendientes(servicio_correo, tamanio_lote=options['lote'])
+            procesados = resultado['enviados'] + resultado['fallidos']
+            if procesados:
+                self.stdout.write(f"Enviados: {resultado['enviados']} - Fallidos: {resultado['fallidos']}")
+            elif options['una_vez']:
+                break
+            else:
+                time.sleep(options['intervalo'])
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from entradas.ventas import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Recalcula VentasDiarias desde las Entradas (cargas históricas o correcciones hechas por fuera de la API)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help="Primera fecha de visita a recalcular (YYYY-MM-DD); por defecto, todas")
+        parser.add_argument('--hasta', help="Última fecha de visita a recalcular (YYYY-MM-DD); por defecto, todas")
+
+    def handle(self, *args, **options):
+        rango = {}
+        for nombre in ('desde', 'hasta'):
+            if options[nombre]:
+                rango[nombre] = parse_date(options[nombre])
+                if rango[nombre] is None:
+                    raise CommandError(f"Fecha inválida para --{nombre}: {options[nombre]}")
+
+        filas = reconstruir(**rango)
+        self.stdout.write(self.style.SUCCESS(f"VentasDiarias reconstruida: {filas} filas."))
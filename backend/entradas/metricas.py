@@ -0,0 +1,173 @@
+# metricas.py
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.http import HttpResponse
+
+# Límites (en segundos) de los buckets de latencia, al estilo de los histogramas de Prometheus
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, math.inf)
+
+
+class Histograma:
+    """Histograma acumulado con buckets fijos: cuenta, suma y una cuenta por bucket."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.cuentas = [0] * len(buckets)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+        self.suma += valor
+        self.cantidad += 1
+
+    def acumulados(self):
+        """Pares (límite, observaciones <= límite), como los expone Prometheus."""
+        total = 0
+        for limite, cuenta in zip(self.buckets, self.cuentas):
+            total += cuenta
+            yield limite, total
+
+
+class RegistroMetricas:
+    """
+    Métricas por vista del proceso actual (cada worker lleva las suyas, como prometheus_client
+    sin modo multiproceso). Thread-safe.
+    """
+    SERIES = {
+        'entradas_request_duracion_segundos': ('Latencia de los requests por vista', BUCKETS_SEGUNDOS),
+        'entradas_request_consultas_db': ('Consultas a la base por request', BUCKETS_CONSULTAS),
+        'entradas_request_db_segundos': ('Tiempo en la base por request', BUCKETS_SEGUNDOS),
+        'entradas_request_serializacion_segundos': ('Tiempo armando los datos de la respuesta (.data de los serializers)', BUCKETS_SEGUNDOS),
+        'entradas_request_render_segundos': ('Tiempo de render de la respuesta (de los datos a JSON)', BUCKETS_SEGUNDOS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}
+        self.perfiles = 0
+
+    def observar(self, serie: str, etiquetas: tuple, valor: float):
+        with self._lock:
+            clave = (serie, etiquetas)
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = Histograma(self.SERIES[serie][1])
+            histograma.observar(valor)
+
+    def registrar_request(self, vista: str, metodo: str, estado: int, medicion):
+        etiquetas = (('vista', vista), ('metodo', metodo), ('estado', str(estado)))
+        self.observar('entradas_request_duracion_segundos', etiquetas, medicion.duracion)
+        por_vista = (('vista', vista),)
+        self.observar('entradas_request_consultas_db', por_vista, medicion.consultas)
+        self.observar('entradas_request_db_segundos', por_vista, medicion.tiempo_db)
+        if medicion.tiempo_serializacion:
+            self.observar('entradas_request_serializacion_segundos', por_vista, medicion.tiempo_serializacion)
+        if medicion.tiempo_render:
+            self.observar('entradas_request_render_segundos', por_vista, medicion.tiempo_render)
+
+    def exportar(self) -> str:
+        """Texto en el formato de exposición de Prometheus (text/plain; version=0.0.4)."""
+        with self._lock:
+            items = sorted(self._histogramas.items())
+            perfiles = self.perfiles
+
+        lineas = []
+        for serie, (descripcion, _) in self.SERIES.items():
+            lineas.append(f"# HELP {serie} {descripcion}")
+            lineas.append(f"# TYPE {serie} histogram")
+            for (nombre, etiquetas), histograma in items:
+                if nombre != serie:
+                    continue
+                base = ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in etiquetas)
+                for limite, acumulado in histograma.acumulados():
+                    le = "+Inf" if limite == math.inf else repr(float(limite))
+                    lineas.append(f'{serie}_bucket{{{base},le="{le}"}} {acumulado}')
+                lineas.append(f"{serie}_sum{{{base}}} {histograma.suma!r}")
+                lineas.append(f"{serie}_count{{{base}}} {histograma.cantidad}")
+        lineas.append("# HELP entradas_perfiles_total Requests perfilados con cProfile")
+        lineas.append("# TYPE entradas_perfiles_total counter")
+        lineas.append(f"entradas_perfiles_total {perfiles}")
+        return "\n".join(lineas) + "\n"
+
+    def contar_perfil(self):
+        with self._lock:
+            self.perfiles += 1
+
+    def reiniciar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self.perfiles = 0
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registro = RegistroMetricas()
+
+
+class Medicion:
+    """
+    Lo medido durante un request: duración total, consultas y tiempo en la base, tiempo de los
+    serializers y tiempo de render.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.duracion = 0.0
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.tiempo_serializacion = 0.0
+        self.tiempo_render = 0.0
+
+
+# Medición del request en curso. Es una ContextVar y no un atributo del hilo porque las vistas
+# async hacen sus consultas en otros hilos (sync_to_async), que heredan el contexto
+medicion_actual = contextvars.ContextVar('medicion_actual', default=None)
+
+
+def contar_consulta(execute, sql, params, many, context):
+    """execute_wrapper instalado en cada conexión: suma la consulta a la medición en curso, si hay una."""
+    medicion = medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.consultas += 1
+        medicion.tiempo_db += time.perf_counter() - inicio
+
+
+@contextmanager
+def medir_serializacion():
+    """Suma lo que tarda el bloque (armar el .data de un serializer) a la medición en curso, si hay una."""
+    medicion = medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.tiempo_serializacion += time.perf_counter() - inicio
+
+
+def instalar_en_conexion(connection):
+    if contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(contar_consulta)
+
+
+def vista_metricas(request):
+    """Endpoint de scraping para Prometheus."""
+    return HttpResponse(registro.exportar(), content_type="text/plain; version=0.0.4; charset=utf-8")
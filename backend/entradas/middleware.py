@@ -0,0 +1,142 @@
+# middleware.py
+
+import cProfile
+import logging
+import random
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .enrutador import COOKIE_PRIMARIO, hay_replica, request_enrutado
+from .metricas import Medicion, medicion_actual, registro
+
+logger = logging.getLogger(__name__)
+
+
+class MetricasMiddleware:
+    """
+    Mide cada request (latencia, consultas y tiempo en la base, tiempo de render) y lo acumula por
+    vista en los histogramas de entradas.metricas. El tiempo de los serializers lo suman ellos mismos
+    (api/serializers.py, SerializacionMedidaMixin), aparte del render. Además puede perfilar requests con cProfile:
+    los que traen el header configurado (con el token correcto) y una muestra aleatoria según
+    settings.PERFILADO['MUESTREO']. Cada perfil se guarda como .prof (pstats) en PERFILADO['DIRECTORIO'].
+
+    Funciona con vistas sync y async; en las async no obliga a Django a pasar por un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        medicion, token = self._iniciar(request)
+        perfil = self._perfil_para(request)
+        try:
+            if perfil is not None:
+                perfil.enable()
+            response = self.get_response(request)
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            medicion_actual.reset(token)
+        return self._terminar(request, response, medicion, perfil)
+
+    async def __acall__(self, request):
+        medicion, token = self._iniciar(request)
+        # cProfile solo ve el hilo actual: en vistas async el perfil quedaría incompleto
+        try:
+            response = await self.get_response(request)
+        finally:
+            medicion_actual.reset(token)
+        return self._terminar(request, response, medicion, None)
+
+    def process_template_response(self, request, response):
+        # Las Response de DRF se renderizan después de la vista: se envuelve el render para medirlo
+        medicion = getattr(request, '_medicion', None)
+        if medicion is not None:
+            render = response.render
+
+            def render_medido():
+                inicio = time.perf_counter()
+                try:
+                    return render()
+                finally:
+                    medicion.tiempo_render += time.perf_counter() - inicio
+
+            response.render = render_medido
+        return response
+
+    def _iniciar(self, request):
+        medicion = Medicion()
+        request._medicion = medicion
+        return medicion, medicion_actual.set(medicion)
+
+    def _terminar(self, request, response, medicion, perfil):
+        medicion.duracion = time.perf_counter() - medicion.inicio
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = coincidencia.view_name if coincidencia is not None else 'sin_ruta'
+        registro.registrar_request(vista, request.method, response.status_code, medicion)
+
+        if perfil is not None:
+            nombre = self._guardar_perfil(perfil, vista, medicion)
+            response['X-Perfil'] = nombre
+        return response
+
+    def _perfil_para(self, request):
+        configuracion = settings.PERFILADO
+        token = configuracion.get('TOKEN')
+        pedido = token and request.headers.get(configuracion['HEADER']) == token
+        if pedido or random.random() < configuracion.get('MUESTREO', 0.0):
+            return cProfile.Profile()
+        return None
+
+    def _guardar_perfil(self, perfil, vista, medicion) -> str:
+        directorio = Path(settings.PERFILADO['DIRECTORIO'])
+        directorio.mkdir(parents=True, exist_ok=True)
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{vista.replace(':', '_')}-{medicion.duracion * 1000:.0f}ms-{random.getrandbits(24):06x}.prof"
+        perfil.dump_stats(directorio / nombre)
+        registro.contar_perfil()
+        logger.info("Perfil guardado: %s (%s, %.1f ms, %d consultas)", nombre, vista, medicion.duracion * 1000, medicion.consultas)
+        return nombre
+
+
+class EnrutadorLecturasMiddleware:
+    """
+    Lleva el estado de lecturas de cada request para entradas.enrutador.EnrutadorLecturas. Si el
+    request escribió en la base, deja una cookie para que las lecturas del mismo cliente vayan al
+    primario durante REPLICA_LECTURAS['SEGUNDOS_EN_PRIMARIO'], mientras la réplica se pone al día.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        with request_enrutado(COOKIE_PRIMARIO in request.COOKIES) as estado:
+            response = self.get_response(request)
+        return self._marcar(response, estado)
+
+    async def __acall__(self, request):
+        with request_enrutado(COOKIE_PRIMARIO in request.COOKIES) as estado:
+            response = await self.get_response(request)
+        return self._marcar(response, estado)
+
+    def _marcar(self, response, estado):
+        if estado.escribio and hay_replica():
+            segundos = settings.REPLICA_LECTURAS['SEGUNDOS_EN_PRIMARIO']
+            response.set_cookie(COOKIE_PRIMARIO, '1', max_age=segundos, httponly=True, samesite='Lax')
+        return response
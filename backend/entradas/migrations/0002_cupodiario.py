@@ -0,0 +1,31 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:24
+
+import django
+import django.db.models.deletion
+from django.db import migrations, models
+
+# CheckConstraint acepta condition= desde Django 5.1 (check= queda obsoleto); requirements admite desde 4.0
+_CONDICION = 'condition' if django.VERSION >= (5, 1) else 'check'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entradas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CupoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_visita', models.DateField(help_text='Fecha de visita a la que corresponde el cupo')),
+                ('capacidad', models.PositiveIntegerField(help_text='Cantidad máxima de entradas para la fecha')),
+                ('vendidas', models.PositiveIntegerField(default=0, help_text='Entradas ya vendidas para la fecha')),
+                ('pase', models.ForeignKey(blank=True, help_text='Pase limitado por este cupo (vacío = capacidad total del parque)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cupos', to='entradas.pase')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha_visita', 'pase'), name='cupo_unico_por_fecha_y_pase'), models.UniqueConstraint(condition=models.Q(('pase__isnull', True)), fields=('fecha_visita',), name='cupo_unico_por_fecha'), models.CheckConstraint(**{_CONDICION: models.Q(('vendidas__lte', models.F('capacidad')))}, name='cupo_vendidas_no_supera_capacidad')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entradas', '0002_cupodiario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiaCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Fecha del calendario', unique=True)),
+                ('abierto', models.BooleanField(default=True, help_text='Indica si el parque abre ese día')),
+                ('hora_apertura', models.TimeField(blank=True, help_text='Hora de apertura (vacío = horario habitual)', null=True)),
+                ('hora_cierre', models.TimeField(blank=True, help_text='Hora de cierre (vacío = horario habitual)', null=True)),
+                ('motivo', models.CharField(blank=True, help_text='Motivo del cierre o del horario especial', max_length=100)),
+            ],
+            options={
+                'ordering': ['fecha'],
+            },
+        ),
+    ]
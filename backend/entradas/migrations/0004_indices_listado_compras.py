@@ -0,0 +1,39 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entradas', '0003_diacalendario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='compra',
+            options={'ordering': ['-fecha_compra', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['fecha_compra', 'id'], name='compra_fecha_compra_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['usuario', 'fecha_compra', 'id'], name='compra_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['fecha_visita', 'fecha_compra', 'id'], name='compra_visita_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['estado_pago', 'fecha_compra', 'id'], name='compra_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['forma_pago', 'fecha_compra', 'id'], name='compra_forma_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entradas', '0004_indices_listado_compras'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(condition=models.Q(('estado_pago', 'PEN')), fields=['fecha_visita', 'fecha_compra'], name='compra_pendientes_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entradas', '0005_indice_pagos_pendientes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destinatario', models.EmailField(help_text='Email del destinatario', max_length=254)),
+                ('datos', models.JSONField(help_text='Datos de la compra para armar el correo')),
+                ('estado', models.CharField(choices=[('PEN', 'Pendiente'), ('ENV', 'Enviado'), ('FAL', 'Fallido')], default='PEN', help_text='Estado del envío', max_length=3)),
+                ('intentos', models.PositiveIntegerField(default=0, help_text='Cantidad de intentos de envío fallidos')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, help_text='Momento a partir del cual el worker puede (re)intentar el envío')),
+                ('ultimo_error', models.TextField(blank=True, help_text='Último error informado por el servicio de correo')),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now, help_text='Fecha y hora en que se encoló el correo')),
+                ('fecha_envio', models.DateTimeField(blank=True, help_text='Fecha y hora del envío exitoso', null=True)),
+                ('compra', models.ForeignKey(help_text='Compra que originó el correo', on_delete=django.db.models.deletion.CASCADE, related_name='correos', to='entradas.compra')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('estado', 'PEN')), fields=['proximo_intento'], name='correo_pendiente_idx')],
+            },
+        ),
+    ]
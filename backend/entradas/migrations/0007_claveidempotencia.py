@@ -0,0 +1,32 @@
+# Generated by Django 4.2.25 on 2026-10-18 10:31
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entradas', '0006_correosaliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alcance', models.CharField(help_text='Usuario, método y ruta a los que aplica la clave', max_length=200)),
+                ('clave', models.CharField(help_text='Valor del header Idempotency-Key', max_length=100)),
+                ('huella', models.CharField(help_text='Hash del cuerpo del request original', max_length=64)),
+                ('estado_http', models.PositiveSmallIntegerField(blank=True, help_text='Código de la respuesta (vacío = request en curso)', null=True)),
+                ('respuesta', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Cuerpo de la respuesta original', null=True)),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now, help_text='Fecha y hora del primer request con la clave')),
+                ('expira', models.DateTimeField(help_text='A partir de este momento la clave puede reutilizarse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expira'], name='clave_idempotencia_expira_idx')],
+                'constraints': [models.UniqueConstraint(fields=('alcance', 'clave'), name='clave_idempotencia_unica')],
+            },
+        ),
+    ]
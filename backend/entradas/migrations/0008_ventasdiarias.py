@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-18 11:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entradas', '0007_claveidempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentasDiarias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_visita', models.DateField(help_text='Fecha de visita de las entradas')),
+                ('forma_pago', models.CharField(choices=[('EFE', 'Efectivo en Boletería'), ('TAR', 'Tarjeta (Mercado Pago)')], help_text='Forma de pago de las compras', max_length=3)),
+                ('estado_pago', models.CharField(choices=[('PEN', 'Pendiente'), ('PAG', 'Pagado'), ('CAN', 'Cancelado')], help_text='Estado de pago de las compras', max_length=3)),
+                ('entradas', models.IntegerField(default=0, help_text='Cantidad de entradas')),
+                ('recaudacion', models.DecimalField(decimal_places=2, default=0, help_text='Suma de los precios de las entradas', max_digits=14)),
+                ('infantes', models.IntegerField(default=0, help_text='Entradas de 0 a 2 años')),
+                ('ninos', models.IntegerField(default=0, help_text='Entradas de 3 a 9 años')),
+                ('adultos', models.IntegerField(default=0, help_text='Entradas de 10 a 60 años')),
+                ('mayores', models.IntegerField(default=0, help_text='Entradas de 61 años o más')),
+                ('pase', models.ForeignKey(help_text='Tipo de pase vendido', on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='entradas.pase')),
+            ],
+            options={
+                'ordering': ['fecha_visita', 'pase', 'forma_pago', 'estado_pago'],
+                'constraints': [models.UniqueConstraint(fields=('fecha_visita', 'pase', 'forma_pago', 'estado_pago'), name='ventas_diarias_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entradas', '0008_ventasdiarias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entrada',
+            name='fecha_ingreso',
+            field=models.DateTimeField(blank=True, help_text='Fecha y hora en que se usó en el molinete (vacía si no se usó)', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entradas', '0009_entrada_fecha_ingreso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compra',
+            name='referencia_pago',
+            field=models.CharField(blank=True, help_text='Referencia del cobro con tarjeta; la pasarela la usa como clave de idempotencia', max_length=64, null=True, unique=True),
+        ),
+    ]
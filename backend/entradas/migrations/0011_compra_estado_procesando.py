@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entradas', '0010_compra_referencia_pago'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='compra',
+            name='estado_pago',
+            field=models.CharField(choices=[('PEN', 'Pendiente'), ('PRO', 'Procesando pago'), ('PAG', 'Pagado'), ('CAN', 'Cancelado')], default='PEN', help_text='Estado actual del pago', max_length=3),
+        ),
+        migrations.AlterField(
+            model_name='ventasdiarias',
+            name='estado_pago',
+            field=models.CharField(choices=[('PEN', 'Pendiente'), ('PRO', 'Procesando pago'), ('PAG', 'Pagado'), ('CAN', 'Cancelado')], help_text='Estado de pago de las compras', max_length=3),
+        ),
+    ]
@@ -1,6 +1,16 @@
+import django
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def _restriccion_check(condicion, nombre):
+    """CheckConstraint con `condition=` (Django >= 5.1) o con `check=`, obsoleto desde 5.1, en las versiones anteriores."""
+    if django.VERSION >= (5, 1):
+        return models.CheckConstraint(condition=condicion, name=nombre)
+    return models.CheckConstraint(check=condicion, name=nombre)
+
 
 class Pase(models.Model):
     nombre = models.CharField(max_length=50, unique=True, help_text="Nombre del tipo de pase")
@@ -11,7 +21,7 @@ class Pase(models.Model):
     )
 
     def __str__(self):
-        return f"{self.nombre} (${self.precio_base_adulto})"
+        return f"{self.nombre} (${self.precio})"
 
 class Compra(models.Model):
     class FormasPago(models.TextChoices):
@@ -20,6 +30,8 @@ class Compra(models.Model):
         
     class EstadosPago(models.TextChoices):
         PENDIENTE = 'PEN', 'Pendiente'
+        # Registrada y con el cobro con tarjeta en curso
+        PROCESANDO = 'PRO', 'Procesando pago'
         PAGADO = 'PAG', 'Pagado'
         CANCELADO = 'CAN', 'Cancelado'
 
@@ -35,18 +47,180 @@ class Compra(models.Model):
     monto_total = models.DecimalField(max_digits=10, decimal_places=2, help_text="Costo total calculado de todas las entradas")
     forma_pago = models.CharField(max_length=3, choices=FormasPago.choices, help_text="Método de pago seleccionado")
     estado_pago = models.CharField(max_length=3, choices=EstadosPago.choices, default=EstadosPago.PENDIENTE, help_text="Estado actual del pago")
+    referencia_pago = models.CharField(max_length=64, unique=True, null=True, blank=True, help_text="Referencia del cobro con tarjeta; la pasarela la usa como clave de idempotencia")
 
     def __str__(self):
         return f"Compra #{self.id} - Usuario: {self.usuario.username} - Fecha de visita: {self.fecha_visita}"
 
     class Meta:
-        ordering = ['-fecha_compra']
+        ordering = ['-fecha_compra', '-id']
+        # Índices alineados con la paginación por cursor (fecha_compra, id) y los filtros del listado
+        indexes = [
+            models.Index(fields=['fecha_compra', 'id'], name='compra_fecha_compra_idx'),
+            models.Index(fields=['usuario', 'fecha_compra', 'id'], name='compra_usuario_fecha_idx'),
+            models.Index(fields=['fecha_visita', 'fecha_compra', 'id'], name='compra_visita_fecha_idx'),
+            models.Index(fields=['estado_pago', 'fecha_compra', 'id'], name='compra_estado_fecha_idx'),
+            models.Index(fields=['forma_pago', 'fecha_compra', 'id'], name='compra_forma_fecha_idx'),
+            # Índice parcial: los pagos pendientes son pocos y se consultan seguido (cobro en boletería)
+            models.Index(
+                fields=['fecha_visita', 'fecha_compra'],
+                name='compra_pendientes_idx',
+                condition=models.Q(estado_pago='PEN'),
+            ),
+        ]
 
 class Entrada(models.Model):
     compra = models.ForeignKey(Compra, on_delete=models.CASCADE, related_name='entradas', help_text="Compra a la que pertenece esta entrada")
     pase = models.ForeignKey(Pase, on_delete=models.PROTECT, related_name='entradas_vendidas', help_text="Tipo de pase adquirido")
     edad_visitante = models.PositiveIntegerField(help_text="Edad del visitante")
     precio_calculado = models.DecimalField(max_digits=8, decimal_places=2, help_text="Precio final de esta entrada")
+    fecha_ingreso = models.DateTimeField(null=True, blank=True, help_text="Fecha y hora en que se usó en el molinete (vacía si no se usó)")
+
+    def __str__(self):
+        return f"Entrada para Compra #{self.compra.id} - Pase: {self.pase.nombre} - Edad: {self.edad_visitante}"
+
+class CupoDiario(models.Model):
+    """
+    Inventario de entradas por fecha de visita. La fila con pase=None es la capacidad total del parque;
+    opcionalmente puede haber filas por pase para limitar un tipo de pase en particular.
+    """
+    fecha_visita = models.DateField(help_text="Fecha de visita a la que corresponde el cupo")
+    pase = models.ForeignKey(Pase, on_delete=models.CASCADE, null=True, blank=True, related_name='cupos', help_text="Pase limitado por este cupo (vacío = capacidad total del parque)")
+    capacidad = models.PositiveIntegerField(help_text="Cantidad máxima de entradas para la fecha")
+    vendidas = models.PositiveIntegerField(default=0, help_text="Entradas ya vendidas para la fecha")
+
+    def __str__(self):
+        alcance = self.pase.nombre if self.pase_id else "Parque"
+        return f"Cupo {self.fecha_visita} - {alcance}: {self.vendidas}/{self.capacidad}"
+
+    @classmethod
+    def reservar(cls, fecha_visita, cantidad, pase=None):
+        """
+        Descuenta `cantidad` entradas del cupo con un UPDATE condicional (vendidas + cantidad <= capacidad).
+        Es atómico en la base y solo bloquea la fila de esa fecha. Retorna False si no hay lugar.
+        """
+        actualizadas = cls.objects.filter(
+            fecha_visita=fecha_visita,
+            pase=pase,
+            vendidas__lte=models.F('capacidad') - cantidad,
+        ).update(vendidas=models.F('vendidas') + cantidad)
+        return actualizadas == 1
+
+    @classmethod
+    def liberar(cls, fecha_visita, cantidad, pase=None):
+        """Devuelve al cupo entradas reservadas (p. ej. si la compra falla después de reservar)."""
+        cls.objects.filter(
+            fecha_visita=fecha_visita,
+            pase=pase,
+            vendidas__gte=cantidad,
+        ).update(vendidas=models.F('vendidas') - cantidad)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha_visita', 'pase'], name='cupo_unico_por_fecha_y_pase'),
+            models.UniqueConstraint(fields=['fecha_visita'], condition=models.Q(pase__isnull=True), name='cupo_unico_por_fecha'),
+            _restriccion_check(models.Q(vendidas__lte=models.F('capacidad')), 'cupo_vendidas_no_supera_capacidad'),
+        ]
+
+
+class DiaCalendario(models.Model):
+    """
+    Día del calendario del parque. Guarda los días especiales (feriados, cierres, horarios extendidos)
+    y los días materializados por el comando generar_calendario para el horizonte de venta.
+    """
+    fecha = models.DateField(unique=True, help_text="Fecha del calendario")
+    abierto = models.BooleanField(default=True, help_text="Indica si el parque abre ese día")
+    hora_apertura = models.TimeField(null=True, blank=True, help_text="Hora de apertura (vacío = horario habitual)")
+    hora_cierre = models.TimeField(null=True, blank=True, help_text="Hora de cierre (vacío = horario habitual)")
+    motivo = models.CharField(max_length=100, blank=True, help_text="Motivo del cierre o del horario especial")
+
+    def __str__(self):
+        estado = "Abierto" if self.abierto else "Cerrado"
+        return f"{self.fecha} - {estado}{f' ({self.motivo})' if self.motivo else ''}"
+
+    class Meta:
+        ordering = ['fecha']
+
+
+class CorreoSaliente(models.Model):
+    """
+    Bandeja de salida (outbox) de correos. Se escribe en la misma transacción que la Compra
+    y un worker (comando procesar_correos) la vacía fuera del request, con reintentos.
+    """
+    class Estados(models.TextChoices):
+        PENDIENTE = 'PEN', 'Pendiente'
+        ENVIADO = 'ENV', 'Enviado'
+        FALLIDO = 'FAL', 'Fallido'
+
+    compra = models.ForeignKey(Compra, on_delete=models.CASCADE, related_name='correos', help_text="Compra que originó el correo")
+    destinatario = models.EmailField(help_text="Email del destinatario")
+    datos = models.JSONField(help_text="Datos de la compra para armar el correo")
+    estado = models.CharField(max_length=3, choices=Estados.choices, default=Estados.PENDIENTE, help_text="Estado del envío")
+    intentos = models.PositiveIntegerField(default=0, help_text="Cantidad de intentos de envío fallidos")
+    proximo_intento = models.DateTimeField(default=timezone.now, help_text="Momento a partir del cual el worker puede (re)intentar el envío")
+    ultimo_error = models.TextField(blank=True, help_text="Último error informado por el servicio de correo")
+    fecha_creacion = models.DateTimeField(default=timezone.now, help_text="Fecha y hora en que se encoló el correo")
+    fecha_envio = models.DateTimeField(null=True, blank=True, help_text="Fecha y hora del envío exitoso")
+
+    def __str__(self):
+        return f"Correo Compra #{self.compra_id} a {self.destinatario} ({self.get_estado_display()})"
+
+    class Meta:
+        indexes = [
+            # El worker solo busca pendientes vencidos: índice parcial chico aunque la tabla crezca
+            models.Index(fields=['proximo_intento'], name='correo_pendiente_idx', condition=models.Q(estado='PEN')),
+        ]
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Respuesta guardada para un header Idempotency-Key: los reintentos con la misma clave
+    reciben la respuesta original en lugar de repetir la compra o el cobro.
+    """
+    alcance = models.CharField(max_length=200, help_text="Usuario, método y ruta a los que aplica la clave")
+    clave = models.CharField(max_length=100, help_text="Valor del header Idempotency-Key")
+    huella = models.CharField(max_length=64, help_text="Hash del cuerpo del request original")
+    estado_http = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Código de la respuesta (vacío = request en curso)")
+    respuesta = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, help_text="Cuerpo de la respuesta original")
+    fecha_creacion = models.DateTimeField(default=timezone.now, help_text="Fecha y hora del primer request con la clave")
+    expira = models.DateTimeField(help_text="A partir de este momento la clave puede reutilizarse")
 
     def __str__(self):
-        return f"Entrada para Compra #{self.compra.id} - Pase: {self.pase.nombre} - Edad: {self.edad_visitante}"
\ No newline at end of file
+        return f"{self.alcance} [{self.clave}]"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['alcance', 'clave'], name='clave_idempotencia_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['expira'], name='clave_idempotencia_expira_idx'),
+        ]
+
+
+class VentasDiarias(models.Model):
+    """
+    Ventas acumuladas por fecha de visita, pase, forma y estado de pago, para tableros y reportes.
+    Se mantiene de forma incremental con cada compra y cambio de estado (ver entradas.ventas), así
+    que consultar un período recorre días y no entradas. El comando reconstruir_ventas_diarias
+    la vuelve a calcular desde las Entradas (cargas masivas, correcciones a mano).
+    """
+    fecha_visita = models.DateField(help_text="Fecha de visita de las entradas")
+    pase = models.ForeignKey(Pase, on_delete=models.CASCADE, related_name='ventas_diarias', help_text="Tipo de pase vendido")
+    forma_pago = models.CharField(max_length=3, choices=Compra.FormasPago.choices, help_text="Forma de pago de las compras")
+    estado_pago = models.CharField(max_length=3, choices=Compra.EstadosPago.choices, help_text="Estado de pago de las compras")
+    entradas = models.IntegerField(default=0, help_text="Cantidad de entradas")
+    recaudacion = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Suma de los precios de las entradas")
+    infantes = models.IntegerField(default=0, help_text="Entradas de 0 a 2 años")
+    ninos = models.IntegerField(default=0, help_text="Entradas de 3 a 9 años")
+    adultos = models.IntegerField(default=0, help_text="Entradas de 10 a 60 años")
+    mayores = models.IntegerField(default=0, help_text="Entradas de 61 años o más")
+
+    def __str__(self):
+        return f"Ventas {self.fecha_visita} - Pase #{self.pase_id} {self.forma_pago}/{self.estado_pago}: {self.entradas}"
+
+    class Meta:
+        ordering = ['fecha_visita', 'pase', 'forma_pago', 'estado_pago']
+        constraints = [
+            # También sirve de índice para los rangos de fechas de los reportes
+            models.UniqueConstraint(fields=['fecha_visita', 'pase', 'forma_pago', 'estado_pago'], name='ventas_diarias_unica'),
+        ]
@@ -0,0 +1,298 @@
+# pasarela_pagos.py
+
+import asyncio
+import threading
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+
+import aiohttp
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .servicios_externos import PasarelaPagosSimulada
+from .excepciones import TimeoutError, ConnectionError, PagoRechazadoError
+
+
+class CircuitBreaker:
+    """
+    Corta las llamadas a un servicio degradado: tras `umbral_fallos` fallos seguidos se abre
+    y rechaza al instante durante `tiempo_apertura` segundos; después deja pasar una llamada
+    de prueba (semiabierto) y se vuelve a cerrar si sale bien.
+    """
+    CERRADO = 'cerrado'
+    ABIERTO = 'abierto'
+    SEMIABIERTO = 'semiabierto'
+
+    def __init__(self, umbral_fallos: int = 5, tiempo_apertura: float = 30.0, reloj=time.monotonic):
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_apertura = tiempo_apertura
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._abierto_desde = None
+        self._prueba_en_curso = False
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            return self._estado()
+
+    def _estado(self) -> str:
+        if self._abierto_desde is None:
+            return self.CERRADO
+        if self._reloj() - self._abierto_desde >= self.tiempo_apertura:
+            return self.SEMIABIERTO
+        return self.ABIERTO
+
+    def permitir(self) -> bool:
+        """Indica si se puede intentar la llamada; en semiabierto solo pasa una a la vez."""
+        with self._lock:
+            return self._permitir()[0]
+
+    def _permitir(self):
+        # (se permite, es la llamada de prueba del semiabierto); se llama con el lock tomado
+        estado = self._estado()
+        if estado == self.CERRADO:
+            return True, False
+        if estado == self.SEMIABIERTO and not self._prueba_en_curso:
+            self._prueba_en_curso = True
+            return True, True
+        return False, False
+
+    @contextmanager
+    def llamada(self):
+        """
+        Envuelve una llamada al servicio: lanza ConnectionError si el breaker no la deja pasar.
+        Si era la llamada de prueba y termina sin registrar éxito ni fallo (una excepción no
+        prevista, una cancelación), la prueba se libera igual y el breaker no queda trabado.
+        """
+        with self._lock:
+            permitida, prueba = self._permitir()
+        if not permitida:
+            raise ConnectionError("La pasarela de pagos no está disponible en este momento.")
+        try:
+            yield
+        finally:
+            if prueba:
+                with self._lock:
+                    self._prueba_en_curso = False
+
+    def registrar_exito(self):
+        with self._lock:
+            self._fallos = 0
+            self._abierto_desde = None
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self):
+        with self._lock:
+            self._fallos += 1
+            self._prueba_en_curso = False
+            if self._abierto_desde is not None or self._fallos >= self.umbral_fallos:
+                self._abierto_desde = self._reloj()
+
+
+class ClientePasarelaPagos:
+    """
+    Cliente HTTP de la pasarela de pagos (API tipo Mercado Pago).
+    Reutiliza conexiones con un pool, limita cada operación a un plazo total (`plazo`),
+    reintenta solo operaciones idempotentes y corta con un circuit breaker si la pasarela se degrada.
+    Las variantes `*_async` hacen lo mismo sobre aiohttp sin bloquear el hilo (servicio de compra async).
+    """
+
+    def __init__(self, url_base: str, token: str = "", plazo: float = 5.0, timeout_conexion: float = 1.0,
+                 reintentos: int = 2, tamanio_pool: int = 20, tamanio_pool_async: int = 200,
+                 breaker: CircuitBreaker = None):
+        self.url_base = url_base.rstrip('/')
+        self.plazo = plazo
+        self.timeout_conexion = timeout_conexion
+        self.reintentos = reintentos
+        self.tamanio_pool_async = tamanio_pool_async
+        self.breaker = breaker or CircuitBreaker()
+        self._encabezados = {'Authorization': f"Bearer {token}"} if token else {}
+        # Una sesión de aiohttp queda atada al event loop en que se crea: se guarda una por loop
+        self._sesiones_async = weakref.WeakKeyDictionary()
+
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=tamanio_pool, max_retries=0)
+        self.session.mount('http://', adaptador)
+        self.session.mount('https://', adaptador)
+        self.session.headers.update(self._encabezados)
+
+    def procesar_pago(self, monto, referencia: str = None) -> bool:
+        """
+        Cobra `monto`. Retorna True si la pasarela aprueba y False si lo rechaza.
+        Se envía una clave de idempotencia, así que reintentar no duplica el cobro.
+        """
+        cuerpo = {'transaction_amount': str(monto), 'external_reference': referencia}
+        encabezados = {'X-Idempotency-Key': referencia or uuid.uuid4().hex}
+        datos = self._llamar('POST', '/v1/payments', json=cuerpo, headers=encabezados)
+        return datos.get('status') == 'approved'
+
+    async def procesar_pago_async(self, monto, referencia: str = None) -> bool:
+        """Como procesar_pago, pero mientras espera a la pasarela el event loop atiende otros requests."""
+        cuerpo = {'transaction_amount': str(monto), 'external_reference': referencia}
+        encabezados = {'X-Idempotency-Key': referencia or uuid.uuid4().hex}
+        datos = await self._llamar_async('POST', '/v1/payments', json=cuerpo, headers=encabezados)
+        return datos.get('status') == 'approved'
+
+    def consultar_pago(self, id_pago: str) -> dict:
+        """Estado de un pago ya procesado."""
+        return self._llamar('GET', f'/v1/payments/{id_pago}')
+
+    def _llamar(self, metodo: str, ruta: str, **kwargs) -> dict:
+        with self.breaker.llamada():
+            return self._llamar_con_reintentos(metodo, ruta, **kwargs)
+
+    def _llamar_con_reintentos(self, metodo: str, ruta: str, **kwargs) -> dict:
+        """
+        Hace la llamada dentro del plazo, reintentando los errores de red, los 5xx y las respuestas
+        que no son JSON (la operación lleva su clave de idempotencia). Retorna el JSON de la respuesta.
+        """
+        vencimiento = time.monotonic() + self.plazo
+        intento = 0
+        while True:
+            restante = vencimiento - time.monotonic()
+            if restante <= 0:
+                self.breaker.registrar_fallo()
+                raise TimeoutError("La pasarela de pagos no respondió a tiempo.")
+            try:
+                respuesta = self.session.request(
+                    metodo, self.url_base + ruta,
+                    timeout=(min(self.timeout_conexion, restante), restante),
+                    **kwargs,
+                )
+                error = self._verificar_estado(respuesta.status_code)
+                if error is None:
+                    return respuesta.json()
+            except requests.Timeout:
+                error = TimeoutError("La pasarela de pagos no respondió a tiempo.")
+            except ValueError:
+                # requests.JSONDecodeError también es RequestException: va antes
+                error = ConnectionError("La pasarela de pagos respondió algo que no es JSON.")
+            except requests.RequestException:
+                error = ConnectionError("No se pudo conectar con la pasarela de pagos.")
+
+            intento += 1
+            if intento > self.reintentos:
+                self.breaker.registrar_fallo()
+                raise error
+            # Backoff corto entre reintentos, sin pasarse del plazo
+            time.sleep(self._espera_reintento(intento, vencimiento))
+
+    async def _llamar_async(self, metodo: str, ruta: str, **kwargs) -> dict:
+        with self.breaker.llamada():
+            return await self._llamar_con_reintentos_async(metodo, ruta, **kwargs)
+
+    async def _llamar_con_reintentos_async(self, metodo: str, ruta: str, **kwargs) -> dict:
+        """Como _llamar_con_reintentos, sobre aiohttp."""
+        vencimiento = time.monotonic() + self.plazo
+        intento = 0
+        while True:
+            restante = vencimiento - time.monotonic()
+            if restante <= 0:
+                self.breaker.registrar_fallo()
+                raise TimeoutError("La pasarela de pagos no respondió a tiempo.")
+            try:
+                timeout = aiohttp.ClientTimeout(total=restante, sock_connect=min(self.timeout_conexion, restante))
+                async with self._sesion_async().request(metodo, self.url_base + ruta, timeout=timeout, **kwargs) as respuesta:
+                    error = self._verificar_estado(respuesta.status)
+                    if error is None:
+                        return await respuesta.json()
+            except asyncio.TimeoutError:
+                error = TimeoutError("La pasarela de pagos no respondió a tiempo.")
+            except aiohttp.ClientResponseError as e:
+                # Incluye ContentTypeError: la respuesta no vino como JSON
+                error = ConnectionError(f"La pasarela de pagos respondió algo inesperado ({e.status}).")
+            except aiohttp.ClientError:
+                error = ConnectionError("No se pudo conectar con la pasarela de pagos.")
+            except ValueError:
+                error = ConnectionError("La pasarela de pagos respondió algo que no es JSON.")
+
+            intento += 1
+            if intento > self.reintentos:
+                self.breaker.registrar_fallo()
+                raise error
+            await asyncio.sleep(self._espera_reintento(intento, vencimiento))
+
+    async def cerrar_async(self):
+        """Cierra la sesión async del event loop actual (p. ej. al apagar el worker ASGI)."""
+        sesion = self._sesiones_async.pop(asyncio.get_running_loop(), None)
+        if sesion is not None:
+            await sesion.close()
+
+    def _sesion_async(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        sesion = self._sesiones_async.get(loop)
+        if sesion is None:
+            sesion = aiohttp.ClientSession(
+                headers=self._encabezados,
+                connector=aiohttp.TCPConnector(limit=self.tamanio_pool_async),
+            )
+            self._sesiones_async[loop] = sesion
+        return sesion
+
+    # Respuestas 4xx pasajeras: la misma operación puede salir bien al reintentarla
+    CODIGOS_A_REINTENTAR = (408, 409, 429)
+    # El token no es válido o no tiene permiso: falla de configuración, no de la operación
+    CODIGOS_DE_CREDENCIALES = (401, 403)
+    # Único 4xx que es un rechazo explícito del pago (los rechazos habituales vienen en un 2xx con status 'rejected')
+    CODIGO_RECHAZO = 402
+
+    def _verificar_estado(self, codigo: int):
+        """
+        Retorna None si la respuesta es final y el error a reintentar ante un 5xx o un 4xx pasajero
+        (CODIGOS_A_REINTENTAR). Lanza PagoRechazadoError solo ante un rechazo explícito (402) y
+        ConnectionError ante cualquier otro 4xx; si son las credenciales, cuenta como fallo en el breaker.
+        """
+        if codigo >= 500:
+            return ConnectionError(f"La pasarela de pagos respondió {codigo}.")
+        if codigo == 408:
+            return TimeoutError("La pasarela de pagos no respondió a tiempo (408).")
+        if codigo in self.CODIGOS_A_REINTENTAR:
+            return ConnectionError(f"La pasarela de pagos no pudo atender la operación por ahora ({codigo}).")
+        if codigo in self.CODIGOS_DE_CREDENCIALES:
+            self.breaker.registrar_fallo()
+            raise ConnectionError(f"La pasarela de pagos no aceptó las credenciales ({codigo}): revisar la configuración.")
+        # El resto es una respuesta válida de una pasarela sana
+        self.breaker.registrar_exito()
+        if codigo == self.CODIGO_RECHAZO:
+            raise PagoRechazadoError(f"La pasarela de pagos rechazó la operación ({codigo}).")
+        if codigo >= 400:
+            raise ConnectionError(f"La pasarela de pagos no aceptó el pedido ({codigo}).")
+        return None
+
+    def _espera_reintento(self, intento: int, vencimiento: float) -> float:
+        """Backoff corto entre reintentos, sin pasarse del plazo."""
+        return min(0.05 * (2 ** intento), max(vencimiento - time.monotonic(), 0))
+
+
+# Un único cliente por proceso: comparte el pool de conexiones y el estado del circuit breaker
+_lock = threading.Lock()
+_cliente = None
+
+
+def obtener_pasarela_pagos():
+    """Cliente de la pasarela configurada en settings.PASARELA_PAGOS, o la simulada si no hay URL."""
+    global _cliente
+    configuracion = settings.PASARELA_PAGOS
+    if not configuracion.get('URL'):
+        return PasarelaPagosSimulada()
+
+    with _lock:
+        if _cliente is None:
+            _cliente = ClientePasarelaPagos(
+                url_base=configuracion['URL'],
+                token=configuracion.get('TOKEN', ''),
+                plazo=configuracion.get('PLAZO', 5.0),
+                reintentos=configuracion.get('REINTENTOS', 2),
+                tamanio_pool=configuracion.get('TAMANIO_POOL', 20),
+                tamanio_pool_async=configuracion.get('TAMANIO_POOL_ASYNC', 200),
+                breaker=CircuitBreaker(
+                    umbral_fallos=configuracion.get('UMBRAL_FALLOS', 5),
+                    tiempo_apertura=configuracion.get('TIEMPO_APERTURA', 30.0),
+                ),
+            )
+        return _cliente
@@ -1,62 +1,238 @@
 # servicio_compra.py
 
+import uuid
+from collections import Counter
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from .excepciones import LimiteEntradasExcedidoError, ParqueCerradoError, PagoRechazadoError
+from django.db import transaction
 from datetime import datetime, timedelta
+from decimal import Decimal
+
+from .excepciones import (
+    LimiteEntradasExcedidoError,
+    ParqueCerradoError,
+    PagoRechazadoError,
+    EdadInvalidaError,
+    PermissionError,
+    CupoAgotadoError,
+)
+from .models import Pase, Compra, Entrada, CupoDiario
+from .tarifas import EDAD_MAXIMA, obtener_tabla
+from .calendario import obtener_calendario
+from .bandeja_salida import encolar_confirmacion
+from .trazas import tramo
+from .ventas import registrar_entradas
+
+# Formas de pago que acepta el servicio y su código en Compra.FormasPago
+FORMAS_PAGO = {
+    'Efectivo': Compra.FormasPago.EFECTIVO,
+    'Tarjeta': Compra.FormasPago.TARJETA,
+}
 
-# Importamos la excepción EdadInvalidaError (asumo que está junto a las otras)
-# y la clase EmailError si la necesitas, aunque para el mock puedes usar Exception.
-# Si EdadInvalidaError no está en excepciones.py, deberás añadirla a ese archivo.
-from .excepciones import LimiteEntradasExcedidoError, ParqueCerradoError, PagoRechazadoError, EdadInvalidaError
+
+def _datos_cobro(monto, referencia: str = None) -> dict:
+    """Argumentos de procesar_pago; la referencia solo se pasa si hay una."""
+    if referencia is None:
+        return {'monto': monto}
+    return {'monto': monto, 'referencia': referencia}
 
 
 class ServicioCompraEntradas:
     """Clase de la Capa de Lógica de Negocio (Service)."""
 
-    def __init__(self, pasarela_pagos, servicio_correo, servicio_calendario):
+    def __init__(self, pasarela_pagos, servicio_correo, servicio_calendario=None, tarifas=None, calendario=None):
         self.pasarela_pagos = pasarela_pagos
         self.servicio_correo = servicio_correo
+        # Calendario externo opcional (p. ej. cierres por clima); los días y horarios del parque
+        # se resuelven con el calendario en memoria
         self.servicio_calendario = servicio_calendario
+        # Tabla de tarifas fija (p. ej. en tests); si es None se usa la tabla en caché de los Pase
+        self.tarifas = tarifas
+        # Calendario fijo (p. ej. en tests); si es None se usa el calendario en caché de DiaCalendario
+        self.calendario = calendario
+
+    def _tabla_tarifas(self):
+        return self.tarifas if self.tarifas is not None else obtener_tabla()
 
-    # 1. Método Principal (Manteniendo la estructura que permite fallar el test RED por AttributeError si no se implementa)
-    def comprar_entradas(self, usuario: User, cantidad: int, fecha_visita: str, tipo_pago: str, visitantes: list):
+    def _calendario(self):
+        return self.calendario if self.calendario is not None else obtener_calendario()
+
+    # 1. Método Principal
+    def comprar_entradas(self, usuario: User, cantidad: int, fecha_visita: str, tipo_pago: str, visitantes: list,
+                         referencia: str = None):
         """
-        Método a construir. Actualmente, no tiene la lógica de validación de cantidad.
-        Esta ausencia es lo que causa el fallo RED esperado en el test.
+        Ejecuta la compra completa: valida los datos, calcula el monto, registra la Compra con
+        todas sus Entradas en una única transacción y recién después cobra. Con tarjeta la compra
+        se registra PROCESANDO y pasa a PAGADO con el cobro aprobado, junto con el correo de
+        confirmación encolado en la bandeja de salida; así nunca queda un cargo sin su compra.
+        Retorna la Compra creada.
+
+        `referencia` identifica el intento de compra (p. ej. derivada del Idempotency-Key) y viaja a
+        la pasarela con el cobro: si el usuario ya tiene una compra con esa referencia se retorna
+        esa (reintentando el cobro si quedó pendiente), y reintentar no cobra dos veces.
         """
-        # En esta etapa, el método debe fallar o devolver un mock. 
-        # Pero si tu test final es Failed: DID NOT RAISE <class 'AttributeError'>, significa
-        # que el método comprar_entradas está incompleto, pero los métodos internos 
-        # que se llaman desde ahí aún no están implementados o no se llaman correctamente.
+        with tramo("compra", cantidad=cantidad, tipo_pago=tipo_pago) as tramo_compra:
+            if referencia is not None:
+                previa = Compra.objects.filter(referencia_pago=referencia, usuario=usuario).first()
+                if previa is not None:
+                    tramo_compra.anotar(compra_id=previa.id, repetida=True)
+                    return self._retomar_cobro(previa, usuario)
+            elif tipo_pago == 'Tarjeta':
+                referencia = uuid.uuid4().hex
+
+            with tramo("compra.validacion"):
+                self._validar_usuario(usuario)
+                self._validar_formato_cantidad(cantidad)
+                self._validar_formato_edades(visitantes)
+                self._validar_formato_pases(visitantes)
+                self._validar_cantidad(cantidad, visitantes)
+                self._validar_forma_pago(tipo_pago)
+
+                fecha = self._validar_formato_fecha(fecha_visita)
+                self._validar_fecha_hora_visita(fecha)
 
-        # Retorna el mensaje original para mantener el fallo en los tests finales si no está implementado:
-        # return {"mensaje": "Compra iniciada (Validación de cantidad omitida para el test RED)."}
+            if self.servicio_calendario is not None:
+                with tramo("compra.calendario_externo"):
+                    if not self.servicio_calendario.es_dia_abierto(fecha.date()):
+                        raise ParqueCerradoError("El parque está cerrado en esa fecha.")
 
-        # O lanza un AttributeError esperado en el test final si es necesario:
-        raise NotImplementedError("Método comprar_entradas aún no implementado por completo (Fase RED).")
+            with tramo("compra.precios"):
+                tabla = self._tabla_tarifas()
+                precios = [tabla.precio(v["edad"], v["tipo_pase"]) for v in visitantes]
+                monto_total = sum(precios, Decimal('0'))
+
+            # El cupo se reserva en la misma transacción que registra la compra: si el registro
+            # falla (o el proceso se cae), la reserva se revierte con ella
+            with transaction.atomic():
+                with tramo("compra.reserva_cupo"):
+                    pases = self._obtener_pases(visitantes)
+                    self._reservar_cupo(fecha.date(), visitantes, pases)
+                with tramo("compra.registro"):
+                    compra = self._registrar_compra(usuario, fecha, tipo_pago, visitantes, precios, pases, referencia)
+
+            tramo_compra.anotar(compra_id=compra.id)
+            if compra.estado_pago == Compra.EstadosPago.PROCESANDO:
+                self._cobrar_compra(compra, usuario)
+        return compra
+
+    def pagar_compra(self, compra: Compra, referencia: str = None) -> Compra:
+        """
+        Cobra con tarjeta una compra que quedó pendiente de pago y la marca como pagada.
+        Bajo el bloqueo de la fila solo se la pasa a PROCESANDO, así dos pedidos simultáneos no
+        cobran dos veces; el cobro se hace fuera de la transacción y después se confirma.
+        Si el cobro se rechaza la compra vuelve a PENDIENTE con una referencia nueva; si falla sin
+        respuesta vuelve a PENDIENTE con la misma, y el reintento no cobra dos veces.
+        """
+        with tramo("compra.pagar_pendiente", compra_id=compra.id):
+            with transaction.atomic():
+                compra = Compra.objects.select_for_update().get(id=compra.id)
+                if compra.estado_pago == Compra.EstadosPago.PROCESANDO:
+                    raise ValueError("La compra ya tiene un cobro en curso.")
+                if compra.estado_pago != Compra.EstadosPago.PENDIENTE:
+                    raise ValueError("La compra no está pendiente de pago.")
+                # Un cobro anterior sin respuesta se reintenta con su misma referencia
+                compra.referencia_pago = compra.referencia_pago or referencia or uuid.uuid4().hex
+                compra.estado_pago = Compra.EstadosPago.PROCESANDO
+                compra.save(update_fields=['estado_pago', 'referencia_pago'])
+
+            try:
+                with tramo("compra.pago", monto=compra.monto_total):
+                    self._gestionar_pago(monto_total=compra.monto_total, tipo_pago='Tarjeta', referencia=compra.referencia_pago)
+            except PagoRechazadoError:
+                compra.estado_pago = Compra.EstadosPago.PENDIENTE
+                compra.referencia_pago = None
+                compra.save(update_fields=['estado_pago', 'referencia_pago'])
+                raise
+            except Exception:
+                self._cambiar_estado(compra, Compra.EstadosPago.PENDIENTE)
+                raise
+
+            compra.estado_pago = Compra.EstadosPago.PAGADO
+            compra.forma_pago = Compra.FormasPago.TARJETA
+            compra.save(update_fields=['estado_pago', 'forma_pago'])
+        return compra
+
+    def _cobrar_compra(self, compra: Compra, usuario: User) -> Compra:
+        """
+        Cobra con tarjeta una compra registrada en PROCESANDO, con su referencia_pago:
+        - aprobado: pasa a PAGADO y se encola el correo de confirmación;
+        - rechazado: no hubo cargo, así que se borra la compra y se devuelve el cupo;
+        - cualquier otro error (timeout, pasarela caída): no se sabe si hubo cargo. La compra queda
+          PENDIENTE con su cupo y su referencia; reintentar con la misma referencia no cobra dos veces.
+        """
+        try:
+            with tramo("compra.pago", monto=compra.monto_total):
+                self._gestionar_pago(monto_total=compra.monto_total, tipo_pago='Tarjeta', referencia=compra.referencia_pago)
+        except PagoRechazadoError:
+            with tramo("compra.liberar_cupo"):
+                self._anular_compra(compra)
+            raise
+        except Exception:
+            self._cambiar_estado(compra, Compra.EstadosPago.PENDIENTE)
+            raise
+
+        with tramo("compra.confirmacion_pago"):
+            self._confirmar_pago(compra, usuario)
+        return compra
+
+    def _retomar_cobro(self, compra: Compra, usuario: User) -> Compra:
+        """Compra ya registrada con la misma referencia: se vuelve a cobrar si quedó pendiente con tarjeta."""
+        if not self._tomar_para_cobrar(compra):
+            return compra
+        return self._cobrar_compra(compra, usuario)
+
+    def _tomar_para_cobrar(self, compra: Compra) -> bool:
+        """
+        Pasa a PROCESANDO una compra con tarjeta pendiente, bajo el bloqueo de la fila: un solo
+        reintento a la vez. Con save() las señales sacan sus entradas de la fila PENDIENTE de VentasDiarias.
+        """
+        with transaction.atomic():
+            bloqueada = Compra.objects.select_for_update().filter(
+                id=compra.id, forma_pago=Compra.FormasPago.TARJETA, estado_pago=Compra.EstadosPago.PENDIENTE,
+            ).first()
+            if bloqueada is None:
+                return False
+            self._cambiar_estado(bloqueada, Compra.EstadosPago.PROCESANDO)
+        compra.estado_pago = Compra.EstadosPago.PROCESANDO
+        return True
+
+    def _confirmar_pago(self, compra: Compra, usuario: User):
+        """Marca pagada una compra cobrada y encola su correo de confirmación, en una transacción."""
+        with transaction.atomic():
+            self._cambiar_estado(compra, Compra.EstadosPago.PAGADO)
+            encolar_confirmacion(compra, usuario.email)
+
+    def _cambiar_estado(self, compra: Compra, estado_pago: str):
+        # Con save() las señales mueven sus entradas en VentasDiarias y avisan al índice de ingresos
+        compra.estado_pago = estado_pago
+        compra.save(update_fields=['estado_pago'])
+
+    def _anular_compra(self, compra: Compra):
+        """Borra una compra que no se cobró y devuelve sus entradas al cupo del día, en una transacción."""
+        with transaction.atomic():
+            por_pase = Counter(compra.entradas.values_list('pase_id', flat=True))
+            fecha_visita = compra.fecha_visita
+            compra.delete()
+            # Los pases sin cupo propio no tienen fila en CupoDiario: liberarlos no cambia nada
+            self._liberar_cupo(fecha_visita, [(None, sum(por_pase.values()))] + list(por_pase.items()))
 
     # 2. Métodos de Cálculo (Implementados en el código que pasaste)
-    def _calcular_precio_entrada(self, edad: int, tipo_pase: str) -> float:
-        """Calculará el precio de una entrada según edad y tipo de pase."""
-        costo = 0
-        if tipo_pase == 'Regular':
-            costo = 5000
-        elif tipo_pase == 'VIP':
-            costo = 10000
-
-        if edad < 3:
-            costo = 0
-        elif edad < 10 or edad > 60:
-            costo *= 0.5
-
-        return costo
-
-    def _calcular_monto_total(self, visitantes: list) -> float:
-        """Calculará el monto total sumando todos los precios individuales."""
-        suma = 0
-        for visitante in visitantes:
-            suma += self._calcular_precio_entrada(visitante["edad"], visitante["tipo_pase"])
-        return suma
+    def _calcular_precio_entrada(self, edad: int, tipo_pase: str) -> Decimal:
+        """Calcula el precio de una entrada según edad y tipo de pase (búsqueda en la tabla de tarifas)."""
+        return self._tabla_tarifas().precio(edad, tipo_pase)
+
+    def _calcular_monto_total(self, visitantes: list) -> Decimal:
+        """Calcula el monto total sumando todos los precios individuales."""
+        tabla = self._tabla_tarifas()
+        return sum((tabla.precio(v["edad"], v["tipo_pase"]) for v in visitantes), Decimal('0'))
+
+    def cotizar_grupo(self, edades, tipos_pase):
+        """
+        Cotiza un grupo grande (ventas corporativas, escuelas) a partir de columnas de edades
+        y tipos de pase. Retorna una CotizacionLote con los precios por entrada y el total.
+        """
+        return self._tabla_tarifas().cotizar_lote(edades, tipos_pase)
 
     # 3. Métodos de Validación (Implementados en el código que pasaste)
     def _validar_cantidad(self, cantidad, visitantes):
@@ -71,85 +247,219 @@ class ServicioCompraEntradas:
 
     def _validar_fecha_hora_visita(self, fecha):
         """
-        Valida que la fecha sea en un dia donde el parque esté abierto (ni lunes, ni feriados como navidad o año nuevo),
-        que se compre durante horario habilitado
+        Valida que la fecha sea en un dia donde el parque esté abierto (ni lunes, ni feriados como navidad o año nuevo,
+        ni cierres especiales del calendario), que se compre durante horario habilitado
         """
-        dia_fecha = fecha.weekday()
-        # Se necesita la hora actual para comparar con datetime.now()
-        ahora = datetime.now()
-
-        # Simplificación de fechas especiales para el stub, corrigiendo la lógica de comparación
-        # (se debe comparar solo el día, no día y hora a la vez)
-        navidad_sin_hora = datetime(fecha.year, 12, 25).date()
-        anio_nuevo_sin_hora = datetime(fecha.year, 1, 1).date()
-
-        if fecha.date() == navidad_sin_hora or fecha.date() == anio_nuevo_sin_hora or dia_fecha == 0:
+        horario = self._calendario().horario(fecha.date())
+        if horario is None:
             raise ParqueCerradoError("El parque está cerrado en esa fecha.")
 
-        hora_fecha = fecha.hour
+        apertura, cierre = horario
+        if not apertura <= fecha.time() < cierre:
+            raise ParqueCerradoError(
+                f"Horario de visita fuera del rango permitido ({apertura.hour}:{apertura.minute:02d} - {cierre.hour}:{cierre.minute:02d})."
+            )
 
-        if hora_fecha < 9 or hora_fecha >= 19:
-            raise ParqueCerradoError("Horario de visita fuera del rango permitido (9:00 - 19:00).")
-
-        if fecha < ahora:
+        if fecha < datetime.now():
             raise ValueError("La fecha de visita no puede ser en el pasado.")
 
         return True
 
-    # 4. MÉTODOS FALTANTES (CAUSAN AttributeError)
+    # 4. Validaciones de formato, usuario, pago y notificaciones
 
     def _validar_formato_fecha(self, fecha_str: str) -> datetime:
         """
         Valida que la fecha sea un string no vacío y que tenga formato ISO 8601 (YYYY-MM-DDThh:mm:ss).
         """
-        # STUB: Lanza AttributeError para pasar a la fase GREEN
-        raise NotImplementedError("Método pendiente de implementación en fase GREEN")
+        if fecha_str is None or fecha_str == "":
+            raise ValueError("La fecha de visita no fue proporcionada.")
+        if not isinstance(fecha_str, str):
+            raise ValueError("La fecha de visita debe ser un texto con formato ISO 8601.")
+        try:
+            return datetime.fromisoformat(fecha_str)
+        except ValueError:
+            raise ValueError("El formato de la fecha es inválido.")
 
     def _validar_formato_cantidad(self, cantidad):
         """
         Valida que la cantidad sea un entero, no un string, float o None.
         """
-        # STUB: Lanza AttributeError para pasar a la fase GREEN
-        raise NotImplementedError("Método pendiente de implementación en fase GREEN")
+        if not isinstance(cantidad, int) or isinstance(cantidad, bool):
+            raise ValueError("La cantidad de entradas debe ser un número entero.")
+        return True
 
     def _validar_formato_edades(self, visitantes: list):
         """
         Valida que la clave 'edad' exista, sea un entero, no sea None, y no sea negativa/muy alta.
         """
-        # STUB: Lanza AttributeError para pasar a la fase GREEN
-        raise NotImplementedError("Método pendiente de implementación en fase GREEN")
+        for visitante in visitantes:
+            if "edad" not in visitante:
+                raise EdadInvalidaError("Falta 'edad' para un visitante.")
+            edad = visitante["edad"]
+            if not isinstance(edad, int) or isinstance(edad, bool):
+                raise EdadInvalidaError("La edad debe ser un número entero.")
+            if edad < 0:
+                raise EdadInvalidaError("La edad no puede ser negativa.")
+            if edad > EDAD_MAXIMA:
+                raise EdadInvalidaError(f"La edad no puede ser mayor a {EDAD_MAXIMA}.")
+        return True
 
     def _validar_formato_pases(self, visitantes: list):
         """
         Valida que la clave 'tipo_pase' exista, sea un string y no esté vacío/None/tipo incorrecto.
         """
-        # STUB: Lanza AttributeError para pasar a la fase GREEN
-        raise NotImplementedError("Método pendiente de implementación en fase GREEN")
+        for visitante in visitantes:
+            if "tipo_pase" not in visitante:
+                raise ValueError("Falta la clave 'tipo_pase' para un visitante.")
+            tipo_pase = visitante["tipo_pase"]
+            if not isinstance(tipo_pase, str):
+                raise ValueError("El 'tipo_pase' debe ser texto.")
+            if tipo_pase.strip() == "":
+                raise ValueError("El 'tipo_pase' no puede estar vacío.")
+            if tipo_pase not in self._tabla_tarifas().tipos_pase:
+                raise ValueError(f"El 'tipo_pase' '{tipo_pase}' no es válido.")
+        return True
 
     def _validar_usuario(self, usuario: User):
         """
-        Valida que el usuario esté registrado.
+        Valida que el usuario esté registrado y tenga un email válido para la confirmación.
         """
-        # STUB: Lanza AttributeError para pasar a la fase GREEN
-        raise NotImplementedError("Método pendiente de implementación en fase GREEN")
+        registrado = getattr(usuario, "esta_registrado", None)
+        if registrado is None:
+            # Usuarios de Django: registrado si está persistido y activo
+            registrado = usuario is not None and usuario.pk is not None and usuario.is_active
+        if not registrado:
+            raise PermissionError("Usuario no registrado.")
 
-    def _gestionar_pago(self, monto_total: float, tipo_pago: str) -> bool:
+        email = getattr(usuario, "email", None)
+        if not isinstance(email, str) or "@" not in email or email.startswith("@") or email.endswith("@"):
+            raise ValueError("El email del usuario es inválido.")
+        return True
+
+    def _validar_forma_pago(self, tipo_pago: str):
+        """
+        Valida que la forma de pago esté especificada y sea una de FORMAS_PAGO.
+        """
+        if tipo_pago is None:
+            raise ValueError("Forma de pago inválida: No especificada.")
+        if tipo_pago not in FORMAS_PAGO:
+            raise ValueError(f"Forma de pago inválida: '{tipo_pago}' no reconocido.")
+        return True
+
+    def _gestionar_pago(self, monto_total: float, tipo_pago: str, referencia: str = None) -> bool:
         """
         Procesa el pago (llama a pasarela si es Tarjeta) o lo registra (si es Efectivo).
+        La pasarela usa la referencia como clave de idempotencia del cobro.
+        """
+        self._validar_forma_pago(tipo_pago)
+
+        if tipo_pago == 'Efectivo':
+            # Se abona en boletería, la compra queda pendiente de pago
+            return True
+
+        if not self.pasarela_pagos.procesar_pago(**_datos_cobro(monto_total, referencia)):
+            raise PagoRechazadoError("El pago fue rechazado por la pasarela.")
+        return True
+
+    def _obtener_pases(self, visitantes: list) -> dict:
+        """
+        Retorna los Pase usados por los visitantes, indexados por nombre.
+        """
+        nombres = {v["tipo_pase"] for v in visitantes}
+        pases = {pase.nombre: pase for pase in Pase.objects.filter(nombre__in=nombres)}
+        faltantes = nombres - pases.keys()
+        if faltantes:
+            raise ValueError(f"No existe el pase: {', '.join(sorted(faltantes))}.")
+        return pases
+
+    def _reservar_cupo(self, fecha_visita, visitantes: list, pases: dict) -> list:
+        """
+        Descuenta las entradas del cupo del día (y del cupo por pase, si el pase tiene uno).
+        Cada descuento es un UPDATE condicional sobre una sola fila, sin bloqueos globales. Se llama
+        dentro de la transacción que registra las entradas; si algún cupo no alcanza, un savepoint
+        deshace los descuentos ya hechos. Retorna las reservas hechas como (pase, cantidad).
+        """
+        CupoDiario.objects.get_or_create(
+            fecha_visita=fecha_visita,
+            pase=None,
+            defaults={'capacidad': settings.CAPACIDAD_DIARIA_PARQUE},
+        )
+
+        por_pase = {}
+        for visitante in visitantes:
+            pase = pases[visitante["tipo_pase"]]
+            por_pase[pase] = por_pase.get(pase, 0) + 1
+
+        reservas = []
+        with transaction.atomic():
+            if not CupoDiario.reservar(fecha_visita, len(visitantes)):
+                raise CupoAgotadoError("No quedan entradas disponibles para esa fecha.")
+            reservas.append((None, len(visitantes)))
+
+            limitados = set(CupoDiario.objects.filter(fecha_visita=fecha_visita, pase__in=por_pase).values_list('pase_id', flat=True))
+            for pase, cantidad in por_pase.items():
+                if pase.id not in limitados:
+                    continue
+                if not CupoDiario.reservar(fecha_visita, cantidad, pase=pase):
+                    raise CupoAgotadoError(f"No quedan entradas {pase.nombre} disponibles para esa fecha.")
+                reservas.append((pase, cantidad))
+        return reservas
+
+    def _liberar_cupo(self, fecha_visita, reservas: list):
+        """Devuelve al cupo las reservas hechas por _reservar_cupo (al anular una compra, en su transacción)."""
+        for pase, cantidad in reservas:
+            CupoDiario.liberar(fecha_visita, cantidad, pase=pase)
+
+    def _registrar_compra(self, usuario: User, fecha: datetime, tipo_pago: str, visitantes: list, precios: list, pases: dict,
+                          referencia: str = None) -> Compra:
         """
-        # STUB: Lanza AttributeError para pasar a la fase GREEN
-        raise NotImplementedError("Método pendiente de implementación en fase GREEN")
+        Persiste la Compra y todas sus Entradas (un único bulk_create) dentro de una transacción.
+        En la misma transacción suma las entradas a VentasDiarias. Con tarjeta la compra queda
+        PROCESANDO hasta que se cobra; con efectivo queda PENDIENTE y ya se encola el correo de
+        confirmación, que envía el worker de la bandeja de salida.
+        """
+        forma_pago = FORMAS_PAGO[tipo_pago]
+        tarjeta = forma_pago == Compra.FormasPago.TARJETA
+        estado_pago = Compra.EstadosPago.PROCESANDO if tarjeta else Compra.EstadosPago.PENDIENTE
+
+        with transaction.atomic():
+            compra = Compra.objects.create(
+                usuario=usuario,
+                fecha_visita=fecha.date(),
+                monto_total=sum(precios, Decimal('0')),
+                forma_pago=forma_pago,
+                estado_pago=estado_pago,
+                referencia_pago=referencia,
+            )
+            entradas = Entrada.objects.bulk_create([
+                Entrada(
+                    compra=compra,
+                    pase=pases[visitante["tipo_pase"]],
+                    edad_visitante=visitante["edad"],
+                    precio_calculado=precio,
+                )
+                for visitante, precio in zip(visitantes, precios)
+            ])
+            registrar_entradas(compra, entradas)
+            if not tarjeta:
+                encolar_confirmacion(compra, usuario.email)
+        return compra
 
     def _enviar_confirmacion(self, usuario: User, compra):
         """
         Envía el correo de confirmación de la compra.
+        Un fallo del servicio de correo no invalida la compra: se informa devolviendo False.
         """
-        # STUB: Lanza AttributeError para pasar a la fase GREEN
-        raise NotImplementedError("Método pendiente de implementación en fase GREEN")
+        with tramo("compra.confirmacion") as tramo_confirmacion:
+            try:
+                return self._enviar_notificacion(usuario, compra)
+            except Exception as e:
+                tramo_confirmacion.anotar(error=type(e).__name__)
+                return False
 
     def _enviar_notificacion(self, usuario: User, compra):
         """
-        Envía notificaciones, similar a _enviar_confirmacion
+        Envía notificaciones, similar a _enviar_confirmacion, pero propaga los errores del servicio de correo.
         """
-        # STUB: Lanza AttributeError para pasar a la fase GREEN
-        raise NotImplementedError("Método pendiente de implementación en fase GREEN")
+        mail = getattr(usuario, "email", usuario)
+        return self.servicio_correo.enviar_confirmacion(mail=mail, compra_details=compra.__dict__)
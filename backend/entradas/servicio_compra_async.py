@@ -0,0 +1,132 @@
+# servicio_compra_async.py
+
+import asyncio
+import uuid
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .excepciones import ParqueCerradoError, PagoRechazadoError
+from .models import Compra
+from .servicio_compra import ServicioCompraEntradas, _datos_cobro
+from .trazas import tramo
+
+
+class ServicioCompraEntradasAsync(ServicioCompraEntradas):
+    """
+    Variante async del servicio de compra, para vistas ASGI. Aplica las mismas validaciones y
+    el mismo orden de reserva, cobro y registro, pero mientras espera a la pasarela o al
+    calendario externo el event loop sigue atendiendo otros checkouts.
+
+    Los adaptadores pueden ofrecer `procesar_pago_async` / `es_dia_abierto_async`; si no,
+    su versión sincrónica corre en un hilo aparte.
+    """
+
+    # 1. Método Principal
+    async def comprar_entradas(self, usuario: User, cantidad: int, fecha_visita: str, tipo_pago: str, visitantes: list,
+                               referencia: str = None):
+        """
+        Ejecuta la compra completa igual que ServicioCompraEntradas.comprar_entradas.
+        La consulta al calendario externo y la de los pases se esperan en paralelo; la reserva de
+        cupo y el registro van después, en una sola transacción.
+        """
+        with tramo("compra", cantidad=cantidad, tipo_pago=tipo_pago, modo="async") as tramo_compra:
+            if referencia is not None:
+                previa = await Compra.objects.filter(referencia_pago=referencia, usuario=usuario).afirst()
+                if previa is not None:
+                    tramo_compra.anotar(compra_id=previa.id, repetida=True)
+                    if not await sync_to_async(self._tomar_para_cobrar)(previa):
+                        return previa
+                    return await self._cobrar_compra_async(previa, usuario)
+            elif tipo_pago == 'Tarjeta':
+                referencia = uuid.uuid4().hex
+
+            # La tabla de tarifas y el calendario se cargan de la base solo si no están en caché
+            await sync_to_async(self._fijar_tablas)()
+
+            with tramo("compra.validacion"):
+                self._validar_usuario(usuario)
+                self._validar_formato_cantidad(cantidad)
+                self._validar_formato_edades(visitantes)
+                self._validar_formato_pases(visitantes)
+                self._validar_cantidad(cantidad, visitantes)
+                self._validar_forma_pago(tipo_pago)
+
+                fecha = self._validar_formato_fecha(fecha_visita)
+                self._validar_fecha_hora_visita(fecha)
+
+            with tramo("compra.precios"):
+                tabla = self._tabla_tarifas()
+                precios = [tabla.precio(v["edad"], v["tipo_pase"]) for v in visitantes]
+                monto_total = sum(precios, Decimal('0'))
+
+            abierto, pases = await asyncio.gather(
+                self._es_dia_abierto_externo(fecha.date()),
+                sync_to_async(self._obtener_pases)(visitantes),
+            )
+            if not abierto:
+                raise ParqueCerradoError("El parque está cerrado en esa fecha.")
+
+            compra = await sync_to_async(self._reservar_y_registrar)(usuario, fecha, tipo_pago, visitantes, precios, pases, referencia)
+
+            tramo_compra.anotar(compra_id=compra.id)
+            if compra.estado_pago == Compra.EstadosPago.PROCESANDO:
+                await self._cobrar_compra_async(compra, usuario)
+        return compra
+
+    # 2. Pasos async
+    def _fijar_tablas(self):
+        self.tarifas = self._tabla_tarifas()
+        self.calendario = self._calendario()
+
+    def _reservar_y_registrar(self, usuario: User, fecha, tipo_pago: str, visitantes: list, precios: list, pases: dict, referencia: str):
+        # En un solo hilo y una sola transacción, como en comprar_entradas sincrónico
+        with transaction.atomic():
+            with tramo("compra.reserva_cupo"):
+                self._reservar_cupo(fecha.date(), visitantes, pases)
+            with tramo("compra.registro"):
+                return self._registrar_compra(usuario, fecha, tipo_pago, visitantes, precios, pases, referencia)
+
+    async def _es_dia_abierto_externo(self, fecha) -> bool:
+        if self.servicio_calendario is None:
+            return True
+        consultar = getattr(self.servicio_calendario, 'es_dia_abierto_async', None)
+        if consultar is None:
+            consultar = sync_to_async(self.servicio_calendario.es_dia_abierto, thread_sensitive=False)
+        return await consultar(fecha)
+
+    async def _cobrar_compra_async(self, compra: Compra, usuario: User) -> Compra:
+        """
+        Igual que _cobrar_compra: la compra ya está registrada; si el cobro se rechaza se anula,
+        y si falla sin respuesta queda PENDIENTE con su referencia para reintentarlo.
+        """
+        try:
+            with tramo("compra.pago", monto=compra.monto_total):
+                await self._gestionar_pago_async(monto_total=compra.monto_total, tipo_pago='Tarjeta', referencia=compra.referencia_pago)
+        except PagoRechazadoError:
+            with tramo("compra.liberar_cupo"):
+                await sync_to_async(self._anular_compra)(compra)
+            raise
+        except BaseException:
+            await sync_to_async(self._cambiar_estado)(compra, Compra.EstadosPago.PENDIENTE)
+            raise
+
+        with tramo("compra.confirmacion_pago"):
+            await sync_to_async(self._confirmar_pago)(compra, usuario)
+        return compra
+
+    async def _gestionar_pago_async(self, monto_total, tipo_pago: str, referencia: str = None) -> bool:
+        """
+        Igual que _gestionar_pago: con Efectivo no se llama a la pasarela.
+        """
+        if tipo_pago != 'Tarjeta':
+            return self._gestionar_pago(monto_total=monto_total, tipo_pago=tipo_pago)
+
+        procesar = getattr(self.pasarela_pagos, 'procesar_pago_async', None)
+        if procesar is None:
+            procesar = sync_to_async(self.pasarela_pagos.procesar_pago, thread_sensitive=False)
+        if not await procesar(**_datos_cobro(monto_total, referencia)):
+            raise PagoRechazadoError("El pago fue rechazado por la pasarela.")
+        return True
@@ -0,0 +1,37 @@
+# servicios_externos.py
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+
+
+class PasarelaPagosSimulada:
+    """Pasarela de pagos de desarrollo: aprueba todos los cobros."""
+
+    def procesar_pago(self, monto, referencia: str = None):
+        return True
+
+    async def procesar_pago_async(self, monto, referencia: str = None):
+        return True
+
+
+class ServicioCorreoDjango:
+    """Envía los correos de confirmación con el backend de email configurado en Django."""
+
+    def enviar_confirmacion(self, mail, compra_details, boletos: bytes = None):
+        mensaje = (
+            "¡Gracias por tu compra en EcoHarmony Park!\n\n"
+            f"Compra #{compra_details.get('id')}\n"
+            f"Fecha de visita: {compra_details.get('fecha_visita')}\n"
+            f"Total: ${compra_details.get('monto_total')}\n"
+        )
+        correo = EmailMessage(
+            subject="Confirmación de compra - EcoHarmony Park",
+            body=mensaje,
+            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+            to=[mail],
+        )
+        if boletos:
+            correo.body += "\nAdjuntamos tus entradas: mostrá el código QR de cada una en el ingreso.\n"
+            correo.attach(f"entradas-compra-{compra_details.get('id')}.pdf", boletos, 'application/pdf')
+        return correo.send() == 1
+
@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Pase, DiaCalendario, Compra, Entrada
+from .tarifas import invalidar_tabla
+from .calendario import invalidar_calendario
+from .api.catalogo import invalidar_catalogo
+from .metricas import instalar_en_conexion
+from .base_datos import ajustar_sqlite
+from . import ingresos, ventas
+
+
+# Las cachés del proceso se invalidan al confirmar la transacción que cambió los datos: si se
+# invalidaran antes, otro request podría reconstruirlas con los datos viejos mientras tanto.
+# Fuera de una transacción on_commit corre en el momento.
+
+@receiver([post_save, post_delete], sender=Pase)
+def invalidar_tarifas(sender, **kwargs):
+    """Cualquier cambio en el catálogo de pases invalida la tabla de tarifas y el catálogo en caché."""
+    transaction.on_commit(invalidar_tabla)
+    transaction.on_commit(invalidar_catalogo)
+
+
+@receiver([post_save, post_delete], sender=DiaCalendario)
+def actualizar_calendario(sender, **kwargs):
+    """Los cambios en días especiales invalidan el calendario en caché."""
+    transaction.on_commit(invalidar_calendario)
+
+
+@receiver(connection_created)
+def medir_consultas(sender, connection, **kwargs):
+    """Cada conexión nueva cuenta sus consultas para las métricas por request."""
+    instalar_en_conexion(connection)
+
+
+@receiver(connection_created)
+def ajustar_conexion(sender, connection, **kwargs):
+    """Las conexiones SQLite salen con WAL, busy_timeout y demás PRAGMA de settings.SQLITE_PRAGMAS."""
+    ajustar_sqlite(connection)
+
+
+# --- Acumulado de VentasDiarias ---
+# Las altas masivas (bulk_create, QuerySet.update/delete) no emiten señales: las suma quien las hace
+# (ServicioCompraEntradas._registrar_compra) o se corrigen con reconstruir_ventas_diarias
+
+CAMPOS_CLAVE_VENTAS = {'fecha_visita', 'forma_pago', 'estado_pago'}
+
+
+@receiver(pre_save, sender=Compra)
+def recordar_clave_ventas(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not CAMPOS_CLAVE_VENTAS.intersection(update_fields):
+        return
+    instance._clave_ventas = (
+        Compra.objects.filter(pk=instance.pk).values_list('fecha_visita', 'forma_pago', 'estado_pago').first()
+    )
+
+
+@receiver(post_save, sender=Compra)
+def mover_ventas_de_compra(sender, instance, created, raw=False, **kwargs):
+    """Si cambió la fecha, la forma o el estado de pago, sus entradas pasan a la fila que corresponde."""
+    antes = instance.__dict__.pop('_clave_ventas', None)
+    if raw or created or antes is None:
+        return
+    despues = ventas.clave_de(instance)
+    if antes != despues:
+        ventas.mover_compra(instance.pk, antes, despues)
+
+
+@receiver(pre_save, sender=Entrada)
+def recordar_entrada(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._entrada_antes = (
+        Entrada.objects.filter(pk=instance.pk).values_list('compra_id', 'pase_id', 'edad_visitante', 'precio_calculado').first()
+    )
+
+
+@receiver(post_save, sender=Entrada)
+def sumar_entrada_a_ventas(sender, instance, created, raw=False, **kwargs):
+    antes = instance.__dict__.pop('_entrada_antes', None)
+    if raw:
+        return
+    if antes is not None:
+        ventas.sumar_entrada(*antes, signo=-1)
+    if created or antes is not None:
+        ventas.sumar_entrada(instance.compra_id, instance.pase_id, instance.edad_visitante, instance.precio_calculado)
+
+
+@receiver(post_delete, sender=Entrada)
+def descontar_entrada_de_ventas(sender, instance, **kwargs):
+    ventas.sumar_entrada(instance.compra_id, instance.pase_id, instance.edad_visitante, instance.precio_calculado, signo=-1)
+
+
+# --- Índice de ingresos del día ---
+
+@receiver(post_save, sender=Compra)
+def actualizar_indice_ingresos(sender, instance, created, raw=False, **kwargs):
+    """Una compra del día que cambia de estado de pago se habilita o se revoca en el índice de los molinetes."""
+    indice = ingresos.indice_cargado()
+    if raw or created or indice is None or indice.fecha != instance.fecha_visita:
+        return
+    indice.revocar_compra(instance.pk, revocada=instance.estado_pago != Compra.EstadosPago.PAGADO)
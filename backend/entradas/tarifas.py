@@ -0,0 +1,174 @@
+# tarifas.py
+
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sin él, la cotización por lote usa listas de Python
+    np = None
+
+EDAD_MAXIMA = 120
+
+# Bandas de edad: (edad mínima, edad máxima, factor sobre el precio del pase)
+BANDAS_EDAD = (
+    (0, 2, Decimal('0')),       # Infante: entrada gratuita
+    (3, 9, Decimal('0.5')),     # Niño: 50% de descuento
+    (10, 60, Decimal('1')),     # Adulto: precio completo
+    (61, EDAD_MAXIMA, Decimal('0.5')),  # Adulto mayor: 50% de descuento
+)
+
+CENTAVOS = Decimal('0.01')
+
+
+class TablaTarifas:
+    """
+    Tabla de precios precalculada: para cada pase guarda el precio final de cada edad
+    (0..EDAD_MAXIMA), así que obtener un precio es una búsqueda O(1) sin acceder a la base.
+    """
+
+    def __init__(self, precios_pases: dict, version: int = 0, bandas=BANDAS_EDAD):
+        self.version = version
+        self.bandas = bandas
+        self.precios_base = {nombre: Decimal(precio) for nombre, precio in precios_pases.items()}
+        self._precios = {
+            nombre: self._precios_por_edad(precio, bandas)
+            for nombre, precio in self.precios_base.items()
+        }
+        # Los mismos precios en centavos enteros, para sumar lotes grandes sin redondeos intermedios
+        self._nombres = list(self._precios)
+        self._centavos = [[int(p * 100) for p in self._precios[nombre]] for nombre in self._nombres]
+        self._matriz_centavos = np.array(self._centavos, dtype=np.int64) if np is not None else None
+
+    @staticmethod
+    def _precios_por_edad(precio_base: Decimal, bandas) -> list:
+        precios = [None] * (EDAD_MAXIMA + 1)
+        for edad_min, edad_max, factor in bandas:
+            precio = (precio_base * factor).quantize(CENTAVOS)
+            for edad in range(edad_min, edad_max + 1):
+                precios[edad] = precio
+        return precios
+
+    @property
+    def tipos_pase(self):
+        return self._precios.keys()
+
+    def precio(self, edad: int, tipo_pase: str) -> Decimal:
+        """Precio final de una entrada según edad y tipo de pase."""
+        try:
+            precios = self._precios[tipo_pase]
+        except KeyError:
+            raise ValueError(f"El 'tipo_pase' '{tipo_pase}' no es válido.")
+        if not 0 <= edad <= EDAD_MAXIMA:
+            raise ValueError(f"La edad debe estar entre 0 y {EDAD_MAXIMA}.")
+        return precios[edad]
+
+    def cotizar_lote(self, edades, tipos_pase) -> 'CotizacionLote':
+        """
+        Cotiza un lote de visitantes expresado en columnas (edades y tipos de pase alineados).
+        Con numpy la búsqueda por banda es vectorizada; el total se convierte a Decimal al final.
+        """
+        if len(edades) != len(tipos_pase):
+            raise ValueError("Las columnas de edades y tipos de pase deben tener el mismo largo.")
+        if len(edades) == 0:
+            return CotizacionLote([], 0)
+        if np is None:
+            return self._cotizar_lote_python(edades, tipos_pase)
+
+        edades = np.asarray(edades)
+        if not np.issubdtype(edades.dtype, np.integer):
+            raise ValueError("La edad debe ser un número entero.")
+        if (edades.min() < 0 or edades.max() > EDAD_MAXIMA):
+            raise ValueError(f"La edad debe estar entre 0 y {EDAD_MAXIMA}.")
+
+        # Hay pocos pases: una comparación vectorizada por pase es más barata que ordenar los nombres
+        tipos_pase = np.asarray(tipos_pase)
+        filas = np.full(len(tipos_pase), -1, dtype=np.intp)
+        for fila, nombre in enumerate(self._nombres):
+            filas[tipos_pase == nombre] = fila
+        if (filas < 0).any():
+            invalido = tipos_pase[np.argmax(filas < 0)]
+            raise ValueError(f"El 'tipo_pase' '{invalido}' no es válido.")
+
+        centavos = self._matriz_centavos[filas, edades]
+        return CotizacionLote(centavos, int(centavos.sum()))
+
+    def _cotizar_lote_python(self, edades, tipos_pase) -> 'CotizacionLote':
+        filas = dict(zip(self._nombres, self._centavos))
+        centavos = []
+        for edad, tipo_pase in zip(edades, tipos_pase):
+            self.precio(edad, tipo_pase)  # valida edad y pase con los mismos errores que el camino escalar
+            centavos.append(filas[tipo_pase][edad])
+        return CotizacionLote(centavos, sum(centavos))
+
+
+class CotizacionLote:
+    """Resultado de cotizar un lote: precios por entrada en centavos y total exacto en Decimal."""
+
+    def __init__(self, centavos, total_centavos: int):
+        self.centavos = centavos
+        self.total = (Decimal(total_centavos) / 100).quantize(CENTAVOS)
+
+    def __len__(self):
+        return len(self.centavos)
+
+    @property
+    def precios(self) -> list:
+        """Precio de cada entrada como Decimal, en el mismo orden que las columnas de entrada."""
+        return [(Decimal(int(c)) / 100).quantize(CENTAVOS) for c in self.centavos]
+
+
+# Caché en proceso de la tabla vigente. Se invalida con las señales de Pase (ver signals.py); cada
+# invalidación cambia la versión y la tabla se reconstruye si su versión no es la vigente. Con una
+# caché compartida (settings.CATALOGO_PASES['CACHE']) la versión vive ahí, así que invalidar en un
+# proceso alcanza a todos; si no, es un contador del proceso.
+CLAVE_VERSION = 'entradas:tarifas_version'
+
+_lock = threading.Lock()
+_tabla = None
+_version = 0
+
+
+def _cache_compartida():
+    alias = settings.CATALOGO_PASES.get('CACHE')
+    return caches[alias] if alias else None
+
+
+def _version_vigente():
+    compartida = _cache_compartida()
+    if compartida is None:
+        return _version
+    return compartida.get(CLAVE_VERSION, 0)
+
+
+def obtener_tabla() -> TablaTarifas:
+    """Retorna la tabla vigente, construyéndola desde Pase si falta o cambió la versión (una sola consulta)."""
+    global _tabla
+    version = _version_vigente()
+    tabla = _tabla
+    if tabla is not None and tabla.version == version:
+        return tabla
+
+    from .models import Pase
+
+    with _lock:
+        if _tabla is None or _tabla.version != version:
+            precios = dict(Pase.objects.values_list('nombre', 'precio'))
+            _tabla = TablaTarifas(precios, version=version)
+        return _tabla
+
+
+def invalidar_tabla():
+    """Descarta la tabla en caché (en todos los procesos, si hay caché compartida); la próxima consulta la reconstruye."""
+    global _tabla, _version
+    with _lock:
+        _version += 1
+        _tabla = None
+    compartida = _cache_compartida()
+    if compartida is not None:
+        # Un valor nuevo en cada invalidación, aunque la clave se haya desalojado de la caché
+        compartida.set(CLAVE_VERSION, time.time_ns(), timeout=None)
@@ -2,3 +2,18 @@ import pytest
 import django
 
 django.setup()
+
+
+@pytest.fixture(autouse=True)
+def caches_limpias():
+    """Evita que la tabla de tarifas, el calendario o el catálogo en caché de un test se filtren al siguiente."""
+    from entradas.tarifas import invalidar_tabla
+    from entradas.calendario import invalidar_calendario
+    from entradas.api.catalogo import invalidar_catalogo
+    invalidar_tabla()
+    invalidar_calendario()
+    invalidar_catalogo()
+    yield
+    invalidar_tabla()
+    invalidar_calendario()
+    invalidar_catalogo()
@@ -0,0 +1,91 @@
+"""
+Pasarela de pagos falsa para tests: un servidor HTTP local que imita la API de pagos
+y permite inyectar latencia, errores 5xx y rechazos.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    # Admite ráfagas de cientos de conexiones (pruebas del cliente async)
+    request_queue_size = 512
+
+
+class PasarelaFalsa:
+
+    def __init__(self):
+        self.latencia = 0.0
+        # Códigos de estado a devolver en los próximos requests (luego, 201)
+        self.errores = []
+        # Cantidad de próximos requests que reciben un cuerpo que no es JSON (p. ej. la página de un proxy)
+        self.respuestas_invalidas = 0
+        self.estado_pago = 'approved'
+        self.requests = []
+        self._lock = threading.Lock()
+        self._servidor = _Servidor(('127.0.0.1', 0), self._crear_handler())
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address
+        return f"http://{host}:{puerto}"
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _crear_handler(self):
+        pasarela = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, codigo, cuerpo):
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(codigo)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _atender(self):
+                largo = int(self.headers.get('Content-Length') or 0)
+                cuerpo = json.loads(self.rfile.read(largo)) if largo else None
+                with pasarela._lock:
+                    pasarela.requests.append({
+                        'metodo': self.command,
+                        'ruta': self.path,
+                        'cuerpo': cuerpo,
+                        'idempotency_key': self.headers.get('X-Idempotency-Key'),
+                    })
+                    codigo = pasarela.errores.pop(0) if pasarela.errores else 201
+                    invalida = pasarela.respuestas_invalidas > 0
+                    pasarela.respuestas_invalidas -= invalida
+                if pasarela.latencia:
+                    time.sleep(pasarela.latencia)
+                if invalida:
+                    datos = b"<html>Bad gateway</html>"
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html')
+                    self.send_header('Content-Length', str(len(datos)))
+                    self.end_headers()
+                    self.wfile.write(datos)
+                elif codigo >= 400:
+                    self._responder(codigo, {'message': 'error simulado'})
+                else:
+                    self._responder(codigo, {'id': str(len(pasarela.requests)), 'status': pasarela.estado_pago})
+
+            do_GET = _atender
+            do_POST = _atender
+
+        return Handler
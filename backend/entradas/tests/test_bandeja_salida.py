@@ -0,0 +1,105 @@
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+
+from ..bandeja_salida import MAX_INTENTOS, encolar_confirmacion, espera_para, procesar_pendientes
+from ..excepciones import EmailError
+from ..models import Compra, CorreoSaliente
+
+
+@pytest.fixture
+def compra(db):
+    usuario = User.objects.create_user(username="juan", email="juan@example.com")
+    return Compra.objects.create(
+        usuario=usuario,
+        fecha_visita=date(2030, 1, 2),
+        monto_total=Decimal("15000"),
+        forma_pago=Compra.FormasPago.TARJETA,
+    )
+
+
+@pytest.fixture
+def servicio_correo():
+    mock = MagicMock()
+    mock.enviar_confirmacion.return_value = True
+    return mock
+
+
+# --- PRUEBAS UNITARIAS: BACKOFF ---
+
+def test_espera_crece_exponencialmente_hasta_el_maximo():
+    assert espera_para(1) == timedelta(seconds=30)
+    assert espera_para(2) == timedelta(seconds=60)
+    assert espera_para(3) == timedelta(seconds=120)
+    assert espera_para(20) == timedelta(hours=1)
+
+
+# --- PRUEBAS DE INTEGRACIÓN: WORKER ---
+
+@pytest.mark.django_db
+def test_worker_envia_y_marca_como_enviado(compra, servicio_correo):
+    encolar_confirmacion(compra, "juan@example.com")
+
+    resultado = procesar_pendientes(servicio_correo)
+
+    assert resultado == {'enviados': 1, 'fallidos': 0}
+    servicio_correo.enviar_confirmacion.assert_called_once_with(
+        mail="juan@example.com",
+        compra_details={'id': compra.id, 'fecha_visita': '2030-01-02', 'monto_total': '15000',
+                        'forma_pago': 'TAR', 'estado_pago': 'PEN'},
+    )
+    correo = CorreoSaliente.objects.get()
+    assert correo.estado == CorreoSaliente.Estados.ENVIADO
+    assert correo.fecha_envio is not None
+
+
+@pytest.mark.django_db
+def test_worker_reintenta_con_backoff(compra, servicio_correo):
+    encolar_confirmacion(compra, "juan@example.com")
+    servicio_correo.enviar_confirmacion.side_effect = EmailError("SMTP caído")
+
+    procesar_pendientes(servicio_correo)
+
+    correo = CorreoSaliente.objects.get()
+    assert correo.estado == CorreoSaliente.Estados.PENDIENTE
+    assert correo.intentos == 1
+    assert correo.ultimo_error == "SMTP caído"
+    assert correo.proximo_intento > timezone.now()
+    # Todavía no venció el backoff: el siguiente lote no lo vuelve a tomar
+    assert procesar_pendientes(servicio_correo) == {'enviados': 0, 'fallidos': 0}
+
+
+@pytest.mark.django_db
+def test_worker_marca_fallido_al_agotar_intentos(compra, servicio_correo):
+    correo = encolar_confirmacion(compra, "juan@example.com")
+    CorreoSaliente.objects.filter(id=correo.id).update(intentos=MAX_INTENTOS - 1)
+    servicio_correo.enviar_confirmacion.return_value = False
+
+    procesar_pendientes(servicio_correo)
+
+    assert CorreoSaliente.objects.get().estado == CorreoSaliente.Estados.FALLIDO
+
+
+@pytest.mark.django_db
+def test_correo_reservado_por_un_worker_caido_se_retoma(compra, servicio_correo):
+    """Si el proceso muere con el correo reservado, se reenvía cuando vence la reserva."""
+    correo = encolar_confirmacion(compra, "juan@example.com")
+    CorreoSaliente.objects.filter(id=correo.id).update(proximo_intento=timezone.now() - timedelta(seconds=1))
+
+    assert procesar_pendientes(servicio_correo)['enviados'] == 1
+
+
+@pytest.mark.django_db
+def test_comando_procesar_correos_una_vez(compra, settings, mailoutbox):
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    encolar_confirmacion(compra, "juan@example.com")
+
+    call_command("procesar_correos", "--una-vez")
+
+    assert len(mailoutbox) == 1
+    assert mailoutbox[0].to == ["juan@example.com"]
@@ -0,0 +1,111 @@
+import threading
+import pytest
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import override_settings
+
+
+def conexion_a(archivo):
+    """Conexión SQLite nueva contra otro archivo, con la misma configuración que la de la app."""
+    return DatabaseWrapper({**connection.settings_dict, 'NAME': str(archivo)}, alias='prueba')
+
+
+def pragma(conexion, nombre):
+    with conexion.cursor() as cursor:
+        cursor.execute(f"PRAGMA {nombre}")
+        return cursor.fetchone()[0]
+
+
+# --- PRUEBAS UNITARIAS: AJUSTES DE SQLITE ---
+
+@pytest.mark.django_db
+def test_conexion_de_la_app_queda_ajustada():
+    assert pragma(connection, "synchronous") == 1  # NORMAL
+    assert pragma(connection, "busy_timeout") == settings.SQLITE_PRAGMAS["busy_timeout"]
+
+
+@pytest.mark.django_db
+def test_archivo_nuevo_queda_en_wal(tmp_path):
+    conexion = conexion_a(tmp_path / "entradas.sqlite3")
+    try:
+        assert pragma(conexion, "journal_mode") == "wal"
+        assert pragma(conexion, "mmap_size") == settings.SQLITE_PRAGMAS["mmap_size"]
+    finally:
+        conexion.close()
+
+
+@pytest.mark.django_db
+def test_sin_pragmas_queda_la_configuracion_de_sqlite(tmp_path):
+    with override_settings(SQLITE_PRAGMAS={}):
+        conexion = conexion_a(tmp_path / "entradas.sqlite3")
+        try:
+            assert pragma(conexion, "journal_mode") == "delete"
+            assert pragma(conexion, "synchronous") == 2  # FULL
+        finally:
+            conexion.close()
+
+
+# --- PRUEBAS DE CARGA: ESCRITURAS CONCURRENTES ---
+
+@pytest.mark.django_db
+def test_escrituras_concurrentes_sin_database_is_locked(tmp_path):
+    """
+    Ocho hilos escriben a la vez mientras otro lee sin parar: con WAL y busy_timeout ninguna
+    escritura falla por el lock y las lecturas nunca esperan a los escritores.
+    """
+    archivo = tmp_path / "carga.sqlite3"
+    inicial = conexion_a(archivo)
+    with inicial.cursor() as cursor:
+        cursor.execute("CREATE TABLE ventas (id INTEGER PRIMARY KEY, hilo INTEGER, numero INTEGER)")
+    inicial.close()
+
+    escritores, por_hilo = 8, 100
+    errores = []
+    terminado = threading.Event()
+    lecturas = []
+
+    def escribir(hilo):
+        conexion = conexion_a(archivo)
+        try:
+            for numero in range(por_hilo):
+                with conexion.cursor() as cursor:
+                    cursor.execute("INSERT INTO ventas (hilo, numero) VALUES (%s, %s)", [hilo, numero])
+        except Exception as e:
+            errores.append(e)
+        finally:
+            conexion.close()
+
+    def leer():
+        conexion = conexion_a(archivo)
+        try:
+            while not terminado.is_set():
+                with conexion.cursor() as cursor:
+                    cursor.execute("SELECT COUNT(*) FROM ventas")
+                    lecturas.append(cursor.fetchone()[0])
+        except Exception as e:
+            errores.append(e)
+        finally:
+            conexion.close()
+
+    lector = threading.Thread(target=leer)
+    lector.start()
+    hilos = [threading.Thread(target=escribir, args=(i,)) for i in range(escritores)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    terminado.set()
+    lector.join()
+
+    assert errores == []
+    final = conexion_a(archivo)
+    try:
+        assert pragma(final, "journal_mode") == "wal"
+        with final.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM ventas")
+            assert cursor.fetchone()[0] == escritores * por_hilo
+    finally:
+        final.close()
+    assert lecturas
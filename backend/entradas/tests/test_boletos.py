@@ -0,0 +1,182 @@
+import os
+import re
+import subprocess
+import sys
+import zlib
+import pytest
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from .. import boletos as modulo_boletos
+from ..bandeja_salida import encolar_confirmacion, procesar_pendientes
+from ..boletos import RenderizadorBoletos, datos_boletos
+from ..credenciales import LARGO_TOKEN, credencial_de, firmar, verificar
+from ..excepciones import CredencialInvalidaError
+from ..models import Pase, Compra, Entrada
+from ..servicios_externos import ServicioCorreoDjango
+
+
+# --- FIXTURES ---
+
+@pytest.fixture
+def compra(db):
+    usuario = User.objects.create_user(username="juan", email="juan@example.com")
+    pase = Pase.objects.create(nombre="Niño VIP", precio=Decimal("10000"))
+    compra = Compra.objects.create(
+        usuario=usuario, fecha_visita=date(2030, 1, 2), monto_total=Decimal("15000"), forma_pago=Compra.FormasPago.TARJETA,
+    )
+    Entrada.objects.bulk_create([
+        Entrada(compra=compra, pase=pase, edad_visitante=edad, precio_calculado=precio)
+        for edad, precio in ((30, Decimal("10000")), (8, Decimal("5000")))
+    ])
+    return compra
+
+
+def paginas(pdf: bytes) -> list:
+    """Contenido (descomprimido) de los streams de cada página del PDF."""
+    streams = [zlib.decompress(s) for s in re.findall(rb"stream\n(.*?)\nendstream", pdf, re.S)]
+    return [s for s in streams if s.startswith(b"q /Plantilla Do Q")]
+
+
+# --- PRUEBAS UNITARIAS: CREDENCIALES ---
+
+def test_credencial_firmada_se_verifica_sin_base():
+    token = firmar(123456, date(2030, 1, 2), 7)
+
+    credencial = verificar(token)
+
+    assert len(token) == LARGO_TOKEN and re.fullmatch(r"[A-Z2-7]+", token)
+    assert (credencial.entrada_id, credencial.fecha_visita, credencial.pase_id) == (123456, date(2030, 1, 2), 7)
+    assert firmar(123456, date(2030, 1, 2), 7) == token
+
+
+@pytest.mark.parametrize("token", [
+    "", None, "ABC", "a" * LARGO_TOKEN, "0" * LARGO_TOKEN,
+])
+def test_credencial_mal_formada(token):
+    with pytest.raises(CredencialInvalidaError):
+        verificar(token)
+
+
+def test_credencial_adulterada_no_verifica():
+    token = firmar(123456, date(2030, 1, 2), 7)
+    # Otro id de entrada con la firma original
+    otra = firmar(123457, date(2030, 1, 2), 7)
+    adulterada = otra[:12] + token[12:]
+
+    with pytest.raises(CredencialInvalidaError, match="firma"):
+        verificar(adulterada)
+
+
+def test_rotacion_de_claves():
+    with override_settings(CREDENCIALES={'CLAVES': {1: "vieja"}, 'VIGENTE': 1}):
+        vieja = firmar(1, date(2030, 1, 2), 1)
+    with override_settings(CREDENCIALES={'CLAVES': {1: "vieja", 2: "nueva"}, 'VIGENTE': 2}):
+        assert verificar(vieja).clave_id == 1
+        assert verificar(firmar(1, date(2030, 1, 2), 1)).clave_id == 2
+    with override_settings(CREDENCIALES={'CLAVES': {2: "nueva"}, 'VIGENTE': 2}):
+        with pytest.raises(CredencialInvalidaError, match="clave desconocida"):
+            verificar(vieja)
+
+
+@pytest.mark.parametrize("claves, valida", [("0:a,255:b", True), ("1:a,256:b", False), ("-1:a", False)])
+def test_ids_de_clave_entran_en_un_byte(claves, valida):
+    """Los ids de CREDENCIALES_CLAVES se validan al cargar la configuración."""
+    entorno = {**os.environ, "CREDENCIALES_CLAVES": claves}
+    entorno.pop("CREDENCIALES_VIGENTE", None)
+    resultado = subprocess.run([sys.executable, "-c", "import config.settings"], cwd=settings.BASE_DIR,
+                               env=entorno, capture_output=True, text=True)
+
+    assert (resultado.returncode == 0) is valida
+    if not valida:
+        assert "ImproperlyConfigured" in resultado.stderr and "van de 0 a 255" in resultado.stderr
+
+
+@pytest.mark.django_db
+def test_credencial_de_una_entrada(compra):
+    entrada = compra.entradas.first()
+
+    credencial = verificar(credencial_de(entrada))
+
+    assert (credencial.entrada_id, credencial.fecha_visita, credencial.pase_id) == (entrada.id, compra.fecha_visita, entrada.pase_id)
+
+
+# --- PRUEBAS DE INTEGRACIÓN: RENDERIZADO ---
+
+@pytest.mark.django_db
+def test_boletos_de_una_compra(compra, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        boletos = datos_boletos([compra.id])[compra.id]
+
+    pdf = RenderizadorBoletos().renderizar(boletos)
+
+    assert pdf.startswith(b"%PDF-1.4") and pdf.rstrip().endswith(b"%%EOF")
+    assert b"/Count 2" in pdf
+    primera, segunda = paginas(pdf)
+    assert b"(02/01/2030)" in primera
+    assert "(Niño VIP)".encode("cp1252") in primera
+    assert "(8 años · $5000.00)".encode("cp1252") in segunda
+    assert b"2 de 2" in segunda
+    assert boletos[1]["token"].encode() in segunda
+
+
+@pytest.mark.skipif(modulo_boletos.segno is None, reason="segno no está instalado")
+@pytest.mark.django_db
+def test_el_qr_lleva_la_credencial(compra):
+    import segno
+
+    boleto = datos_boletos([compra.id])[compra.id][0]
+    pagina, = paginas(RenderizadorBoletos().renderizar([boleto]))
+
+    # Se reconstruye la matriz a partir de los rectángulos dibujados y se compara con la del token
+    matriz = segno.make_qr(boleto["token"], error="m", mask=modulo_boletos.MASCARA_QR, boost_error=False).matrix
+    dibujada = [bytearray(len(matriz)) for _ in matriz]
+    for x, y, ancho in re.findall(rb"(\d+) (\d+) (\d+) 1 re", pagina):
+        for columna in range(int(x), int(x) + int(ancho)):
+            dibujada[len(matriz) - 1 - int(y)][columna] = 1
+    assert tuple(dibujada) == matriz
+
+
+def test_sin_segno_el_boleto_lleva_solo_el_codigo(monkeypatch):
+    monkeypatch.setattr(modulo_boletos, "segno", None)
+    token = firmar(1, date(2030, 1, 2), 1)
+    boleto = {"entrada_id": 1, "compra_id": 1, "fecha_visita": date(2030, 1, 2), "pase": "Regular",
+              "edad": 30, "precio": Decimal("5000.00"), "token": token}
+
+    pagina, = paginas(RenderizadorBoletos().renderizar([boleto]))
+
+    assert token.encode() in pagina
+    assert b" re" not in pagina
+
+
+# --- PRUEBAS DE INTEGRACIÓN: WORKER ---
+
+@pytest.mark.django_db
+def test_worker_adjunta_los_boletos(compra):
+    encolar_confirmacion(compra, "juan@example.com")
+    servicio_correo = MagicMock()
+    servicio_correo.enviar_confirmacion.return_value = True
+
+    assert procesar_pendientes(servicio_correo) == {'enviados': 1, 'fallidos': 0}
+
+    pdf = servicio_correo.enviar_confirmacion.call_args.kwargs["boletos"]
+    assert len(paginas(pdf)) == 2
+
+
+@pytest.mark.django_db
+def test_correo_de_confirmacion_con_pdf(compra, settings, mailoutbox):
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    encolar_confirmacion(compra, "juan@example.com")
+
+    procesar_pendientes(ServicioCorreoDjango())
+
+    correo, = mailoutbox
+    nombre, contenido, tipo = correo.attachments[0]
+    assert (nombre, tipo) == (f"entradas-compra-{compra.id}.pdf", "application/pdf")
+    assert contenido.startswith(b"%PDF")
+    assert "código QR" in correo.body
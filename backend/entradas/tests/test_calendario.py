@@ -0,0 +1,108 @@
+import pytest
+from datetime import date, time, timedelta
+
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from ..calendario import CalendarioParque, obtener_calendario
+from ..models import DiaCalendario
+
+DESDE = date(2030, 1, 1)  # Martes, feriado
+
+
+class Dia:
+    """Día especial mínimo (mismos atributos que DiaCalendario) para no tocar la base."""
+
+    def __init__(self, fecha, abierto=True, hora_apertura=None, hora_cierre=None):
+        self.fecha = fecha
+        self.abierto = abierto
+        self.hora_apertura = hora_apertura
+        self.hora_cierre = hora_cierre
+
+
+# --- PRUEBAS UNITARIAS: CALENDARIO EN MEMORIA ---
+
+def test_calendario_aplica_reglas_habituales():
+    calendario = CalendarioParque(desde=DESDE, horizonte=30)
+
+    assert calendario.es_dia_abierto(DESDE) is False  # 1 de enero
+    assert calendario.es_dia_abierto(date(2030, 1, 7)) is False  # Lunes
+    assert calendario.horario(date(2030, 1, 2)) == (time(9), time(19))
+
+
+def test_calendario_aplica_dias_especiales():
+    especiales = [
+        Dia(date(2030, 1, 2), abierto=False),  # Cierre especial
+        Dia(date(2030, 1, 7), hora_apertura=time(10), hora_cierre=time(22)),  # Lunes con apertura especial
+    ]
+    calendario = CalendarioParque(especiales, desde=DESDE, horizonte=30)
+
+    assert calendario.es_dia_abierto(date(2030, 1, 2)) is False
+    assert calendario.horario(date(2030, 1, 7)) == (time(10), time(22))
+
+
+def test_calendario_fuera_del_horizonte_usa_reglas():
+    calendario = CalendarioParque(desde=DESDE, horizonte=10)
+
+    assert calendario.es_dia_abierto(date(2030, 12, 25)) is False
+    assert calendario.es_dia_abierto(date(2030, 12, 26)) is True
+
+
+def test_proximos_dias_abiertos_saltea_cerrados():
+    calendario = CalendarioParque(desde=DESDE, horizonte=10)
+
+    proximos = calendario.proximos_dias_abiertos(DESDE, 7)
+
+    assert proximos[0] == date(2030, 1, 2)
+    assert date(2030, 1, 7) not in proximos
+    assert len(proximos) == 7  # Completa con reglas más allá del horizonte
+
+
+# --- PRUEBAS DE INTEGRACIÓN: CACHÉ, COMANDO Y ENDPOINT ---
+
+@pytest.mark.django_db
+def test_cierre_especial_invalida_el_calendario(django_assert_num_queries, django_capture_on_commit_callbacks):
+    manana = date.today() + timedelta(days=1)
+    calendario = obtener_calendario()
+    with django_assert_num_queries(0):
+        obtener_calendario().es_dia_abierto(manana)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        DiaCalendario.objects.create(fecha=manana, abierto=False, motivo="Mantenimiento")
+        # Hasta confirmar la transacción sigue el calendario en caché
+        assert obtener_calendario() is calendario
+
+    assert obtener_calendario() is not calendario
+    assert obtener_calendario().es_dia_abierto(manana) is False
+
+
+@pytest.mark.django_db
+def test_generar_calendario_no_pisa_dias_especiales():
+    manana = date.today() + timedelta(days=1)
+    DiaCalendario.objects.create(fecha=manana, abierto=False, motivo="Mantenimiento")
+
+    call_command("generar_calendario", dias=30)
+
+    assert DiaCalendario.objects.filter(fecha__gte=date.today()).count() == 30
+    assert DiaCalendario.objects.get(fecha=manana).abierto is False
+
+
+@pytest.mark.django_db
+def test_endpoint_calendario_devuelve_la_temporada_cacheable():
+    respuesta = APIClient().get("/api/calendario/", {"desde": "2030-01-01", "dias": 7})
+
+    assert respuesta.status_code == 200
+    assert len(respuesta.data) == 7
+    assert respuesta.data[0]["abierto"] is False
+    assert respuesta.data[1]["hora_apertura"] == time(9)
+    assert "max-age" in respuesta["Cache-Control"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", ["/api/calendario/", "/api/calendario/proximos/"])
+@pytest.mark.parametrize("desde", ["2024-02-30", "2024-13-01", "mañana"])
+def test_endpoint_calendario_rechaza_fechas_invalidas(url, desde):
+    respuesta = APIClient().get(url, {"desde": desde})
+
+    assert respuesta.status_code == 400
+    assert "desde" in respuesta.json()["error"]
@@ -0,0 +1,111 @@
+import pytest
+from decimal import Decimal
+
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from ..models import Pase
+
+
+# --- FIXTURES ---
+
+@pytest.fixture
+def pases(db):
+    return [
+        Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+        Pase.objects.create(nombre="VIP", precio=Decimal("10000")),
+    ]
+
+
+@pytest.fixture
+def cliente():
+    return APIClient()
+
+
+# --- PRUEBAS DE INTEGRACIÓN: CATÁLOGO EN CACHÉ ---
+
+@pytest.mark.django_db
+def test_listado_con_etag_y_cache_control(cliente, pases):
+    respuesta = cliente.get("/api/pases/")
+
+    assert respuesta.status_code == 200
+    assert [p["nombre"] for p in respuesta.data] == ["Regular", "VIP"]
+    assert respuesta["ETag"].startswith('"')
+    assert "max-age=300" in respuesta["Cache-Control"]
+    assert "public" in respuesta["Cache-Control"]
+
+
+@pytest.mark.django_db
+def test_listado_repetido_no_consulta_la_base(cliente, pases, django_assert_num_queries):
+    cliente.get("/api/pases/")
+
+    with django_assert_num_queries(0):
+        respuesta = cliente.get("/api/pases/")
+    assert len(respuesta.data) == 2
+
+
+@pytest.mark.django_db
+def test_if_none_match_vigente_responde_304_sin_cuerpo(cliente, pases):
+    etag = cliente.get("/api/pases/")["ETag"]
+
+    respuesta = cliente.get("/api/pases/", HTTP_IF_NONE_MATCH=etag)
+
+    assert respuesta.status_code == 304
+    assert respuesta.content == b""
+    assert respuesta["ETag"] == etag
+
+
+@pytest.mark.django_db
+def test_cambio_de_pase_invalida_el_catalogo_y_el_etag(cliente, pases, django_capture_on_commit_callbacks):
+    etag = cliente.get("/api/pases/")["ETag"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        pases[0].precio = Decimal("6000")
+        pases[0].save()
+    respuesta = cliente.get("/api/pases/", HTTP_IF_NONE_MATCH=etag)
+
+    assert respuesta.status_code == 200
+    assert respuesta["ETag"] != etag
+    assert respuesta.data[0]["precio"] == "6000.00"
+
+
+@pytest.mark.django_db
+def test_alta_por_api_se_ve_en_el_listado(cliente, pases, django_capture_on_commit_callbacks):
+    cliente.get("/api/pases/")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        cliente.post("/api/pases/", {"nombre": "Familiar", "precio": "8000"}, format="json")
+
+    assert len(cliente.get("/api/pases/").data) == 3
+
+
+@pytest.mark.django_db
+def test_detalle_desde_el_catalogo_con_su_propio_etag(cliente, pases):
+    lista = cliente.get("/api/pases/")
+    respuesta = cliente.get(f"/api/pases/{pases[1].id}/")
+
+    assert respuesta.status_code == 200
+    assert respuesta.data["nombre"] == "VIP"
+    assert respuesta["ETag"] != lista["ETag"]
+    assert cliente.get(f"/api/pases/{pases[1].id}/", HTTP_IF_NONE_MATCH=respuesta["ETag"]).status_code == 304
+
+
+@pytest.mark.django_db
+def test_detalle_inexistente_404(cliente, pases):
+    assert cliente.get("/api/pases/999/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_catalogo_en_cache_compartida(cliente, pases, django_assert_num_queries, django_capture_on_commit_callbacks):
+    caches = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "catalogo": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "catalogo-test"},
+    }
+    with override_settings(CACHES=caches, CATALOGO_PASES={"CACHE": "catalogo"}):
+        etag = cliente.get("/api/pases/")["ETag"]
+        with django_assert_num_queries(0):
+            assert cliente.get("/api/pases/")["ETag"] == etag
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Pase.objects.create(nombre="Familiar", precio=Decimal("8000"))
+        assert len(cliente.get("/api/pases/").data) == 3
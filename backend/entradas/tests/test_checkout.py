@@ -0,0 +1,155 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+from ..excepciones import ConnectionError
+from ..models import Pase, Compra, Entrada, CorreoSaliente, CupoDiario
+from ..servicios_externos import PasarelaPagosSimulada
+
+
+# --- FIXTURES ---
+
+@pytest.fixture
+def pases(db):
+    return {
+        "Regular": Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+        "VIP": Pase.objects.create(nombre="VIP", precio=Decimal("10000")),
+    }
+
+
+@pytest.fixture
+def cliente(db):
+    usuario = User.objects.create_user(username="juan", email="juan@example.com", password="x")
+    client = APIClient()
+    client.force_authenticate(user=usuario)
+    return client
+
+
+@pytest.fixture
+def fecha_visita():
+    """Próximo miércoles (día abierto) a las 12:00, siempre en el futuro."""
+    fecha = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    return fecha.isoformat()
+
+
+@pytest.fixture
+def carrito(fecha_visita):
+    return {
+        "fecha_visita": fecha_visita,
+        "tipo_pago": "Tarjeta",
+        "visitantes": [
+            {"edad": 30, "tipo_pase": "Regular"},  # 5000
+            {"edad": 8, "tipo_pase": "VIP"},  # 5000
+            {"edad": 2, "tipo_pase": "Regular"},  # 0
+        ],
+    }
+
+
+# --- PRUEBAS DE INTEGRACIÓN: CHECKOUT ---
+
+@pytest.mark.django_db
+def test_checkout_registra_compra_y_entradas(cliente, pases, carrito):
+    """Un solo POST crea la Compra con todas sus Entradas."""
+    respuesta = cliente.post("/api/compras/checkout/", carrito, format="json")
+
+    assert respuesta.status_code == 201
+    compra = Compra.objects.get(id=respuesta.data["id"])
+    assert compra.monto_total == Decimal("10000")
+    assert compra.estado_pago == Compra.EstadosPago.PAGADO
+    assert compra.forma_pago == Compra.FormasPago.TARJETA
+    assert compra.entradas.count() == 3
+    assert len(respuesta.data["entradas"]) == 3
+
+
+@pytest.mark.django_db
+def test_checkout_efectivo_queda_pendiente(cliente, pases, carrito):
+    """Con pago en efectivo la compra queda pendiente de pago en boletería."""
+    carrito["tipo_pago"] = "Efectivo"
+    respuesta = cliente.post("/api/compras/checkout/", carrito, format="json")
+
+    assert respuesta.status_code == 201
+    assert respuesta.data["estado_pago"] == Compra.EstadosPago.PENDIENTE
+
+
+@pytest.mark.django_db
+def test_checkout_datos_invalidos_no_registra_nada(cliente, pases, carrito):
+    """Un visitante inválido rechaza el carrito completo sin escribir en la base."""
+    carrito["visitantes"].append({"edad": -1, "tipo_pase": "VIP"})
+    respuesta = cliente.post("/api/compras/checkout/", carrito, format="json")
+
+    assert respuesta.status_code == 400
+    assert Compra.objects.count() == 0
+    assert Entrada.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_checkout_pago_rechazado_no_registra_nada(cliente, pases, carrito):
+    """Si la pasarela rechaza el pago no queda ninguna compra a medio escribir."""
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", return_value=False):
+        respuesta = cliente.post("/api/compras/checkout/", carrito, format="json")
+
+    assert respuesta.status_code == 402
+    assert Compra.objects.count() == 0
+    assert Entrada.objects.count() == 0
+    assert CorreoSaliente.objects.count() == 0
+    assert CupoDiario.objects.get(pase=None).vendidas == 0
+
+
+@pytest.mark.django_db
+def test_checkout_falla_al_guardar_entradas_revierte_la_compra(cliente, pases, carrito):
+    """Un error al insertar las entradas revierte también la Compra, y no se llegó a cobrar."""
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", return_value=True) as cobro, \
+            patch.object(Entrada.objects, "bulk_create", side_effect=RuntimeError("Fallo simulado")):
+        with pytest.raises(RuntimeError):
+            cliente.post("/api/compras/checkout/", carrito, format="json")
+
+    assert cobro.call_count == 0
+    assert Compra.objects.count() == 0
+    # La reserva del cupo se revirtió con el registro, en la misma transacción
+    assert not CupoDiario.objects.filter(vendidas__gt=0).exists()
+
+
+@pytest.mark.django_db
+def test_checkout_falla_despues_de_cobrar_no_deja_el_cargo_sin_compra(cliente, pases, carrito):
+    """Si algo falla después del cobro, la compra ya está registrada con la referencia del cargo."""
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", return_value=True) as cobro, \
+            patch("entradas.servicio_compra.encolar_confirmacion", side_effect=RuntimeError("Fallo simulado")):
+        with pytest.raises(RuntimeError):
+            cliente.post("/api/compras/checkout/", carrito, format="json")
+
+    compra = Compra.objects.get()
+    assert cobro.call_count == 1
+    assert compra.referencia_pago == cobro.call_args.kwargs["referencia"]
+    assert compra.entradas.count() == 3
+
+
+@pytest.mark.django_db
+def test_checkout_sin_respuesta_de_la_pasarela_deja_la_compra_pendiente(cliente, pases, carrito):
+    """Sin respuesta no se sabe si hubo cargo: la compra queda pendiente, con su cupo, para reintentar el cobro."""
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", side_effect=ConnectionError("caída")):
+        respuesta = cliente.post("/api/compras/checkout/", carrito, format="json")
+
+    compra = Compra.objects.get()
+    assert respuesta.status_code == 503
+    assert (compra.forma_pago, compra.estado_pago) == (Compra.FormasPago.TARJETA, Compra.EstadosPago.PENDIENTE)
+    assert compra.referencia_pago
+    assert CupoDiario.objects.get(pase=None).vendidas == 3
+    assert CorreoSaliente.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_checkout_encola_la_confirmacion_sin_enviarla(cliente, pases, carrito, mailoutbox):
+    """El correo queda en la bandeja de salida; el request no espera al servicio de correo."""
+    respuesta = cliente.post("/api/compras/checkout/", carrito, format="json")
+
+    assert respuesta.status_code == 201
+    assert len(mailoutbox) == 0
+    correo = CorreoSaliente.objects.get()
+    assert correo.compra_id == respuesta.data["id"]
+    assert correo.destinatario == "juan@example.com"
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import pytest
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import AsyncClient
+
+from ..models import Pase, Compra, Entrada, CupoDiario
+from ..servicio_compra_async import ServicioCompraEntradasAsync
+from ..servicios_externos import PasarelaPagosSimulada
+from ..api.idempotencia import cache_respuestas
+from ..excepciones import ConnectionError, ParqueCerradoError, PagoRechazadoError
+
+
+# --- FIXTURES ---
+
+@pytest.fixture
+def pases(db):
+    return {
+        "Regular": Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+        "VIP": Pase.objects.create(nombre="VIP", precio=Decimal("10000")),
+    }
+
+
+@pytest.fixture
+def usuario(db):
+    return User.objects.create_user(username="juan", email="juan@example.com", password="x")
+
+
+@pytest.fixture
+def cliente(usuario):
+    client = AsyncClient()
+    client.force_login(usuario)
+    return client
+
+
+@pytest.fixture
+def fecha_visita():
+    """Próximo miércoles (día abierto) a las 12:00, siempre en el futuro."""
+    fecha = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+@pytest.fixture
+def carrito(fecha_visita):
+    return {
+        "fecha_visita": fecha_visita.isoformat(),
+        "tipo_pago": "Tarjeta",
+        "visitantes": [
+            {"edad": 30, "tipo_pase": "Regular"},  # 5000
+            {"edad": 8, "tipo_pase": "VIP"},  # 5000
+            {"edad": 2, "tipo_pase": "Regular"},  # 0
+        ],
+    }
+
+
+class PasarelaLenta:
+    """Pasarela async que tarda `latencia` segundos y cuenta cuántos cobros hubo en vuelo a la vez."""
+
+    def __init__(self, latencia=0.2, aprobar=True):
+        self.latencia = latencia
+        self.aprobar = aprobar
+        self.en_vuelo = 0
+        self.maximo_en_vuelo = 0
+
+    async def procesar_pago_async(self, monto, referencia=None):
+        self.en_vuelo += 1
+        self.maximo_en_vuelo = max(self.maximo_en_vuelo, self.en_vuelo)
+        await asyncio.sleep(self.latencia)
+        self.en_vuelo -= 1
+        return self.aprobar
+
+
+class CalendarioExterno:
+    def __init__(self, abierto=True, latencia=0.0):
+        self.abierto = abierto
+        self.latencia = latencia
+
+    async def es_dia_abierto_async(self, fecha):
+        await asyncio.sleep(self.latencia)
+        return self.abierto
+
+
+def post_checkout(cliente, carrito, clave=None):
+    return async_to_sync(cliente.post)(
+        "/api/compras/checkout-async/", json.dumps(carrito), content_type="application/json",
+        headers={"Idempotency-Key": clave} if clave else None,
+    )
+
+
+def vendidas(fecha):
+    # Sin fila de cupo para la fecha no se reservó nada (se revirtió con la compra)
+    return sum(CupoDiario.objects.filter(fecha_visita=fecha, pase=None).values_list('vendidas', flat=True))
+
+
+# --- PRUEBAS DE INTEGRACIÓN: VISTA ASYNC ---
+
+@pytest.mark.django_db
+def test_checkout_async_registra_compra_y_entradas(cliente, pases, carrito):
+    respuesta = post_checkout(cliente, carrito)
+
+    assert respuesta.status_code == 201
+    datos = respuesta.json()
+    compra = Compra.objects.get(id=datos["id"])
+    assert compra.monto_total == Decimal("10000")
+    assert compra.estado_pago == Compra.EstadosPago.PAGADO
+    assert compra.entradas.count() == 3
+    assert len(datos["entradas"]) == 3
+
+
+@pytest.mark.django_db
+def test_checkout_async_pago_rechazado_libera_el_cupo(cliente, pases, carrito, fecha_visita):
+    with patch.object(PasarelaPagosSimulada, "procesar_pago_async", return_value=False):
+        respuesta = post_checkout(cliente, carrito)
+
+    assert respuesta.status_code == 402
+    assert Compra.objects.count() == 0
+    assert vendidas(fecha_visita.date()) == 0
+
+
+@pytest.mark.django_db
+def test_checkout_async_reintento_con_la_misma_clave_no_duplica_la_compra(cliente, pases, carrito):
+    cache_respuestas.limpiar()
+    with patch.object(PasarelaPagosSimulada, "procesar_pago_async", return_value=True) as cobro:
+        primera = post_checkout(cliente, carrito, "clave-1")
+        segunda = post_checkout(cliente, carrito, "clave-1")
+        cache_respuestas.limpiar()
+        tercera = post_checkout(cliente, carrito, "clave-1")
+
+    assert primera.status_code == segunda.status_code == tercera.status_code == 201
+    assert segunda.json()["id"] == tercera.json()["id"] == primera.json()["id"]
+    assert segunda["Idempotent-Replayed"] == tercera["Idempotent-Replayed"] == "true"
+    assert cobro.call_count == 1
+    assert Compra.objects.count() == 1
+    carrito["visitantes"].pop()
+    assert post_checkout(cliente, carrito, "clave-1").status_code == 422
+
+
+@pytest.mark.django_db
+def test_checkout_async_error_de_la_pasarela_se_reintenta_con_la_misma_referencia(cliente, pases, carrito):
+    cache_respuestas.limpiar()
+    with patch.object(PasarelaPagosSimulada, "procesar_pago_async", side_effect=ConnectionError("caída")) as cobro:
+        primera = post_checkout(cliente, carrito, "clave-1")
+    with patch.object(PasarelaPagosSimulada, "procesar_pago_async", return_value=True) as reintento:
+        segunda = post_checkout(cliente, carrito, "clave-1")
+
+    assert (primera.status_code, segunda.status_code) == (503, 201)
+    assert reintento.call_args.kwargs["referencia"] == cobro.call_args.kwargs["referencia"]
+    compra = Compra.objects.get()
+    assert compra.estado_pago == Compra.EstadosPago.PAGADO
+
+
+@pytest.mark.django_db
+def test_checkout_async_clave_requiere_un_usuario_autenticado(pases, carrito):
+    # Usuario por defecto de los requests sin sesión (ID 2 para desarrollo)
+    User.objects.create_user(id=2, username="invitado", email="invitado@example.com")
+    respuesta = post_checkout(AsyncClient(), carrito, "clave-1")
+
+    assert respuesta.status_code == 403
+    assert not Compra.objects.exists()
+
+
+@pytest.mark.django_db
+def test_checkout_async_datos_invalidos(cliente, pases, carrito):
+    carrito["visitantes"].append({"edad": -1, "tipo_pase": "VIP"})
+
+    respuesta = post_checkout(cliente, carrito)
+
+    assert respuesta.status_code == 400
+    assert Entrada.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_checkout_async_solo_acepta_post(cliente):
+    respuesta = async_to_sync(cliente.get)("/api/compras/checkout-async/")
+
+    assert respuesta.status_code == 405
+
+
+# --- PRUEBAS DE INTEGRACIÓN: SERVICIO ASYNC ---
+
+@pytest.mark.django_db
+def test_calendario_externo_cerrado_no_reserva_cupo(usuario, pases, carrito, fecha_visita):
+    servicio = ServicioCompraEntradasAsync(PasarelaLenta(latencia=0), None, servicio_calendario=CalendarioExterno(abierto=False))
+
+    with pytest.raises(ParqueCerradoError):
+        async_to_sync(servicio.comprar_entradas)(usuario, 3, carrito["fecha_visita"], "Tarjeta", carrito["visitantes"])
+
+    assert Compra.objects.count() == 0
+    assert vendidas(fecha_visita.date()) == 0
+
+
+@pytest.mark.django_db
+def test_pago_rechazado_por_pasarela_async(usuario, pases, carrito, fecha_visita):
+    servicio = ServicioCompraEntradasAsync(PasarelaLenta(latencia=0, aprobar=False), None)
+
+    with pytest.raises(PagoRechazadoError):
+        async_to_sync(servicio.comprar_entradas)(usuario, 3, carrito["fecha_visita"], "Tarjeta", carrito["visitantes"])
+
+    assert vendidas(fecha_visita.date()) == 0
+
+
+@pytest.mark.django_db
+def test_muchos_checkouts_esperan_a_la_pasarela_a_la_vez(usuario, pases, carrito):
+    """50 compras con una pasarela de 0,2 s y un calendario externo de 0,1 s tardan cerca de una sola."""
+    pasarela = PasarelaLenta(latencia=0.2)
+    servicio = ServicioCompraEntradasAsync(pasarela, None, servicio_calendario=CalendarioExterno(latencia=0.1))
+
+    async def comprar_todas():
+        return await asyncio.gather(*(
+            servicio.comprar_entradas(usuario, 3, carrito["fecha_visita"], "Tarjeta", carrito["visitantes"])
+            for _ in range(50)
+        ))
+
+    inicio = time.monotonic()
+    compras = async_to_sync(comprar_todas)()
+
+    assert len({compra.id for compra in compras}) == 50
+    assert pasarela.maximo_en_vuelo > 10
+    assert time.monotonic() - inicio < 3.0  # En serie serían 15 s
@@ -17,6 +17,8 @@ from ..excepciones import (
 from ..models import Compra
 
 from ..servicio_compra import ServicioCompraEntradas
+from ..tarifas import TablaTarifas
+from ..calendario import CalendarioParque
 
 
 # --- FIXTURES ---
@@ -66,9 +68,21 @@ def mocks_infraestructura():
 
 
 @pytest.fixture
-def servicio_compra(mocks_infraestructura):
+def tarifas():
+    """Fixture que retorna la tabla de tarifas del catálogo vigente, sin acceder a la base."""
+    return TablaTarifas({"Regular": 5000, "VIP": 10000})
+
+
+@pytest.fixture
+def calendario():
+    """Fixture que retorna el calendario con las reglas habituales del parque, sin acceder a la base."""
+    return CalendarioParque()
+
+
+@pytest.fixture
+def servicio_compra(mocks_infraestructura, tarifas, calendario):
     """Fixture que inicializa y retorna una nueva instancia de ServicioCompraEntradas."""
-    return ServicioCompraEntradas(**mocks_infraestructura)
+    return ServicioCompraEntradas(**mocks_infraestructura, tarifas=tarifas, calendario=calendario)
 
 
 # --- PRUEBAS UNITARIAS: VALIDACIÓN DE FORMATO DE FECHA Y HORA ---
@@ -0,0 +1,63 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from ..models import Pase, Compra, Entrada
+
+
+def _crear_compras(cantidad, pases):
+    inicio = User.objects.count()
+    for i in range(inicio, inicio + cantidad):
+        usuario = User.objects.create_user(username=f"usuario{i}", email=f"u{i}@example.com")
+        compra = Compra.objects.create(
+            usuario=usuario,
+            fecha_visita=date(2030, 1, 2),
+            monto_total=Decimal("15000"),
+            forma_pago=Compra.FormasPago.TARJETA,
+        )
+        Entrada.objects.bulk_create([
+            Entrada(compra=compra, pase=pase, edad_visitante=30, precio_calculado=pase.precio)
+            for pase in pases
+        ])
+
+
+def _consultas(url):
+    with CaptureQueriesContext(connection) as contexto:
+        respuesta = APIClient().get(url)
+    assert respuesta.status_code == 200
+    return len(contexto.captured_queries)
+
+
+# --- PRUEBAS DE REGRESIÓN: CANTIDAD DE CONSULTAS ---
+
+@pytest.mark.django_db
+def test_listado_de_compras_usa_consultas_constantes():
+    """La cantidad de consultas del listado no depende de la cantidad de compras."""
+    pases = [
+        Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+        Pase.objects.create(nombre="VIP", precio=Decimal("10000")),
+    ]
+    _crear_compras(5, pases)
+    consultas_con_pocas = _consultas("/api/compras/")
+
+    _crear_compras(45, pases)
+    consultas_con_muchas = _consultas("/api/compras/")
+
+    assert consultas_con_pocas == consultas_con_muchas
+    assert consultas_con_muchas <= 3
+
+
+@pytest.mark.django_db
+def test_listado_de_entradas_usa_consultas_constantes():
+    pases = [Pase.objects.create(nombre="Regular", precio=Decimal("5000"))]
+    _crear_compras(3, pases)
+    consultas_con_pocas = _consultas("/api/entradas/")
+
+    _crear_compras(30, pases)
+
+    assert _consultas("/api/entradas/") == consultas_con_pocas
@@ -0,0 +1,134 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+from ..excepciones import CupoAgotadoError
+from ..models import Pase, Compra, CupoDiario
+from ..servicio_compra import ServicioCompraEntradas
+
+FECHA = date(2030, 1, 2)
+
+
+def _proximo_miercoles():
+    fecha = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+@pytest.fixture
+def servicio():
+    mocks = {
+        'pasarela_pagos': MagicMock(),
+        'servicio_correo': MagicMock(),
+        'servicio_calendario': MagicMock(),
+    }
+    mocks['servicio_calendario'].es_dia_abierto.return_value = True
+    mocks['pasarela_pagos'].procesar_pago.return_value = True
+    return ServicioCompraEntradas(**mocks)
+
+
+@pytest.fixture
+def pases(db):
+    return {
+        "Regular": Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+        "VIP": Pase.objects.create(nombre="VIP", precio=Decimal("10000")),
+    }
+
+
+@pytest.fixture
+def usuario(db):
+    return User.objects.create_user(username="juan", email="juan@example.com", password="x")
+
+
+# --- PRUEBAS UNITARIAS: RESERVA DE CUPO ---
+
+@pytest.mark.django_db
+def test_reservar_descuenta_hasta_la_capacidad():
+    CupoDiario.objects.create(fecha_visita=FECHA, capacidad=5)
+
+    assert CupoDiario.reservar(FECHA, 3) is True
+    assert CupoDiario.reservar(FECHA, 3) is False
+    assert CupoDiario.reservar(FECHA, 2) is True
+    assert CupoDiario.objects.get(fecha_visita=FECHA).vendidas == 5
+
+
+@pytest.mark.django_db
+def test_liberar_devuelve_entradas_al_cupo():
+    CupoDiario.objects.create(fecha_visita=FECHA, capacidad=5, vendidas=5)
+
+    CupoDiario.liberar(FECHA, 2)
+
+    assert CupoDiario.objects.get(fecha_visita=FECHA).vendidas == 3
+
+
+# --- PRUEBAS DE INTEGRACIÓN: COMPRA CON CUPO ---
+
+@pytest.mark.django_db
+def test_compra_sin_cupo_falla_sin_cobrar(servicio, pases, usuario):
+    fecha = _proximo_miercoles()
+    CupoDiario.objects.create(fecha_visita=fecha.date(), capacidad=1)
+
+    with pytest.raises(CupoAgotadoError):
+        servicio.comprar_entradas(usuario, 2, fecha.isoformat(), "Tarjeta",
+                                  [{"edad": 30, "tipo_pase": "Regular"}] * 2)
+
+    servicio.pasarela_pagos.procesar_pago.assert_not_called()
+    assert Compra.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_compra_respeta_cupo_por_pase(servicio, pases, usuario):
+    fecha = _proximo_miercoles()
+    CupoDiario.objects.create(fecha_visita=fecha.date(), pase=pases["VIP"], capacidad=1)
+
+    with pytest.raises(CupoAgotadoError, match="VIP"):
+        servicio.comprar_entradas(usuario, 2, fecha.isoformat(), "Tarjeta",
+                                  [{"edad": 30, "tipo_pase": "VIP"}] * 2)
+
+    # La reserva del cupo total del parque se revirtió al fallar la del pase
+    assert not CupoDiario.objects.filter(fecha_visita=fecha.date(), vendidas__gt=0).exists()
+
+
+@pytest.mark.django_db
+def test_pago_rechazado_devuelve_el_cupo(servicio, pases, usuario):
+    fecha = _proximo_miercoles()
+    servicio.pasarela_pagos.procesar_pago.return_value = False
+
+    with pytest.raises(Exception):
+        servicio.comprar_entradas(usuario, 1, fecha.isoformat(), "Tarjeta",
+                                  [{"edad": 30, "tipo_pase": "Regular"}])
+
+    assert CupoDiario.objects.get(fecha_visita=fecha.date(), pase=None).vendidas == 0
+
+
+# --- PRUEBAS DE CONCURRENCIA ---
+
+@pytest.mark.django_db(transaction=True)
+def test_compras_concurrentes_no_superan_la_capacidad(servicio, pases):
+    """Cientos de compras en paralelo sobre la misma fecha venden exactamente la capacidad."""
+    capacidad, intentos = 50, 300
+    fecha = _proximo_miercoles()
+    CupoDiario.objects.create(fecha_visita=fecha.date(), capacidad=capacidad)
+    usuarios = [User.objects.create_user(username=f"visitante{n}", email=f"visitante{n}@example.com") for n in range(intentos)]
+
+    def comprar(n):
+        try:
+            return servicio.comprar_entradas(usuarios[n], 1, fecha.isoformat(), "Tarjeta", [{"edad": 30, "tipo_pase": "Regular"}])
+        except CupoAgotadoError:
+            return None
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        compras = [compra for compra in pool.map(comprar, range(intentos)) if compra is not None]
+
+    assert len(compras) == capacidad
+    assert Compra.objects.count() == capacidad
+    assert Compra.objects.filter(estado_pago=Compra.EstadosPago.PAGADO).count() == capacidad
+    assert CupoDiario.objects.get(fecha_visita=fecha.date(), pase=None).vendidas == capacidad
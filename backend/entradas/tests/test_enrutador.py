@@ -0,0 +1,143 @@
+import sqlite3
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.test import APIClient
+
+from ..enrutador import COOKIE_PRIMARIO, REPLICA, EnrutadorLecturas, leer_de_replica, request_enrutado
+from ..models import Pase, Compra
+
+
+# --- FIXTURES ---
+
+@pytest.fixture
+def replica(transactional_db, tmp_path):
+    """
+    Registra una réplica SQLite en otro archivo. replicar() copia el primario a la réplica, como
+    haría la replicación; lo que se escribe después solo queda en el primario hasta la próxima copia.
+    """
+    archivo = tmp_path / "replica.sqlite3"
+    connections.settings[REPLICA] = {**connections[DEFAULT_DB_ALIAS].settings_dict, 'NAME': str(archivo)}
+
+    def replicar():
+        destino = sqlite3.connect(archivo)
+        connections[DEFAULT_DB_ALIAS].connection.backup(destino)
+        destino.close()
+
+    connections[DEFAULT_DB_ALIAS].ensure_connection()
+    replicar()
+    # Los tests solo permiten conexiones nuevas a los alias que declaran; esta se abre a mano
+    connections[REPLICA].connect()
+    yield replicar
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.settings[REPLICA]
+
+
+@pytest.fixture
+def usuario(transactional_db):
+    return User.objects.create_user(username="juan", email="juan@example.com")
+
+
+@pytest.fixture
+def fecha_visita():
+    fecha = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+def crear_compra(usuario, fecha_visita):
+    return Compra.objects.create(
+        usuario=usuario, fecha_visita=fecha_visita.date(), monto_total=Decimal("5000"),
+        forma_pago=Compra.FormasPago.TARJETA, estado_pago=Compra.EstadosPago.PAGADO,
+    )
+
+
+def ids_listados(respuesta):
+    return {compra["id"] for compra in respuesta.json()["results"]}
+
+
+# --- PRUEBAS UNITARIAS: ROUTER ---
+
+def test_sin_replica_todo_va_al_primario():
+    router = EnrutadorLecturas()
+    with leer_de_replica():
+        assert router.db_for_read(Compra) is None
+    assert router.db_for_write(Compra) == DEFAULT_DB_ALIAS
+
+
+def test_lecturas_marcadas_van_a_la_replica(replica):
+    router = EnrutadorLecturas()
+
+    assert router.db_for_read(Compra) is None
+    with leer_de_replica():
+        assert router.db_for_read(Compra) == REPLICA
+        assert Compra.objects.all().db == REPLICA
+
+
+def test_despues_de_escribir_el_request_lee_del_primario(replica):
+    router = EnrutadorLecturas()
+    with request_enrutado(primario=False) as estado, leer_de_replica():
+        assert router.db_for_read(Compra) == REPLICA
+        assert router.db_for_write(Compra) == DEFAULT_DB_ALIAS
+        assert router.db_for_read(Compra) is None
+    assert estado.escribio
+
+
+def test_no_se_migra_la_replica():
+    router = EnrutadorLecturas()
+
+    assert router.allow_migrate(REPLICA, "entradas") is False
+    assert router.allow_migrate(DEFAULT_DB_ALIAS, "entradas") is True
+
+
+# --- PRUEBAS DE INTEGRACIÓN: API ---
+
+def test_listado_de_compras_lee_de_la_replica(replica, usuario, fecha_visita):
+    replicada = crear_compra(usuario, fecha_visita)
+    replica()
+    crear_compra(usuario, fecha_visita)  # Todavía no llegó a la réplica
+
+    respuesta = APIClient().get("/api/compras/")
+
+    assert ids_listados(respuesta) == {replicada.id}
+    assert COOKIE_PRIMARIO not in respuesta.cookies
+
+
+def test_detalle_de_compra_lee_de_la_replica(replica, usuario, fecha_visita):
+    compra = crear_compra(usuario, fecha_visita)
+
+    assert APIClient().get(f"/api/compras/{compra.id}/").status_code == 404
+    replica()
+    assert APIClient().get(f"/api/compras/{compra.id}/").status_code == 200
+
+
+def test_despues_de_comprar_el_cliente_lee_sus_escrituras(replica, usuario, fecha_visita):
+    Pase.objects.create(nombre="Regular", precio=Decimal("5000"))
+    replica()
+    cliente = APIClient()
+    cliente.force_authenticate(user=usuario)
+
+    respuesta = cliente.post("/api/compras/checkout/", {
+        "fecha_visita": fecha_visita.isoformat(),
+        "tipo_pago": "Tarjeta",
+        "visitantes": [{"edad": 30, "tipo_pase": "Regular"}],
+    }, format="json")
+    assert respuesta.status_code == 201
+    assert COOKIE_PRIMARIO in respuesta.cookies
+
+    # El cliente guarda la cookie: su listado sale del primario aunque la réplica no tenga la compra
+    assert respuesta.data["id"] in ids_listados(cliente.get("/api/compras/"))
+    # Otro cliente, sin la cookie, sigue leyendo de la réplica
+    assert respuesta.data["id"] not in ids_listados(APIClient().get("/api/compras/"))
+
+
+def test_catalogo_de_pases_usa_el_primario(replica):
+    Pase.objects.create(nombre="Regular", precio=Decimal("5000"))
+
+    # El catálogo de pases no pasa por la réplica: el pase nuevo se ve sin replicar
+    assert [pase["nombre"] for pase in APIClient().get("/api/pases/").json()] == ["Regular"]
@@ -0,0 +1,171 @@
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..exportacion import COLUMNAS, consulta, generar
+from ..models import Pase, Compra, Entrada
+
+
+# --- FIXTURES ---
+
+@pytest.fixture
+def pase(db):
+    return Pase.objects.create(nombre="Regular", precio=Decimal("5000"))
+
+
+@pytest.fixture
+def usuario(db):
+    return User.objects.create_user(username="juan", email="juan@example.com")
+
+
+@pytest.fixture
+def compras(usuario, pase):
+    """Tres compras en días de compra consecutivos, con dos entradas cada una."""
+    hoy = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    creadas = []
+    for dias in (2, 1, 0):
+        compra = Compra.objects.create(
+            usuario=usuario, fecha_visita=(hoy + timedelta(days=7)).date(), monto_total=Decimal("10000.50"),
+            forma_pago=Compra.FormasPago.TARJETA, estado_pago=Compra.EstadosPago.PAGADO,
+        )
+        Compra.objects.filter(id=compra.id).update(fecha_compra=hoy - timedelta(days=dias))
+        compra.refresh_from_db()
+        Entrada.objects.bulk_create([
+            Entrada(compra=compra, pase=pase, edad_visitante=edad, precio_calculado=Decimal("5000.25"))
+            for edad in (30, 8)
+        ])
+        creadas.append(compra)
+    return creadas
+
+
+@pytest.fixture
+def cliente(db):
+    """Cliente autenticado como staff."""
+    cliente = APIClient()
+    cliente.force_authenticate(user=User.objects.create_user(username="admin", email="admin@example.com", is_staff=True))
+    return cliente
+
+
+def leer_csv(contenido: bytes):
+    return list(csv.DictReader(io.StringIO(contenido.decode())))
+
+
+def leer_ndjson(contenido: bytes):
+    return [json.loads(linea) for linea in contenido.decode().splitlines()]
+
+
+def contenido(respuesta) -> bytes:
+    return b"".join(respuesta.streaming_content)
+
+
+# --- PRUEBAS UNITARIAS: GENERACIÓN ---
+
+@pytest.mark.django_db
+def test_csv_de_compras(compras):
+    filas = leer_csv(b"".join(generar(consulta("compras"), "compras", "csv")))
+
+    assert list(filas[0]) == list(COLUMNAS["compras"])
+    assert [int(fila["id"]) for fila in filas] == [compra.id for compra in compras]
+    assert filas[0]["usuario"] == "juan"
+    assert filas[0]["monto_total"] == "10000.50"
+    assert filas[0]["fecha_compra"] == compras[0].fecha_compra.isoformat()
+
+
+@pytest.mark.django_db
+def test_ndjson_de_entradas(compras):
+    registros = leer_ndjson(b"".join(generar(consulta("entradas"), "entradas", "ndjson")))
+
+    assert len(registros) == 6
+    assert registros[0] == {
+        "id": registros[0]["id"], "compra": compras[0].id, "fecha_compra": compras[0].fecha_compra.isoformat(),
+        "fecha_visita": compras[0].fecha_visita.isoformat(), "forma_pago": "TAR", "estado_pago": "PAG",
+        "pase": "Regular", "edad_visitante": 30, "precio_calculado": "5000.25",
+    }
+
+
+@pytest.mark.django_db
+def test_filtro_por_fecha_de_compra(compras):
+    ayer = compras[1].fecha_compra.date()
+
+    assert [fila[0] for fila in consulta("compras", desde=ayer)] == [compras[1].id, compras[2].id]
+    assert [fila[0] for fila in consulta("compras", hasta=ayer)] == [compras[0].id, compras[1].id]
+    assert {fila[1] for fila in consulta("entradas", desde=ayer, hasta=ayer)} == {compras[1].id}
+
+
+@pytest.mark.django_db
+def test_se_genera_por_bloques(compras):
+    bloques = list(generar(consulta("entradas"), "entradas", "ndjson", tamanio_bloque=4))
+
+    assert [len(bloque.splitlines()) for bloque in bloques] == [4, 2]
+
+
+# --- PRUEBAS DE INTEGRACIÓN: API ---
+
+@pytest.mark.django_db
+def test_api_exporta_en_streaming(compras, cliente):
+    respuesta = cliente.get("/api/exportar/entradas/", {"formato": "csv"})
+
+    assert respuesta.status_code == 200
+    assert isinstance(respuesta, StreamingHttpResponse)
+    assert respuesta["Content-Type"] == "text/csv; charset=utf-8"
+    assert respuesta["Content-Disposition"] == 'attachment; filename="entradas.csv"'
+    assert len(leer_csv(contenido(respuesta))) == 6
+
+
+@pytest.mark.django_db
+def test_api_exporta_ndjson_filtrado(compras, cliente):
+    hoy = compras[2].fecha_compra.date().isoformat()
+
+    respuesta = cliente.get("/api/exportar/compras/", {"formato": "ndjson", "desde": hoy, "hasta": hoy})
+
+    assert respuesta["Content-Type"] == "application/x-ndjson"
+    assert respuesta["Content-Disposition"] == f'attachment; filename="compras-{hoy}-{hoy}.ndjson"'
+    assert [registro["id"] for registro in leer_ndjson(contenido(respuesta))] == [compras[2].id]
+
+
+@pytest.mark.django_db
+def test_api_exportacion_parametros_invalidos(compras, cliente):
+    assert cliente.get("/api/exportar/compras/", {"formato": "xml"}).status_code == 400
+    assert cliente.get("/api/exportar/compras/", {"desde": "ayer"}).status_code == 400
+    assert cliente.get("/api/exportar/entradas/", {"hasta": "2024-13-01"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_api_exportacion_solo_para_el_staff(compras, usuario):
+    visitante = APIClient()
+    visitante.force_authenticate(user=usuario)
+
+    for cliente in (APIClient(), visitante):
+        assert cliente.get("/api/exportar/compras/").status_code == 403
+        assert cliente.get("/api/exportar/entradas/", {"formato": "ndjson"}).status_code == 403
+
+
+# --- PRUEBAS DE INTEGRACIÓN: COMANDO ---
+
+@pytest.mark.django_db
+def test_comando_exporta_a_archivo(compras, tmp_path):
+    archivo = tmp_path / "entradas.ndjson"
+
+    call_command("exportar", "entradas", formato="ndjson", salida=str(archivo), bloque=1)
+
+    assert [registro["compra"] for registro in leer_ndjson(archivo.read_bytes())] == [
+        compra.id for compra in compras for _ in range(2)
+    ]
+
+
+@pytest.mark.django_db
+def test_comando_exporta_a_salida_estandar(compras):
+    salida = io.StringIO()
+
+    call_command("exportar", "compras", desde=compras[1].fecha_compra.date().isoformat(), stdout=salida)
+
+    assert [int(fila["id"]) for fila in leer_csv(salida.getvalue().encode())] == [compras[1].id, compras[2].id]
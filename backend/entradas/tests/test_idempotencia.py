@@ -0,0 +1,328 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..excepciones import ConnectionError
+from ..api.idempotencia import CacheLRU, cache_respuestas
+from ..models import Pase, Compra, Entrada, ClaveIdempotencia, CorreoSaliente, VentasDiarias
+from ..servicios_externos import PasarelaPagosSimulada
+
+
+# --- FIXTURES ---
+
+@pytest.fixture(autouse=True)
+def cache_vacia():
+    cache_respuestas.limpiar()
+    yield
+    cache_respuestas.limpiar()
+
+
+@pytest.fixture
+def pases(db):
+    return {
+        "Regular": Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+        "VIP": Pase.objects.create(nombre="VIP", precio=Decimal("10000")),
+    }
+
+
+@pytest.fixture
+def usuario(db):
+    return User.objects.create_user(username="ana", email="ana@example.com", password="x")
+
+
+@pytest.fixture
+def cliente(usuario):
+    client = APIClient()
+    client.force_authenticate(user=usuario)
+    return client
+
+
+@pytest.fixture
+def carrito():
+    fecha = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    return {
+        "fecha_visita": fecha.isoformat(),
+        "tipo_pago": "Tarjeta",
+        "visitantes": [{"edad": 30, "tipo_pase": "Regular"}, {"edad": 40, "tipo_pase": "VIP"}],
+    }
+
+
+def checkout(cliente, carrito, clave):
+    return cliente.post("/api/compras/checkout/", carrito, format="json", HTTP_IDEMPOTENCY_KEY=clave)
+
+
+# --- PRUEBAS UNITARIAS: CACHÉ LRU ---
+
+def test_cache_lru_descarta_la_menos_usada():
+    cache = CacheLRU(maximo=2, ttl=60)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obtener("a")
+    cache.guardar("c", 3)
+
+    assert cache.obtener("a") == 1
+    assert cache.obtener("b") is None
+    assert cache.obtener("c") == 3
+
+
+def test_cache_lru_vence_por_ttl():
+    ahora = [0.0]
+    cache = CacheLRU(maximo=10, ttl=5, reloj=lambda: ahora[0])
+    cache.guardar("a", 1)
+
+    ahora[0] = 5
+    assert cache.obtener("a") is None
+
+
+# --- PRUEBAS DE INTEGRACIÓN: CHECKOUT CON IDEMPOTENCY-KEY ---
+
+@pytest.mark.django_db
+def test_reintento_con_la_misma_clave_no_duplica_la_compra(cliente, pases, carrito):
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", return_value=True) as cobro:
+        primera = checkout(cliente, carrito, "clave-1")
+        segunda = checkout(cliente, carrito, "clave-1")
+
+    assert primera.status_code == segunda.status_code == 201
+    assert segunda.data["id"] == primera.data["id"]
+    assert segunda["Idempotent-Replayed"] == "true"
+    assert cobro.call_count == 1
+    assert Compra.objects.count() == 1
+    assert Entrada.objects.count() == 2
+    assert CorreoSaliente.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_reintento_se_responde_desde_la_base_sin_cache_en_memoria(cliente, pases, carrito):
+    primera = checkout(cliente, carrito, "clave-1")
+    cache_respuestas.limpiar()
+
+    segunda = checkout(cliente, carrito, "clave-1")
+
+    assert segunda["Idempotent-Replayed"] == "true"
+    assert segunda.data["id"] == primera.data["id"]
+    assert Compra.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_claves_distintas_registran_compras_distintas(cliente, pases, carrito):
+    checkout(cliente, carrito, "clave-1")
+    checkout(cliente, carrito, "clave-2")
+
+    assert Compra.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_sin_header_no_se_guarda_nada(cliente, pases, carrito):
+    cliente.post("/api/compras/checkout/", carrito, format="json")
+
+    assert ClaveIdempotencia.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_misma_clave_con_otros_datos_se_rechaza(cliente, pases, carrito):
+    checkout(cliente, carrito, "clave-1")
+    carrito["visitantes"].append({"edad": 10, "tipo_pase": "Regular"})
+
+    respuesta = checkout(cliente, carrito, "clave-1")
+
+    assert respuesta.status_code == 422
+    assert Compra.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_la_clave_es_por_usuario(cliente, pases, carrito):
+    checkout(cliente, carrito, "clave-1")
+    otro = APIClient()
+    otro.force_authenticate(user=User.objects.create_user(username="beto", email="beto@example.com", password="x"))
+
+    respuesta = checkout(otro, carrito, "clave-1")
+
+    assert respuesta.status_code == 201
+    assert Compra.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_la_clave_requiere_un_usuario_autenticado(pases, carrito):
+    # Los anónimos no tienen nada propio que separe sus claves: compartirían respuestas entre sí
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", return_value=True) as cobro:
+        respuesta = checkout(APIClient(), carrito, "clave-1")
+
+    assert respuesta.status_code == 403
+    assert not cobro.called
+    assert not Compra.objects.exists() and not ClaveIdempotencia.objects.exists()
+
+
+@pytest.mark.django_db
+def test_request_en_curso_con_la_misma_clave_devuelve_409(cliente, usuario, pases, carrito):
+    primera = checkout(cliente, carrito, "clave-1")
+    ClaveIdempotencia.objects.update(estado_http=None, respuesta=None)
+    cache_respuestas.limpiar()
+
+    respuesta = checkout(cliente, carrito, "clave-1")
+
+    assert respuesta.status_code == 409
+    assert Compra.objects.count() == 1
+    assert primera.status_code == 201
+
+
+@pytest.mark.django_db
+def test_error_de_la_pasarela_se_reintenta_con_la_misma_referencia(cliente, pases, carrito):
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", side_effect=ConnectionError("caída")) as cobro:
+        primera = checkout(cliente, carrito, "clave-1")
+    # La clave queda marcada como fallida, no se borra
+    assert ClaveIdempotencia.objects.get().estado_http == 503
+
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", return_value=True) as reintento:
+        segunda = checkout(cliente, carrito, "clave-1")
+
+    assert primera.status_code == 503
+    assert segunda.status_code == 201
+    assert Compra.objects.count() == 1
+    referencia = cobro.call_args.kwargs["referencia"]
+    assert reintento.call_args.kwargs["referencia"] == referencia
+    assert Compra.objects.get().referencia_pago == referencia
+    # Las dos entradas cuentan una sola vez en el acumulado, como pagadas
+    assert set(VentasDiarias.objects.filter(entradas__gt=0).values_list("estado_pago", flat=True)) == {Compra.EstadosPago.PAGADO}
+    assert sum(VentasDiarias.objects.values_list("entradas", flat=True)) == 2
+
+
+@pytest.mark.django_db
+def test_falla_despues_de_cobrar_el_reintento_no_cobra_de_nuevo(cliente, pases, carrito):
+    cobros = []
+
+    def cobrar(self, monto, referencia=None):
+        # La pasarela no cobra dos veces la misma referencia
+        if referencia not in cobros:
+            cobros.append(referencia)
+        return True
+
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", cobrar):
+        with patch.object(Entrada.objects, "bulk_create", side_effect=RuntimeError("base caída")):
+            with pytest.raises(RuntimeError):
+                checkout(cliente, carrito, "clave-1")
+        segunda = checkout(cliente, carrito, "clave-1")
+        tercera = checkout(cliente, carrito, "clave-1")
+
+    assert segunda.status_code == tercera.status_code == 201
+    assert tercera["Idempotent-Replayed"] == "true"
+    assert len(cobros) == 1
+    assert Compra.objects.get().referencia_pago == cobros[0]
+
+
+@pytest.mark.django_db
+def test_la_referencia_de_cobro_depende_del_usuario_y_la_clave(cliente, pases, carrito):
+    otro = APIClient()
+    otro.force_authenticate(user=User.objects.create_user(username="beto", email="beto@example.com", password="x"))
+
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", return_value=True) as cobro:
+        checkout(cliente, carrito, "clave-1")
+        checkout(cliente, carrito, "clave-2")
+        checkout(otro, carrito, "clave-1")
+
+    referencias = {llamada.kwargs["referencia"] for llamada in cobro.call_args_list}
+    assert len(referencias) == 3
+
+
+@pytest.mark.django_db
+def test_clave_vencida_se_puede_reutilizar_y_se_barre(cliente, pases, carrito):
+    checkout(cliente, carrito, "clave-1")
+    ClaveIdempotencia.objects.update(expira=timezone.now() - timedelta(seconds=1))
+    cache_respuestas.limpiar()
+
+    respuesta = checkout(cliente, carrito, "clave-1")
+    assert respuesta.status_code == 201
+    assert Compra.objects.count() == 2
+
+    ClaveIdempotencia.objects.update(expira=timezone.now() - timedelta(seconds=1))
+    call_command("limpiar_claves_idempotencia")
+    assert ClaveIdempotencia.objects.count() == 0
+
+
+# --- PRUEBAS DE INTEGRACIÓN: PROCESAR PAGO ---
+
+@pytest.mark.django_db
+def test_procesar_pago_cobra_una_sola_vez_la_compra_pendiente(cliente, pases, carrito):
+    carrito["tipo_pago"] = "Efectivo"
+    compra_id = cliente.post("/api/compras/checkout/", carrito, format="json").data["id"]
+    url = f"/api/compras/{compra_id}/procesar-pago/"
+
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", return_value=True) as cobro:
+        primera = cliente.post(url, {}, format="json", HTTP_IDEMPOTENCY_KEY="pago-1")
+        segunda = cliente.post(url, {}, format="json", HTTP_IDEMPOTENCY_KEY="pago-1")
+
+    assert primera.status_code == segunda.status_code == 200
+    assert segunda["Idempotent-Replayed"] == "true"
+    assert cobro.call_count == 1
+    compra = Compra.objects.get(id=compra_id)
+    assert compra.estado_pago == Compra.EstadosPago.PAGADO
+    assert compra.forma_pago == Compra.FormasPago.TARJETA
+
+
+@pytest.mark.django_db
+def test_procesar_pago_de_compra_ya_pagada_devuelve_409(cliente, pases, carrito):
+    compra_id = cliente.post("/api/compras/checkout/", carrito, format="json").data["id"]
+
+    respuesta = cliente.post(f"/api/compras/{compra_id}/procesar-pago/", {}, format="json")
+
+    assert respuesta.status_code == 409
+
+
+@pytest.mark.django_db
+def test_procesar_pago_cobra_fuera_de_la_transaccion(cliente, pases, carrito):
+    carrito["tipo_pago"] = "Efectivo"
+    compra_id = cliente.post("/api/compras/checkout/", carrito, format="json").data["id"]
+    savepoints = len(connection.savepoint_ids)
+    durante_el_cobro = []
+
+    def cobrar(self, monto, referencia=None):
+        # Mientras se cobra, la compra ya está en PROCESANDO y confirmada, sin bloqueos abiertos
+        durante_el_cobro.append((len(connection.savepoint_ids), Compra.objects.get(id=compra_id).estado_pago))
+        return True
+
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", cobrar):
+        respuesta = cliente.post(f"/api/compras/{compra_id}/procesar-pago/", {}, format="json")
+
+    assert respuesta.status_code == 200
+    assert durante_el_cobro == [(savepoints, Compra.EstadosPago.PROCESANDO)]
+    assert Compra.objects.get(id=compra_id).estado_pago == Compra.EstadosPago.PAGADO
+
+
+@pytest.mark.django_db
+def test_procesar_pago_con_cobro_en_curso_devuelve_409(cliente, pases, carrito):
+    carrito["tipo_pago"] = "Efectivo"
+    compra_id = cliente.post("/api/compras/checkout/", carrito, format="json").data["id"]
+    Compra.objects.filter(id=compra_id).update(estado_pago=Compra.EstadosPago.PROCESANDO)
+
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", return_value=True) as cobro:
+        respuesta = cliente.post(f"/api/compras/{compra_id}/procesar-pago/", {}, format="json")
+
+    assert respuesta.status_code == 409
+    assert cobro.call_count == 0
+
+
+@pytest.mark.django_db
+def test_procesar_pago_fallido_vuelve_a_pendiente(cliente, pases, carrito):
+    carrito["tipo_pago"] = "Efectivo"
+    compra_id = cliente.post("/api/compras/checkout/", carrito, format="json").data["id"]
+    url = f"/api/compras/{compra_id}/procesar-pago/"
+
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", side_effect=ConnectionError("caída")) as caida:
+        assert cliente.post(url, {}, format="json").status_code == 503
+    sin_respuesta = Compra.objects.get(id=compra_id)
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", return_value=False):
+        assert cliente.post(url, {}, format="json").status_code == 402
+    rechazada = Compra.objects.get(id=compra_id)
+
+    # Sin respuesta conserva la referencia del cobro; rechazado se descarta
+    assert sin_respuesta.estado_pago == Compra.EstadosPago.PENDIENTE
+    assert sin_respuesta.referencia_pago == caida.call_args.kwargs["referencia"]
+    assert (rechazada.estado_pago, rechazada.referencia_pago) == (Compra.EstadosPago.PENDIENTE, None)
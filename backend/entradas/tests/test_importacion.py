@@ -0,0 +1,263 @@
+import io
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from .. import importacion
+from ..importacion import ImportadorReservas
+from ..models import Pase, Compra, Entrada, CupoDiario, VentasDiarias
+from ..servicio_compra import ServicioCompraEntradas
+from ..ventas import reconstruir
+
+
+# --- FIXTURES ---
+
+@pytest.fixture
+def pases(db):
+    return {
+        "Regular": Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+        "VIP": Pase.objects.create(nombre="VIP", precio=Decimal("10000")),
+    }
+
+
+@pytest.fixture
+def agencias(db):
+    agencias = [
+        User.objects.create_user(username="viajes-sur", email="reservas@viajessur.com"),
+        User.objects.create_user(username="turismo-norte", email="grupos@turismonorte.com"),
+    ]
+    Group.objects.create(name=importacion.GRUPO_AGENCIAS).user_set.add(*agencias)
+    return agencias
+
+
+@pytest.fixture
+def staff(db):
+    cliente = APIClient()
+    cliente.force_authenticate(user=User.objects.create_user(username="admin", email="admin@example.com", is_staff=True))
+    return cliente
+
+
+def proximo_miercoles(semanas=1) -> date:
+    fecha = date.today() + timedelta(days=7 * semanas)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+@pytest.fixture
+def miercoles():
+    return proximo_miercoles()
+
+
+@pytest.fixture
+def importador(pases):
+    return ImportadorReservas(ServicioCompraEntradas(pasarela_pagos=None, servicio_correo=None), tamanio_lote=3)
+
+
+@pytest.fixture
+def falla_el_segundo_lote(monkeypatch):
+    """La base rechaza el registro del segundo lote (la suma a VentasDiarias va dentro de su transacción)."""
+    sumar, llamadas = importacion.sumar, []
+
+    def sumar_o_fallar(*args):
+        llamadas.append(args)
+        if len(llamadas) == 2:
+            raise IntegrityError("UNIQUE constraint failed: entradas_ventasdiarias")
+        return sumar(*args)
+
+    monkeypatch.setattr(importacion, "sumar", sumar_o_fallar)
+
+
+def csv_de(filas, encabezado="agencia,fecha_visita,edad,tipo_pase"):
+    return io.StringIO("\n".join([encabezado, *(",".join(map(str, fila)) for fila in filas)]) + "\n")
+
+
+# --- PRUEBAS DE INTEGRACIÓN: IMPORTADOR ---
+
+@pytest.mark.django_db
+def test_importa_una_compra_por_agencia_y_dia(importador, agencias, miercoles):
+    otro_miercoles = miercoles + timedelta(days=7)
+    filas = [
+        ("viajes-sur", miercoles, 30, "Regular"),
+        ("viajes-sur", miercoles, 8, "VIP"),
+        ("turismo-norte", miercoles, 2, "Regular"),
+        ("viajes-sur", miercoles, 70, "Regular"),  # Otro lote, misma compra
+        ("viajes-sur", otro_miercoles, 40, "VIP"),
+    ]
+
+    resultado = importador.importar(csv_de(filas))
+
+    assert (resultado.filas, resultado.importadas, resultado.errores) == (5, 5, [])
+    assert len(resultado.compras) == 3
+    compra = Compra.objects.get(usuario=agencias[0], fecha_visita=miercoles)
+    assert compra.monto_total == Decimal("12500")
+    assert (compra.forma_pago, compra.estado_pago) == (Compra.FormasPago.EFECTIVO, Compra.EstadosPago.PENDIENTE)
+    assert sorted(compra.entradas.values_list("edad_visitante", "precio_calculado")) == [
+        (8, Decimal("5000")), (30, Decimal("5000")), (70, Decimal("2500")),
+    ]
+    assert CupoDiario.objects.get(fecha_visita=miercoles, pase=None).vendidas == 4
+
+
+@pytest.mark.django_db
+def test_errores_por_fila_no_frenan_al_resto(importador, agencias, miercoles):
+    filas = [
+        ("viajes-sur", miercoles, 30, "Regular"),
+        ("viajes-sur", miercoles, "treinta", "Regular"),
+        ("viajes-sur", miercoles, -1, "Regular"),
+        ("viajes-sur", miercoles, 30, "Platino"),
+        ("viajes-sur", miercoles, 30, ""),
+        ("agencia-fantasma", miercoles, 30, "Regular"),
+        ("viajes-sur", "el miércoles", 30, "Regular"),
+        ("viajes-sur", miercoles - timedelta(days=2), 30, "Regular"),  # Lunes: cerrado
+        ("viajes-sur", proximo_miercoles(-2), 30, "Regular"),
+        ("viajes-sur", miercoles, 8, "VIP"),
+    ]
+
+    resultado = importador.importar(csv_de(filas))
+
+    assert (resultado.filas, resultado.importadas) == (10, 2)
+    assert resultado.errores == [
+        (3, "La edad debe ser un número entero."),
+        (4, "La edad no puede ser negativa."),
+        (5, "El 'tipo_pase' 'Platino' no es válido."),
+        (6, "El 'tipo_pase' no puede estar vacío."),
+        (7, "La agencia 'agencia-fantasma' no existe o no está habilitada."),
+        (8, "El formato de la fecha es inválido."),
+        (9, "El parque está cerrado en esa fecha."),
+        (10, "La fecha de visita no puede ser en el pasado."),
+    ]
+    assert Entrada.objects.count() == 2
+
+
+@pytest.mark.django_db
+@override_settings(CAPACIDAD_DIARIA_PARQUE=2)
+def test_sin_cupo_las_filas_del_dia_fallan(importador, agencias, miercoles):
+    filas = [("viajes-sur", miercoles, 30, "Regular")] * 2 + [("turismo-norte", miercoles, 30, "Regular")] * 2
+
+    resultado = importador.importar(csv_de(filas))
+
+    assert resultado.importadas == 2
+    assert [linea for linea, _ in resultado.errores] == [4, 5]
+    assert resultado.errores[0][1] == "No quedan entradas disponibles para esa fecha."
+    assert CupoDiario.objects.get(fecha_visita=miercoles, pase=None).vendidas == 2
+
+
+@pytest.mark.django_db
+def test_la_importacion_mantiene_ventas_diarias(importador, agencias, miercoles):
+    filas = [("viajes-sur", miercoles, edad, pase) for edad in (1, 5, 30, 80) for pase in ("Regular", "VIP")]
+
+    importador.importar(csv_de(filas))
+
+    incremental = sorted(VentasDiarias.objects.values_list("pase_id", "entradas", "recaudacion"))
+    reconstruir()
+    assert incremental == sorted(VentasDiarias.objects.values_list("pase_id", "entradas", "recaudacion"))
+    assert sum(entradas for _, entradas, _ in incremental) == 8
+
+
+@pytest.mark.django_db
+def test_lote_rechazado_por_la_base_no_frena_al_resto(importador, agencias, miercoles, falla_el_segundo_lote):
+    filas = [("viajes-sur", miercoles, 30, "Regular")] * 3 + [("turismo-norte", miercoles, 30, "VIP")] * 3 + [("viajes-sur", miercoles, 8, "VIP")]
+
+    resultado = importador.importar(csv_de(filas))
+
+    assert (resultado.filas, resultado.importadas, resultado.lotes_fallidos) == (7, 4, 1)
+    assert [linea for linea, _ in resultado.errores] == [5, 6, 7]
+    assert resultado.errores[0][1] == "No se pudo registrar el lote: UNIQUE constraint failed: entradas_ventasdiarias"
+    # El lote rechazado no dejó compra, entradas ni cupo reservado
+    assert sorted(Compra.objects.values_list("id", flat=True)) == sorted(resultado.compras) and len(resultado.compras) == 1
+    assert Entrada.objects.count() == 4
+    assert CupoDiario.objects.get(fecha_visita=miercoles, pase=None).vendidas == 4
+
+
+@pytest.mark.django_db
+def test_solo_se_importa_a_nombre_de_agencias(importador, agencias, miercoles):
+    # Un usuario cualquiera (o el staff) no es una agencia: no se le pueden cargar compras
+    User.objects.create_user(username="ana", email="ana@example.com")
+
+    resultado = importador.importar(csv_de([("ana", miercoles, 30, "Regular"), ("viajes-sur", miercoles, 30, "Regular")]))
+
+    assert resultado.importadas == 1
+    assert resultado.errores == [(2, "La agencia 'ana' no existe o no está habilitada.")]
+    assert not Compra.objects.filter(usuario__username="ana").exists()
+
+
+@pytest.mark.django_db
+def test_faltan_columnas(importador):
+    with pytest.raises(ValueError, match="Faltan columnas en el archivo: tipo_pase"):
+        importador.importar(csv_de([], encabezado="agencia,fecha_visita,edad"))
+
+
+# --- PRUEBAS DE INTEGRACIÓN: API Y COMANDO ---
+
+@pytest.mark.django_db
+def test_api_importar_agencias(pases, agencias, miercoles, staff):
+    contenido = csv_de([("viajes-sur", miercoles, 30, "Regular"), ("viajes-sur", miercoles, 200, "VIP")]).getvalue()
+    archivo = SimpleUploadedFile("reservas.csv", ("\ufeff" + contenido).encode(), content_type="text/csv")
+
+    respuesta = staff.post("/api/compras/importar-agencias/", {"archivo": archivo}, format="multipart")
+
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert (datos["filas"], datos["importadas"]) == (2, 1)
+    assert datos["errores"] == [{"linea": 3, "error": "La edad no puede ser mayor a 120."}]
+    assert Compra.objects.get(id=datos["compras"][0]).entradas.count() == 1
+
+
+@pytest.mark.django_db
+def test_api_importar_agencias_con_un_lote_rechazado(pases, agencias, miercoles, falla_el_segundo_lote, staff):
+    # Un solo lote con dos fechas: falla la suma de la segunda y se revierte el lote entero
+    contenido = csv_de([("viajes-sur", miercoles, 30, "Regular"), ("viajes-sur", miercoles + timedelta(days=7), 30, "Regular")]).getvalue()
+    archivo = SimpleUploadedFile("reservas.csv", contenido.encode(), content_type="text/csv")
+
+    respuesta = staff.post("/api/compras/importar-agencias/", {"archivo": archivo}, format="multipart")
+
+    assert respuesta.status_code == 207
+    datos = respuesta.json()
+    assert (datos["importadas"], datos["lotes_fallidos"], datos["compras"]) == (0, 1, [])
+    assert [error["linea"] for error in datos["errores"]] == [2, 3]
+    assert Compra.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_api_importar_agencias_sin_archivo_o_sin_columnas(pases, staff):
+    cliente = staff
+
+    assert cliente.post("/api/compras/importar-agencias/", {}, format="multipart").status_code == 400
+    archivo = SimpleUploadedFile("reservas.csv", b"nombre,edad\nAna,30\n", content_type="text/csv")
+    respuesta = cliente.post("/api/compras/importar-agencias/", {"archivo": archivo}, format="multipart")
+    assert respuesta.status_code == 400
+    assert "Faltan columnas" in respuesta.json()["error"]
+
+
+@pytest.mark.django_db
+def test_api_importar_agencias_solo_para_el_staff(pases, agencias, miercoles):
+    visitante = APIClient()
+    visitante.force_authenticate(user=User.objects.create_user(username="ana", email="ana@example.com"))
+    agencia = APIClient()
+    agencia.force_authenticate(user=agencias[0])
+    contenido = csv_de([("viajes-sur", miercoles, 30, "Regular")]).getvalue().encode()
+
+    for cliente in (APIClient(), visitante, agencia):
+        archivo = SimpleUploadedFile("reservas.csv", contenido, content_type="text/csv")
+        assert cliente.post("/api/compras/importar-agencias/", {"archivo": archivo}, format="multipart").status_code == 403
+    assert Compra.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_comando_importar_reservas(pases, agencias, miercoles, tmp_path):
+    archivo = tmp_path / "reservas.csv"
+    archivo.write_text(csv_de([("turismo-norte", miercoles, 30, "VIP"), ("turismo-norte", miercoles, 30, "Oro")]).getvalue())
+    salida, errores = io.StringIO(), io.StringIO()
+
+    call_command("importar_reservas", str(archivo), lote=1, stdout=salida, stderr=errores)
+
+    assert "Importadas 1 de 2 filas en 1 compras nuevas; 1 con errores." in salida.getvalue()
+    assert "Línea 3: El 'tipo_pase' 'Oro' no es válido." in errores.getvalue()
+    assert Entrada.objects.get().compra.usuario == agencias[1]
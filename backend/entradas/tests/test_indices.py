@@ -0,0 +1,63 @@
+import pytest
+from datetime import date
+
+from django.db import connection
+
+from ..models import Compra, Entrada
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "sqlite",
+    reason="Las aserciones leen el formato de EXPLAIN QUERY PLAN de SQLite",
+)
+
+
+def _plan(queryset):
+    return queryset.explain()
+
+
+# --- PRUEBAS DE PLAN DE EJECUCIÓN: ÍNDICES DE LOS ACCESOS FRECUENTES ---
+
+@pytest.mark.django_db
+def test_compras_por_fecha_de_visita_usan_indice():
+    plan = _plan(Compra.objects.filter(fecha_visita=date(2030, 1, 2)))
+
+    assert "USING INDEX compra_visita_fecha_idx" in plan
+
+
+@pytest.mark.django_db
+def test_pagos_pendientes_del_dia_usan_indice_parcial():
+    plan = _plan(Compra.objects.filter(estado_pago=Compra.EstadosPago.PENDIENTE, fecha_visita=date(2030, 1, 2)))
+
+    assert "USING INDEX compra_pendientes_idx" in plan
+
+
+@pytest.mark.django_db
+def test_compras_por_estado_usan_indice():
+    plan = _plan(Compra.objects.filter(estado_pago=Compra.EstadosPago.PAGADO).order_by("-fecha_compra", "-id")[:50])
+
+    assert "USING INDEX compra_estado_fecha_idx" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.django_db
+def test_historial_de_usuario_ordenado_sin_sort():
+    plan = _plan(Compra.objects.filter(usuario_id=1).order_by("-fecha_compra", "-id")[:50])
+
+    assert "USING INDEX compra_usuario_fecha_idx" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.django_db
+def test_listado_general_ordenado_sin_sort():
+    plan = _plan(Compra.objects.all()[:50])
+
+    assert "USING INDEX compra_fecha_compra_idx" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.django_db
+def test_entradas_por_compra_usan_indice():
+    plan = _plan(Entrada.objects.filter(compra_id__in=[1, 2, 3]))
+
+    assert "USING INDEX" in plan
+    assert "(compra_id=?)" in plan
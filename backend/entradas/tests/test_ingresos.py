@@ -0,0 +1,249 @@
+import threading
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .. import ingresos
+from ..credenciales import credencial_de, firmar
+from ..ingresos import IndiceIngresos
+from ..models import Pase, Compra, Entrada
+
+
+# --- FIXTURES ---
+
+@pytest.fixture(autouse=True)
+def sin_indice():
+    """Cada test arranca sin índice del día en el proceso."""
+    ingresos._indice = None
+    yield
+    ingresos._indice = None
+
+
+@pytest.fixture
+def hoy():
+    return timezone.localdate()
+
+
+@pytest.fixture
+def pase(db):
+    return Pase.objects.create(nombre="Pase Full", precio=Decimal("10000"))
+
+
+@pytest.fixture
+def crear_compra(pase):
+    usuario = User.objects.create_user(username="juan", email="juan@example.com")
+
+    def crear(fecha, cantidad=2, estado_pago=Compra.EstadosPago.PAGADO):
+        compra = Compra.objects.create(
+            usuario=usuario, fecha_visita=fecha, monto_total=Decimal("10000") * cantidad,
+            forma_pago=Compra.FormasPago.TARJETA, estado_pago=estado_pago,
+        )
+        Entrada.objects.bulk_create([
+            Entrada(compra=compra, pase=pase, edad_visitante=30, precio_calculado=Decimal("10000"))
+            for _ in range(cantidad)
+        ])
+        return compra
+    return crear
+
+
+@pytest.fixture
+def cliente(db):
+    """Cliente autenticado como personal del parque."""
+    cliente = APIClient()
+    cliente.force_authenticate(user=User.objects.create_user(username="boleteria", email="boleteria@example.com", is_staff=True))
+    return cliente
+
+
+def tokens(compra):
+    return [credencial_de(entrada) for entrada in compra.entradas.select_related('compra').order_by('id')]
+
+
+# --- PRUEBAS UNITARIAS: ÍNDICE ---
+
+def test_entrada_valida_se_marca_y_no_vuelve_a_pasar(crear_compra, hoy):
+    compra = crear_compra(hoy)
+    indice = IndiceIngresos.cargar(hoy)
+    primero, segundo = tokens(compra)
+
+    validacion = indice.validar(primero)
+    repetida = indice.validar(primero)
+
+    assert len(indice) == 2
+    assert validacion.resultado == ingresos.VALIDA and validacion.pase == "Pase Full" and validacion.edad == 30
+    assert repetida.resultado == ingresos.USADA and repetida.ingreso == validacion.ingreso
+    assert indice.validar(segundo).resultado == ingresos.VALIDA
+
+
+def test_validar_escribe_un_update_por_entrada_aceptada(crear_compra, hoy, django_assert_num_queries):
+    compra = crear_compra(hoy, cantidad=5)
+    indice = IndiceIngresos.cargar(hoy)
+    credenciales = tokens(compra)
+
+    with django_assert_num_queries(5):
+        resultados = [indice.validar(token).resultado for token in credenciales]
+    # Las repetidas se rechazan con el bitset, sin ir a la base
+    with django_assert_num_queries(0):
+        repetida = indice.validar(credenciales[0]).resultado
+
+    assert resultados == [ingresos.VALIDA] * 5 and repetida == ingresos.USADA
+    assert not compra.entradas.filter(fecha_ingreso__isnull=True).exists()
+
+
+def test_credencial_invalida_y_de_otra_fecha(crear_compra, hoy):
+    manana = crear_compra(hoy + timedelta(days=1))
+    indice = IndiceIngresos.cargar(hoy)
+
+    assert indice.validar("A" * 31).resultado == ingresos.INVALIDA
+    assert indice.validar(tokens(manana)[0]).resultado == ingresos.OTRA_FECHA
+
+
+def test_entradas_que_no_estaban_al_cargar(crear_compra, pase, hoy):
+    indice = IndiceIngresos.cargar(hoy)
+    del_dia = crear_compra(hoy, cantidad=1)
+    pendiente = crear_compra(hoy, cantidad=1, estado_pago=Compra.EstadosPago.PENDIENTE)
+
+    token = tokens(del_dia)[0]
+    assert indice.validar(token).resultado == ingresos.VALIDA
+    assert indice.validar(token).resultado == ingresos.USADA
+    assert indice.validar(tokens(pendiente)[0]).resultado == ingresos.NO_PAGADA
+    assert indice.validar(firmar(999999, hoy, pase.id)).resultado == ingresos.DESCONOCIDA
+
+
+def test_entradas_ya_usadas_en_la_base(crear_compra, hoy):
+    compra = crear_compra(hoy, cantidad=1)
+    antes = timezone.now() - timedelta(hours=1)
+    compra.entradas.update(fecha_ingreso=antes)
+
+    validacion = IndiceIngresos.cargar(hoy).validar(tokens(compra)[0])
+
+    assert validacion.resultado == ingresos.USADA and validacion.ingreso == antes
+
+
+@pytest.mark.django_db(transaction=True)
+def test_validaciones_concurrentes_aceptan_una_sola_vez(crear_compra, hoy):
+    compra = crear_compra(hoy, cantidad=1)
+    indice = IndiceIngresos.cargar(hoy)
+    token = tokens(compra)[0]
+    resultados = []
+
+    def validar():
+        try:
+            resultados.append(indice.validar(token).resultado)
+        finally:
+            connection.close()
+
+    hilos = [threading.Thread(target=validar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sorted(resultados) == [ingresos.USADA] * 7 + [ingresos.VALIDA]
+
+
+def test_dos_procesos_no_aceptan_la_misma_entrada(crear_compra, hoy):
+    compra = crear_compra(hoy, cantidad=1)
+    token = tokens(compra)[0]
+    # Cada proceso tiene su propio índice: el segundo en validar pierde en el UPDATE de la base
+    uno, otro = IndiceIngresos.cargar(hoy), IndiceIngresos.cargar(hoy)
+    aceptada = uno.validar(token)
+    rechazada = otro.validar(token)
+
+    assert aceptada.resultado == ingresos.VALIDA
+    assert rechazada.resultado == ingresos.USADA and rechazada.ingreso == aceptada.ingreso
+    assert otro.conflictos == 1 and uno.conflictos == 0
+    # El conflicto queda en el bitset del segundo: la próxima vez se rechaza sin ir a la base
+    assert otro.validar(token).resultado == ingresos.USADA and otro.conflictos == 1
+
+
+def test_si_la_base_falla_la_entrada_puede_volver_a_pasar(crear_compra, hoy, monkeypatch):
+    compra = crear_compra(hoy, cantidad=1)
+    indice = IndiceIngresos.cargar(hoy)
+    token = tokens(compra)[0]
+
+    def falla(*args, **kwargs):
+        raise RuntimeError("base caída")
+    with monkeypatch.context() as parche:
+        parche.setattr("django.db.models.query.QuerySet.update", falla)
+        with pytest.raises(RuntimeError):
+            indice.validar(token)
+
+    assert indice.validar(token).resultado == ingresos.VALIDA
+
+
+def test_compra_que_deja_de_estar_pagada_se_revoca(crear_compra, hoy):
+    compra = crear_compra(hoy, cantidad=1)
+    indice = ingresos.obtener_indice(hoy)
+    token = tokens(compra)[0]
+
+    compra.estado_pago = Compra.EstadosPago.PENDIENTE
+    compra.save()
+    assert indice.validar(token).resultado == ingresos.NO_PAGADA
+
+    compra.estado_pago = Compra.EstadosPago.PAGADO
+    compra.save()
+    assert indice.validar(token).resultado == ingresos.VALIDA
+
+
+def test_indice_del_proceso_cambia_con_el_dia(crear_compra, hoy):
+    compra = crear_compra(hoy, cantidad=1)
+    indice = ingresos.obtener_indice(hoy)
+    indice.validar(tokens(compra)[0])
+
+    assert ingresos.obtener_indice(hoy) is indice
+    siguiente = ingresos.obtener_indice(hoy + timedelta(days=1))
+
+    assert siguiente is not indice and siguiente.fecha == hoy + timedelta(days=1)
+    # El ingreso quedó en la base al validarlo, no depende del índice descartado
+    assert compra.entradas.get().fecha_ingreso is not None
+
+
+# --- PRUEBAS DE INTEGRACIÓN: API ---
+
+def test_api_validar(crear_compra, hoy, cliente):
+    compra = crear_compra(hoy, cantidad=1)
+    token = tokens(compra)[0]
+
+    valida = cliente.post("/api/ingresos/validar/", {"token": token}, format="json")
+    usada = cliente.post("/api/ingresos/validar/", {"token": token}, format="json")
+
+    assert valida.status_code == 200 and valida.json()["resultado"] == ingresos.VALIDA
+    assert valida.json()["entrada"] == compra.entradas.get().id
+    assert usada.status_code == 409 and usada.json()["resultado"] == ingresos.USADA
+    assert cliente.post("/api/ingresos/validar/", {"token": "X" * 31}, format="json").status_code == 400
+    assert cliente.post("/api/ingresos/validar/", {}, format="json").status_code == 400
+
+
+def test_api_precargar_y_estado(crear_compra, hoy, cliente):
+    compra = crear_compra(hoy, cantidad=3)
+    assert cliente.get("/api/ingresos/estado/").status_code == 404
+
+    precarga = cliente.post("/api/ingresos/precargar/")
+    cliente.post("/api/ingresos/validar/", {"token": tokens(compra)[0]}, format="json")
+
+    assert precarga.status_code == 200
+    assert precarga.json() == {"fecha": hoy.isoformat(), "entradas": 3, "usadas": 0, "conflictos": 0}
+    assert cliente.get("/api/ingresos/estado/").json()["usadas"] == 1
+    assert Entrada.objects.filter(fecha_ingreso__isnull=False).count() == 1
+
+
+def test_api_ingresos_solo_para_el_personal_y_los_molinetes(crear_compra, hoy):
+    token = tokens(crear_compra(hoy, cantidad=1))[0]
+    anonimo = APIClient()
+    visitante = APIClient()
+    visitante.force_authenticate(user=User.objects.create_user(username="ana", email="ana@example.com"))
+    molinete = APIClient()
+    usuario_molinete = User.objects.create_user(username="norte-1", email="norte-1@example.com")
+    usuario_molinete.groups.add(Group.objects.create(name="molinetes"))
+    molinete.force_authenticate(user=usuario_molinete)
+
+    for cliente, esperado in ((anonimo, 403), (visitante, 403)):
+        assert cliente.post("/api/ingresos/validar/", {"token": token}, format="json").status_code == esperado
+        assert cliente.post("/api/ingresos/precargar/").status_code == esperado
+        assert cliente.get("/api/ingresos/estado/").status_code == esperado
+    assert molinete.post("/api/ingresos/validar/", {"token": token}, format="json").status_code == 200
@@ -0,0 +1,274 @@
+import io
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .. import ingresos
+from ..conciliacion import ConciliadorIngresos
+from ..credenciales import credencial_de, firmar
+from ..instantanea import Instantanea, ValidadorOffline, escribir_instantanea, exportar_instantanea
+from ..models import Pase, Compra, Entrada
+
+
+# --- FIXTURES ---
+
+@pytest.fixture(autouse=True)
+def sin_indice():
+    ingresos._indice = None
+    yield
+    ingresos._indice = None
+
+
+@pytest.fixture
+def hoy():
+    return timezone.localdate()
+
+
+@pytest.fixture
+def compra(db, hoy):
+    usuario = User.objects.create_user(username="juan", email="juan@example.com")
+    pase = Pase.objects.create(nombre="Pase Full", precio=Decimal("10000"))
+    compra = Compra.objects.create(
+        usuario=usuario, fecha_visita=hoy, monto_total=Decimal("30000"),
+        forma_pago=Compra.FormasPago.TARJETA, estado_pago=Compra.EstadosPago.PAGADO,
+    )
+    Entrada.objects.bulk_create([
+        Entrada(compra=compra, pase=pase, edad_visitante=edad, precio_calculado=Decimal("10000")) for edad in (30, 8, 65)
+    ])
+    # Pendiente de pago: no va a la instantánea
+    pendiente = Compra.objects.create(usuario=usuario, fecha_visita=hoy, monto_total=Decimal("10000"), forma_pago=Compra.FormasPago.EFECTIVO)
+    Entrada.objects.create(compra=pendiente, pase=pase, edad_visitante=40, precio_calculado=Decimal("10000"))
+    return compra
+
+
+@pytest.fixture
+def ruta_instantanea(compra, hoy, tmp_path):
+    ruta = str(tmp_path / "ingresos.bin")
+    exportar_instantanea(hoy, ruta)
+    return ruta
+
+
+def tokens(compra):
+    return [credencial_de(entrada) for entrada in compra.entradas.select_related('compra').order_by('id')]
+
+
+# --- PRUEBAS UNITARIAS: INSTANTÁNEA ---
+
+def test_instantanea_tiene_las_entradas_pagadas_ordenadas(compra, ruta_instantanea, hoy):
+    ids = list(compra.entradas.order_by('id').values_list('id', flat=True))
+
+    with Instantanea(ruta_instantanea) as instantanea:
+        assert (instantanea.fecha, len(instantanea)) == (hoy, 3)
+        assert instantanea.pases == {compra.entradas.first().pase_id: "Pase Full"}
+        assert [instantanea.buscar(entrada_id)[1:] for entrada_id in ids] == [(30, False), (8, False), (65, False)]
+        assert instantanea.buscar(ids[0] - 1) is None
+        assert instantanea.buscar(ids[-1] + 100) is None
+
+
+def test_instantanea_marca_las_ya_usadas(compra, hoy, tmp_path):
+    usada = compra.entradas.order_by('id').first()
+    Entrada.objects.filter(id=usada.id).update(fecha_ingreso=timezone.now())
+    ruta = tmp_path / "ingresos.bin"
+
+    with open(ruta, 'wb') as archivo:
+        assert escribir_instantanea(hoy, archivo, tamanio_bloque=2) == 3
+
+    with Instantanea(str(ruta)) as instantanea:
+        assert [instantanea.buscar(entrada.id)[2] for entrada in compra.entradas.order_by('id')] == [True, False, False]
+
+
+def test_instantanea_danada_o_ajena(ruta_instantanea, tmp_path):
+    cortada = tmp_path / "cortada.bin"
+    with open(ruta_instantanea, 'rb') as archivo:
+        cortada.write_bytes(archivo.read()[:-5])
+    ajena = tmp_path / "ajena.bin"
+    ajena.write_bytes(b"%PDF-1.4 no es una instantanea de ingresos")
+
+    with pytest.raises(ValueError, match="dañada"):
+        Instantanea(str(cortada))
+    with pytest.raises(ValueError, match="compatible"):
+        Instantanea(str(ajena))
+
+
+# --- PRUEBAS UNITARIAS: MOLINETE SIN RED ---
+
+def test_validador_offline(compra, ruta_instantanea, hoy, tmp_path, django_assert_num_queries):
+    primero, segundo, _ = tokens(compra)
+    pendiente = credencial_de(Entrada.objects.select_related('compra').get(compra__estado_pago=Compra.EstadosPago.PENDIENTE))
+    otra_fecha = firmar(compra.entradas.first().id, hoy + timedelta(days=1), 1)
+    validador = ValidadorOffline(ruta_instantanea, str(tmp_path / "bitacora.csv"), molinete="norte-1")
+
+    with django_assert_num_queries(0):
+        valida = validador.validar(primero)
+        repetida = validador.validar(primero)
+        resultados = [validador.validar(token).resultado for token in (segundo, pendiente, otra_fecha, "A" * 31)]
+    validador.cerrar()
+
+    assert valida.resultado == ingresos.VALIDA and valida.pase == "Pase Full" and valida.edad == 30
+    assert repetida.resultado == ingresos.USADA
+    assert resultados == [ingresos.VALIDA, ingresos.DESCONOCIDA, ingresos.OTRA_FECHA, ingresos.INVALIDA]
+    lineas = (tmp_path / "bitacora.csv").read_text().splitlines()
+    assert len(lineas) == 2 and lineas[0].endswith(",norte-1") and f",{hoy.isoformat()}," in lineas[0]
+
+
+def test_validador_offline_recuerda_su_bitacora_al_reiniciar(compra, ruta_instantanea, tmp_path):
+    token = tokens(compra)[0]
+    bitacora = str(tmp_path / "bitacora.csv")
+    validador = ValidadorOffline(ruta_instantanea, bitacora)
+    assert validador.validar(token).resultado == ingresos.VALIDA
+    validador.cerrar()
+
+    reiniciado = ValidadorOffline(ruta_instantanea, bitacora)
+    assert reiniciado.validar(token).resultado == ingresos.USADA
+    reiniciado.cerrar()
+
+
+# --- PRUEBAS UNITARIAS: CONCILIACIÓN ---
+
+def test_conciliar_bitacoras_de_varios_molinetes(compra, ruta_instantanea, tmp_path):
+    primero, segundo, tercero = tokens(compra)
+    antes = timezone.now() - timedelta(minutes=10)
+    despues = antes + timedelta(minutes=5)
+    norte = ValidadorOffline(ruta_instantanea, str(tmp_path / "norte.csv"), "norte")
+    sur = ValidadorOffline(ruta_instantanea, str(tmp_path / "sur.csv"), "sur")
+    # La misma entrada pasó por los dos molinetes sin red: vale el primer ingreso
+    norte.validar(primero, ahora=despues)
+    sur.validar(primero, ahora=antes)
+    sur.validar(segundo, ahora=despues)
+    norte.cerrar()
+    sur.cerrar()
+    # El tercero ya había entrado por un molinete con red
+    ya = compra.entradas.order_by('id')[2]
+    Entrada.objects.filter(id=ya.id).update(fecha_ingreso=antes)
+    fecha = compra.fecha_visita.isoformat()
+    with open(tmp_path / "sur.csv", "a") as archivo:
+        archivo.write(f"{ya.id},{fecha},{despues.isoformat()},sur\n999999,{fecha},{despues.isoformat()},sur\nbasura\n")
+
+    conciliador = ConciliadorIngresos()
+    for nombre in ("norte.csv", "sur.csv"):
+        with open(tmp_path / nombre, newline='') as archivo:
+            conciliador.agregar(archivo)
+    resultado = conciliador.conciliar().como_dict()
+
+    ingresos_en_base = dict(compra.entradas.values_list('id', 'fecha_ingreso'))
+    primero_id, segundo_id = sorted(ingresos_en_base)[:2]
+    assert ingresos_en_base[primero_id] == antes.replace(microsecond=0)
+    assert ingresos_en_base[segundo_id] == despues.replace(microsecond=0)
+    assert ingresos_en_base[ya.id] == antes
+    assert resultado == {
+        "lineas": 6, "registrados": 2, "ya_registrados": 1, "desconocidas": 1, "repetidos": 1,
+        "errores": [{"linea": 5, "error": "La línea debe tener entrada_id, fecha_visita y momento."}],
+        "conflictos": [],
+    }
+
+
+def test_conciliar_reporta_entradas_de_otra_fecha_o_sin_pagar(compra, hoy, tmp_path):
+    """La bitácora no alcanza: la fecha de visita y el pago se comparan con la base."""
+    primera, segunda, tercera = compra.entradas.order_by('id')
+    otra = Compra.objects.create(
+        usuario=compra.usuario, fecha_visita=hoy + timedelta(days=1), monto_total=Decimal("10000"),
+        forma_pago=Compra.FormasPago.TARJETA, estado_pago=Compra.EstadosPago.PAGADO,
+    )
+    de_manana = Entrada.objects.create(compra=otra, pase=primera.pase, edad_visitante=30, precio_calculado=Decimal("10000"))
+    sin_pagar = Entrada.objects.filter(compra__estado_pago=Compra.EstadosPago.PENDIENTE).get()
+    indice = ingresos.obtener_indice(hoy)
+    momento = timezone.now().replace(microsecond=0).isoformat()
+
+    conciliador = ConciliadorIngresos()
+    conciliador.agregar([f"{entrada_id},{hoy.isoformat()},{momento},norte" for entrada_id in (primera.id, de_manana.id, sin_pagar.id)])
+    resultado = conciliador.conciliar()
+
+    assert resultado.registrados == 1
+    conflictos = dict(resultado.conflictos)
+    assert set(conflictos) == {de_manana.id, sin_pagar.id}
+    assert "la compra es para el" in conflictos[de_manana.id] and "no está pagada" in conflictos[sin_pagar.id]
+    assert set(Entrada.objects.filter(fecha_ingreso__isnull=False).values_list('id', flat=True)) == {primera.id}
+    # Al índice del día solo llega el ingreso registrado
+    assert indice.estado()["usadas"] == 1
+
+
+def test_conciliar_dos_veces_no_cambia_nada(compra, ruta_instantanea, tmp_path):
+    validador = ValidadorOffline(ruta_instantanea, str(tmp_path / "bitacora.csv"))
+    validador.validar(tokens(compra)[0])
+    validador.cerrar()
+
+    resultados = []
+    for _ in range(2):
+        conciliador = ConciliadorIngresos()
+        conciliador.agregar((tmp_path / "bitacora.csv").read_text().splitlines())
+        resultados.append(conciliador.conciliar())
+
+    assert (resultados[0].registrados, resultados[1].registrados, resultados[1].ya_registrados) == (1, 0, 1)
+
+
+def test_conciliar_avisa_al_indice_del_dia(compra, ruta_instantanea, hoy, tmp_path):
+    token = tokens(compra)[0]
+    indice = ingresos.obtener_indice(hoy)
+    validador = ValidadorOffline(ruta_instantanea, str(tmp_path / "bitacora.csv"))
+    validador.validar(token)
+    validador.cerrar()
+
+    conciliador = ConciliadorIngresos()
+    conciliador.agregar((tmp_path / "bitacora.csv").read_text().splitlines())
+    conciliador.conciliar()
+
+    assert indice.validar(token).resultado == ingresos.USADA
+
+
+# --- PRUEBAS DE INTEGRACIÓN: COMANDOS Y API ---
+
+def test_comandos_exportar_y_conciliar(compra, hoy, tmp_path):
+    ruta = str(tmp_path / "ingresos.bin")
+    salida = io.StringIO()
+    call_command('exportar_instantanea', ruta, '--fecha', hoy.isoformat(), stdout=salida)
+    assert "con 3 entradas" in salida.getvalue()
+
+    validador = ValidadorOffline(ruta, str(tmp_path / "bitacora.csv"))
+    validador.validar(tokens(compra)[1])
+    validador.cerrar()
+    salida = io.StringIO()
+    call_command('conciliar_ingresos', str(tmp_path / "bitacora.csv"), stdout=salida)
+
+    assert "Registrados 1 ingresos de 1 líneas" in salida.getvalue()
+    assert Entrada.objects.filter(fecha_ingreso__isnull=False).count() == 1
+
+
+def test_api_instantanea_y_conciliar(compra, hoy, tmp_path):
+    cliente = APIClient()
+    cliente.force_authenticate(user=User.objects.create_user(username="boleteria", email="boleteria@example.com", is_staff=True))
+
+    respuesta = cliente.get("/api/ingresos/instantanea/", {"fecha": hoy.isoformat()})
+    ruta = tmp_path / "descargada.bin"
+    ruta.write_bytes(b"".join(respuesta.streaming_content))
+    validador = ValidadorOffline(str(ruta), str(tmp_path / "bitacora.csv"))
+    validador.validar(tokens(compra)[0])
+    validador.cerrar()
+    conciliacion = cliente.post(
+        "/api/ingresos/conciliar/", {"archivo": SimpleUploadedFile("bitacora.csv", (tmp_path / "bitacora.csv").read_bytes())},
+        format="multipart",
+    )
+
+    assert respuesta.status_code == 200 and respuesta["Content-Disposition"].endswith(f'"ingresos-{hoy.isoformat()}.bin"')
+    assert conciliacion.status_code == 200 and conciliacion.json()["registrados"] == 1
+    assert cliente.get("/api/ingresos/instantanea/", {"fecha": "2024-13-01"}).status_code == 400
+    assert cliente.post("/api/ingresos/conciliar/", {}, format="multipart").status_code == 400
+
+
+def test_api_instantanea_y_conciliar_solo_para_el_personal(compra, hoy, tmp_path):
+    visitante = APIClient()
+    visitante.force_authenticate(user=compra.usuario)
+    bitacora = f"{compra.entradas.first().id},{hoy.isoformat()},{timezone.now().isoformat()},norte\n".encode()
+
+    for cliente in (APIClient(), visitante):
+        assert cliente.get("/api/ingresos/instantanea/", {"fecha": hoy.isoformat()}).status_code == 403
+        conciliacion = cliente.post(
+            "/api/ingresos/conciliar/", {"archivo": SimpleUploadedFile("bitacora.csv", bitacora)}, format="multipart",
+        )
+        assert conciliacion.status_code == 403
+    assert Entrada.objects.filter(fecha_ingreso__isnull=False).count() == 0
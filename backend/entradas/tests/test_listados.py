@@ -0,0 +1,109 @@
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Pase, Compra, Entrada
+
+
+@pytest.fixture
+def compras(db):
+    """30 compras con fecha_compra repetida de a pares, para probar empates en el cursor."""
+    usuarios = [User.objects.create_user(username=f"usuario{i}") for i in range(2)]
+    pase = Pase.objects.create(nombre="Regular", precio=Decimal("5000"))
+    ahora = timezone.now()
+    compras = []
+    for i in range(30):
+        compra = Compra.objects.create(
+            usuario=usuarios[i % 2],
+            fecha_compra=ahora - timedelta(minutes=i // 2),
+            fecha_visita=date(2030, 1, 2) + timedelta(days=i % 3),
+            monto_total=Decimal("5000"),
+            forma_pago=Compra.FormasPago.TARJETA if i % 2 else Compra.FormasPago.EFECTIVO,
+            estado_pago=Compra.EstadosPago.PENDIENTE if i % 5 == 0 else Compra.EstadosPago.PAGADO,
+        )
+        Entrada.objects.create(compra=compra, pase=pase, edad_visitante=30, precio_calculado=Decimal("5000"))
+        compras.append(compra)
+    return compras
+
+
+def _recorrer(client, url):
+    ids = []
+    while url:
+        respuesta = client.get(url)
+        assert respuesta.status_code == 200
+        ids += [fila["id"] for fila in respuesta.data["results"]]
+        url = respuesta.data["next"]
+    return ids
+
+
+# --- PRUEBAS DE INTEGRACIÓN: PAGINACIÓN POR CURSOR ---
+
+@pytest.mark.django_db
+def test_paginacion_recorre_todas_las_compras_sin_repetir(compras):
+    ids = _recorrer(APIClient(), "/api/compras/?page_size=7")
+
+    esperados = [c.id for c in sorted(compras, key=lambda c: (c.fecha_compra, c.id), reverse=True)]
+    assert ids == esperados
+
+
+@pytest.mark.django_db
+def test_paginacion_con_muchas_compras_en_la_misma_fecha_compra(compras):
+    """Más empates que el tamaño de página: el cursor avanza con OFFSET dentro de la misma fecha_compra."""
+    Compra.objects.filter(id__in=[c.id for c in compras[5:25]]).update(fecha_compra=compras[5].fecha_compra)
+    esperados = list(Compra.objects.order_by("-fecha_compra", "-id").values_list("id", flat=True))
+    client = APIClient()
+
+    assert _recorrer(client, "/api/compras/?page_size=4") == esperados
+
+    # Y de vuelta desde la última página con los enlaces "previous"
+    url, ultima = "/api/compras/?page_size=4", None
+    while url:
+        ultima = client.get(url).data
+        url = ultima["next"]
+    ids = [fila["id"] for fila in ultima["results"]]
+    url = ultima["previous"]
+    while url:
+        respuesta = client.get(url).data
+        ids = [fila["id"] for fila in respuesta["results"]] + ids
+        url = respuesta["previous"]
+    assert ids == esperados
+
+
+@pytest.mark.django_db
+def test_paginacion_de_entradas(compras):
+    ids = _recorrer(APIClient(), "/api/entradas/?page_size=8")
+
+    assert ids == sorted(Entrada.objects.values_list("id", flat=True), reverse=True)
+
+
+# --- PRUEBAS DE INTEGRACIÓN: FILTROS ---
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("parametro, valor, campo", [
+    ("estado_pago", "PEN", "estado_pago"),
+    ("forma_pago", "TAR", "forma_pago"),
+    ("fecha_visita", "2030-01-03", "fecha_visita"),
+])
+def test_filtros_del_listado_de_compras(compras, parametro, valor, campo):
+    ids = _recorrer(APIClient(), f"/api/compras/?{parametro}={valor}")
+
+    assert set(ids) == set(Compra.objects.filter(**{campo: valor}).values_list("id", flat=True))
+
+
+@pytest.mark.django_db
+def test_filtro_por_usuario(compras):
+    usuario = compras[0].usuario
+    ids = _recorrer(APIClient(), f"/api/compras/?usuario={usuario.id}")
+
+    assert set(ids) == {c.id for c in compras if c.usuario_id == usuario.id}
+
+
+@pytest.mark.django_db
+def test_filtro_invalido_responde_400(compras):
+    respuesta = APIClient().get("/api/compras/?fecha_visita=no-es-fecha")
+
+    assert respuesta.status_code == 400
@@ -0,0 +1,179 @@
+import json
+import pstats
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import AsyncClient, override_settings
+from rest_framework.test import APIClient
+
+from ..metricas import Histograma, Medicion, RegistroMetricas, medicion_actual, medir_serializacion, registro
+from ..models import Pase, Compra
+
+
+# --- FIXTURES ---
+
+@pytest.fixture(autouse=True)
+def registro_limpio():
+    registro.reiniciar()
+    yield
+    registro.reiniciar()
+
+
+@pytest.fixture
+def pases(db):
+    return [Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+            Pase.objects.create(nombre="VIP", precio=Decimal("10000"))]
+
+
+@pytest.fixture
+def perfilado(tmp_path):
+    configuracion = {'HEADER': 'X-Perfilar', 'TOKEN': 'secreto', 'MUESTREO': 0.0, 'DIRECTORIO': str(tmp_path)}
+    with override_settings(PERFILADO=configuracion):
+        yield tmp_path
+
+
+def _lineas(prefijo):
+    return [linea for linea in registro.exportar().splitlines() if linea.startswith(prefijo)]
+
+
+# --- PRUEBAS UNITARIAS: HISTOGRAMAS Y EXPOSICIÓN ---
+
+def test_histograma_acumula_por_bucket():
+    histograma = Histograma((1, 5, float("inf")))
+    for valor in (0.5, 1, 3, 100):
+        histograma.observar(valor)
+
+    assert list(histograma.acumulados()) == [(1, 2), (5, 3), (float("inf"), 4)]
+    assert histograma.suma == 104.5
+    assert histograma.cantidad == 4
+
+
+def test_exportar_en_formato_prometheus():
+    registro_local = RegistroMetricas()
+    medicion = Medicion()
+    medicion.duracion, medicion.consultas = 0.02, 3
+    registro_local.registrar_request('pase-list', 'GET', 200, medicion)
+
+    texto = registro_local.exportar()
+
+    assert "# TYPE entradas_request_duracion_segundos histogram" in texto
+    assert 'entradas_request_duracion_segundos_bucket{vista="pase-list",metodo="GET",estado="200",le="0.01"} 0' in texto
+    assert 'entradas_request_duracion_segundos_bucket{vista="pase-list",metodo="GET",estado="200",le="0.025"} 1' in texto
+    assert 'entradas_request_duracion_segundos_count{vista="pase-list",metodo="GET",estado="200"} 1' in texto
+    assert 'entradas_request_consultas_db_sum{vista="pase-list"} 3' in texto
+    assert "entradas_perfiles_total 0" in texto
+
+
+def test_medir_serializacion_suma_a_la_medicion_en_curso():
+    with medir_serializacion():
+        pass  # Sin request en curso no hace nada
+
+    medicion = Medicion()
+    token = medicion_actual.set(medicion)
+    try:
+        for _ in range(2):
+            with medir_serializacion():
+                sum(range(10000))
+    finally:
+        medicion_actual.reset(token)
+
+    assert medicion.tiempo_serializacion > 0 and medicion.tiempo_render == 0
+
+
+# --- PRUEBAS DE INTEGRACIÓN: MIDDLEWARE ---
+
+@pytest.mark.django_db
+def test_requests_quedan_registrados_por_vista(pases):
+    cliente = APIClient()
+    cliente.get("/api/pases/")
+    cliente.get("/api/pases/")
+    cliente.get("/api/entradas/")
+
+    assert _lineas('entradas_request_duracion_segundos_count{vista="pase-list",metodo="GET",estado="200"} 2')
+    assert _lineas('entradas_request_duracion_segundos_count{vista="entrada-list",metodo="GET",estado="200"} 1')
+
+
+@pytest.mark.django_db
+def test_cuenta_consultas_y_tiempo_de_render(pases, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        APIClient().get("/api/entradas/")
+
+    assert _lineas('entradas_request_consultas_db_sum{vista="entrada-list"} 1')
+    assert _lineas('entradas_request_db_segundos_count{vista="entrada-list"} 1')
+    assert _lineas('entradas_request_serializacion_segundos_count{vista="entrada-list"} 1')
+    assert _lineas('entradas_request_render_segundos_count{vista="entrada-list"} 1')
+
+
+@pytest.mark.django_db
+def test_tiempo_del_model_serializer_aparte_del_render(pases):
+    usuario = User.objects.create_user(username="juan", email="juan@example.com")
+    compra = Compra.objects.create(
+        usuario=usuario, fecha_visita=datetime.now().date(), monto_total=Decimal("5000"), forma_pago=Compra.FormasPago.EFECTIVO,
+    )
+
+    respuesta = APIClient().get(f"/api/compras/{compra.id}/")
+
+    assert respuesta.status_code == 200
+    serializacion = _lineas('entradas_request_serializacion_segundos_sum{vista="compra-detail"}')
+    render = _lineas('entradas_request_render_segundos_sum{vista="compra-detail"}')
+    assert serializacion and float(serializacion[0].split()[-1]) > 0
+    assert render and float(render[0].split()[-1]) > 0
+
+
+@pytest.mark.django_db
+def test_endpoint_de_metricas(pases):
+    cliente = APIClient()
+    cliente.get("/api/pases/")
+
+    respuesta = cliente.get("/metricas/")
+
+    assert respuesta.status_code == 200
+    assert respuesta["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'vista="pase-list"' in respuesta.content.decode()
+
+
+@pytest.mark.django_db
+def test_checkout_async_queda_registrado(pases):
+    fecha = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    cliente = AsyncClient()
+    cliente.force_login(User.objects.create_user(username="juan", email="juan@example.com", password="x"))
+    carrito = {"fecha_visita": fecha.isoformat(), "tipo_pago": "Tarjeta", "visitantes": [{"edad": 30, "tipo_pase": "Regular"}]}
+
+    respuesta = async_to_sync(cliente.post)("/api/compras/checkout-async/", json.dumps(carrito), content_type="application/json")
+
+    assert respuesta.status_code == 201
+    consultas = _lineas('entradas_request_consultas_db_sum{vista="compra-checkout-async"}')
+    assert consultas and float(consultas[0].split()[-1]) > 0
+
+
+# --- PRUEBAS DE INTEGRACIÓN: PERFILADO ---
+
+@pytest.mark.django_db
+def test_header_con_token_guarda_perfil(pases, perfilado):
+    respuesta = APIClient().get("/api/pases/", HTTP_X_PERFILAR="secreto")
+
+    archivo = perfilado / respuesta["X-Perfil"]
+    assert archivo.exists()
+    assert pstats.Stats(str(archivo)).total_calls > 0
+    assert "entradas_perfiles_total 1" in registro.exportar()
+
+
+@pytest.mark.django_db
+def test_header_sin_token_valido_no_perfila(pases, perfilado):
+    respuesta = APIClient().get("/api/pases/", HTTP_X_PERFILAR="otro")
+
+    assert "X-Perfil" not in respuesta
+    assert not list(perfilado.iterdir())
+
+
+@pytest.mark.django_db
+def test_muestreo_perfila_sin_header(pases, perfilado):
+    with override_settings(PERFILADO={'HEADER': 'X-Perfilar', 'TOKEN': '', 'MUESTREO': 1.0, 'DIRECTORIO': str(perfilado)}):
+        respuesta = APIClient().get("/api/pases/")
+
+    assert (perfilado / respuesta["X-Perfil"]).exists()
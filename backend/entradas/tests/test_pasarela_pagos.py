@@ -0,0 +1,291 @@
+import asyncio
+import pytest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import requests
+
+from ..excepciones import TimeoutError, ConnectionError, PagoRechazadoError
+from ..pasarela_pagos import CircuitBreaker, ClientePasarelaPagos
+from .pasarela_falsa import PasarelaFalsa
+
+
+@pytest.fixture
+def pasarela():
+    pasarela = PasarelaFalsa().iniciar()
+    yield pasarela
+    pasarela.detener()
+
+
+@pytest.fixture
+def cliente(pasarela):
+    return ClientePasarelaPagos(pasarela.url, plazo=1.0, reintentos=2,
+                                breaker=CircuitBreaker(umbral_fallos=3, tiempo_apertura=60))
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+# --- PRUEBAS UNITARIAS: CIRCUIT BREAKER ---
+
+def test_breaker_se_abre_tras_fallos_seguidos_y_se_recupera():
+    reloj = Reloj()
+    breaker = CircuitBreaker(umbral_fallos=2, tiempo_apertura=10, reloj=reloj)
+
+    breaker.registrar_fallo()
+    assert breaker.permitir() is True
+    breaker.registrar_fallo()
+    assert breaker.estado == CircuitBreaker.ABIERTO
+    assert breaker.permitir() is False
+
+    reloj.ahora = 10
+    assert breaker.permitir() is True  # Llamada de prueba
+    assert breaker.permitir() is False  # Solo una a la vez
+    breaker.registrar_exito()
+    assert breaker.estado == CircuitBreaker.CERRADO
+
+
+def test_breaker_semiabierto_vuelve_a_abrirse_si_la_prueba_falla():
+    reloj = Reloj()
+    breaker = CircuitBreaker(umbral_fallos=1, tiempo_apertura=10, reloj=reloj)
+    breaker.registrar_fallo()
+
+    reloj.ahora = 10
+    assert breaker.permitir() is True
+    breaker.registrar_fallo()
+
+    assert breaker.estado == CircuitBreaker.ABIERTO
+
+
+def test_breaker_libera_la_prueba_si_la_llamada_termina_sin_registrar():
+    reloj = Reloj()
+    breaker = CircuitBreaker(umbral_fallos=1, tiempo_apertura=10, reloj=reloj)
+    breaker.registrar_fallo()
+    reloj.ahora = 10
+
+    with pytest.raises(RuntimeError):
+        with breaker.llamada():
+            raise RuntimeError("error no previsto")
+
+    assert breaker.estado == CircuitBreaker.SEMIABIERTO
+    assert breaker.permitir() is True
+
+
+# --- PRUEBAS DE INTEGRACIÓN: CLIENTE CONTRA LA PASARELA FALSA ---
+
+def test_pago_aprobado(cliente, pasarela):
+    assert cliente.procesar_pago(monto=Decimal("15000")) is True
+    assert pasarela.requests[0]['cuerpo']['transaction_amount'] == "15000"
+
+
+def test_pago_rechazado(cliente, pasarela):
+    pasarela.estado_pago = 'rejected'
+
+    assert cliente.procesar_pago(monto=Decimal("15000")) is False
+
+
+def test_reintenta_errores_5xx_con_la_misma_clave_de_idempotencia(cliente, pasarela):
+    pasarela.errores = [503, 502]
+
+    assert cliente.procesar_pago(monto=Decimal("100")) is True
+    claves = {r['idempotency_key'] for r in pasarela.requests}
+    assert len(pasarela.requests) == 3
+    assert len(claves) == 1
+
+
+def test_rechazo_explicito_no_se_reintenta(cliente, pasarela):
+    pasarela.errores = [402]
+
+    with pytest.raises(PagoRechazadoError):
+        cliente.procesar_pago(monto=Decimal("100"))
+    assert len(pasarela.requests) == 1
+
+
+def test_error_4xx_no_es_un_rechazo_ni_se_reintenta(cliente, pasarela):
+    pasarela.errores = [400]
+
+    with pytest.raises(ConnectionError, match="400"):
+        cliente.procesar_pago(monto=Decimal("100"))
+    assert len(pasarela.requests) == 1
+    assert cliente.breaker.estado == CircuitBreaker.CERRADO
+
+
+@pytest.mark.parametrize("codigo", [408, 409, 429])
+def test_errores_4xx_pasajeros_se_reintentan(cliente, pasarela, codigo):
+    pasarela.errores = [codigo, codigo]
+
+    assert cliente.procesar_pago(monto=Decimal("100")) is True
+    assert len(pasarela.requests) == 3
+    assert len({r['idempotency_key'] for r in pasarela.requests}) == 1
+
+
+@pytest.mark.parametrize("codigo", [401, 403])
+def test_credenciales_rechazadas_cuentan_como_fallo_del_breaker(cliente, pasarela, codigo):
+    pasarela.errores = [codigo] * 3
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError, match="credenciales"):
+            cliente.procesar_pago(monto=Decimal("100"))
+
+    assert len(pasarela.requests) == 3
+    assert cliente.breaker.estado == CircuitBreaker.ABIERTO
+
+
+def test_respeta_el_plazo_total_con_pasarela_lenta(cliente, pasarela):
+    pasarela.latencia = 0.5
+    cliente.plazo = 0.3
+
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError):
+        cliente.procesar_pago(monto=Decimal("100"))
+    assert time.monotonic() - inicio < 0.6
+
+
+def test_breaker_corta_sin_llamar_a_la_pasarela_degradada(cliente, pasarela):
+    pasarela.errores = [500] * 9
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            cliente.procesar_pago(monto=Decimal("100"))
+    llamadas = len(pasarela.requests)
+
+    inicio = time.monotonic()
+    with pytest.raises(ConnectionError, match="no está disponible"):
+        cliente.procesar_pago(monto=Decimal("100"))
+
+    assert len(pasarela.requests) == llamadas
+    assert time.monotonic() - inicio < 0.01
+
+
+def test_respuesta_que_no_es_json_se_reintenta(cliente, pasarela):
+    pasarela.respuestas_invalidas = 1
+
+    assert cliente.procesar_pago(monto=Decimal("100")) is True
+    assert len(pasarela.requests) == 2
+    assert len({r['idempotency_key'] for r in pasarela.requests}) == 1
+
+    pasarela.respuestas_invalidas = 3
+    with pytest.raises(ConnectionError, match="JSON"):
+        cliente.procesar_pago(monto=Decimal("100"))
+
+
+def test_cualquier_error_de_requests_se_informa_como_conexion(cliente, monkeypatch):
+    def cortada(*args, **kwargs):
+        raise requests.exceptions.ChunkedEncodingError("conexión cortada a mitad de la respuesta")
+    monkeypatch.setattr(cliente.session, "request", cortada)
+
+    with pytest.raises(ConnectionError):
+        cliente.procesar_pago(monto=Decimal("100"))
+
+
+def test_llamada_de_prueba_con_error_no_previsto_no_traba_el_breaker(pasarela, monkeypatch):
+    reloj = Reloj()
+    cliente = ClientePasarelaPagos(pasarela.url, plazo=1.0, reintentos=0,
+                                   breaker=CircuitBreaker(umbral_fallos=1, tiempo_apertura=10, reloj=reloj))
+    cliente.breaker.registrar_fallo()
+    reloj.ahora = 10
+    with monkeypatch.context() as parche:
+        parche.setattr(cliente.session, "request", lambda *a, **k: (_ for _ in ()).throw(RuntimeError("no previsto")))
+        with pytest.raises(RuntimeError):
+            cliente.procesar_pago(monto=Decimal("100"))
+
+    assert cliente.procesar_pago(monto=Decimal("100")) is True
+    assert cliente.breaker.estado == CircuitBreaker.CERRADO
+
+
+def test_pasarela_lenta_no_retiene_hilos_mas_alla_del_plazo(pasarela):
+    """Con la pasarela colgada, cada hilo se libera al vencer el plazo y luego el breaker corta al instante."""
+    pasarela.latencia = 2.0
+    cliente = ClientePasarelaPagos(pasarela.url, plazo=0.2, reintentos=0,
+                                   breaker=CircuitBreaker(umbral_fallos=5, tiempo_apertura=60))
+
+    def pagar(_):
+        inicio = time.monotonic()
+        try:
+            cliente.procesar_pago(monto=Decimal("100"))
+        except (TimeoutError, ConnectionError):
+            pass
+        return time.monotonic() - inicio
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        duraciones = list(pool.map(pagar, range(40)))
+
+    assert max(duraciones) < 0.5
+
+
+# --- PRUEBAS DE INTEGRACIÓN: CLIENTE ASYNC ---
+
+def correr(cliente, corutina):
+    """Corre la corutina en un event loop nuevo y cierra la sesión async del cliente al terminar."""
+    async def principal():
+        try:
+            return await corutina
+        finally:
+            await cliente.cerrar_async()
+    return asyncio.run(principal())
+
+
+def test_pago_async_aprobado_y_reintento_con_la_misma_clave(cliente, pasarela):
+    pasarela.errores = [503]
+
+    assert correr(cliente, cliente.procesar_pago_async(monto=Decimal("100"))) is True
+    assert len(pasarela.requests) == 2
+    assert len({r['idempotency_key'] for r in pasarela.requests}) == 1
+
+
+def test_pago_async_respeta_el_plazo_total(cliente, pasarela):
+    pasarela.latencia = 0.5
+    cliente.plazo = 0.3
+
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError):
+        correr(cliente, cliente.procesar_pago_async(monto=Decimal("100")))
+    assert time.monotonic() - inicio < 0.6
+
+
+def test_pago_async_error_4xx_no_se_reintenta(cliente, pasarela):
+    pasarela.errores = [402, 400]
+
+    with pytest.raises(PagoRechazadoError):
+        correr(cliente, cliente.procesar_pago_async(monto=Decimal("100")))
+    with pytest.raises(ConnectionError, match="400"):
+        correr(cliente, cliente.procesar_pago_async(monto=Decimal("100")))
+    assert len(pasarela.requests) == 2
+
+
+def test_pago_async_reintenta_429(cliente, pasarela):
+    pasarela.errores = [429]
+
+    assert correr(cliente, cliente.procesar_pago_async(monto=Decimal("100"))) is True
+    assert len(pasarela.requests) == 2
+
+
+def test_pago_async_respuesta_que_no_es_json_se_reintenta(cliente, pasarela):
+    pasarela.respuestas_invalidas = 1
+
+    assert correr(cliente, cliente.procesar_pago_async(monto=Decimal("100"))) is True
+    assert len(pasarela.requests) == 2
+
+    pasarela.respuestas_invalidas = 3
+    with pytest.raises(ConnectionError):
+        correr(cliente, cliente.procesar_pago_async(monto=Decimal("100")))
+
+
+def test_cientos_de_pagos_async_en_vuelo_en_un_solo_hilo(cliente, pasarela):
+    """Con la pasarela lenta, 200 pagos simultáneos tardan lo que uno: ninguno ocupa un hilo mientras espera."""
+    pasarela.latencia = 0.3
+
+    async def pagar_todos():
+        return await asyncio.gather(*(cliente.procesar_pago_async(monto=Decimal("100")) for _ in range(200)))
+
+    inicio = time.monotonic()
+    resultados = correr(cliente, pagar_todos())
+
+    assert all(resultados)
+    assert time.monotonic() - inicio < 2.0
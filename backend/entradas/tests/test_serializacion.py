@@ -0,0 +1,92 @@
+import json
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from ..api.renderers import ORJSONRenderer
+from ..api.serializers import (
+    PaseSerializer, CompraSerializer, EntradaSerializer,
+    PaseListaSerializer, CompraListaSerializer, EntradaListaSerializer,
+)
+from ..models import Pase, Compra, Entrada
+
+
+@pytest.fixture
+def compras(db):
+    usuario = User.objects.create_user(username="josé", email="jose@example.com")
+    pases = [Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+             Pase.objects.create(nombre="VIP", precio=Decimal("10000.50"))]
+    compras = []
+    for i in range(5):
+        compra = Compra.objects.create(
+            usuario=usuario, fecha_visita=date(2030, 1, 2) + timedelta(days=i), monto_total=Decimal("15000.50"),
+            forma_pago=Compra.FormasPago.TARJETA, estado_pago=Compra.EstadosPago.PAGADO,
+        )
+        for j in range(i):
+            Entrada.objects.create(compra=compra, pase=pases[j % 2], edad_visitante=j, precio_calculado=Decimal("0"))
+        compras.append(compra)
+    return compras
+
+
+# --- PRUEBAS UNITARIAS: SERIALIZERS LIVIANOS ---
+
+@pytest.mark.django_db
+def test_compra_liviana_igual_al_model_serializer(compras):
+    completo = CompraSerializer(Compra.objects.all(), many=True).data
+    liviano = CompraListaSerializer(Compra.objects.values(*CompraListaSerializer.columnas)).data
+
+    assert json.loads(JSONRenderer().render(liviano)) == json.loads(JSONRenderer().render(completo))
+
+
+@pytest.mark.django_db
+def test_entrada_liviana_igual_al_model_serializer(compras):
+    completo = EntradaSerializer(Entrada.objects.order_by('id'), many=True).data
+    liviano = EntradaListaSerializer(Entrada.objects.order_by('id').values(*EntradaListaSerializer.columnas)).data
+
+    assert json.loads(JSONRenderer().render(liviano)) == json.loads(JSONRenderer().render(completo))
+
+
+@pytest.mark.django_db
+def test_pase_liviano_igual_al_model_serializer(compras):
+    completo = PaseSerializer(Pase.objects.order_by('id'), many=True).data
+    liviano = PaseListaSerializer(Pase.objects.order_by('id').values(*PaseListaSerializer.columnas)).data
+
+    assert liviano == [dict(pase) for pase in completo]
+
+
+@pytest.mark.django_db
+def test_listado_de_compras_en_dos_consultas(compras, django_assert_num_queries):
+    with django_assert_num_queries(2):
+        respuesta = APIClient().get("/api/compras/")
+
+    assert len(respuesta.data["results"]) == 5
+
+
+# --- PRUEBAS UNITARIAS: RENDERER Y PARSER ORJSON ---
+
+@pytest.mark.django_db
+def test_orjson_renderiza_los_mismos_bytes_que_drf(compras):
+    datos = CompraSerializer(Compra.objects.all(), many=True).data
+
+    assert ORJSONRenderer().render(datos) == JSONRenderer().render(datos)
+
+
+def test_orjson_resuelve_tipos_no_nativos_como_drf():
+    datos = {"monto": Decimal("12.50"), 1: "clave numérica"}
+
+    assert json.loads(ORJSONRenderer().render(datos)) == json.loads(JSONRenderer().render(datos))
+
+
+@pytest.mark.django_db
+def test_api_responde_y_parsea_con_orjson(compras):
+    cliente = APIClient()
+    respuesta = cliente.post("/api/pases/", '{"nombre": "Familiar", "precio": "8000"}', content_type="application/json")
+    assert respuesta.status_code == 201
+
+    respuesta = cliente.post("/api/pases/", '{"nombre": ', content_type="application/json")
+    assert respuesta.status_code == 400
+    assert "JSON parse error" in respuesta.json()["detail"]
@@ -0,0 +1,170 @@
+import pytest
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import override_settings
+
+from ..models import Pase
+from ..tarifas import CLAVE_VERSION, TablaTarifas, obtener_tabla
+
+
+# --- PRUEBAS UNITARIAS: TABLA DE TARIFAS ---
+
+@pytest.mark.parametrize("edad, tipo_pase, esperado", [
+    (0, "Regular", Decimal("0")),
+    (2, "VIP", Decimal("0")),
+    (3, "Regular", Decimal("2500")),
+    (9, "VIP", Decimal("5000")),
+    (10, "Regular", Decimal("5000")),
+    (60, "VIP", Decimal("10000")),
+    (61, "Regular", Decimal("2500")),
+    (120, "VIP", Decimal("5000")),
+])
+def test_tabla_aplica_bandas_de_edad(edad, tipo_pase, esperado):
+    tabla = TablaTarifas({"Regular": 5000, "VIP": 10000})
+    assert tabla.precio(edad, tipo_pase) == esperado
+
+
+def test_tabla_pase_desconocido_falla():
+    tabla = TablaTarifas({"Regular": 5000})
+    with pytest.raises(ValueError, match="no es válido"):
+        tabla.precio(30, "Premium")
+
+
+def test_tabla_edad_fuera_de_rango_falla():
+    tabla = TablaTarifas({"Regular": 5000})
+    with pytest.raises(ValueError):
+        tabla.precio(121, "Regular")
+
+
+# --- PRUEBAS DE INTEGRACIÓN: CACHÉ E INVALIDACIÓN ---
+
+@pytest.mark.django_db
+def test_tabla_usa_precios_de_pase_y_no_consulta_la_base(django_assert_num_queries):
+    Pase.objects.create(nombre="Regular", precio=Decimal("6000"))
+
+    with django_assert_num_queries(1):
+        obtener_tabla()
+    with django_assert_num_queries(0):
+        for edad in range(100):
+            obtener_tabla().precio(edad, "Regular")
+
+    assert obtener_tabla().precio(30, "Regular") == Decimal("6000")
+
+
+@pytest.mark.django_db
+def test_cambio_de_pase_invalida_la_tabla(django_capture_on_commit_callbacks):
+    pase = Pase.objects.create(nombre="VIP", precio=Decimal("10000"))
+    version = obtener_tabla().version
+
+    with django_capture_on_commit_callbacks(execute=True):
+        pase.precio = Decimal("12000")
+        pase.save()
+
+    tabla = obtener_tabla()
+    assert tabla.version > version
+    assert tabla.precio(30, "VIP") == Decimal("12000")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        pase.delete()
+    assert "VIP" not in obtener_tabla().tipos_pase
+
+
+@pytest.mark.django_db
+def test_la_tabla_se_invalida_recien_al_confirmar_la_transaccion(django_capture_on_commit_callbacks):
+    """Mientras la transacción que cambia el precio no se confirma, otro request no reconstruye la tabla con el precio viejo."""
+    pase = Pase.objects.create(nombre="VIP", precio=Decimal("10000"))
+    tabla = obtener_tabla()
+
+    with django_capture_on_commit_callbacks(execute=True) as al_confirmar:
+        pase.precio = Decimal("12000")
+        pase.save()
+        assert obtener_tabla() is tabla
+
+    assert len(al_confirmar) == 2
+    assert obtener_tabla().precio(30, "VIP") == Decimal("12000")
+
+
+@pytest.mark.django_db
+def test_invalidar_en_otro_proceso_llega_por_la_cache_compartida(django_assert_num_queries):
+    configuracion = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "catalogo": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tarifas-test"},
+    }
+    pase = Pase.objects.create(nombre="VIP", precio=Decimal("10000"))
+    with override_settings(CACHES=configuracion, CATALOGO_PASES={"CACHE": "catalogo"}):
+        tabla = obtener_tabla()
+        with django_assert_num_queries(0):
+            assert obtener_tabla() is tabla
+
+        # Otro worker guarda el precio nuevo e invalida: acá solo cambia la versión compartida
+        Pase.objects.filter(id=pase.id).update(precio=Decimal("12000"))
+        caches["catalogo"].set(CLAVE_VERSION, tabla.version + 1, timeout=None)
+
+        assert obtener_tabla().precio(30, "VIP") == Decimal("12000")
+
+
+# --- PRUEBAS UNITARIAS: COTIZACIÓN POR LOTE ---
+
+@pytest.fixture
+def tabla():
+    return TablaTarifas({"Regular": 5000, "VIP": 10000})
+
+
+@pytest.fixture
+def grupo():
+    """Todas las combinaciones de edad y pase, para comparar contra el cálculo escalar."""
+    edades = [edad for edad in range(0, 121) for _ in ("Regular", "VIP")]
+    tipos_pase = [tipo for _ in range(0, 121) for tipo in ("Regular", "VIP")]
+    return edades, tipos_pase
+
+
+def test_cotizar_lote_coincide_con_calculo_escalar(tabla, grupo):
+    edades, tipos_pase = grupo
+    cotizacion = tabla.cotizar_lote(edades, tipos_pase)
+
+    esperados = [tabla.precio(e, t) for e, t in zip(edades, tipos_pase)]
+    assert cotizacion.precios == esperados
+    assert cotizacion.total == sum(esperados)
+
+
+def test_cotizar_lote_sin_numpy_coincide_con_calculo_escalar(tabla, grupo, monkeypatch):
+    from .. import tarifas
+    monkeypatch.setattr(tarifas, "np", None)
+    edades, tipos_pase = grupo
+
+    cotizacion = tabla.cotizar_lote(edades, tipos_pase)
+
+    assert cotizacion.precios == [tabla.precio(e, t) for e, t in zip(edades, tipos_pase)]
+
+
+def test_cotizar_lote_pase_desconocido_falla(tabla):
+    with pytest.raises(ValueError, match="'Premium' no es válido"):
+        tabla.cotizar_lote([30, 40], ["Regular", "Premium"])
+
+
+def test_cotizar_lote_edad_fuera_de_rango_falla(tabla):
+    with pytest.raises(ValueError):
+        tabla.cotizar_lote([30, 200], ["Regular", "VIP"])
+
+
+def test_cotizar_lote_columnas_desalineadas_falla(tabla):
+    with pytest.raises(ValueError, match="mismo largo"):
+        tabla.cotizar_lote([30, 40], ["Regular"])
+
+
+@pytest.mark.django_db
+def test_endpoint_cotizar_grupo():
+    from rest_framework.test import APIClient
+    Pase.objects.create(nombre="Regular", precio=Decimal("5000"))
+    Pase.objects.create(nombre="VIP", precio=Decimal("10000"))
+
+    respuesta = APIClient().post(
+        "/api/pases/cotizar/",
+        {"edades": [2, 8, 35, 65], "tipos_pase": ["Regular", "Regular", "VIP", "VIP"]},
+        format="json",
+    )
+
+    assert respuesta.status_code == 200
+    assert respuesta.data["total"] == "17500.00"
+    assert respuesta.data["precios"] == ["0.00", "2500.00", "10000.00", "5000.00"]
@@ -0,0 +1,139 @@
+import json
+import logging
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import Mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from ..excepciones import PagoRechazadoError
+from ..models import Pase
+from ..servicio_compra import ServicioCompraEntradas
+from ..servicio_compra_async import ServicioCompraEntradasAsync
+from ..servicios_externos import PasarelaPagosSimulada
+from ..trazas import TRAMO_NULO, FormatoJSON, tramo
+
+
+# --- FIXTURES ---
+
+@pytest.fixture
+def trazas(caplog):
+    """Trazas habilitadas (sin OpenTelemetry), con los tramos capturados en caplog."""
+    with override_settings(TRAZAS={'HABILITADAS': True, 'OTEL': False}):
+        with caplog.at_level(logging.INFO, logger="entradas.trazas"):
+            yield caplog
+
+
+@pytest.fixture
+def usuario(db):
+    Pase.objects.create(nombre="Regular", precio=Decimal("5000"))
+    Pase.objects.create(nombre="VIP", precio=Decimal("10000"))
+    return User.objects.create_user(username="juan", email="juan@example.com")
+
+
+@pytest.fixture
+def fecha_visita():
+    fecha = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    return fecha.isoformat()
+
+
+VISITANTES = [{"edad": 30, "tipo_pase": "Regular"}, {"edad": 8, "tipo_pase": "VIP"}]
+
+
+def tramos(caplog):
+    return [registro.tramo for registro in caplog.records if hasattr(registro, "tramo")]
+
+
+# --- PRUEBAS UNITARIAS: TRAMOS ---
+
+def test_deshabilitadas_devuelven_el_tramo_nulo(caplog):
+    with override_settings(TRAZAS={'HABILITADAS': False, 'OTEL': False}):
+        with tramo("compra") as actual:
+            actual.anotar(compra_id=1)
+
+    assert actual is TRAMO_NULO
+    assert not tramos(caplog)
+
+
+def test_tramos_anidados_comparten_traza(trazas):
+    with tramo("externo", canal="web"):
+        with tramo("interno"):
+            pass
+
+    interno, externo = tramos(trazas)
+    assert interno["nombre"] == "interno" and externo["nombre"] == "externo"
+    assert interno["traza"] == externo["traza"]
+    assert interno["padre"] == externo["id"]
+    assert externo["padre"] is None
+    assert externo["canal"] == "web"
+
+
+def test_tramo_con_error_registra_el_resultado(trazas):
+    with pytest.raises(ValueError):
+        with tramo("falla"):
+            raise ValueError("boom")
+
+    registro, = tramos(trazas)
+    assert registro["resultado"] == "error"
+    assert registro["error"] == "ValueError"
+
+
+def test_formato_json(trazas):
+    with tramo("compra.pago", monto=Decimal("15000")):
+        pass
+
+    linea = json.loads(FormatoJSON().format(trazas.records[0]))
+    assert linea["nombre"] == "compra.pago"
+    assert linea["monto"] == "15000"
+    assert linea["duracion_ms"] >= 0
+
+
+# --- PRUEBAS DE INTEGRACIÓN: SERVICIO DE COMPRA ---
+
+@pytest.mark.django_db
+def test_compra_emite_un_tramo_por_etapa(trazas, usuario, fecha_visita):
+    servicio = ServicioCompraEntradas(PasarelaPagosSimulada(), None)
+
+    compra = servicio.comprar_entradas(usuario, 2, fecha_visita, "Tarjeta", VISITANTES)
+
+    registros = tramos(trazas)
+    assert [r["nombre"] for r in registros] == [
+        "compra.validacion", "compra.precios", "compra.reserva_cupo", "compra.registro", "compra.pago",
+        "compra.confirmacion_pago", "compra",
+    ]
+    raiz = registros[-1]
+    assert raiz["compra_id"] == compra.id and raiz["resultado"] == "ok"
+    assert all(r["padre"] == raiz["id"] for r in registros[:-1])
+    assert sum(r["duracion_ms"] for r in registros[:-1]) <= raiz["duracion_ms"]
+
+
+@pytest.mark.django_db
+def test_pago_rechazado_marca_la_etapa_con_error(trazas, usuario, fecha_visita):
+    servicio = ServicioCompraEntradas(Mock(procesar_pago=Mock(return_value=False)), None)
+
+    with pytest.raises(PagoRechazadoError):
+        servicio.comprar_entradas(usuario, 2, fecha_visita, "Tarjeta", VISITANTES)
+
+    resultados = {r["nombre"]: r["resultado"] for r in tramos(trazas)}
+    assert resultados["compra.pago"] == "error"
+    assert resultados["compra.liberar_cupo"] == "ok"
+    assert resultados["compra"] == "error"
+    # La compra se registró antes de cobrar y se anuló con el rechazo
+    assert resultados["compra.registro"] == "ok"
+    assert "compra.confirmacion_pago" not in resultados
+
+
+@pytest.mark.django_db
+def test_compra_async_emite_tramos(trazas, usuario, fecha_visita):
+    servicio = ServicioCompraEntradasAsync(PasarelaPagosSimulada(), None)
+
+    async_to_sync(servicio.comprar_entradas)(usuario, 2, fecha_visita, "Tarjeta", VISITANTES)
+
+    registros = tramos(trazas)
+    assert registros[-1]["nombre"] == "compra" and registros[-1]["modo"] == "async"
+    assert {r["traza"] for r in registros} == {registros[-1]["traza"]}
@@ -0,0 +1,237 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from ..excepciones import ConnectionError
+from ..models import Pase, Compra, Entrada, VentasDiarias
+from ..servicio_compra import ServicioCompraEntradas
+from ..servicios_externos import PasarelaPagosSimulada
+from ..ventas import CAMPOS_TOTALES, banda_de_edad, reconstruir
+
+
+# --- FIXTURES ---
+
+@pytest.fixture
+def pases(db):
+    return {
+        "Regular": Pase.objects.create(nombre="Regular", precio=Decimal("5000")),
+        "VIP": Pase.objects.create(nombre="VIP", precio=Decimal("10000")),
+    }
+
+
+@pytest.fixture
+def usuario(db):
+    return User.objects.create_user(username="juan", email="juan@example.com")
+
+
+@pytest.fixture
+def fecha_visita():
+    fecha = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    while fecha.weekday() != 2:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+@pytest.fixture
+def cliente(db):
+    """Cliente autenticado como staff."""
+    cliente = APIClient()
+    cliente.force_authenticate(user=User.objects.create_user(username="admin", email="admin@example.com", is_staff=True))
+    return cliente
+
+
+@pytest.fixture
+def servicio():
+    return ServicioCompraEntradas(PasarelaPagosSimulada(), None)
+
+
+VISITANTES = [
+    {"edad": 30, "tipo_pase": "Regular"},  # 5000, adulto
+    {"edad": 8, "tipo_pase": "VIP"},  # 5000, niño
+    {"edad": 2, "tipo_pase": "Regular"},  # 0, infante
+    {"edad": 70, "tipo_pase": "VIP"},  # 5000, mayor
+]
+
+
+def acumulado():
+    """VentasDiarias sin filas vacías, como dicts comparables."""
+    return sorted(
+        (fila for fila in VentasDiarias.objects.values('fecha_visita', 'pase_id', 'forma_pago', 'estado_pago', *CAMPOS_TOTALES)
+         if fila['entradas']),
+        key=lambda fila: (fila['fecha_visita'], fila['pase_id'], fila['forma_pago'], fila['estado_pago']),
+    )
+
+
+def reconstruido():
+    incremental = acumulado()
+    reconstruir()
+    return incremental, acumulado()
+
+
+# --- PRUEBAS UNITARIAS ---
+
+def test_bandas_de_edad():
+    assert [banda_de_edad(edad) for edad in (0, 2, 3, 9, 10, 60, 61, 120, 150)] == [
+        "infantes", "infantes", "ninos", "ninos", "adultos", "adultos", "mayores", "mayores", "mayores",
+    ]
+
+
+# --- PRUEBAS DE INTEGRACIÓN: MANTENIMIENTO INCREMENTAL ---
+
+@pytest.mark.django_db
+def test_compra_suma_sus_entradas(servicio, usuario, pases, fecha_visita):
+    servicio.comprar_entradas(usuario, 4, fecha_visita.isoformat(), "Tarjeta", VISITANTES)
+
+    regular = VentasDiarias.objects.get(pase=pases["Regular"])
+    assert (regular.fecha_visita, regular.forma_pago, regular.estado_pago) == (fecha_visita.date(), "TAR", "PAG")
+    assert (regular.entradas, regular.recaudacion, regular.adultos, regular.infantes) == (2, Decimal("5000"), 1, 1)
+    vip = VentasDiarias.objects.get(pase=pases["VIP"])
+    assert (vip.entradas, vip.recaudacion, vip.ninos, vip.mayores) == (2, Decimal("10000"), 1, 1)
+
+
+@pytest.mark.django_db
+def test_compras_del_mismo_dia_acumulan_en_la_misma_fila(servicio, usuario, pases, fecha_visita):
+    for _ in range(3):
+        servicio.comprar_entradas(usuario, 1, fecha_visita.isoformat(), "Tarjeta", VISITANTES[:1])
+
+    fila, = VentasDiarias.objects.all()
+    assert (fila.entradas, fila.recaudacion) == (3, Decimal("15000"))
+
+
+@pytest.mark.django_db
+def test_pago_de_compra_pendiente_mueve_sus_entradas(servicio, usuario, pases, fecha_visita):
+    compra = servicio.comprar_entradas(usuario, 4, fecha_visita.isoformat(), "Efectivo", VISITANTES)
+    assert set(VentasDiarias.objects.values_list('estado_pago', flat=True)) == {"PEN"}
+
+    servicio.pagar_compra(compra)
+
+    pendientes = VentasDiarias.objects.filter(estado_pago="PEN")
+    pagadas = VentasDiarias.objects.filter(estado_pago="PAG", forma_pago="TAR")
+    assert sum(fila.entradas for fila in pendientes) == 0
+    assert sum(fila.entradas for fila in pagadas) == 4
+    incremental, desde_cero = reconstruido()
+    assert incremental == desde_cero
+
+
+@pytest.mark.django_db
+def test_cambios_por_la_api_mantienen_el_acumulado(servicio, usuario, pases, fecha_visita):
+    compra = servicio.comprar_entradas(usuario, 4, fecha_visita.isoformat(), "Tarjeta", VISITANTES)
+    cliente = APIClient()
+
+    assert cliente.patch(f"/api/compras/{compra.id}/", {"estado_pago": "CAN"}, format="json").status_code == 200
+    entrada = compra.entradas.first()
+    assert cliente.patch(f"/api/entradas/{entrada.id}/", {"edad_visitante": 65}, format="json").status_code == 200
+    assert cliente.post("/api/entradas/", {
+        "compra": compra.id, "pase": pases["VIP"].id, "edad_visitante": 40, "precio_calculado": "10000",
+    }, format="json").status_code == 201
+    assert cliente.delete(f"/api/entradas/{compra.entradas.last().id}/").status_code == 204
+
+    incremental, desde_cero = reconstruido()
+    assert incremental == desde_cero
+    assert {fila['estado_pago'] for fila in incremental} == {"CAN"}
+
+
+@pytest.mark.django_db
+def test_compra_con_tarjeta_reintentada_coincide_con_la_reconstruccion(servicio, usuario, pases, fecha_visita):
+    with patch.object(PasarelaPagosSimulada, "procesar_pago", side_effect=ConnectionError("caída")):
+        with pytest.raises(ConnectionError):
+            servicio.comprar_entradas(usuario, 4, fecha_visita.isoformat(), "Tarjeta", VISITANTES, referencia="intento-1")
+    compra = servicio.comprar_entradas(usuario, 4, fecha_visita.isoformat(), "Tarjeta", VISITANTES, referencia="intento-1")
+
+    assert compra.estado_pago == Compra.EstadosPago.PAGADO and Compra.objects.count() == 1
+    incremental, desde_cero = reconstruido()
+    assert incremental == desde_cero
+    assert {fila['estado_pago'] for fila in incremental} == {"PAG"}
+    assert sum(fila['entradas'] for fila in incremental) == 4
+
+
+@pytest.mark.django_db
+def test_borrar_compra_descuenta_sus_entradas(servicio, usuario, pases, fecha_visita):
+    compra = servicio.comprar_entradas(usuario, 4, fecha_visita.isoformat(), "Tarjeta", VISITANTES)
+
+    compra.delete()
+
+    assert acumulado() == []
+
+
+# --- PRUEBAS DE INTEGRACIÓN: RECONSTRUCCIÓN ---
+
+@pytest.mark.django_db
+def test_reconstruir_carga_historica(usuario, pases, fecha_visita):
+    # Carga masiva por fuera del servicio: bulk_create no emite señales
+    compras = Compra.objects.bulk_create([
+        Compra(usuario=usuario, fecha_visita=fecha_visita.date() - timedelta(days=dia), monto_total=Decimal("0"),
+               forma_pago="TAR", estado_pago="PAG")
+        for dia in range(5)
+    ])
+    Entrada.objects.bulk_create([
+        Entrada(compra=compra, pase=pases["Regular"], edad_visitante=edad, precio_calculado=Decimal("5000"))
+        for compra in compras for edad in (1, 5, 30, 80)
+    ])
+    assert acumulado() == []
+
+    call_command("reconstruir_ventas_diarias", desde=str(fecha_visita.date() - timedelta(days=1)))
+
+    filas = acumulado()
+    assert [fila['fecha_visita'] for fila in filas] == [fecha_visita.date() - timedelta(days=1), fecha_visita.date()]
+    assert all((f['entradas'], f['infantes'], f['ninos'], f['adultos'], f['mayores']) == (4, 1, 1, 1, 1) for f in filas)
+
+    call_command("reconstruir_ventas_diarias")
+    assert len(acumulado()) == 5
+
+
+# --- PRUEBAS DE INTEGRACIÓN: API ---
+
+@pytest.mark.django_db
+def test_api_ventas_diarias(servicio, usuario, pases, fecha_visita, cliente):
+    servicio.comprar_entradas(usuario, 4, fecha_visita.isoformat(), "Tarjeta", VISITANTES)
+    servicio.comprar_entradas(usuario, 1, (fecha_visita + timedelta(days=1)).isoformat(), "Efectivo", VISITANTES[:1])
+
+    detalle = cliente.get("/api/ventas-diarias/").json()
+    assert len(detalle["filas"]) == 3
+    assert detalle["totales"]["entradas"] == 5
+    assert detalle["totales"]["recaudacion"] == "20000.00"
+
+    por_fecha = cliente.get("/api/ventas-diarias/", {"agrupar": "fecha"}).json()["filas"]
+    assert [(fila["fecha_visita"], fila["entradas"]) for fila in por_fecha] == [
+        (fecha_visita.date().isoformat(), 4), ((fecha_visita + timedelta(days=1)).date().isoformat(), 1),
+    ]
+
+    filtrado = cliente.get("/api/ventas-diarias/", {"desde": fecha_visita.date().isoformat(), "pase": pases["VIP"].id}).json()
+    assert [(fila["pase_nombre"], fila["entradas"], fila["recaudacion"]) for fila in filtrado["filas"]] == [("VIP", 2, "10000.00")]
+
+
+@pytest.mark.django_db
+def test_api_ventas_diarias_no_recorre_entradas(servicio, usuario, pases, fecha_visita, cliente, django_assert_num_queries):
+    for _ in range(5):
+        servicio.comprar_entradas(usuario, 4, fecha_visita.isoformat(), "Tarjeta", VISITANTES)
+
+    # Filas del período y totales, sin importar cuántas entradas se vendieron
+    with django_assert_num_queries(2):
+        respuesta = cliente.get("/api/ventas-diarias/", {"agrupar": "fecha"})
+    assert respuesta.json()["totales"]["entradas"] == 20
+
+
+@pytest.mark.django_db
+def test_api_ventas_diarias_parametros_invalidos(pases, cliente):
+
+    assert cliente.get("/api/ventas-diarias/", {"desde": "ayer"}).status_code == 400
+    assert cliente.get("/api/ventas-diarias/", {"desde": "2024-13-01"}).status_code == 400
+    assert cliente.get("/api/ventas-diarias/", {"hasta": "2024-02-30"}).status_code == 400
+    assert cliente.get("/api/ventas-diarias/", {"agrupar": "pase"}).status_code == 400
+    vacio = cliente.get("/api/ventas-diarias/").json()
+    assert vacio == {"filas": [], "totales": {"entradas": 0, "recaudacion": "0.00", "infantes": 0, "ninos": 0, "adultos": 0, "mayores": 0}}
+
+
+@pytest.mark.django_db
+def test_api_ventas_diarias_solo_para_el_staff(usuario):
+    visitante = APIClient()
+    visitante.force_authenticate(user=usuario)
+
+    assert APIClient().get("/api/ventas-diarias/").status_code == 403
+    assert visitante.get("/api/ventas-diarias/").status_code == 403
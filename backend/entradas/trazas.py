@@ -0,0 +1,130 @@
+# trazas.py
+
+import contextvars
+import importlib.util
+import json
+import logging
+import secrets
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# OpenTelemetry es opcional: sin el paquete, los tramos solo se registran en el log
+OTEL_DISPONIBLE = importlib.util.find_spec('opentelemetry') is not None
+
+# Tramo abierto en el contexto actual (hilo o tarea async), para anidar los siguientes
+_tramo_actual = contextvars.ContextVar('tramo_actual', default=None)
+
+
+class _TramoNulo:
+    """Tramo que no mide nada: es lo que devuelve tramo() con las trazas deshabilitadas."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, error, traceback):
+        return False
+
+    def anotar(self, **atributos):
+        pass
+
+
+TRAMO_NULO = _TramoNulo()
+
+
+class Tramo:
+    """
+    Mide una etapa (validación, cobro, registro...) y al cerrarse emite un registro de log
+    estructurado con su duración y su resultado ('ok' o 'error' y la clase de la excepción).
+    Los tramos anidados comparten la traza del tramo raíz y apuntan a su padre.
+    """
+    __slots__ = ('nombre', 'atributos', 'traza', 'id', 'padre', 'duracion', 'resultado', '_inicio', '_token', '_otel', '_span')
+
+    def __init__(self, nombre: str, atributos: dict, otel: bool = False):
+        self.nombre = nombre
+        self.atributos = atributos
+        self.duracion = None
+        self.resultado = None
+        self._otel = _tracer().start_as_current_span(nombre) if otel else None
+
+    def anotar(self, **atributos):
+        """Agrega atributos que se conocen recién durante la etapa (p. ej. el id de la compra)."""
+        self.atributos.update(atributos)
+
+    def __enter__(self):
+        padre = _tramo_actual.get()
+        self.traza = padre.traza if padre is not None else secrets.token_hex(8)
+        self.padre = padre.id if padre is not None else None
+        self.id = secrets.token_hex(4)
+        self._token = _tramo_actual.set(self)
+        if self._otel is not None:
+            self._span = self._otel.__enter__()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, error, traceback):
+        self.duracion = time.perf_counter() - self._inicio
+        self.resultado = 'ok' if tipo is None else 'error'
+        if tipo is not None:
+            self.atributos['error'] = tipo.__name__
+        _tramo_actual.reset(self._token)
+
+        if self._otel is not None:
+            self._span.set_attributes({clave: _valor_otel(valor) for clave, valor in self.atributos.items()})
+            self._otel.__exit__(tipo, error, traceback)
+
+        logger.info(
+            "%s %s en %.2f ms", self.nombre, self.resultado, self.duracion * 1000,
+            extra={'tramo': self.como_dict()},
+        )
+        return False
+
+    def como_dict(self) -> dict:
+        return {
+            'nombre': self.nombre,
+            'traza': self.traza,
+            'id': self.id,
+            'padre': self.padre,
+            'duracion_ms': round(self.duracion * 1000, 3),
+            'resultado': self.resultado,
+            **self.atributos,
+        }
+
+
+def tramo(nombre: str, **atributos):
+    """
+    Abre un tramo con nombre para usar como context manager:
+
+        with tramo("compra.pago", tipo_pago=tipo_pago):
+            ...
+
+    Con settings.TRAZAS['HABILITADAS'] en False devuelve un tramo nulo compartido, así que
+    dejar los tramos en los caminos calientes cuesta una consulta a settings por etapa.
+    """
+    configuracion = settings.TRAZAS
+    if not configuracion['HABILITADAS']:
+        return TRAMO_NULO
+    return Tramo(nombre, atributos, otel=OTEL_DISPONIBLE and configuracion['OTEL'])
+
+
+def _tracer():
+    from opentelemetry import trace
+    return trace.get_tracer(__name__)
+
+
+def _valor_otel(valor):
+    # OpenTelemetry solo acepta atributos primitivos
+    return valor if isinstance(valor, (str, bool, int, float)) else str(valor)
+
+
+class FormatoJSON(logging.Formatter):
+    """Formatter que escribe cada tramo como una línea JSON, para procesar los logs con herramientas."""
+
+    def format(self, record):
+        datos = getattr(record, 'tramo', None)
+        if datos is None:
+            return super().format(record)
+        return json.dumps({'momento': self.formatTime(record), **datos}, default=str, ensure_ascii=False)
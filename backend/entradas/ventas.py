@@ -0,0 +1,132 @@
+# ventas.py
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Compra, Entrada, VentasDiarias
+from .tarifas import BANDAS_EDAD, EDAD_MAXIMA
+
+# Columna de VentasDiarias para cada banda de tarifas.BANDAS_EDAD, en el mismo orden
+CAMPOS_BANDAS = ('infantes', 'ninos', 'adultos', 'mayores')
+
+CAMPOS_TOTALES = ('entradas', 'recaudacion') + CAMPOS_BANDAS
+
+_BANDA_POR_EDAD = [None] * (EDAD_MAXIMA + 1)
+for _campo, (_minima, _maxima, _) in zip(CAMPOS_BANDAS, BANDAS_EDAD):
+    for _edad in range(_minima, _maxima + 1):
+        _BANDA_POR_EDAD[_edad] = _campo
+
+
+def banda_de_edad(edad: int) -> str:
+    return _BANDA_POR_EDAD[min(edad, EDAD_MAXIMA)]
+
+
+def clave_de(compra) -> tuple:
+    """Lo que define la fila de VentasDiarias de una compra (además del pase)."""
+    return compra.fecha_visita, compra.forma_pago, compra.estado_pago
+
+
+def totales_por_pase(entradas) -> dict:
+    """Agrupa (pase_id, edad, precio) por pase: cantidad, recaudación y cantidad por banda de edad."""
+    por_pase = {}
+    for pase_id, edad, precio in entradas:
+        totales = por_pase.get(pase_id)
+        if totales is None:
+            totales = por_pase[pase_id] = dict.fromkeys(CAMPOS_TOTALES, 0)
+            totales['recaudacion'] = Decimal('0')
+        totales['entradas'] += 1
+        totales['recaudacion'] += precio
+        totales[banda_de_edad(edad)] += 1
+    return por_pase
+
+
+def sumar(clave: tuple, por_pase: dict, signo: int = 1):
+    """
+    Suma (o resta, con signo=-1) los totales de cada pase a su fila de VentasDiarias con un UPDATE
+    sobre F(); la fila se crea la primera vez. Se llama dentro de la transacción que cambia las
+    entradas, así el acumulado nunca queda desfasado de lo confirmado.
+
+    Las compras con el cobro en curso (PROCESANDO) no suman: entran al acumulado cuando pasan a
+    PAGADO o PENDIENTE, y si el cobro se rechaza se borran sin haberlo tocado.
+    """
+    fecha_visita, forma_pago, estado_pago = clave
+    if estado_pago == Compra.EstadosPago.PROCESANDO:
+        return
+    for pase_id, totales in por_pase.items():
+        fila = {'fecha_visita': fecha_visita, 'pase_id': pase_id, 'forma_pago': forma_pago, 'estado_pago': estado_pago}
+        incrementos = {campo: F(campo) + signo * valor for campo, valor in totales.items()}
+        if VentasDiarias.objects.filter(**fila).update(**incrementos):
+            continue
+        try:
+            with transaction.atomic():
+                VentasDiarias.objects.create(**fila, **{campo: signo * valor for campo, valor in totales.items()})
+        except IntegrityError:
+            # Otra transacción creó la fila al mismo tiempo
+            VentasDiarias.objects.filter(**fila).update(**incrementos)
+
+
+def registrar_entradas(compra, entradas):
+    """Suma al acumulado entradas nuevas de una compra (p. ej. las de un bulk_create, que no emite señales)."""
+    sumar(clave_de(compra), totales_por_pase((e.pase_id, e.edad_visitante, e.precio_calculado) for e in entradas))
+
+
+def sumar_entrada(compra_id, pase_id, edad, precio, signo: int = 1):
+    """Suma o resta una sola entrada (altas, cambios y bajas de a una, desde las señales)."""
+    clave = Compra.objects.filter(id=compra_id).values_list('fecha_visita', 'forma_pago', 'estado_pago').first()
+    if clave is not None:
+        sumar(clave, totales_por_pase([(pase_id, edad, precio)]), signo)
+
+
+def mover_compra(compra_id, antes: tuple, despues: tuple):
+    """Pasa las entradas de una compra de una fila a otra, cuando cambia su fecha, forma o estado de pago."""
+    por_pase = totales_por_pase(
+        Entrada.objects.filter(compra_id=compra_id).values_list('pase_id', 'edad_visitante', 'precio_calculado')
+    )
+    sumar(antes, por_pase, signo=-1)
+    sumar(despues, por_pase)
+
+
+def reconstruir(desde=None, hasta=None) -> int:
+    """
+    Recalcula VentasDiarias desde las Entradas para el rango de fechas de visita (todo, sin rango).
+    Un único GROUP BY en la base; reemplaza las filas del rango en una transacción. Retorna las filas creadas.
+    """
+    rango = {}
+    if desde is not None:
+        rango['fecha_visita__gte'] = desde
+    if hasta is not None:
+        rango['fecha_visita__lte'] = hasta
+
+    bandas = {}
+    for campo, (minima, maxima, _) in zip(CAMPOS_BANDAS, BANDAS_EDAD):
+        # La última banda también cuenta edades por encima de EDAD_MAXIMA
+        edades = Q(edad_visitante__gte=minima) if maxima == EDAD_MAXIMA else Q(edad_visitante__range=(minima, maxima))
+        bandas[campo] = Count('id', filter=edades)
+
+    grupos = (
+        Entrada.objects
+        .filter(**{f'compra__{filtro}': valor for filtro, valor in rango.items()})
+        .exclude(compra__estado_pago=Compra.EstadosPago.PROCESANDO)
+        .values('compra__fecha_visita', 'pase_id', 'compra__forma_pago', 'compra__estado_pago')
+        .annotate(total_entradas=Count('id'), total_recaudacion=Sum('precio_calculado'), **bandas)
+        .order_by()
+    )
+    with transaction.atomic():
+        filas = [
+            VentasDiarias(
+                fecha_visita=grupo['compra__fecha_visita'],
+                pase_id=grupo['pase_id'],
+                forma_pago=grupo['compra__forma_pago'],
+                estado_pago=grupo['compra__estado_pago'],
+                entradas=grupo['total_entradas'],
+                recaudacion=grupo['total_recaudacion'],
+                **{campo: grupo[campo] for campo in CAMPOS_BANDAS},
+            )
+            for grupo in grupos
+        ]
+        VentasDiarias.objects.filter(**rango).delete()
+        VentasDiarias.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
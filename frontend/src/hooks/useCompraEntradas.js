@@ -1,16 +1,25 @@
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import { servicioCompra } from '../services/entradasService';
 
 export const useCompraEntradas = () => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  // Intento de compra en curso: la misma clave de idempotencia en cada reintento del mismo carrito,
+  // hasta que la compra se confirma o el backend la rechaza (4xx). Si cambia el carrito, clave nueva.
+  const intentoRef = useRef(null);
 
   const procesarCompra = async (datosCompra) => {
     setLoading(true);
     setError(null);
-    
+
+    const carrito = JSON.stringify(datosCompra);
+    if (!intentoRef.current || intentoRef.current.carrito !== carrito) {
+      intentoRef.current = { carrito, clave: crypto.randomUUID() };
+    }
+
     try {
-      const compraProcesada = await servicioCompra.procesarCompra(datosCompra);
+      const compraProcesada = await servicioCompra.procesarCompra(datosCompra, intentoRef.current.clave);
+      intentoRef.current = null;
       
       // Mensaje de confirmación para el email - ACTUALIZADO
       const mensajeMail = `
@@ -41,6 +50,11 @@ export const useCompraEntradas = () => {
         datosOriginales: datosCompra // Para mantener compatibilidad
       };
     } catch (err) {
+      // Rechazo definitivo (datos inválidos, pago rechazado): el próximo intento es otra compra.
+      // Con 409 se conserva la clave: puede ser el mismo intento todavía en curso en el backend.
+      if (err.status >= 400 && err.status < 500 && err.status !== 409) {
+        intentoRef.current = null;
+      }
       const errorMessage = err.response?.data?.message || err.response?.data || 'Error al procesar la compra';
       setError(errorMessage);
       throw new Error(errorMessage);
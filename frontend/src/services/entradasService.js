@@ -1,10 +1,17 @@
 import api from './api';
 
+// Hora de apertura del parque, la fecha de visita se envía como fecha y hora ISO 8601
+const HORA_APERTURA = '09:00:00';
+
 export const entradasService = {
   // Pases
   getPases: () => api.get('/pases/'),
   getPaseById: (id) => api.get(`/pases/${id}/`),
 
+  // Calendario: disponibilidad de toda la temporada en un solo request
+  getCalendario: (desde, dias) => api.get('/calendario/', { params: { desde, dias } }),
+  getProximosDiasAbiertos: (cantidad) => api.get('/calendario/proximos/', { params: { cantidad } }),
+
   // Compras
   getCompras: () => api.get('/compras/'),
   getCompraById: (id) => api.get(`/compras/${id}/`),
@@ -29,73 +36,52 @@ export const entradasService = {
   getEntradaById: (id) => api.get(`/entradas/${id}/`),
   createEntrada: (entradaData) => api.post('/entradas/', entradaData),
   
+  // Checkout: compra completa (compra + entradas + pago) en un solo request.
+  // Con la misma clave de idempotencia, un reintento devuelve la compra ya registrada en vez de duplicarla
+  checkout: (carrito, claveIdempotencia) => api.post('/compras/checkout/', carrito, {
+    headers: claveIdempotencia ? { 'Idempotency-Key': claveIdempotencia } : {}
+  }),
+
   // Procesar pago (para tarjetas)
-  procesarPago: (compraId, datosPago) => api.post(`/compras/${compraId}/procesar-pago/`, datosPago),
+  procesarPago: (compraId, datosPago, claveIdempotencia) => api.post(`/compras/${compraId}/procesar-pago/`, datosPago, {
+    headers: claveIdempotencia ? { 'Idempotency-Key': claveIdempotencia } : {}
+  }),
 };
 
 // Servicio para procesar compras con la lógica de negocio - ACTUALIZADO
 export const servicioCompra = {
-  procesarCompra: async (datosCompra) => {
+  // La clave de idempotencia la arma quien llama, una por intento de compra (ver useCompraEntradas),
+  // así los reintentos del mismo carrito no cobran dos veces
+  procesarCompra: async (datosCompra, claveIdempotencia) => {
     try {
       console.log('Datos recibidos para procesar compra:', datosCompra);
 
-      // Primero crear la compra con usuario
-      const compraResponse = await entradasService.createCompra({
-        fecha_visita: datosCompra.fecha_visita,
-        forma_pago: datosCompra.forma_pago,
-        monto_total: datosCompra.total,
-        estado_pago: datosCompra.forma_pago === 'tarjeta' ? 'PRO' : 'PEN',
-        email: datosCompra.email,
-        cantidad_entradas: datosCompra.cantidad_entradas,
-        usuario: 2 // Usuario demo
-      });
+      // Un único request: el backend valida, cobra y registra la compra con todas sus entradas
+      const checkoutResponse = await entradasService.checkout({
+        cantidad: datosCompra.cantidad_entradas,
+        fecha_visita: `${datosCompra.fecha_visita}T${HORA_APERTURA}`,
+        tipo_pago: datosCompra.forma_pago === 'tarjeta' ? 'Tarjeta' : 'Efectivo',
+        visitantes: datosCompra.entradas.map((entrada) => ({
+          edad: entrada.edad,
+          tipo_pase: entrada.tipo_pase === 'VIP' ? 'VIP' : 'Regular'
+        }))
+      }, claveIdempotencia);
 
-      const compra = compraResponse.data;
+      const compra = checkoutResponse.data;
       console.log('Compra creada:', compra);
 
-      // Luego crear las entradas asociadas
-      const entradasPromises = datosCompra.entradas.map((entrada) => {
-        // Determinar el pase_id basado en el tipo de entrada
-        const paseId = entrada.tipo_pase === 'VIP' ? 2 : 1; // Ajusta según tus IDs
-        
-        return entradasService.createEntrada({
-          compra: compra.id,
-          pase: paseId,
-          edad_visitante: entrada.edad,
-          precio_calculado: entrada.precio
-        });
-      });
-
-      const entradasCreadas = await Promise.all(entradasPromises);
-      console.log('Entradas creadas:', entradasCreadas);
-
-      // Si es pago con tarjeta, procesar el pago
-      if (datosCompra.forma_pago === 'tarjeta') {
-        try {
-          const pagoResponse = await entradasService.procesarPago(compra.id, {
-            // Aquí irían los datos de la tarjeta si los necesitas
-            metodo: 'mercadopago' // o la pasarela que uses
-          });
-          console.log('Pago procesado:', pagoResponse.data);
-        } catch (pagoError) {
-          console.error('Error procesando pago:', pagoError);
-          // No lanzamos error aquí para no revertir la compra creada
-        }
-      }
-
       // Retornar compra con entradas para el frontend
-      return {
-        ...compra,
-        entradas: entradasCreadas.map(entrada => entrada.data)
-      };
+      return compra;
 
     } catch (error) {
       console.error('Error en procesarCompra:', error);
       
       // Mejor manejo de errores
       if (error.response) {
-        // Error del servidor
-        throw new Error(error.response.data.detail || error.response.data.message || 'Error del servidor');
+        // Error del servidor: se conserva el código para decidir si el intento se puede reintentar
+        const errorServidor = new Error(error.response.data.error || error.response.data.detail || error.response.data.message || 'Error del servidor');
+        errorServidor.status = error.response.status;
+        throw errorServidor;
       } else if (error.request) {
         // Error de red
         throw new Error('Error de conexión con el servidor');